@@ -4,7 +4,6 @@ from __future__ import annotations
 import os
 from typing import Any, Dict, Optional
 
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
@@ -65,4 +64,22 @@ def get_betrieb_id(user: Dict[str, Any] = Depends(get_current_user)) -> int:
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode(), hashed.encode())
+    from utils.anmeldung import passwort_pruefen
+    return passwort_pruefen(plain, hashed)
+
+
+def pruefe_mitarbeiter_im_betrieb(mitarbeiter_id: int, betrieb_id: int) -> None:
+    """404, wenn der Mitarbeiter nicht zum Betrieb gehört (ID-Cache je Betrieb, meist ohne DB-Abfrage)."""
+    from utils.betrieb_mitarbeiter import gehoert_zu_betrieb
+    if not gehoert_zu_betrieb(betrieb_id, mitarbeiter_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mitarbeiter nicht gefunden.")
+
+
+def mitarbeiter_im_betrieb(
+    mitarbeiter_id: int,
+    betrieb_id: int = Depends(get_betrieb_id),
+) -> int:
+    """Dependency für Endpunkte mit ``mitarbeiter_id`` im Pfad/Query: Mandantenschutz."""
+    pruefe_mitarbeiter_im_betrieb(mitarbeiter_id, betrieb_id)
+    return mitarbeiter_id
+
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import asyncio
+import os
+import secrets
+
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from routers import auth, stempel, zeiten, urlaub, mitarbeiter, admin, lohn, dokumente, dienstplan, leads
+from utils.anfrage_cache import anfrage_cache
+from utils.db_instrumentierung import MetrikMiddleware
+from utils.profiling import PROFILING_AKTIV, ProfilMiddleware
 
-app = FastAPI(title="Complio API", version="2.0.0")
+# Identity-Map je Request: Stammdaten werden pro Request höchstens einmal geladen.
+app = FastAPI(title="Complio API", version="2.0.0", dependencies=[Depends(anfrage_cache)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +30,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Profiling einzelner Admin-Requests auf Anforderung; ohne PROFILING_AKTIV=1
+# nicht eingehängt. Muss innerhalb der MetrikMiddleware liegen (DB-Spur).
+if PROFILING_AKTIV:
+    app.add_middleware(ProfilMiddleware)
+# Latenz, DB-Aufrufe und DB-Zeit je Route (→ /metrics, p95 in /health).
+app.add_middleware(MetrikMiddleware)
 
 for router, prefix, tag in [
     (auth.router,        "/auth",        "Auth"),
@@ -37,6 +52,35 @@ for router, prefix, tag in [
     app.include_router(router, prefix=prefix, tags=[tag])
 
 
+@app.on_event("startup")
+async def _startup():
+    from utils.aufwaermen import WARMUP_AKTIV, starte_aufwaermen
+    if WARMUP_AKTIV:
+        starte_aufwaermen()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    from utils.anmeldung import schreibe_last_login
+    from utils.database_async import schliesse_async_client
+    await asyncio.to_thread(schreibe_last_login)
+    await schliesse_async_client()
+
+
 @app.get("/health")
 def health():
-    return {"status": "ok", "version": "2.0.0"}
+    from utils.metrics import rolling_p95
+    return {"status": "ok", "version": "2.0.0", "latenz": rolling_p95()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str = Header(default="")):
+    # Nur für den Scraper mit METRICS_TOKEN als Bearer-Token. Ohne konfiguriertes
+    # Token existiert der Endpunkt nicht (Routen- und Latenzdaten bleiben intern).
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(authorization, f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Nicht autorisiert")
+    from utils.metrics import prometheus_text
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4; charset=utf-8")
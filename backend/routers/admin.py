@@ -73,6 +73,10 @@ def betrieb_aktualisieren(
     if not updates:
         raise HTTPException(status_code=400, detail="Keine Änderungen angegeben.")
     res = supabase.table("betriebe").update(updates).eq("id", betrieb_id).execute()
+    from utils.anfrage_cache import vergiss
+    from utils.anmeldung import invalidiere_betrieb_login
+    vergiss("betriebe", betrieb_id)
+    invalidiere_betrieb_login(betrieb_id)
     return res.data[0] if res.data else {"ok": True}
 
 
@@ -100,10 +104,10 @@ def user_anlegen(
     user: Dict[str, Any] = Depends(require_admin),
 ):
     """Neuen User-Account anlegen."""
-    import bcrypt
     supabase = _get_supabase()
 
-    pw_hash = bcrypt.hashpw(body.password.encode(), bcrypt.gensalt()).decode()
+    from utils.anmeldung import passwort_hashen
+    pw_hash = passwort_hashen(body.password)
     payload = {
         "betrieb_id": betrieb_id,
         "username": body.username,
@@ -148,56 +152,48 @@ def user_aktualisieren(
         raise HTTPException(status_code=400, detail="Keine Änderungen angegeben.")
 
     res = supabase.table("users").update(updates).eq("id", user_id).execute()
+    from utils.benutzerprofil import invalidiere_profil
+    invalidiere_profil(user_id)
     return res.data[0] if res.data else {"ok": True}
 
 
 @router.get("/dashboard")
-def admin_dashboard_stats(
+async def admin_dashboard_stats(
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(require_admin),
 ):
-    """Kurz-Statistiken für das Admin-Dashboard."""
-    supabase = _get_supabase()
+    """Kurz-Statistiken für das Admin-Dashboard (vier unabhängige Abfragen gleichzeitig)."""
     from datetime import date
 
+    from utils.database_async import get_async_service_role_client, parallel
+
+    db = get_async_service_role_client()
     heute = date.today().isoformat()
 
-    ma_res = (
-        supabase.table("mitarbeiter")
+    def _events(aktion: str):
+        return (
+            db.table("zeit_eintraege")
+            .select("mitarbeiter_id")
+            .eq("betrieb_id", betrieb_id)
+            .eq("aktion", aktion)
+            .gte("zeitpunkt_utc", f"{heute}T00:00:00+00:00")
+        )
+
+    ma_res, offen_res, eingestempelt_res, clock_out_res = await parallel(
+        db.table("mitarbeiter")
         .select("id", count="exact")
         .eq("betrieb_id", betrieb_id)
-        .eq("aktiv", True)
-        .execute()
-    )
-    anzahl_mitarbeiter = ma_res.count or 0
-
-    offen_res = (
-        supabase.table("urlaubsantraege")
+        .eq("aktiv", True),
+        db.table("urlaubsantraege")
         .select("id", count="exact")
         .eq("betrieb_id", betrieb_id)
-        .eq("status", "ausstehend")
-        .execute()
+        .eq("status", "ausstehend"),
+        _events("clock_in"),
+        _events("clock_out"),
     )
+    anzahl_mitarbeiter = ma_res.count or 0
     offene_urlaube = offen_res.count or 0
-
-    eingestempelt_res = (
-        supabase.table("zeit_eintraege")
-        .select("mitarbeiter_id")
-        .eq("betrieb_id", betrieb_id)
-        .eq("aktion", "clock_in")
-        .gte("zeitpunkt_utc", f"{heute}T00:00:00+00:00")
-        .execute()
-    )
     clock_ins = {r["mitarbeiter_id"] for r in (eingestempelt_res.data or [])}
-
-    clock_out_res = (
-        supabase.table("zeit_eintraege")
-        .select("mitarbeiter_id")
-        .eq("betrieb_id", betrieb_id)
-        .eq("aktion", "clock_out")
-        .gte("zeitpunkt_utc", f"{heute}T00:00:00+00:00")
-        .execute()
-    )
     clock_outs = {r["mitarbeiter_id"] for r in (clock_out_res.data or [])}
     aktuell_eingestempelt = len(clock_ins - clock_outs)
 
@@ -207,3 +203,28 @@ def admin_dashboard_stats(
         "aktuell_eingestempelt": aktuell_eingestempelt,
         "datum": heute,
     }
+
+
+# ── Profiling (utils.profiling, nur mit PROFILING_AKTIV=1) ─────────────────────
+
+@router.get("/profile")
+def profile_liste(
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """Gespeicherte Request-Profile des eigenen Betriebs (neueste zuerst)."""
+    from utils.profiling import profile_liste as _liste
+    return _liste(betrieb_id)
+
+
+@router.get("/profile/{profil_id}")
+def profil_abrufen(
+    profil_id: str,
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    from utils.profiling import profil_laden
+    profil = profil_laden(profil_id, betrieb_id)
+    if profil is None:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden.")
+    return profil
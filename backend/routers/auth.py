@@ -4,11 +4,10 @@ from __future__ import annotations
 import os
 from typing import Any, Dict, Optional
 
-import bcrypt
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 
-from deps import JWT_EXPIRE_MINUTES, create_access_token, get_current_user, verify_password
+from deps import JWT_EXPIRE_MINUTES, create_access_token, get_current_user
 
 router = APIRouter()
 
@@ -44,10 +43,15 @@ def _get_supabase():
     return get_service_role_client()
 
 
-def _load_mitarbeiter_id(supabase, betrieb_id: int, user_id: int) -> Optional[int]:
+def _get_async_db():
+    from utils.database_async import get_async_service_role_client
+    return get_async_service_role_client()
+
+
+async def _load_mitarbeiter_id_async(db, betrieb_id: int, user_id: int) -> Optional[int]:
     try:
-        res = (
-            supabase.table("mitarbeiter")
+        res = await (
+            db.table("mitarbeiter")
             .select("id")
             .eq("betrieb_id", betrieb_id)
             .eq("user_id", user_id)
@@ -64,28 +68,40 @@ def _load_mitarbeiter_id(supabase, betrieb_id: int, user_id: int) -> Optional[in
 # ── Endpoints ────────────────────────────────────────────────────────────────
 
 @router.post("/login", response_model=LoginResponse)
-def login(body: LoginRequest):
+async def login(body: LoginRequest, request: Request):
+    """
+    Asynchron: Abfragen über den async Client, bcrypt im eigenen Pool,
+    Betrieb aus dem Cache, last_login verzögert (utils.anmeldung).
+    """
+    from utils.anmeldung import (
+        bremse_konto,
+        client_ip,
+        lade_betrieb_fuer_login,
+        melde_erfolg,
+        melde_fehlversuch,
+        merke_last_login,
+        passwort_pruefen_async,
+        pruefe_login_sperre,
+    )
+
+    ip = client_ip(request)
+    pruefe_login_sperre(ip, body.betriebsnummer, body.username)
+    await bremse_konto(body.betriebsnummer, body.username)
     try:
-        supabase = _get_supabase()
+        db = _get_async_db()
 
         # 1. Betrieb prüfen
-        betrieb_res = (
-            supabase.table("betriebe")
-            .select("id, name")
-            .eq("betriebsnummer", body.betriebsnummer)
-            .eq("aktiv", True)
-            .execute()
-        )
-        if not betrieb_res.data:
+        betrieb = await lade_betrieb_fuer_login(db, body.betriebsnummer)
+        if betrieb is None:
+            melde_fehlversuch(ip, body.betriebsnummer, body.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Login fehlgeschlagen. Betriebsnummer nicht gefunden oder Betrieb inaktiv.",
             )
-        betrieb = betrieb_res.data[0]
 
         # 2. User prüfen
-        user_res = (
-            supabase.table("users")
+        user_res = await (
+            db.table("users")
             .select("id, username, password_hash, role, is_active")
             .eq("username", body.username)
             .eq("betrieb_id", betrieb["id"])
@@ -93,6 +109,7 @@ def login(body: LoginRequest):
             .execute()
         )
         if not user_res.data:
+            melde_fehlversuch(ip, body.betriebsnummer, body.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Login fehlgeschlagen. Benutzername oder Passwort falsch.",
@@ -100,8 +117,8 @@ def login(body: LoginRequest):
         user = user_res.data[0]
 
         # 3. Passwort prüfen
-        pw_hash = user.get("password_hash", "")
-        if not pw_hash or not bcrypt.checkpw(body.password.encode(), pw_hash.encode()):
+        if not await passwort_pruefen_async(body.password, user.get("password_hash") or ""):
+            melde_fehlversuch(ip, body.betriebsnummer, body.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Login fehlgeschlagen. Benutzername oder Passwort falsch.",
@@ -113,18 +130,13 @@ def login(body: LoginRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Server-Fehler beim Login: {type(exc).__name__}: {exc}",
         )
+    melde_erfolg(ip, body.betriebsnummer, body.username)
 
     # 4. Mitarbeiter-ID laden (optional, nur für Mitarbeiter-Rolle)
-    mitarbeiter_id = _load_mitarbeiter_id(supabase, betrieb["id"], user["id"])
+    mitarbeiter_id = await _load_mitarbeiter_id_async(db, betrieb["id"], user["id"])
 
-    # 5. Last-Login aktualisieren (best-effort)
-    try:
-        from datetime import datetime, timezone
-        supabase.table("users").update(
-            {"last_login": datetime.now(timezone.utc).isoformat()}
-        ).eq("id", user["id"]).execute()
-    except Exception:
-        pass
+    # 5. Last-Login vormerken (best-effort, gesammelt im Hintergrund geschrieben)
+    merke_last_login(user["id"])
 
     # 6. JWT ausstellen
     token = create_access_token({
@@ -161,27 +173,30 @@ def change_password(
     if not user_res.data:
         raise HTTPException(status_code=404, detail="Benutzer nicht gefunden.")
 
-    if not verify_password(body.old_password, user_res.data["password_hash"]):
+    from utils.anmeldung import passwort_hashen, passwort_pruefen
+
+    if not passwort_pruefen(body.old_password, user_res.data["password_hash"] or ""):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Altes Passwort ist falsch.",
         )
 
-    new_hash = bcrypt.hashpw(body.new_password.encode(), bcrypt.gensalt()).decode()
+    new_hash = passwort_hashen(body.new_password)
     supabase.table("users").update({"password_hash": new_hash}).eq("id", int(user["sub"])).execute()
+    from utils.benutzerprofil import invalidiere_profil
+    invalidiere_profil(int(user["sub"]))
     return {"ok": True, "message": "Passwort erfolgreich geändert."}
 
 
 @router.get("/me")
-def me(user: Dict[str, Any] = Depends(get_current_user)):
-    supabase = _get_supabase()
-    user_res = (
-        supabase.table("users")
-        .select("id, username, role, betrieb_id, last_login")
-        .eq("id", int(user["sub"]))
-        .single()
-        .execute()
-    )
-    if not user_res.data:
+async def me(user: Dict[str, Any] = Depends(get_current_user)):
+    """Eigenes Profil: Rolle/Betrieb aus dem Token, übrige Felder aus dem Profil-Cache."""
+    from utils.anmeldung import vorgemerkter_last_login
+    from utils.benutzerprofil import lade_profil_async, profil_aus_token
+
+    zeile = await lade_profil_async(int(user["sub"]))
+    if zeile is None:
         raise HTTPException(status_code=404, detail="Benutzer nicht gefunden.")
-    return user_res.data
+    profil = profil_aus_token(zeile, user)
+    profil["last_login"] = vorgemerkter_last_login(int(user["sub"])) or profil.get("last_login")
+    return profil
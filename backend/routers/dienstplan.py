@@ -4,7 +4,8 @@ from __future__ import annotations
 from datetime import date, timedelta
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from deps import get_betrieb_id, get_current_user, require_admin
@@ -17,6 +18,53 @@ def _sb():
     return get_service_role_client()
 
 
+def _plan_antwort(
+    betrieb_id: int,
+    datum_von: date,
+    datum_bis: date,
+    if_none_match: Optional[str],
+    response: Response,
+):
+    """Dienstplan-Zeilen eines Zeitraums mit ETag; 304 wenn unverändert."""
+    from utils.dienstplan_cache import etag_passt, lade_plan_zeitraum
+
+    def _laden() -> List[Dict[str, Any]]:
+        res = (
+            _sb().table("dienstplaene")
+            .select("id, mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten")
+            .eq("betrieb_id", betrieb_id)
+            .gte("datum", str(datum_von))
+            .lte("datum", str(datum_bis))
+            .execute()
+        )
+        return res.data or []
+
+    try:
+        rows, etag = lade_plan_zeitraum(betrieb_id, datum_von, datum_bis, _laden)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Fehler beim Laden: {exc}")
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_passt(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return rows
+
+
+def _plan_geaendert(betrieb_id: int) -> None:
+    from utils.dienstplan_cache import plan_geaendert
+    plan_geaendert(betrieb_id)
+
+
+def _arbzg_befunde(supabase, betrieb_id: int, zellen) -> List[Dict[str, Any]]:
+    """ArbZG-Rückmeldung zu geänderten Zellen; blockiert das Speichern nie."""
+    from utils.planpruefung import pruefe_zellen
+    try:
+        return pruefe_zellen(supabase, betrieb_id=betrieb_id, zellen=zellen)
+    except Exception:
+        return []
+
+
 class EintragBody(BaseModel):
     mitarbeiter_id: int
     datum: date
@@ -29,23 +77,13 @@ class EintragBody(BaseModel):
 @router.get("/woche")
 def woche(
     datum_von: date,
+    response: Response,
     betrieb_id: int = Depends(get_betrieb_id),
-) -> List[Dict[str, Any]]:
+    if_none_match: Optional[str] = Header(None),
+):
     """Alle Dienstplan-Einträge für eine Woche (Mo–So)."""
-    supabase = _sb()
     datum_bis = datum_von + timedelta(days=6)
-    try:
-        res = (
-            supabase.table("dienstplaene")
-            .select("id, mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten")
-            .eq("betrieb_id", betrieb_id)
-            .gte("datum", str(datum_von))
-            .lte("datum", str(datum_bis))
-            .execute()
-        )
-        return res.data or []
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Fehler beim Laden: {exc}")
+    return _plan_antwort(betrieb_id, datum_von, datum_bis, if_none_match, response)
 
 
 @router.post("/eintrag", status_code=200)
@@ -76,13 +114,105 @@ def eintrag_setzen(
         )
         if not res.data:
             raise HTTPException(status_code=500, detail="Eintrag konnte nicht gespeichert werden.")
-        return res.data[0]
+        _plan_geaendert(betrieb_id)
+        return {
+            **res.data[0],
+            "pruefung": _arbzg_befunde(supabase, betrieb_id, [(body.mitarbeiter_id, body.datum)]),
+        }
     except HTTPException:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Fehler beim Speichern: {exc}")
 
 
+class ZelleRef(BaseModel):
+    mitarbeiter_id: int
+    datum: date
+
+
+class BatchBody(BaseModel):
+    eintraege: List[EintragBody] = []
+    loeschen: List[ZelleRef] = []
+
+
+class KopierenBody(BaseModel):
+    quelle_von: date
+    quelle_bis: Optional[date] = None   # Standard: quelle_von + 6 (eine Woche)
+    ziel_von: date
+    ziel_bis: date
+    mitarbeiter_ids: Optional[List[int]] = None
+    ueberschreiben: bool = False
+
+
+@router.post("/eintraege", status_code=200)
+def eintraege_batch(
+    body: BatchBody,
+    betrieb_id: int = Depends(get_betrieb_id),
+    _user: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    """Viele Zellen setzen/löschen in einem Aufruf (ein Bulk-Upsert) mit Konfliktbericht."""
+    from utils.dienstplan_batch import MAX_ZELLEN, speichere_zellen
+
+    if not body.eintraege and not body.loeschen:
+        raise HTTPException(status_code=400, detail="Keine Änderungen angegeben.")
+    if len(body.eintraege) + len(body.loeschen) > MAX_ZELLEN:
+        raise HTTPException(status_code=400, detail=f"Maximal {MAX_ZELLEN} Zellen pro Aufruf.")
+    supabase = _sb()
+    try:
+        result = speichere_zellen(
+            supabase,
+            betrieb_id=betrieb_id,
+            setzen=[e.model_dump() for e in body.eintraege],
+            loeschen=[z.model_dump() for z in body.loeschen],
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Fehler beim Speichern: {exc}")
+    _plan_geaendert(betrieb_id)
+    geaendert = [(e.mitarbeiter_id, e.datum) for e in body.eintraege]
+    geaendert += [(z.mitarbeiter_id, z.datum) for z in body.loeschen]
+    result["pruefung"] = _arbzg_befunde(supabase, betrieb_id, geaendert)
+    return result
+
+
+@router.post("/kopieren", status_code=200)
+def plan_kopieren(
+    body: KopierenBody,
+    betrieb_id: int = Depends(get_betrieb_id),
+    _user: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    """Woche (oder Quellzeitraum als Vorlage) zyklisch auf einen Zielzeitraum kopieren."""
+    from utils.dienstplan_batch import kopiere_zeitraum
+
+    quelle_bis = body.quelle_bis or body.quelle_von + timedelta(days=6)
+    if quelle_bis < body.quelle_von or body.ziel_bis < body.ziel_von:
+        raise HTTPException(status_code=400, detail="Enddatum liegt vor Startdatum.")
+    if (body.ziel_bis - body.ziel_von).days > 366:
+        raise HTTPException(status_code=400, detail="Zielzeitraum darf höchstens ein Jahr umfassen.")
+    if body.ziel_von <= quelle_bis and body.quelle_von <= body.ziel_bis:
+        raise HTTPException(status_code=400, detail="Quell- und Zielzeitraum überschneiden sich.")
+    if (quelle_bis - body.quelle_von).days % 7 == 6 and body.ziel_von.weekday() != body.quelle_von.weekday():
+        raise HTTPException(status_code=400, detail="Ziel muss am selben Wochentag beginnen wie die Vorlage.")
+    supabase = _sb()
+    try:
+        result = kopiere_zeitraum(
+            supabase,
+            betrieb_id=betrieb_id,
+            quelle_von=body.quelle_von,
+            quelle_bis=quelle_bis,
+            ziel_von=body.ziel_von,
+            ziel_bis=body.ziel_bis,
+            mitarbeiter_ids=body.mitarbeiter_ids,
+            ueberschreiben=body.ueberschreiben,
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Fehler beim Kopieren: {exc}")
+    _plan_geaendert(betrieb_id)
+    result["pruefung"] = _arbzg_befunde(
+        supabase, betrieb_id, [(e["mitarbeiter_id"], e["datum"]) for e in result["eintraege"]]
+    )
+    return result
+
+
 @router.delete("/{eintrag_id}")
 def eintrag_loeschen(
     eintrag_id: int,
@@ -93,6 +223,7 @@ def eintrag_loeschen(
     supabase = _sb()
     try:
         supabase.table("dienstplaene").delete().eq("id", eintrag_id).eq("betrieb_id", betrieb_id).execute()
+        _plan_geaendert(betrieb_id)
         return {"ok": True}
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Fehler beim Löschen: {exc}")
@@ -259,29 +390,76 @@ def wunsch_entscheiden(
     return {"ok": True, "status": body.status}
 
 
+@router.get("/pruefung")
+def plan_pruefung(
+    jahr: int,
+    monat_nr: int,
+    betrieb_id: int = Depends(get_betrieb_id),
+    _user: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    """ArbZG-Prüfung (Ruhezeit, Tageshöchstzeit, Pausen) des geplanten Monats."""
+    if not 1 <= monat_nr <= 12:
+        raise HTTPException(status_code=400, detail="Ungültiger Monat.")
+    from utils.planpruefung import pruefe_monat
+    try:
+        befunde = pruefe_monat(_sb(), betrieb_id=betrieb_id, jahr=jahr, monat=monat_nr)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Fehler bei der Prüfung: {exc}")
+    return {
+        "fehler": sum(1 for b in befunde if b["level"] == "error"),
+        "warnungen": sum(1 for b in befunde if b["level"] == "warning"),
+        "befunde": befunde,
+    }
+
+
+@router.get("/abweichungen")
+def plan_ist_abweichungen(
+    datum_von: date,
+    datum_bis: date,
+    mitarbeiter_id: Optional[int] = None,
+    format: str = "json",
+    betrieb_id: int = Depends(get_betrieb_id),
+    _user: Dict[str, Any] = Depends(require_admin),
+):
+    """Soll/Ist-Abgleich Plan gegen Zeiterfassung (Abweichungen, Verspätungen, fehlende Schichten)."""
+    from utils.plan_ist_abgleich import MAX_TAGE, iter_abweichungen_csv, lade_abweichungsbericht
+
+    if datum_bis < datum_von:
+        raise HTTPException(status_code=400, detail="datum_bis liegt vor datum_von.")
+    if (datum_bis - datum_von).days + 1 > MAX_TAGE:
+        raise HTTPException(status_code=400, detail=f"Zeitraum zu lang (max. {MAX_TAGE} Tage).")
+    if format not in ("json", "csv"):
+        raise HTTPException(status_code=400, detail="Ungültiges Format (json oder csv).")
+    try:
+        bericht = lade_abweichungsbericht(
+            _sb(), betrieb_id=betrieb_id, von=datum_von, bis=datum_bis, mitarbeiter_id=mitarbeiter_id
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Fehler beim Abgleich: {exc}")
+
+    if format == "json":
+        return bericht
+    filename = f"Plan_Ist_{datum_von.isoformat()}_{datum_bis.isoformat()}.csv"
+    return StreamingResponse(
+        iter_abweichungen_csv(bericht),
+        media_type="text/csv; charset=utf-8-sig",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/monat")
 def monat(
     jahr: int,
     monat_nr: int,
+    response: Response,
     betrieb_id: int = Depends(get_betrieb_id),
-) -> List[Dict[str, Any]]:
+    if_none_match: Optional[str] = Header(None),
+):
     """Alle Einträge eines Monats für alle Mitarbeiter des Betriebs."""
-    supabase = _sb()
     datum_von = date(jahr, monat_nr, 1)
     # last day of month
     if monat_nr == 12:
         datum_bis = date(jahr + 1, 1, 1) - timedelta(days=1)
     else:
         datum_bis = date(jahr, monat_nr + 1, 1) - timedelta(days=1)
-    try:
-        res = (
-            supabase.table("dienstplaene")
-            .select("id, mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten")
-            .eq("betrieb_id", betrieb_id)
-            .gte("datum", str(datum_von))
-            .lte("datum", str(datum_bis))
-            .execute()
-        )
-        return res.data or []
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Fehler beim Laden: {exc}")
+    return _plan_antwort(betrieb_id, datum_von, datum_bis, if_none_match, response)
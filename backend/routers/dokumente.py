@@ -6,7 +6,7 @@ from typing import Any, Dict, Optional
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from pydantic import BaseModel
 
-from deps import get_betrieb_id, get_current_user, require_admin
+from deps import get_betrieb_id, get_current_user, mitarbeiter_im_betrieb, require_admin
 
 router = APIRouter()
 
@@ -18,19 +18,6 @@ def _get_supabase():
     return get_service_role_client()
 
 
-def _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id: int, betrieb_id: int):
-    chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
-
-
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.get("/mitarbeiter/{mitarbeiter_id}")
@@ -38,10 +25,10 @@ def dokumente_liste(
     mitarbeiter_id: int,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(get_current_user),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Alle Dokumente eines Mitarbeiters auflisten."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
 
     res = (
         supabase.table("mitarbeiter_dokumente")
@@ -53,11 +40,13 @@ def dokumente_liste(
     )
     docs = res.data or []
 
-    # Signed URLs für Dokumente ohne direkten file_url generieren
-    from utils.database import get_signed_url
-    for doc in docs:
-        if not doc.get("file_url") and doc.get("file_path"):
-            doc["file_url"] = get_signed_url("dokumente", doc["file_path"])
+    # Signed URLs für Dokumente ohne direkten file_url generieren (ein Storage-Aufruf)
+    from utils.database import get_signed_urls
+    ohne_url = [doc for doc in docs if not doc.get("file_url") and doc.get("file_path")]
+    if ohne_url:
+        urls = get_signed_urls("dokumente", [doc["file_path"] for doc in ohne_url])
+        for doc in ohne_url:
+            doc["file_url"] = urls.get(doc["file_path"])
 
     return docs
 
@@ -67,6 +56,7 @@ async def dokument_hochladen(
     mitarbeiter_id: int,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(require_admin),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
     file: UploadFile = File(...),
     name: str = Form(...),
     typ: str = Form("sonstig"),
@@ -74,7 +64,6 @@ async def dokument_hochladen(
 ):
     """Dokument für einen Mitarbeiter hochladen (nur Admin)."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
 
     file_bytes = await file.read()
     if len(file_bytes) > 10 * 1024 * 1024:
@@ -8,11 +8,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
 from deps import get_current_user
-from utils.database import get_service_role_client
 
 router = APIRouter()
 
 
+def _get_supabase():
+    from utils.database import get_service_role_client
+    return get_service_role_client()
+
+
 def require_superadmin(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     if current_user.get("role") not in ("admin", "superadmin"):
         raise HTTPException(status_code=403, detail="Kein Zugriff")
@@ -46,7 +50,7 @@ def leads_liste(
     search: Optional[str] = None,
     current_user: Dict[str, Any] = Depends(require_superadmin),
 ) -> List[Dict[str, Any]]:
-    supabase = get_service_role_client()
+    supabase = _get_supabase()
     q = supabase.table("leads").select("*").order("erstellt_am", desc=True)
     if status:
         q = q.eq("status", status)
@@ -67,7 +71,7 @@ def leads_liste(
 def leads_stats(
     current_user: Dict[str, Any] = Depends(require_superadmin),
 ) -> Dict[str, Any]:
-    supabase = get_service_role_client()
+    supabase = _get_supabase()
     resp = supabase.table("leads").select("status").execute()
     rows = resp.data or []
     counts: Dict[str, int] = {"neu": 0, "kontaktiert": 0, "interessiert": 0, "abschluss": 0}
@@ -83,7 +87,7 @@ def lead_anlegen(
     body: LeadCreate,
     current_user: Dict[str, Any] = Depends(require_superadmin),
 ) -> Dict[str, Any]:
-    supabase = get_service_role_client()
+    supabase = _get_supabase()
     data = {
         **body.model_dump(exclude_none=True),
         "status": "neu",
@@ -99,7 +103,7 @@ def lead_aktualisieren(
     body: LeadUpdate,
     current_user: Dict[str, Any] = Depends(require_superadmin),
 ) -> Dict[str, Any]:
-    supabase = get_service_role_client()
+    supabase = _get_supabase()
     updates = body.model_dump(exclude_none=True)
     if not updates:
         raise HTTPException(status_code=400, detail="Keine Änderungen")
@@ -112,6 +116,6 @@ def lead_loeschen(
     lead_id: int,
     current_user: Dict[str, Any] = Depends(require_superadmin),
 ) -> Dict[str, Any]:
-    supabase = get_service_role_client()
+    supabase = _get_supabase()
     supabase.table("leads").delete().eq("id", lead_id).execute()
     return {"ok": True}
@@ -1,12 +1,14 @@
 """Lohn-Router: Monatsabrechnung berechnen, speichern, PDF generieren."""
 from __future__ import annotations
 
+from datetime import date
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from deps import get_betrieb_id, require_admin
+from deps import get_betrieb_id, mitarbeiter_im_betrieb, pruefe_mitarbeiter_im_betrieb, require_admin
 
 router = APIRouter()
 
@@ -26,19 +28,6 @@ def _get_supabase():
     return get_service_role_client()
 
 
-def _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id: int, betrieb_id: int):
-    chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
-
-
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.post("/berechnen")
@@ -48,8 +37,7 @@ def lohn_berechnen(
     user: Dict[str, Any] = Depends(require_admin),
 ):
     """Monatsabrechnung berechnen (nicht speichern)."""
-    supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, body.mitarbeiter_id, betrieb_id)
+    pruefe_mitarbeiter_im_betrieb(body.mitarbeiter_id, betrieb_id)
 
     from utils.lohnkern import berechneMonatslohn
     return berechneMonatslohn(body.mitarbeiter_id, body.monat, body.jahr)
@@ -62,8 +50,7 @@ def lohn_speichern(
     user: Dict[str, Any] = Depends(require_admin),
 ):
     """Monatsabrechnung berechnen und in DB speichern."""
-    supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, body.mitarbeiter_id, betrieb_id)
+    pruefe_mitarbeiter_im_betrieb(body.mitarbeiter_id, betrieb_id)
 
     from utils.lohnkern import speichereMonatslohn
     result = speichereMonatslohn(body.mitarbeiter_id, body.monat, body.jahr)
@@ -80,10 +67,10 @@ def lohn_liste(
     mitarbeiter_id: int,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(require_admin),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Gespeicherte Lohnabrechnungen eines Mitarbeiters."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
 
     res = (
         supabase.table("lohnabrechnungen")
@@ -103,14 +90,14 @@ def lohn_pdf(
     jahr: int,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(require_admin),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Lohnabrechnung als PDF generieren."""
-    supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
-
     try:
         from utils.lohnabrechnung import generate_lohnabrechnung_pdf
         pdf_bytes = generate_lohnabrechnung_pdf(mitarbeiter_id, monat, jahr)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF-Generierung fehlgeschlagen: {e}")
 
@@ -122,6 +109,44 @@ def lohn_pdf(
     )
 
 
+@router.get("/pdf-zip")
+def lohn_pdf_zip(
+    monat: int,
+    jahr: int,
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """Alle gespeicherten Lohnabrechnungen eines Monats als ZIP (gestreamt)."""
+    supabase = _get_supabase()
+
+    ma_res = (
+        supabase.table("mitarbeiter")
+        .select("id")
+        .eq("betrieb_id", betrieb_id)
+        .eq("aktiv", True)
+        .execute()
+    )
+    ma_ids = [m["id"] for m in (ma_res.data or [])]
+    if not ma_ids:
+        raise HTTPException(status_code=404, detail="Keine aktiven Mitarbeiter gefunden.")
+
+    from utils.lohnabrechnung import iter_lohnabrechnungen_zip, lade_lohnabrechnungen_monat
+
+    abrechnungen = lade_lohnabrechnungen_monat(supabase, ma_ids, monat, jahr)
+    if not abrechnungen:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Keine gespeicherten Lohnabrechnungen für {monat:02d}/{jahr}.",
+        )
+
+    filename = f"Lohnabrechnungen_{jahr}_{monat:02d}.zip"
+    return StreamingResponse(
+        iter_lohnabrechnungen_zip(abrechnungen),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/datev-export")
 def datev_export_herunterladen(
     monat: int,
@@ -157,14 +182,8 @@ def datev_export_herunterladen(
     )
     abrechnungen = la_res.data or []
 
-    betrieb_res = (
-        supabase.table("betriebe")
-        .select("*")
-        .eq("id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    betrieb_info = betrieb_res.data[0] if betrieb_res.data else {}
+    from utils.anfrage_cache import lade_betrieb_zeile
+    betrieb_info = lade_betrieb_zeile(supabase, betrieb_id)
 
     from utils.datev_export import erstelle_datev_lohnexport
 
@@ -181,3 +200,57 @@ def datev_export_herunterladen(
         media_type="text/csv; charset=utf-8-sig",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.get("/datev-export-zeitraum")
+def datev_export_zeitraum(
+    datum_von: date,
+    datum_bis: date,
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """
+    DATEV-Lohnexport über mehrere Monate (z.B. Quartal/Jahr) als gestreamte CSV.
+
+    Es zählen die Monate von ``datum_von`` bis ``datum_bis`` (inklusive).
+    Ausgeschiedene Mitarbeiter werden mit exportiert, sofern für sie im
+    Zeitraum Abrechnungen gespeichert sind.
+    """
+    if datum_bis < datum_von:
+        raise HTTPException(status_code=400, detail="datum_bis liegt vor datum_von.")
+
+    supabase = _get_supabase()
+
+    ma_res = (
+        supabase.table("mitarbeiter")
+        .select(
+            "id,vorname,nachname,personalnummer,monatliche_soll_stunden,monatliche_brutto_verguetung"
+        )
+        .eq("betrieb_id", betrieb_id)
+        .execute()
+    )
+    mitarbeiter = ma_res.data or []
+    if not mitarbeiter:
+        raise HTTPException(status_code=404, detail="Keine Mitarbeiter gefunden.")
+
+    from utils.anfrage_cache import lade_betrieb_zeile
+    betrieb_info = lade_betrieb_zeile(supabase, betrieb_id)
+
+    from utils.datev_export import iter_datev_lohnexport, iter_lohnabrechnungen_zeitraum
+
+    abrechnungen = iter_lohnabrechnungen_zeitraum(
+        supabase,
+        [m["id"] for m in mitarbeiter],
+        (datum_von.year, datum_von.month),
+        (datum_bis.year, datum_bis.month),
+    )
+
+    filename = (
+        f"DATEV_Lohn_{datum_von.year}_{datum_von.month:02d}"
+        f"-{datum_bis.year}_{datum_bis.month:02d}.csv"
+    )
+    return StreamingResponse(
+        iter_datev_lohnexport(mitarbeiter, abrechnungen, datum_von.year, betrieb_info),
+        media_type="text/csv; charset=utf-8-sig",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,12 +1,13 @@
 """Mitarbeiter-Router: Liste, Detail, Anlegen, Aktualisieren."""
 from __future__ import annotations
 
+from datetime import date
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from deps import get_betrieb_id, get_current_user, require_admin
+from deps import get_betrieb_id, get_current_user, mitarbeiter_im_betrieb, require_admin
 
 router = APIRouter()
 
@@ -116,6 +117,8 @@ def mitarbeiter_anlegen(
     res = supabase.table("mitarbeiter").insert(payload).execute()
     if not res.data:
         raise HTTPException(status_code=500, detail="Fehler beim Anlegen.")
+    from utils.betrieb_mitarbeiter import invalidiere_betrieb_mitarbeiter
+    invalidiere_betrieb_mitarbeiter(betrieb_id)
     return res.data[0]
 
 
@@ -125,25 +128,23 @@ def mitarbeiter_aktualisieren(
     body: MitarbeiterUpdate,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(require_admin),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Mitarbeiter aktualisieren (nur Admin)."""
     supabase = _get_supabase()
-    chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
-
     updates = body.model_dump(exclude_none=True)
     if not updates:
         raise HTTPException(status_code=400, detail="Keine Änderungen angegeben.")
 
     res = supabase.table("mitarbeiter").update(updates).eq("id", mitarbeiter_id).execute()
+    from utils.anfrage_cache import vergiss
+    from utils.betrieb_mitarbeiter import invalidiere_betrieb_mitarbeiter
+    vergiss("mitarbeiter", mitarbeiter_id)
+    if "aktiv" in updates:
+        invalidiere_betrieb_mitarbeiter(betrieb_id)
+    if "jahres_urlaubstage" in updates:
+        from utils.urlaubskonto import aktualisiere_urlaubskonto
+        aktualisiere_urlaubskonto(supabase, mitarbeiter_id, date.today().year)
     return res.data[0] if res.data else {"ok": True}
 
 
@@ -152,19 +153,13 @@ def mitarbeiter_deaktivieren(
     mitarbeiter_id: int,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(require_admin),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Mitarbeiter deaktivieren — kein Hard-Delete (nur Admin)."""
     supabase = _get_supabase()
-    chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
-
     supabase.table("mitarbeiter").update({"aktiv": False}).eq("id", mitarbeiter_id).execute()
+    from utils.anfrage_cache import vergiss
+    from utils.betrieb_mitarbeiter import invalidiere_betrieb_mitarbeiter
+    vergiss("mitarbeiter", mitarbeiter_id)
+    invalidiere_betrieb_mitarbeiter(betrieb_id)
     return {"ok": True}
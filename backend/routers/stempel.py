@@ -33,21 +33,29 @@ class StempelEventRequest(BaseModel):
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _get_supabase():
-    from utils.database import get_service_role_client
-    return get_service_role_client()
+def _get_async_db():
+    # Stempel-, Kiosk- und Statuspfade laufen asynchron (Schichtwechsel-Last).
+    from utils.database_async import get_async_service_role_client
+    return get_async_service_role_client()
+
+
+async def _pruefe_mitarbeiter_im_betrieb(mitarbeiter_id: int, betrieb_id: int) -> None:
+    # Async-Variante von deps.pruefe_mitarbeiter_im_betrieb (lädt nicht im Threadpool).
+    from utils.betrieb_mitarbeiter import gehoert_zu_betrieb_async
+    if not await gehoert_zu_betrieb_async(betrieb_id, mitarbeiter_id):
+        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.post("/pin", response_model=PinLookupResponse)
-def pin_lookup(body: PinLookupRequest):
+async def pin_lookup(body: PinLookupRequest):
     """PIN-Lookup ohne Auth — für Kiosk-Terminal. Unterstützt stempel_pin + pin (Legacy)."""
-    supabase = _get_supabase()
+    db = _get_async_db()
     for pin_column in ("stempel_pin", "pin"):
         try:
-            res = (
-                supabase.table("mitarbeiter")
+            res = await (
+                db.table("mitarbeiter")
                 .select("id, vorname, nachname, stempel_pin, pin")
                 .eq("betrieb_id", body.betrieb_id)
                 .eq(pin_column, body.pin)
@@ -70,17 +78,18 @@ def pin_lookup(body: PinLookupRequest):
 
 
 @router.post("/event")
-def stempel_event(
+async def stempel_event(
     body: StempelEventRequest,
     betrieb_id: int = Depends(get_betrieb_id),
     user: Dict[str, Any] = Depends(get_current_user),
 ):
     """Stempel-Buchung schreiben (clock_in / clock_out / break_start / break_end)."""
-    supabase = _get_supabase()
+    await _pruefe_mitarbeiter_im_betrieb(body.mitarbeiter_id, betrieb_id)
+    db = _get_async_db()
 
-    from utils.zeit_events import register_time_event
-    result = register_time_event(
-        supabase,
+    from utils.zeit_events import register_time_event_async
+    result = await register_time_event_async(
+        db,
         betrieb_id=betrieb_id,
         mitarbeiter_id=body.mitarbeiter_id,
         action=body.action,
@@ -99,28 +108,16 @@ def stempel_event(
 
 
 @router.get("/status/{mitarbeiter_id}")
-def stempel_status(
+async def stempel_status(
     mitarbeiter_id: int,
     betrieb_id: int = Depends(get_betrieb_id),
 ):
     """Aktueller Schicht-/Pausenstatus für heute."""
-    supabase = _get_supabase()
-
-    # Verify mitarbeiter belongs to this betrieb
-    chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
+    await _pruefe_mitarbeiter_im_betrieb(mitarbeiter_id, betrieb_id)
 
-    from utils.zeit_events import get_event_state_for_day
-    state = get_event_state_for_day(
-        supabase,
+    from utils.zeit_events import get_event_state_for_day_async
+    state = await get_event_state_for_day_async(
+        _get_async_db(),
         mitarbeiter_id=mitarbeiter_id,
         day=date.today(),
     )
@@ -140,9 +137,9 @@ class KioskActionRequest(BaseModel):
     action: str
 
 
-def _resolve_betrieb_id(supabase, betriebsnummer: str) -> int:
-    res = (
-        supabase.table("betriebe")
+async def _resolve_betrieb_id(db, betriebsnummer: str) -> int:
+    res = await (
+        db.table("betriebe")
         .select("id")
         .eq("betriebsnummer", betriebsnummer)
         .limit(1)
@@ -153,11 +150,11 @@ def _resolve_betrieb_id(supabase, betriebsnummer: str) -> int:
     return res.data[0]["id"]
 
 
-def _lookup_pin(supabase, betrieb_id: int, pin: str):
+async def _lookup_pin(db, betrieb_id: int, pin: str):
     for pin_column in ("stempel_pin", "pin"):
         try:
-            res = (
-                supabase.table("mitarbeiter")
+            res = await (
+                db.table("mitarbeiter")
                 .select("id, vorname, nachname")
                 .eq("betrieb_id", betrieb_id)
                 .eq(pin_column, pin)
@@ -173,14 +170,14 @@ def _lookup_pin(supabase, betrieb_id: int, pin: str):
 
 
 @router.post("/kiosk-status")
-def kiosk_status_public(body: KioskRequest):
+async def kiosk_status_public(body: KioskRequest):
     """Public kiosk: PIN prüfen und aktuellen Status zurückgeben."""
-    supabase = _get_supabase()
-    betrieb_id = _resolve_betrieb_id(supabase, body.betriebsnummer)
-    ma = _lookup_pin(supabase, betrieb_id, body.pin)
+    db = _get_async_db()
+    betrieb_id = await _resolve_betrieb_id(db, body.betriebsnummer)
+    ma = await _lookup_pin(db, betrieb_id, body.pin)
 
-    from utils.zeit_events import get_event_state_for_day
-    state = get_event_state_for_day(supabase, mitarbeiter_id=ma["id"], day=date.today())
+    from utils.zeit_events import get_event_state_for_day_async
+    state = await get_event_state_for_day_async(db, mitarbeiter_id=ma["id"], day=date.today())
     return {
         "mitarbeiter": {"id": ma["id"], "vorname": ma["vorname"], "nachname": ma["nachname"]},
         "status": state,
@@ -188,15 +185,15 @@ def kiosk_status_public(body: KioskRequest):
 
 
 @router.post("/kiosk-action")
-def kiosk_action_public(body: KioskActionRequest):
+async def kiosk_action_public(body: KioskActionRequest):
     """Public kiosk: PIN prüfen und Stempelbuchung ausführen."""
-    supabase = _get_supabase()
-    betrieb_id = _resolve_betrieb_id(supabase, body.betriebsnummer)
-    ma = _lookup_pin(supabase, betrieb_id, body.pin)
+    db = _get_async_db()
+    betrieb_id = await _resolve_betrieb_id(db, body.betriebsnummer)
+    ma = await _lookup_pin(db, betrieb_id, body.pin)
 
-    from utils.zeit_events import register_time_event
-    result = register_time_event(
-        supabase,
+    from utils.zeit_events import register_time_event_async
+    result = await register_time_event_async(
+        db,
         betrieb_id=betrieb_id,
         mitarbeiter_id=ma["id"],
         action=body.action,
@@ -205,10 +202,8 @@ def kiosk_action_public(body: KioskActionRequest):
     if not result.get("ok", True) and result.get("error"):
         raise HTTPException(status_code=400, detail=result["error"])
 
-    from utils.zeit_events import get_event_state_for_day
-    state = get_event_state_for_day(supabase, mitarbeiter_id=ma["id"], day=date.today())
     return {
         "ok": True,
         "mitarbeiter": {"id": ma["id"], "vorname": ma["vorname"], "nachname": ma["nachname"]},
-        "status": state,
+        "status": result["status"],
     }
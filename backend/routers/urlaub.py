@@ -1,12 +1,19 @@
 """Urlaub-Router: Urlaubsanträge stellen, genehmigen, ablehnen, Saldo."""
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from datetime import date
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from deps import get_betrieb_id, get_current_user, require_admin
+from deps import (
+    get_betrieb_id,
+    get_current_user,
+    mitarbeiter_im_betrieb,
+    pruefe_mitarbeiter_im_betrieb,
+    require_admin,
+)
 
 router = APIRouter()
 
@@ -26,6 +33,14 @@ class UrlaubsantragEntscheidung(BaseModel):
     kommentar: Optional[str] = None
 
 
+class AbwesenheitenImport(BaseModel):
+    # Entweder JSON-Zeilen (mitarbeiter_id, typ, start_datum, ende_datum, grund)
+    # oder CSV-Text mit denselben Spalten (Trennzeichen ';' oder ',').
+    eintraege: Optional[List[Dict[str, Any]]] = None
+    csv: Optional[str] = None
+    nur_pruefen: bool = False
+
+
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
 def _get_supabase():
@@ -33,17 +48,40 @@ def _get_supabase():
     return get_service_role_client()
 
 
-def _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id: int, betrieb_id: int):
+def _load_antrag(supabase, antrag_id: int, betrieb_id: int) -> Dict[str, Any]:
     chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
+        supabase.table("urlaubsantraege")
+        .select("id, mitarbeiter_id, datum_von, datum_bis, status")
+        .eq("id", antrag_id)
         .eq("betrieb_id", betrieb_id)
         .limit(1)
         .execute()
     )
     if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
+        raise HTTPException(status_code=404, detail="Antrag nicht gefunden.")
+    return chk.data[0]
+
+
+def _kapazitaet_fuer_antrag(supabase, antrag: Dict[str, Any], betrieb_id: int) -> Dict[str, Any]:
+    from utils.abwesenheitskalender import pruefe_urlaubskapazitaet
+    von = date.fromisoformat(str(antrag["datum_von"])[:10])
+    bis = date.fromisoformat(str(antrag.get("datum_bis") or antrag["datum_von"])[:10])
+    return pruefe_urlaubskapazitaet(
+        supabase,
+        betrieb_id=betrieb_id,
+        mitarbeiter_id=int(antrag["mitarbeiter_id"]),
+        von=von,
+        bis=max(von, bis),
+    )
+
+
+def _aktualisiere_urlaubskonto_fuer_antrag(supabase, antrag: Dict[str, Any]) -> None:
+    from utils.urlaubskonto import aktualisiere_urlaubskonto, jahre_im_zeitraum
+    aktualisiere_urlaubskonto(
+        supabase,
+        int(antrag["mitarbeiter_id"]),
+        jahre_im_zeitraum(antrag.get("datum_von"), antrag.get("datum_bis")),
+    )
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
@@ -67,14 +105,37 @@ def urlaub_liste(
     return res.data or []
 
 
+@router.get("/kalender")
+def urlaub_kalender(
+    von: date,
+    bis: date,
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """Betriebsweite Abwesenheiten je Tag (Anzahl und Namen) im Zeitraum (nur Admin: enthält Krankmeldungen)."""
+    if bis < von:
+        raise HTTPException(status_code=400, detail="Enddatum liegt vor Startdatum.")
+    if (bis - von).days > 366:
+        raise HTTPException(status_code=400, detail="Zeitraum darf höchstens ein Jahr umfassen.")
+
+    from utils.abwesenheitskalender import lade_abwesenheitskalender
+    kalender = lade_abwesenheitskalender(_get_supabase(), betrieb_id=betrieb_id, von=von, bis=bis)
+    return {
+        "von": von.isoformat(),
+        "bis": bis.isoformat(),
+        "max_gleichzeitig_abwesend": kalender.max_gleichzeitig(von, bis),
+        "tage": kalender.tage(),
+    }
+
+
 @router.get("/mitarbeiter/{mitarbeiter_id}")
 def urlaub_mitarbeiter(
     mitarbeiter_id: int,
     betrieb_id: int = Depends(get_betrieb_id),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Urlaubsanträge eines bestimmten Mitarbeiters."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
     res = (
         supabase.table("urlaubsantraege")
         .select("*")
@@ -91,13 +152,44 @@ def urlaub_saldo(
     mitarbeiter_id: int,
     jahr: int,
     betrieb_id: int = Depends(get_betrieb_id),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
-    """Urlaubssaldo (Anspruch, genommen, Rest) für ein Jahr."""
+    """Urlaubssaldo (Anspruch, genommen, geplant, Rest) für ein Jahr."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
 
-    from utils.azk import berechne_urlaubskonto
-    return berechne_urlaubskonto(mitarbeiter_id, jahr)
+    from utils.urlaubskonto import lade_urlaubskonto
+    return lade_urlaubskonto(supabase, mitarbeiter_id, jahr)
+
+
+@router.post("/abwesenheiten/import")
+def abwesenheiten_importieren(
+    body: AbwesenheitenImport,
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """Abwesenheits-Historie mehrerer Mitarbeiter als Batch importieren (nur Admin)."""
+    from utils.absences import import_absences_bulk, parse_absence_import_csv
+
+    if body.csv:
+        rows = parse_absence_import_csv(body.csv)
+    else:
+        rows = body.eintraege or []
+    if not rows:
+        raise HTTPException(status_code=400, detail="Keine Importzeilen übergeben.")
+    if len(rows) > 5000:
+        raise HTTPException(status_code=400, detail="Maximal 5000 Zeilen pro Import.")
+
+    supabase = _get_supabase()
+    try:
+        return import_absences_bulk(
+            supabase,
+            betrieb_id=betrieb_id,
+            rows=rows,
+            created_by=int(user["sub"]) if user.get("sub") else None,
+            nur_pruefen=body.nur_pruefen,
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Import fehlgeschlagen: {exc}")
 
 
 @router.post("/")
@@ -108,7 +200,7 @@ def urlaub_beantragen(
 ):
     """Urlaubsantrag stellen."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, body.mitarbeiter_id, betrieb_id)
+    pruefe_mitarbeiter_im_betrieb(body.mitarbeiter_id, betrieb_id)
 
     payload = {
         "betrieb_id": betrieb_id,
@@ -137,23 +229,35 @@ def urlaub_entscheiden(
         raise HTTPException(status_code=400, detail="Ungültiger Status.")
 
     supabase = _get_supabase()
-    chk = (
-        supabase.table("urlaubsantraege")
-        .select("id")
-        .eq("id", antrag_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Antrag nicht gefunden.")
+    antrag = _load_antrag(supabase, antrag_id, betrieb_id)
 
     update = {"status": body.status}
     if body.kommentar is not None:
         update["kommentar"] = body.kommentar
 
     res = supabase.table("urlaubsantraege").update(update).eq("id", antrag_id).execute()
-    return res.data[0] if res.data else {"ok": True}
+    result = res.data[0] if res.data else {"ok": True}
+    if body.status == "genehmigt" or antrag.get("status") == "genehmigt":
+        _aktualisiere_urlaubskonto_fuer_antrag(supabase, antrag)
+    if body.status == "genehmigt":
+        # Warnung, keine Sperre: Admin entscheidet bewusst.
+        try:
+            result = {**result, "kapazitaet": _kapazitaet_fuer_antrag(supabase, antrag, betrieb_id)}
+        except Exception:
+            pass
+    return result
+
+
+@router.get("/{antrag_id}/kapazitaet")
+def urlaub_kapazitaet(
+    antrag_id: int,
+    betrieb_id: int = Depends(get_betrieb_id),
+    user: Dict[str, Any] = Depends(require_admin),
+):
+    """Vorschau für den Genehmigungsdialog: wie viele sind im Antragszeitraum bereits abwesend?"""
+    supabase = _get_supabase()
+    antrag = _load_antrag(supabase, antrag_id, betrieb_id)
+    return _kapazitaet_fuer_antrag(supabase, antrag, betrieb_id)
 
 
 @router.delete("/{antrag_id}")
@@ -166,7 +270,7 @@ def urlaub_loeschen(
     supabase = _get_supabase()
     chk = (
         supabase.table("urlaubsantraege")
-        .select("id, status, mitarbeiter_id")
+        .select("id, status, mitarbeiter_id, datum_von, datum_bis")
         .eq("id", antrag_id)
         .eq("betrieb_id", betrieb_id)
         .limit(1)
@@ -187,4 +291,6 @@ def urlaub_loeschen(
             raise HTTPException(status_code=403, detail="Zugriff verweigert.")
 
     supabase.table("urlaubsantraege").delete().eq("id", antrag_id).execute()
+    if antrag["status"] == "genehmigt":
+        _aktualisiere_urlaubskonto_fuer_antrag(supabase, antrag)
     return {"ok": True}
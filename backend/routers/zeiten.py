@@ -8,7 +8,13 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from deps import get_betrieb_id, get_current_user, require_admin
+from deps import (
+    get_betrieb_id,
+    get_current_user,
+    mitarbeiter_im_betrieb,
+    pruefe_mitarbeiter_im_betrieb,
+    require_admin,
+)
 
 router = APIRouter()
 
@@ -32,19 +38,6 @@ def _get_supabase():
     return get_service_role_client()
 
 
-def _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id: int, betrieb_id: int):
-    chk = (
-        supabase.table("mitarbeiter")
-        .select("id")
-        .eq("id", mitarbeiter_id)
-        .eq("betrieb_id", betrieb_id)
-        .limit(1)
-        .execute()
-    )
-    if not chk.data:
-        raise HTTPException(status_code=404, detail="Mitarbeiter nicht gefunden.")
-
-
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.get("/monat/{mitarbeiter_id}")
@@ -53,10 +46,10 @@ def zeiten_monat(
     monat: int,
     jahr: int,
     betrieb_id: int = Depends(get_betrieb_id),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Alle Zeiterfassungen eines Mitarbeiters für einen Monat."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
 
     erster = date(jahr, monat, 1).isoformat()
     letzter = date(jahr, monat, monthrange(jahr, monat)[1]).isoformat()
@@ -96,7 +89,7 @@ def zeiten_manuell_anlegen(
 ):
     """Manuellen Zeiteintrag anlegen (Admin/eigene Zeiten)."""
     supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, body.mitarbeiter_id, betrieb_id)
+    pruefe_mitarbeiter_im_betrieb(body.mitarbeiter_id, betrieb_id)
 
     payload = {
         "mitarbeiter_id": body.mitarbeiter_id,
@@ -110,6 +103,11 @@ def zeiten_manuell_anlegen(
     res = supabase.table("zeiterfassung").insert(payload).execute()
     if not res.data:
         raise HTTPException(status_code=500, detail="Fehler beim Anlegen des Eintrags.")
+
+    from utils.eintragsberechnung import aktualisiere_berechnung_tag
+    from utils.monatsfakten import invalidiere_monatsfakten
+    invalidiere_monatsfakten(body.mitarbeiter_id)
+    aktualisiere_berechnung_tag(supabase, body.mitarbeiter_id, body.datum)
     return res.data[0]
 
 
@@ -121,7 +119,22 @@ def zeiten_loeschen(
 ):
     """Zeiteintrag löschen (nur Admin)."""
     supabase = _get_supabase()
+    eintrag = (
+        supabase.table("zeiterfassung")
+        .select("mitarbeiter_id, datum, abwesenheitstyp")
+        .eq("id", eintrag_id)
+        .limit(1)
+        .execute()
+    ).data or []
     supabase.table("zeiterfassung").delete().eq("id", eintrag_id).execute()
+
+    from utils.monatsfakten import invalidiere_monatsfakten
+    invalidiere_monatsfakten()
+    if eintrag and str(eintrag[0].get("abwesenheitstyp") or "").lower() in ("urlaub", "vacation", "u"):
+        from utils.urlaubskonto import aktualisiere_urlaubskonto, jahre_im_zeitraum
+        aktualisiere_urlaubskonto(
+            supabase, int(eintrag[0]["mitarbeiter_id"]), jahre_im_zeitraum(eintrag[0].get("datum"))
+        )
     return {"ok": True}
 
 
@@ -131,10 +144,8 @@ def azk_monat(
     monat: int,
     jahr: int,
     betrieb_id: int = Depends(get_betrieb_id),
+    _zugehoerig: int = Depends(mitarbeiter_im_betrieb),
 ):
     """Arbeitszeitkonto eines Mitarbeiters für einen Monat."""
-    supabase = _get_supabase()
-    _assert_mitarbeiter_belongs_to_betrieb(supabase, mitarbeiter_id, betrieb_id)
-
     from utils.azk import berechne_azk_monat
     return berechne_azk_monat(mitarbeiter_id, monat, jahr)
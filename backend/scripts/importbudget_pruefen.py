@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Importbudget der App prüfen (Kaltstart).
+
+Misst ``import main`` in einem frischen Interpreter und prüft, dass keine
+schweren Abhängigkeiten schon beim Import geladen werden (sie gehören in
+Lazy-Imports bzw. utils/aufwaermen.py). Exit-Code 1 bei Verstoß – für CI bzw.
+vor dem Deploy:
+    python scripts/importbudget_pruefen.py [--budget 1.5] [--top 15]
+
+Dieselbe Messung läuft als pytest in tests/test_importbudget.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dürfen erst bei Bedarf geladen werden.
+VERBOTEN = (
+    "streamlit", "pandas", "reportlab", "fpdf", "openpyxl", "holidays",
+    "supabase", "utils.email_service",
+)
+
+_MESSUNG = """
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({"sekunden": time.perf_counter() - start, "module": sorted(sys.modules)}))
+"""
+
+
+def budget_sekunden() -> float:
+    return float(os.getenv("IMPORTBUDGET_SEKUNDEN", "1.5"))
+
+
+def messe_import() -> dict:
+    """``import main`` in einem frischen Interpreter: Dauer und geladene Module."""
+    lauf = subprocess.run([sys.executable, "-c", _MESSUNG], cwd=BACKEND, capture_output=True, text=True)
+    if lauf.returncode != 0:
+        raise RuntimeError(f"Import von main fehlgeschlagen:\n{lauf.stderr}")
+    return json.loads(lauf.stdout.strip().splitlines()[-1])
+
+
+def verbotene_module(ergebnis: dict) -> list:
+    return [m for m in VERBOTEN if m in ergebnis["module"]]
+
+
+def teuerste_importe(anzahl: int) -> list:
+    profil = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=BACKEND, capture_output=True, text=True)
+    zeilen = []
+    for zeile in profil.stderr.splitlines():
+        teile = zeile.split("|")
+        if len(teile) == 3 and teile[1].strip().isdigit():
+            zeilen.append((int(teile[1]), teile[2].rstrip()))
+    return sorted(zeilen, reverse=True)[:anzahl]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=budget_sekunden(),
+                        help="Obergrenze in Sekunden (Standard: IMPORTBUDGET_SEKUNDEN bzw. 1.5)")
+    parser.add_argument("--top", type=int, default=0, help="Die N teuersten Importe ausgeben (-X importtime)")
+    args = parser.parse_args()
+
+    try:
+        ergebnis = messe_import()
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    geladen = verbotene_module(ergebnis)
+    zu_langsam = ergebnis["sekunden"] > args.budget
+    print(f"import main: {ergebnis['sekunden']:.3f} s (Budget {args.budget:.3f} s)")
+    for modul in geladen:
+        print(f"  schwerer Import beim Start: {modul}")
+
+    if args.top or zu_langsam:
+        print("Teuerste Importe (kumuliert, ms):")
+        for mikro, name in teuerste_importe(args.top or 15):
+            print(f"  {mikro / 1000:8.1f}  {name}")
+
+    return 1 if zu_langsam or geladen else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
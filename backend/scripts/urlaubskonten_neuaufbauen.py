@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Abgleich der Urlaubskonten (urlaubskonten) mit den Quelltabellen.
+
+Nach der Migration 20261019_urlaubskonten.sql bzw. nach Datenimporten ausführen:
+    python scripts/urlaubskonten_neuaufbauen.py [--betrieb-id 3] [--jahr 2026 --jahr 2027]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_service_role_client
+from utils.urlaubskonto import neuaufbau_urlaubskonten
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--betrieb-id", type=int, default=None, help="Nur diesen Betrieb abgleichen")
+parser.add_argument("--jahr", type=int, action="append", default=None, help="Jahr (mehrfach möglich, Standard: aktuelles)")
+args = parser.parse_args()
+
+result = neuaufbau_urlaubskonten(get_service_role_client(), betrieb_id=args.betrieb_id, jahre=args.jahr)
+print("Abgleich abgeschlossen:", result)
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Neuberechnung der gespeicherten Eintragsberechnung (zeiterfassung.calc_*).
+
+Nach Erhöhung von BERECHNUNGS_VERSION ausführen:
+    python scripts/zeiterfassung_neuberechnen.py [--betrieb-id 3] [--alle]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_service_role_client
+from utils.eintragsberechnung import neuberechne_eintraege
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--betrieb-id", type=int, default=None, help="Nur diesen Betrieb neu berechnen")
+parser.add_argument("--alle", action="store_true", help="Auch Einträge mit aktueller Version neu berechnen")
+args = parser.parse_args()
+
+result = neuberechne_eintraege(get_service_role_client(), betrieb_id=args.betrieb_id, alle=args.alle)
+print("Neuberechnung abgeschlossen:", result)
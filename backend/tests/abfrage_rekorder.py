@@ -0,0 +1,200 @@
+"""
+abfrage_rekorder.py – Datenbank-Abfragen in Tests mitschneiden (N+1-Erkennung)
+
+Viele Module (work_accounts, azk, absences, Schleifen im email_service) setzen
+Abfragen innerhalb von Schleifen ab. ``AbfrageRekorder`` hängt sich als
+Beobachter in utils.db_instrumentierung ein und hält für jeden ``execute()``
+fest:
+
+  - Tabelle, Operation und Abfrageform (Methodenkette mit Spaltennamen, ohne
+    Werte – ``.eq("id", 1)`` und ``.eq("id", 2)`` haben dieselbe Form)
+  - Stack-Fingerabdruck: die innersten Aufrufstellen im Backend-Code
+  - den Request (über die ``AnfrageMessung`` der Middleware) samt Route
+
+Nur für Tests (kein Teil des Produktionspakets). Optional wird für die Dauer
+des Mitschnitts ein Fake-Client (tests/fake_supabase.py) als Singleton in
+utils.database / utils.database_async eingesetzt (instrumentiert wie der
+echte). Beispiel mit FastAPIs TestClient (tests/test_abfragebudget.py)::
+
+    with AbfrageRekorder(client=fake_supabase) as rec:
+        test_client.get("/zeiten/azk/1", headers=admin_header)
+    rec.pruefe_budget()                 # ABFRAGE_BUDGETS je Request
+    rec.pruefe_keine_wiederholung()     # gleiche Form von gleicher Stelle
+
+Verstöße werden als AssertionError mit Bericht gemeldet.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils import db_instrumentierung
+from utils.db_instrumentierung import AnfrageMessung, Form, aktuelle_messung, instrumentiere
+
+# Obergrenzen je Request und Routen-Template.
+ABFRAGE_BUDGETS: Dict[str, int] = {
+    "/zeiten/azk/{mitarbeiter_id}": 5,
+}
+
+_WURZEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_EIGENE = {
+    os.path.abspath(__file__),
+    os.path.abspath(db_instrumentierung.__file__),
+}
+
+
+@dataclass(frozen=True)
+class Abfrage:
+    tabelle: str
+    operation: str
+    form: Form
+    fingerabdruck: Tuple[str, ...]
+    anfrage: Optional[int]  # laufende Nummer des Requests, None außerhalb
+
+    def beschreibung(self) -> str:
+        kette = ".".join(f"{m}({s})" if s else m for m, s in self.form)
+        return f"{self.operation} {self.tabelle}" + (f" [{kette}]" if kette else "")
+
+
+def stack_fingerabdruck(tiefe: int = 4) -> Tuple[str, ...]:
+    """Innerste Aufrufstellen im Backend-Code (ohne Bibliotheken und Instrumentierung)."""
+    stellen: List[str] = []
+    frame = sys._getframe(1)
+    while frame is not None and len(stellen) < tiefe:
+        pfad = os.path.abspath(frame.f_code.co_filename)
+        if pfad.startswith(_WURZEL) and pfad not in _EIGENE and "site-packages" not in pfad:
+            stellen.append(f"{os.path.relpath(pfad, _WURZEL)}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return tuple(stellen)
+
+
+class AbfrageRekorder:
+    """Kontextmanager: schneidet alle instrumentierten Abfragen mit."""
+
+    def __init__(self, *, client: Any = None, async_client: Any = None, tiefe: int = 4):
+        self.abfragen: List[Abfrage] = []
+        self._client = client
+        self._async_client = async_client
+        self._tiefe = tiefe
+        self._anfragen: Dict[int, Tuple[int, AnfrageMessung]] = {}
+        self._lock = Lock()
+        self._vorher: List[Tuple[Any, str, Any]] = []
+
+    # ── Kontext ──────────────────────────────────────────────────────────────
+
+    def __enter__(self) -> "AbfrageRekorder":
+        if self._client is not None:
+            from utils import database
+            for attr in ("_service_client", "_anon_client"):
+                self._vorher.append((database, attr, getattr(database, attr)))
+                setattr(database, attr, instrumentiere(self._client))
+        if self._async_client is not None:
+            from utils import database_async
+            self._vorher.append((database_async, "_client", database_async._client))
+            database_async._client = instrumentiere(self._async_client)
+        db_instrumentierung.beobachter_registrieren(self._erfassen)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        db_instrumentierung.beobachter_entfernen(self._erfassen)
+        for modul, attr, wert in reversed(self._vorher):
+            setattr(modul, attr, wert)
+        self._vorher.clear()
+
+    def _erfassen(self, tabelle: str, operation: str, form: Form, dauer: float) -> None:
+        fingerabdruck = stack_fingerabdruck(self._tiefe)
+        messung = aktuelle_messung()
+        with self._lock:
+            anfrage = None
+            if messung is not None:
+                eintrag = self._anfragen.get(id(messung))
+                if eintrag is None:
+                    eintrag = self._anfragen[id(messung)] = (len(self._anfragen), messung)
+                anfrage = eintrag[0]
+            self.abfragen.append(Abfrage(tabelle, operation, form, fingerabdruck, anfrage))
+
+    # ── Auswertung ───────────────────────────────────────────────────────────
+
+    def route(self, anfrage: Optional[int]) -> str:
+        for nummer, messung in self._anfragen.values():
+            if nummer == anfrage:
+                return messung.route or "unbekannt"
+        return db_instrumentierung.OHNE_REQUEST
+
+    def je_anfrage(self) -> Dict[Optional[int], List[Abfrage]]:
+        gruppen: Dict[Optional[int], List[Abfrage]] = {}
+        for abfrage in self.abfragen:
+            gruppen.setdefault(abfrage.anfrage, []).append(abfrage)
+        return gruppen
+
+    def anzahl(self, route: Optional[str] = None) -> int:
+        if route is None:
+            return len(self.abfragen)
+        return sum(1 for a in self.abfragen if self.route(a.anfrage) == route)
+
+    def wiederholungen(self, mindestens: int = 2) -> List[Dict[str, Any]]:
+        """Gleiche Form von gleicher Aufrufstelle innerhalb eines Requests."""
+        befunde: List[Dict[str, Any]] = []
+        for anfrage, abfragen in self.je_anfrage().items():
+            zaehler = Counter((a.tabelle, a.operation, a.form, a.fingerabdruck) for a in abfragen)
+            for (tabelle, operation, form, fingerabdruck), anzahl in zaehler.items():
+                if anzahl >= mindestens:
+                    befunde.append({
+                        "route": self.route(anfrage),
+                        "tabelle": tabelle,
+                        "anzahl": anzahl,
+                        "abfrage": Abfrage(tabelle, operation, form, fingerabdruck, anfrage).beschreibung(),
+                        "stelle": list(fingerabdruck),
+                    })
+        befunde.sort(key=lambda b: -b["anzahl"])
+        return befunde
+
+    def bericht(self, abfragen: Optional[Iterable[Abfrage]] = None) -> str:
+        zeilen = []
+        for i, a in enumerate(self.abfragen if abfragen is None else abfragen, 1):
+            stelle = a.fingerabdruck[0] if a.fingerabdruck else "?"
+            zeilen.append(f"  {i:>3}. {a.beschreibung()}  ← {stelle}")
+        return "\n".join(zeilen)
+
+    # ── Zusicherungen ────────────────────────────────────────────────────────
+
+    def pruefe_hoechstens(self, grenze: int, route: Optional[str] = None) -> None:
+        """Höchstens ``grenze`` Abfragen je Request (optional nur für ``route``)."""
+        for anfrage, abfragen in self.je_anfrage().items():
+            name = self.route(anfrage)
+            if route is not None and name != route:
+                continue
+            if len(abfragen) > grenze:
+                raise AssertionError(
+                    f"{name}: {len(abfragen)} Abfragen, erlaubt sind {grenze}\n{self.bericht(abfragen)}"
+                )
+
+    def pruefe_budget(self, budgets: Optional[Dict[str, int]] = None) -> None:
+        """
+        ABFRAGE_BUDGETS (bzw. ``budgets``) je Request. Eine budgetierte Route ohne
+        mitgeschnittenen Request ist ein Fehler – sonst bestünde ein nicht mehr
+        passender Routenname (z.B. fehlender Router-Präfix) die Prüfung stillschweigend.
+        """
+        gesehen = {self.route(anfrage) for anfrage in self.je_anfrage()}
+        for route, grenze in (ABFRAGE_BUDGETS if budgets is None else budgets).items():
+            if route not in gesehen:
+                raise AssertionError(
+                    f"{route}: kein Request mitgeschnitten (gesehen: {', '.join(sorted(gesehen)) or '–'})"
+                )
+            self.pruefe_hoechstens(grenze, route)
+
+    def pruefe_keine_wiederholung(self, mindestens: int = 2, erlaubt: Iterable[str] = ()) -> None:
+        """Keine Abfrageform mehrfach von derselben Stelle (typisches N+1); ``erlaubt``: Tabellen."""
+        erlaubt = set(erlaubt)
+        befunde = [b for b in self.wiederholungen(mindestens) if b["tabelle"] not in erlaubt]
+        if befunde:
+            zeilen = [
+                f"  {b['route']}: {b['anzahl']}× {b['abfrage']}  ← {b['stelle'][0] if b['stelle'] else '?'}"
+                for b in befunde
+            ]
+            raise AssertionError("Wiederholte Abfragen (N+1?):\n" + "\n".join(zeilen))
@@ -0,0 +1,91 @@
+"""Gemeinsame Fixtures: Fake-Supabase statt echter Instanz, TestClient, Admin-Token."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+os.environ.setdefault("WARMUP_AKTIV", "0")
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+from tests.fake_supabase import FakeSupabase  # noqa: E402
+
+BETRIEB_ID = 1
+MITARBEITER_ID = 7
+
+
+def _monatsdaten():
+    """September 2026: einige Arbeitstage, ein Krankheitstag, Dienstplan dazu."""
+    zeilen, plan = [], []
+    for tag in (2, 3, 4, 5, 9, 10, 11, 16, 17, 18):
+        datum = f"2026-09-{tag:02d}"
+        zeilen.append({
+            "id": len(zeilen) + 1, "mitarbeiter_id": MITARBEITER_ID, "datum": datum,
+            "start_zeit": "09:00:00", "ende_zeit": "17:30:00", "pause_minuten": 30,
+            "arbeitsstunden": 8.0, "quelle": "stempel", "monat": 9, "jahr": 2026,
+        })
+        plan.append({
+            "id": len(plan) + 1, "betrieb_id": BETRIEB_ID, "mitarbeiter_id": MITARBEITER_ID,
+            "datum": datum, "schichttyp": "arbeit", "start_zeit": "09:00", "end_zeit": "17:30",
+            "pause_minuten": 30,
+        })
+    zeilen.append({
+        "id": len(zeilen) + 1, "mitarbeiter_id": MITARBEITER_ID, "datum": "2026-09-23",
+        "start_zeit": "00:00:00", "ende_zeit": "00:00:00", "pause_minuten": 0,
+        "arbeitsstunden": 8.0, "ist_krank": True, "abwesenheitstyp": "krank",
+        "quelle": "abwesenheit_system", "monat": 9, "jahr": 2026,
+    })
+    return zeilen, plan
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Fake-Client als sync. Client-Singleton (instrumentiert wie der echte)."""
+    pytest.importorskip("supabase")
+    from utils import database
+    from utils.betrieb_mitarbeiter import invalidiere_betrieb_mitarbeiter
+    from utils.db_instrumentierung import instrumentiere
+    from utils.monatsfakten import invalidiere_monatsfakten
+    from utils.planning_tables import clear_planning_table_cache
+
+    zeilen, plan = _monatsdaten()
+    db = FakeSupabase({
+        "betriebe": [{"id": BETRIEB_ID, "name": "Testbetrieb", "betriebsnummer": "1000", "aktiv": True}],
+        "mitarbeiter": [{
+            "id": MITARBEITER_ID, "betrieb_id": BETRIEB_ID, "vorname": "Erika", "nachname": "Muster",
+            "aktiv": True, "monatliche_soll_stunden": 160, "eintrittsdatum": "2025-01-01",
+        }],
+        "zeiterfassung": zeilen,
+        "dienstplaene": plan,
+        "abwesenheiten": [],
+        "vertraege": [],
+    })
+    client = instrumentiere(db)
+    monkeypatch.setattr(database, "_service_client", client)
+    monkeypatch.setattr(database, "_anon_client", client)
+    invalidiere_betrieb_mitarbeiter()
+    invalidiere_monatsfakten()
+    clear_planning_table_cache()
+    yield db
+    invalidiere_betrieb_mitarbeiter()
+    invalidiere_monatsfakten()
+    clear_planning_table_cache()
+
+
+@pytest.fixture
+def api(fake_db):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_header():
+    pytest.importorskip("jose")
+    from deps import create_access_token
+
+    token = create_access_token({"sub": "1", "role": "admin", "betrieb_id": BETRIEB_ID})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,234 @@
+"""
+fake_supabase.py – In-Memory-Ersatz für den Supabase-/PostgREST-Client (Tests)
+
+Unterstützt die Query-API, die das Backend verwendet: ``table(...)`` mit
+select/insert/update/upsert/delete, Filter (eq, neq, gt, gte, lt, lte, in_,
+is_, like, ilike, ``not_``), order, limit, range, single/maybe_single sowie
+``count="exact"``. Spaltenauswahl und Embeddings werden nicht ausgewertet
+(es kommen immer ganze Zeilen zurück). Unbekannte Tabellen verhalten sich wie
+in PostgREST: ``execute()`` schlägt fehl.
+"""
+
+from __future__ import annotations
+
+import copy
+import fnmatch
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class Antwort:
+    data: Any
+    count: Optional[int] = None
+
+
+def _vergleichbar(a: Any, b: Any):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return a, b
+    return str(a), str(b)
+
+
+class _Abfrage:
+    def __init__(self, client: "FakeSupabase", tabelle: str):
+        self._client = client
+        self._tabelle = tabelle
+        self._operation = "select"
+        self._werte: Any = None
+        self._filter: List[Callable[[Dict[str, Any]], bool]] = []
+        self._sortierung: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._bereich: Optional[tuple] = None
+        self._einzeln: Optional[str] = None
+        self._count = False
+        self._negiert = False
+
+    # ── Operationen ──────────────────────────────────────────────────────────
+
+    def select(self, *_spalten, count: Optional[str] = None, **_kwargs) -> "_Abfrage":
+        self._count = count is not None
+        return self
+
+    def insert(self, werte, **_kwargs) -> "_Abfrage":
+        self._operation, self._werte = "insert", werte
+        return self
+
+    def upsert(self, werte, on_conflict: str = "id", **_kwargs) -> "_Abfrage":
+        self._operation, self._werte = "upsert", (werte, [s.strip() for s in on_conflict.split(",")])
+        return self
+
+    def update(self, werte, **_kwargs) -> "_Abfrage":
+        self._operation, self._werte = "update", werte
+        return self
+
+    def delete(self, **_kwargs) -> "_Abfrage":
+        self._operation = "delete"
+        return self
+
+    # ── Filter ───────────────────────────────────────────────────────────────
+
+    @property
+    def not_(self) -> "_Abfrage":
+        self._negiert = True
+        return self
+
+    def _filtern(self, test: Callable[[Dict[str, Any]], bool]) -> "_Abfrage":
+        negiert, self._negiert = self._negiert, False
+        self._filter.append((lambda z: not test(z)) if negiert else test)
+        return self
+
+    def _vergleich(self, spalte: str, wert: Any, op: Callable[[Any, Any], bool]) -> "_Abfrage":
+        def _test(zeile):
+            ist = zeile.get(spalte)
+            if ist is None or wert is None:
+                return False
+            return op(*_vergleichbar(ist, wert))
+        return self._filtern(_test)
+
+    def eq(self, spalte, wert):
+        return self._vergleich(spalte, wert, lambda a, b: a == b)
+
+    def neq(self, spalte, wert):
+        return self._vergleich(spalte, wert, lambda a, b: a != b)
+
+    def gt(self, spalte, wert):
+        return self._vergleich(spalte, wert, lambda a, b: a > b)
+
+    def gte(self, spalte, wert):
+        return self._vergleich(spalte, wert, lambda a, b: a >= b)
+
+    def lt(self, spalte, wert):
+        return self._vergleich(spalte, wert, lambda a, b: a < b)
+
+    def lte(self, spalte, wert):
+        return self._vergleich(spalte, wert, lambda a, b: a <= b)
+
+    def in_(self, spalte, werte: Iterable[Any]):
+        werte = list(werte)
+        return self._filtern(lambda z: any(
+            z.get(spalte) is not None and _vergleichbar(z.get(spalte), w)[0] == _vergleichbar(z.get(spalte), w)[1]
+            for w in werte
+        ))
+
+    def is_(self, spalte, wert):
+        erwartet = None if str(wert).lower() == "null" else wert
+        return self._filtern(lambda z: z.get(spalte) is erwartet or z.get(spalte) == erwartet)
+
+    def like(self, spalte, muster: str):
+        return self._filtern(lambda z: fnmatch.fnmatchcase(str(z.get(spalte) or ""), muster.replace("%", "*")))
+
+    def ilike(self, spalte, muster: str):
+        return self._filtern(lambda z: fnmatch.fnmatchcase(
+            str(z.get(spalte) or "").lower(), muster.lower().replace("%", "*")
+        ))
+
+    # ── Form ─────────────────────────────────────────────────────────────────
+
+    def order(self, spalte: str, desc: bool = False, **_kwargs) -> "_Abfrage":
+        self._sortierung.append((spalte, desc))
+        return self
+
+    def limit(self, anzahl: int, **_kwargs) -> "_Abfrage":
+        self._limit = anzahl
+        return self
+
+    def range(self, start: int, ende: int, **_kwargs) -> "_Abfrage":
+        self._bereich = (start, ende)
+        return self
+
+    def single(self) -> "_Abfrage":
+        self._einzeln = "single"
+        return self
+
+    def maybe_single(self) -> "_Abfrage":
+        self._einzeln = "maybe"
+        return self
+
+    # ── Ausführung ───────────────────────────────────────────────────────────
+
+    def _treffer(self, zeilen: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [z for z in zeilen if all(f(z) for f in self._filter)]
+
+    def execute(self) -> Antwort:
+        zeilen = self._client._zeilen(self._tabelle)
+        if self._operation == "insert":
+            neu = self._client._einfuegen(self._tabelle, self._werte)
+            return Antwort(copy.deepcopy(neu))
+        if self._operation == "upsert":
+            werte, schluessel = self._werte
+            neu = []
+            for wert in (werte if isinstance(werte, list) else [werte]):
+                vorhanden = [z for z in zeilen if all(z.get(k) == wert.get(k) for k in schluessel)]
+                if vorhanden:
+                    vorhanden[0].update(wert)
+                    neu.append(vorhanden[0])
+                else:
+                    neu.extend(self._client._einfuegen(self._tabelle, wert))
+            return Antwort(copy.deepcopy(neu))
+        if self._operation == "update":
+            treffer = self._treffer(zeilen)
+            for z in treffer:
+                z.update(self._werte)
+            return Antwort(copy.deepcopy(treffer))
+        if self._operation == "delete":
+            treffer = self._treffer(zeilen)
+            zeilen[:] = [z for z in zeilen if z not in treffer]
+            return Antwort(copy.deepcopy(treffer))
+
+        treffer = self._treffer(zeilen)
+        for spalte, desc in reversed(self._sortierung):
+            treffer.sort(key=lambda z: (z.get(spalte) is None, str(z.get(spalte))), reverse=desc)
+        anzahl = len(treffer) if self._count else None
+        if self._bereich is not None:
+            treffer = treffer[self._bereich[0]:self._bereich[1] + 1]
+        if self._limit is not None:
+            treffer = treffer[:self._limit]
+        treffer = copy.deepcopy(treffer)
+        if self._einzeln == "single":
+            if len(treffer) != 1:
+                raise RuntimeError(f"single(): {len(treffer)} Zeilen in {self._tabelle}")
+            return Antwort(treffer[0], anzahl)
+        if self._einzeln == "maybe":
+            return Antwort(treffer[0] if treffer else None, anzahl)
+        return Antwort(treffer, anzahl)
+
+
+class _Rpc:
+    def __init__(self, client: "FakeSupabase", funktion: str, parameter: Any):
+        self._client, self._funktion, self._parameter = client, funktion, parameter
+
+    def execute(self) -> Antwort:
+        self._client.rpc_aufrufe.append((self._funktion, self._parameter))
+        return Antwort(None)
+
+
+class FakeSupabase:
+    """Tabellen als Listen von Dicts; ``tabellen`` bestimmt, welche existieren."""
+
+    def __init__(self, tabellen: Dict[str, List[Dict[str, Any]]]):
+        self.tabellen = {name: [dict(z) for z in zeilen] for name, zeilen in tabellen.items()}
+        self.rpc_aufrufe: List[tuple] = []
+
+    def _zeilen(self, tabelle: str) -> List[Dict[str, Any]]:
+        if tabelle not in self.tabellen:
+            raise RuntimeError(f'relation "public.{tabelle}" does not exist')
+        return self.tabellen[tabelle]
+
+    def _einfuegen(self, tabelle: str, werte) -> List[Dict[str, Any]]:
+        zeilen = self._zeilen(tabelle)
+        neu = []
+        for wert in (werte if isinstance(werte, list) else [werte]):
+            zeile = dict(wert)
+            zeile.setdefault("id", max([int(z.get("id") or 0) for z in zeilen] + [0]) + 1)
+            zeilen.append(zeile)
+            neu.append(zeile)
+        return neu
+
+    def table(self, name: str) -> _Abfrage:
+        return _Abfrage(self, name)
+
+    def from_(self, name: str) -> _Abfrage:
+        return _Abfrage(self, name)
+
+    def rpc(self, funktion: str, parameter: Any = None, **_kwargs) -> _Rpc:
+        return _Rpc(self, funktion, parameter)
@@ -0,0 +1,55 @@
+"""Abfragebudgets je Endpunkt und N+1-Erkennung (tests/abfrage_rekorder.py)."""
+from __future__ import annotations
+
+import pytest
+
+from tests.abfrage_rekorder import AbfrageRekorder
+from tests.conftest import MITARBEITER_ID
+from tests.fake_supabase import FakeSupabase
+
+AZK_PFAD = f"/zeiten/azk/{MITARBEITER_ID}?monat=9&jahr=2026"
+
+
+def test_azk_monat_bleibt_im_abfragebudget(api, admin_header):
+    # Erster Request wärmt die Prozess-Caches (Planungstabelle, Mitarbeiter-IDs
+    # des Betriebs); gemessen wird der eingeschwungene Zustand ohne Monatsfakten-Treffer.
+    assert api.get(AZK_PFAD, headers=admin_header).status_code == 200
+    from utils.monatsfakten import invalidiere_monatsfakten
+    invalidiere_monatsfakten()
+
+    with AbfrageRekorder() as rec:
+        antwort = api.get(AZK_PFAD, headers=admin_header)
+
+    assert antwort.status_code == 200
+    assert antwort.json()["ok"] is True, antwort.json()
+    assert rec.anzahl("/zeiten/azk/{mitarbeiter_id}") > 0
+    rec.pruefe_budget()
+    rec.pruefe_keine_wiederholung()
+
+
+def test_rekorder_meldet_wiederholte_abfragen():
+    from utils.db_instrumentierung import instrumentiere
+
+    db = instrumentiere(FakeSupabase({"vertraege": []}))
+    with AbfrageRekorder() as rec:
+        for mitarbeiter_id in range(3):
+            db.table("vertraege").select("*").eq("mitarbeiter_id", mitarbeiter_id).execute()
+
+    assert rec.anzahl() == 3
+    assert rec.wiederholungen()[0]["anzahl"] == 3
+    with pytest.raises(AssertionError, match="N\\+1"):
+        rec.pruefe_keine_wiederholung()
+    with pytest.raises(AssertionError, match="erlaubt sind 2"):
+        rec.pruefe_hoechstens(2)
+    rec.pruefe_keine_wiederholung(erlaubt=["vertraege"])
+
+
+def test_budget_ohne_passenden_request_schlaegt_fehl():
+    from utils.db_instrumentierung import instrumentiere
+
+    db = instrumentiere(FakeSupabase({"vertraege": []}))
+    with AbfrageRekorder() as rec:
+        db.table("vertraege").select("*").execute()
+
+    with pytest.raises(AssertionError, match="kein Request mitgeschnitten"):
+        rec.pruefe_budget({"/azk/{mitarbeiter_id}": 5})
@@ -0,0 +1,57 @@
+"""Bezahl-Policy je Betrieb: Lesefehler dürfen keine Defaults in den Cache legen."""
+from __future__ import annotations
+
+from tests.conftest import BETRIEB_ID
+from tests.fake_supabase import FakeSupabase
+
+
+class _StoerbarerClient:
+    """Reicht an den Fake durch; ``gestoert`` lässt Abfragen wie bei DB-Ausfall scheitern."""
+
+    def __init__(self, db: FakeSupabase):
+        self._db = db
+        self.gestoert = False
+
+    def table(self, name: str):
+        if self.gestoert:
+            raise ConnectionError("connection reset by peer")
+        return self._db.table(name)
+
+
+def _betrieb_ohne_krankheitslohn() -> FakeSupabase:
+    return FakeSupabase({
+        "betriebe": [{"id": BETRIEB_ID, "metadaten": {}}],
+        "betrieb_absence_rules": [{"betrieb_id": BETRIEB_ID, "typ": "krankheit", "ist_bezahlt": False}],
+    })
+
+
+def test_lesefehler_wird_nicht_gecacht():
+    from utils.absence_policy import invalidate_absence_policy, resolve_betrieb_absence_policy
+
+    client = _StoerbarerClient(_betrieb_ohne_krankheitslohn())
+    invalidate_absence_policy()
+    try:
+        client.gestoert = True
+        assert resolve_betrieb_absence_policy(client, betrieb_id=BETRIEB_ID)["krankheit"] is True
+
+        client.gestoert = False
+        assert resolve_betrieb_absence_policy(client, betrieb_id=BETRIEB_ID)["krankheit"] is False
+
+        # Jetzt gecacht: ein späterer Ausfall ändert nichts mehr.
+        client.gestoert = True
+        assert resolve_betrieb_absence_policy(client, betrieb_id=BETRIEB_ID)["krankheit"] is False
+    finally:
+        invalidate_absence_policy()
+
+
+def test_fehlende_regeltabelle_wird_gecacht():
+    from utils.absence_policy import invalidate_absence_policy, resolve_betrieb_absence_policy
+
+    client = _StoerbarerClient(FakeSupabase({"betriebe": [{"id": BETRIEB_ID, "metadaten": {}}]}))
+    invalidate_absence_policy()
+    try:
+        assert resolve_betrieb_absence_policy(client, betrieb_id=BETRIEB_ID)["urlaub"] is True
+        client.gestoert = True
+        assert resolve_betrieb_absence_policy(client, betrieb_id=BETRIEB_ID)["urlaub"] is True
+    finally:
+        invalidate_absence_policy()
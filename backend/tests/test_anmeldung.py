@@ -0,0 +1,65 @@
+"""Login-Fehlversuche: Sperre je (Konto, IP), Bremse je Konto über alle IPs."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("bcrypt")
+
+from fastapi import HTTPException  # noqa: E402
+
+from utils import anmeldung  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def leere_zaehler(monkeypatch):
+    for name in ("_fehlversuche_ip", "_fehlversuche_konto", "_fehlversuche_konto_gesamt"):
+        alt = getattr(anmeldung, name)
+        monkeypatch.setattr(anmeldung, name, anmeldung._Fehlversuche(alt.grenze, alt.fenster))
+    monkeypatch.setattr(anmeldung, "_bremse_naechste", {})
+
+
+def test_fehlversuche_sperren_nur_die_eigene_ip():
+    for _ in range(anmeldung.LOGIN_MAX_FEHLVERSUCHE_KONTO):
+        anmeldung.melde_fehlversuch("6.6.6.6", "1000", "erika")
+
+    with pytest.raises(HTTPException) as fehler:
+        anmeldung.pruefe_login_sperre("6.6.6.6", "1000", "erika")
+    assert fehler.value.status_code == 429
+    anmeldung.pruefe_login_sperre("1.2.3.4", "1000", "erika")  # Inhaber nicht ausgesperrt
+
+
+def test_verteiltes_raten_wird_je_konto_gebremst(monkeypatch):
+    monkeypatch.setattr(anmeldung, "LOGIN_KONTO_BREMSE_SECONDS", 10.0)
+    monkeypatch.setattr(anmeldung, "LOGIN_KONTO_MAX_WARTEN_SECONDS", 15.0)
+    wartezeiten = []
+
+    async def schlafen(sekunden):
+        wartezeiten.append(sekunden)
+
+    monkeypatch.setattr(anmeldung.asyncio, "sleep", schlafen)
+
+    # Unter der Schwelle: keine Bremse.
+    asyncio.run(anmeldung.bremse_konto("1000", "erika"))
+    assert wartezeiten == []
+
+    for i in range(anmeldung.LOGIN_MAX_FEHLVERSUCHE_KONTO_GESAMT):
+        anmeldung.melde_fehlversuch(f"10.0.0.{i}", "1000", "erika")
+
+    # Keine einzelne IP ist gesperrt …
+    anmeldung.pruefe_login_sperre("10.0.0.250", "1000", "erika")
+    # … aber Prüfungen für das Konto bekommen Slots im Abstand der Bremse.
+    asyncio.run(anmeldung.bremse_konto("1000", "erika"))
+    asyncio.run(anmeldung.bremse_konto("1000", "erika"))
+    assert len(wartezeiten) == 1 and 9.0 < wartezeiten[0] <= 10.0
+
+    with pytest.raises(HTTPException) as fehler:
+        asyncio.run(anmeldung.bremse_konto("1000", "erika"))
+    assert fehler.value.status_code == 429
+    assert int(fehler.value.headers["Retry-After"]) >= 1
+
+    # Andere Konten sind nicht betroffen.
+    asyncio.run(anmeldung.bremse_konto("1000", "max"))
+    assert len(wartezeiten) == 1
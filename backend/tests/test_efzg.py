@@ -0,0 +1,85 @@
+"""EFZG-Anspruchsketten über den Episoden-Index."""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from tests.conftest import BETRIEB_ID, MITARBEITER_ID
+from tests.fake_supabase import FakeSupabase
+
+EINTRITT = date(2025, 1, 1)
+
+
+def _episode(start: date, tage: int, diagnose: str | None = "M54.5") -> dict:
+    return {"start_datum": start.isoformat(), "ende_datum": (start + timedelta(days=tage - 1)).isoformat(),
+            "diagnose": diagnose}
+
+
+def test_kette_derselben_diagnose_summiert_lfz_tage():
+    from utils.efzg import EfzgEpisodenIndex, berechne_efzg_status
+
+    erste = _episode(date(2026, 1, 5), 30)
+    zweite_beginn = date(2026, 3, 2)
+    index = EfzgEpisodenIndex(EINTRITT, [erste, _episode(zweite_beginn, 20)])
+
+    # 30 Tage verbraucht → Tag 12 der zweiten Episode ist Tag 42, Tag 13 Krankengeld.
+    assert index.lfz_tage_bis(zweite_beginn + timedelta(days=11), "m54.5") == 42
+    assert index.status(zweite_beginn + timedelta(days=11), "M54.5") == "lohnfortzahlung"
+    assert index.status(zweite_beginn + timedelta(days=12), "M54.5") == "krankengeld"
+    # Andere Diagnose: eigener Anspruch.
+    assert index.status(zweite_beginn, "J06.9") is None
+    assert berechne_efzg_status(
+        zweite_beginn + timedelta(days=12), EINTRITT, zweite_beginn, 13,
+        episode_ende=zweite_beginn + timedelta(days=19), diagnose_schluessel="M54.5", vorerkrankungen=[erste],
+    ) == "krankengeld"
+
+    # Sechs Monate gesund → neue Kette.
+    spaet = date(2026, 10, 1)
+    index.hinzufuegen(_episode(spaet, 50))
+    assert index.kettenbeginn(spaet, "M54.5") == spaet
+    assert index.status(spaet + timedelta(days=41), "M54.5") == "lohnfortzahlung"
+
+
+def test_historie_mit_aktueller_episode_zaehlt_tage_nur_einmal():
+    """
+    build_efzg_episode_history enthält die laufende Episode selbst. Die frühere
+    Kettenbildung zählte sie dann doppelt (Krankengeld ab Tag 22); der Index
+    führt sie zusammen, Tag 30 bleibt Lohnfortzahlung.
+    """
+    from utils.efzg import berechne_efzg_status
+
+    beginn = date(2026, 5, 4)
+    aktuell = _episode(beginn, 30)
+    status = berechne_efzg_status(
+        beginn + timedelta(days=29), EINTRITT, beginn, 30,
+        episode_ende=beginn + timedelta(days=29), diagnose_schluessel="M54.5", vorerkrankungen=[aktuell],
+    )
+    assert status == "lohnfortzahlung"
+
+
+def test_index_wird_geladen_erweitert_und_verworfen():
+    from utils.absences import (
+        _extend_efzg_episode_index, build_efzg_episode_history, invalidate_efzg_episode_index,
+        load_efzg_episode_index,
+    )
+
+    db = FakeSupabase({
+        "mitarbeiter": [{"id": MITARBEITER_ID, "betrieb_id": BETRIEB_ID, "eintrittsdatum": EINTRITT.isoformat()}],
+        "abwesenheiten": [{
+            "id": 1, "mitarbeiter_id": MITARBEITER_ID, "typ": "krankheit",
+            "start_datum": "2026-01-05", "ende_datum": "2026-02-03", "grund": "Rücken | diag:M54.5",
+        }],
+    })
+    invalidate_efzg_episode_index()
+    try:
+        index = load_efzg_episode_index(db, mitarbeiter_id=MITARBEITER_ID)
+        assert load_efzg_episode_index(db, mitarbeiter_id=MITARBEITER_ID) is index
+
+        _extend_efzg_episode_index(MITARBEITER_ID, start=date(2026, 3, 2), end=date(2026, 3, 21), diagnose="M54.5")
+        assert index.status(date(2026, 3, 14), "M54.5") == "krankengeld"
+        historie = build_efzg_episode_history(db, mitarbeiter_id=MITARBEITER_ID, bis_datum=date(2026, 3, 31))
+        assert [h["start_datum"] for h in historie] == ["2026-01-05", "2026-03-02"]
+
+        invalidate_efzg_episode_index(MITARBEITER_ID)
+        assert load_efzg_episode_index(db, mitarbeiter_id=MITARBEITER_ID) is not index
+    finally:
+        invalidate_efzg_episode_index()
@@ -0,0 +1,37 @@
+"""Gespeicherte Netto-Zeit je Eintrag: nur gültig, solange die Basis passt."""
+from __future__ import annotations
+
+from tests.conftest import MITARBEITER_ID
+
+
+def _eintrag():
+    return {
+        "id": 1, "mitarbeiter_id": MITARBEITER_ID, "datum": "2026-09-06",
+        "start_zeit": "09:00:00", "ende_zeit": "17:30:00", "pause_minuten": 30, "quelle": "stempel",
+    }
+
+
+def _mitarbeiter():
+    return {"id": MITARBEITER_ID, "monatliche_soll_stunden": 160, "monatliche_brutto_verguetung": 3200,
+            "sonntagszuschlag_aktiv": True}
+
+
+def test_nur_gelesene_spalten_werden_gespeichert():
+    from utils.lohnberechnung import berechne_gespeicherte_felder
+
+    felder = berechne_gespeicherte_felder(_eintrag(), _mitarbeiter(), "09:00:00")
+    assert set(felder) == {"calc_netto_minuten", "calc_version", "calc_basis"}
+    assert felder["calc_netto_minuten"] == 480.0
+
+
+def test_gespeicherte_netto_stunden_veralten_mit_der_basis():
+    from utils.lohnberechnung import berechne_gespeicherte_felder, gespeicherte_netto_stunden
+
+    eintrag = _eintrag()
+    eintrag.update(berechne_gespeicherte_felder(eintrag, _mitarbeiter(), "09:00:00"))
+    assert gespeicherte_netto_stunden(eintrag, "09:00:00") == 8.0
+
+    # Anderer Dienstplan-Start oder am Schreibpfad vorbei geänderte Zeiten → neu rechnen.
+    assert gespeicherte_netto_stunden(eintrag, "10:00:00") is None
+    assert gespeicherte_netto_stunden({**eintrag, "ende_zeit": "18:00:00"}, "09:00:00") is None
+    assert gespeicherte_netto_stunden({**eintrag, "calc_version": 2}, "09:00:00") is None
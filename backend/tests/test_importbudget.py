@@ -0,0 +1,38 @@
+"""Kaltstart-Importbudget (dieselbe Messung wie scripts/importbudget_pruefen.py)."""
+from __future__ import annotations
+
+import importlib.util
+import os
+
+import pytest
+
+_SKRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "scripts", "importbudget_pruefen.py")
+
+
+def _lade_skript():
+    spec = importlib.util.spec_from_file_location("importbudget_pruefen", _SKRIPT)
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+@pytest.fixture(scope="module")
+def messung():
+    # main zieht FastAPI & Co. – ohne vollständige Umgebung ist nichts zu messen.
+    pytest.importorskip("fastapi")
+    skript = _lade_skript()
+    return skript, skript.messe_import()
+
+
+def test_keine_schweren_module_beim_import(messung):
+    skript, ergebnis = messung
+    assert skript.verbotene_module(ergebnis) == [], "schwere Module beim Import von main geladen"
+
+
+def test_import_main_im_budget(messung):
+    skript, ergebnis = messung
+    budget = skript.budget_sekunden()
+    assert ergebnis["sekunden"] <= budget, (
+        f"import main dauert {ergebnis['sekunden']:.3f} s, Budget {budget:.3f} s"
+    )
@@ -0,0 +1,58 @@
+"""Routen-Labels der MetrikMiddleware (volles Template inkl. Router-Präfix)."""
+from __future__ import annotations
+
+import pytest
+
+from utils.db_instrumentierung import MetrikMiddleware
+from utils.metrics import rolling_p95, zaehler_zuruecksetzen
+
+
+@pytest.fixture
+def app():
+    pytest.importorskip("fastapi")
+    from fastapi import APIRouter, FastAPI
+
+    zeiten, urlaub = APIRouter(), APIRouter()
+
+    @zeiten.get("/azk/{mitarbeiter_id}")
+    def azk(mitarbeiter_id: int):
+        return {"ok": True}
+
+    # Gleicher Teilpfad in einem anderen Router – darf nicht dasselbe Label bekommen.
+    @urlaub.get("/azk/{mitarbeiter_id}")
+    def urlaub_azk(mitarbeiter_id: int):
+        return {"ok": True}
+
+    @zeiten.get("/datei/{pfad:path}")
+    def datei(pfad: str):
+        return {"pfad": pfad}
+
+    anwendung = FastAPI()
+    anwendung.include_router(zeiten, prefix="/zeiten")
+    anwendung.include_router(urlaub, prefix="/urlaub")
+    anwendung.add_middleware(MetrikMiddleware)
+    zaehler_zuruecksetzen()
+    yield anwendung
+    zaehler_zuruecksetzen()
+
+
+def test_label_enthaelt_router_praefix(app):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+    assert client.get("/zeiten/azk/7").status_code == 200
+    assert client.get("/urlaub/azk/7").status_code == 200
+    assert client.get("/zeiten/datei/a/b.pdf").status_code == 200
+
+    routen = rolling_p95()["routen"]
+    assert set(routen) == {
+        "/zeiten/azk/{mitarbeiter_id}",
+        "/urlaub/azk/{mitarbeiter_id}",
+        "/zeiten/datei/{pfad:path}",
+    }
+
+
+def test_azk_route_der_app(api, admin_header):
+    zaehler_zuruecksetzen()
+    assert api.get("/zeiten/azk/7?monat=9&jahr=2026", headers=admin_header).status_code == 200
+    assert "/zeiten/azk/{mitarbeiter_id}" in rolling_p95()["routen"]
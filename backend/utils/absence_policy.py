@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from threading import Lock
+from time import monotonic
 from typing import Dict, Mapping
 
-from utils.database import get_supabase_client
+from utils.metrics import zaehle
 
 # Default-Regeln (DE-nah) - können je Betrieb überschrieben werden.
 DEFAULT_ABSENCE_PAYMENT_POLICY: Dict[str, bool] = {
@@ -41,7 +43,23 @@ def _as_float(value, default: float = 0.0) -> float:
         return float(default)
 
 
-def _query_betrieb_row(supabase, betrieb_id: int) -> tuple[dict, str]:
+def _schema_fehlt(exc: Exception) -> bool:
+    """PostgREST-Fehler für eine fehlende Tabelle/Spalte (optionale Schemata)."""
+    text = str(exc)
+    return (
+        any(code in text for code in ("42P01", "42703", "PGRST204", "PGRST205"))
+        or "does not exist" in text
+        or "Could not find the table" in text
+    )
+
+
+def _query_betrieb_row(supabase, betrieb_id: int) -> tuple[dict, str, bool]:
+    """
+    Betriebszeile samt Meta-Spaltenname. Das dritte Element ist False, wenn
+    die Zeile wegen eines Fehlers (nicht wegen fehlender Spalte) nicht
+    gelesen werden konnte.
+    """
+    gelesen = True
     # Instanzen nutzen teils "metadaten", teils "meta".
     for cols, meta_key in (("id,metadaten", "metadaten"), ("id,meta", "meta")):
         try:
@@ -54,10 +72,12 @@ def _query_betrieb_row(supabase, betrieb_id: int) -> tuple[dict, str]:
             )
             rows = res.data or []
             if rows:
-                return rows[0] or {}, meta_key
-        except Exception:
+                return rows[0] or {}, meta_key, True
+        except Exception as exc:
+            if not _schema_fehlt(exc):
+                gelesen = False
             continue
-    return {}, "metadaten"
+    return {}, "metadaten", gelesen
 
 
 def _canonicalize_policy(raw_policy: Mapping | None) -> Dict[str, bool]:
@@ -74,10 +94,13 @@ def _canonicalize_policy(raw_policy: Mapping | None) -> Dict[str, bool]:
     return out
 
 
-def _read_policy_from_betrieb_meta(supabase, betrieb_id: int | None) -> Dict[str, bool]:
+def _read_policy_from_betrieb_meta(supabase, betrieb_id: int | None) -> Dict[str, bool] | None:
+    """Overrides aus betriebe.meta/metadaten; None, wenn das Lesen fehlschlug."""
     if betrieb_id is None:
         return {}
-    row, meta_key = _query_betrieb_row(supabase, int(betrieb_id))
+    row, meta_key, gelesen = _query_betrieb_row(supabase, int(betrieb_id))
+    if not gelesen:
+        return None
     meta = row.get(meta_key)
     if not isinstance(meta, Mapping):
         return {}
@@ -91,19 +114,90 @@ def _read_policy_from_betrieb_meta(supabase, betrieb_id: int | None) -> Dict[str
     return {}
 
 
-def load_absence_compensation_policy(supabase=None, *, betrieb_id: int | None = None) -> Dict[str, bool]:
+def _read_policy_from_rules_table(supabase, betrieb_id: int | None) -> Dict[str, bool] | None:
+    """Regeln aus betrieb_absence_rules; None, wenn das Lesen fehlschlug."""
+    if betrieb_id is None:
+        return {}
+    out: Dict[str, bool] = {}
+    try:
+        res = (
+            supabase.table("betrieb_absence_rules")
+            .select("typ, ist_bezahlt")
+            .eq("betrieb_id", int(betrieb_id))
+            .execute()
+        )
+        for row in res.data or []:
+            typ = _normalize_absence_type(row.get("typ"))
+            if typ and row.get("ist_bezahlt") is not None:
+                out[typ] = bool(row.get("ist_bezahlt"))
+    except Exception as exc:
+        # Die Tabelle ist optional; fehlt sie, gibt es schlicht keine Regeln.
+        if not _schema_fehlt(exc):
+            return None
+    return out
+
+
+# Regeln ändern sich selten; die TTL begrenzt nur die Verzögerung zwischen
+# mehreren Worker-Prozessen. Im eigenen Prozess invalidieren die save_*-Funktionen.
+ABSENCE_POLICY_TTL_SECONDS = 600.0
+
+_policy_cache: Dict[int, tuple[float, Dict[str, bool]]] = {}
+_policy_cache_lock = Lock()
+
+
+def invalidate_absence_policy(betrieb_id: int | None = None) -> None:
+    with _policy_cache_lock:
+        if betrieb_id is None:
+            _policy_cache.clear()
+        else:
+            _policy_cache.pop(int(betrieb_id), None)
+
+
+def resolve_betrieb_absence_policy(supabase=None, *, betrieb_id: int | None = None) -> Dict[str, bool]:
     """
-    Liefert die effektive Bezahl-Policy für Abwesenheitstypen.
+    Effektive Bezahl-Policy eines Betriebs (gecacht, gemeinsame Quelle für
+    absences.resolve_absence_payment_rules und load_absence_compensation_policy).
     Reihenfolge:
       1) Defaults
       2) optionale betriebe.meta/metadaten overrides (neu+legacy)
+      3) Tabelle betrieb_absence_rules (explizite Regel je Typ)
     """
-    client = supabase or get_supabase_client()
+    if betrieb_id is None:
+        return dict(DEFAULT_ABSENCE_PAYMENT_POLICY)
+    key = int(betrieb_id)
+    now = monotonic()
+    with _policy_cache_lock:
+        hit = _policy_cache.get(key)
+        if hit and (now - hit[0]) < ABSENCE_POLICY_TTL_SECONDS:
+            zaehle("absence_policy.cache_hit")
+            return dict(hit[1])
+
+    zaehle("absence_policy.load")
+    client = supabase
+    if client is None:
+        # Lazy: absences importiert dieses Modul, ohne selbst einen Client zu brauchen.
+        from utils.database import get_supabase_client
+        client = get_supabase_client()
+    meta_policy = _read_policy_from_betrieb_meta(client, key)
+    regel_policy = _read_policy_from_rules_table(client, key)
     policy = dict(DEFAULT_ABSENCE_PAYMENT_POLICY)
-    policy.update(_read_policy_from_betrieb_meta(client, betrieb_id))
+    policy.update(meta_policy or {})
+    policy.update(regel_policy or {})
     if "krankheit" in policy:
         policy["krank"] = bool(policy["krankheit"])
-    return policy
+    if meta_policy is None or regel_policy is None:
+        # Vorübergehender DB-Fehler: Ergebnis nicht cachen, sonst gelten die
+        # Defaults bis zum Ablauf der TTL.
+        zaehle("absence_policy.load_error")
+        return dict(policy)
+    with _policy_cache_lock:
+        _policy_cache[key] = (monotonic(), policy)
+    return dict(policy)
+
+
+def load_absence_compensation_policy(supabase=None, *, betrieb_id: int | None = None) -> Dict[str, bool]:
+    """Liefert die effektive Bezahl-Policy für Abwesenheitstypen (siehe resolve_betrieb_absence_policy)."""
+    return resolve_betrieb_absence_policy(supabase, betrieb_id=betrieb_id)
 
 
 def get_absence_payment_policy(betrieb_id: int | None = None) -> Dict[str, bool]:
@@ -119,7 +213,10 @@ def save_absence_compensation_policy(
     if betrieb_id is None:
         return False, "betrieb_id fehlt"
     try:
-        row, meta_key = _query_betrieb_row(supabase, int(betrieb_id))
+        row, meta_key, gelesen = _query_betrieb_row(supabase, int(betrieb_id))
+        if not gelesen:
+            # Sonst würden die übrigen Metadaten mit {} überschrieben.
+            return False, "betrieb konnte nicht gelesen werden"
         meta = row.get(meta_key)
         if not isinstance(meta, dict):
             meta = {}
@@ -129,6 +226,7 @@ def save_absence_compensation_policy(
         updated["absence_payment_policy"] = dict(canonical)
         updated["abwesenheit_bezahlt"] = dict(canonical)
         supabase.table("betriebe").update({meta_key: updated}).eq("id", int(betrieb_id)).execute()
+        invalidate_absence_policy(betrieb_id)
         return True, "ok"
     except Exception as exc:
         return False, str(exc)
@@ -2,8 +2,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
+from threading import Lock
+from time import monotonic
 from typing import Dict, Optional
 
+from utils.absence_policy import invalidate_absence_policy, resolve_betrieb_absence_policy
+from utils.anfrage_cache import lade_mitarbeiter_zeile, lade_vertraege
+from utils.efzg import EfzgEpisodenIndex
+from utils.monatsfakten import invalidiere_monatsfakten
+from utils.urlaubskonto import aktualisiere_urlaubskonto, jahre_im_zeitraum
+
 
 @dataclass
 class AbsenceResult:
@@ -40,27 +48,15 @@ def get_absence_type_label(absence_type: str) -> str:
 def resolve_absence_payment_rules(supabase, betrieb_id: int | None) -> dict[str, bool]:
     """
     Lädt konfigurierbare Bezahl-Logik pro Abwesenheitstyp.
-    Fallback auf rechtssichere Defaults bei fehlender Tabelle/Schema.
+    Gemeinsamer, gecachter Stand mit absence_policy; Fallback auf rechtssichere
+    Defaults bei fehlender Tabelle/Schema.
     """
     rules = dict(DEFAULT_ABSENCE_PAYMENT_RULES)
     if betrieb_id is None:
         return rules
-    try:
-        res = (
-            supabase.table("betrieb_absence_rules")
-            .select("typ, ist_bezahlt")
-            .eq("betrieb_id", int(betrieb_id))
-            .execute()
-        )
-        for row in res.data or []:
-            typ = _normalize_absence_type(row.get("typ"))
-            if not typ:
-                continue
-            if row.get("ist_bezahlt") is None:
-                continue
-            rules[typ] = bool(row.get("ist_bezahlt"))
-    except Exception:
-        pass
+    policy = resolve_betrieb_absence_policy(supabase, betrieb_id=betrieb_id)
+    policy.pop("krank", None)  # Legacy-Alias, hier immer "krankheit"
+    rules.update(policy)
     return rules
 
 
@@ -93,6 +89,7 @@ def save_absence_payment_rules(
         if not payload:
             return False, "Keine gültigen Regelwerte."
         supabase.table("betrieb_absence_rules").upsert(payload, on_conflict="betrieb_id,typ").execute()
+        invalidate_absence_policy(betrieb_id)
         return True, "Regeln gespeichert."
     except Exception as exc:
         return False, f"Regeln konnten nicht gespeichert werden: {exc}"
@@ -157,37 +154,16 @@ def _monthly_target_to_daily_hours(*, monthly_target_hours: float, reference_day
 
 def _load_default_monthly_target_hours(supabase, mitarbeiter_id: int, fallback: float) -> float:
     try:
-        res = (
-            supabase.table("mitarbeiter")
-            .select("monatliche_soll_stunden")
-            .eq("id", mitarbeiter_id)
-            .limit(1)
-            .execute()
-        )
-        rows = res.data or []
-        if rows:
-            db_val = _to_float((rows[0] or {}).get("monatliche_soll_stunden"), 0.0)
-            if db_val > 0:
-                return db_val
+        db_val = _to_float(lade_mitarbeiter_zeile(supabase, mitarbeiter_id).get("monatliche_soll_stunden"), 0.0)
+        if db_val > 0:
+            return db_val
     except Exception:
         pass
     return _to_float(fallback, 0.0)
 
 
 def _load_contract_rows(supabase, mitarbeiter_id: int) -> list[dict]:
-    try:
-        res = (
-            supabase.table("vertraege")
-            .select(
-                "gueltig_ab,gueltig_bis,soll_stunden_monat,wochenstunden,"
-                "arbeitstage_pro_woche,wochenarbeitstage"
-            )
-            .eq("mitarbeiter_id", mitarbeiter_id)
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    return lade_vertraege(supabase, mitarbeiter_id)
 
 
 def _resolve_workdays_per_week(contract: dict) -> float:
@@ -326,8 +302,7 @@ def _parse_iso_date(value) -> Optional[date]:
         return None
 
 
-def _mirror_absence_into_legacy(
-    supabase,
+def _build_legacy_mirror_rows(
     *,
     mitarbeiter_id: int,
     typ: str,
@@ -336,32 +311,61 @@ def _mirror_absence_into_legacy(
     paid: bool,
     credited_hours: float,
     daily_credit_map: Dict[str, float] | None = None,
-) -> None:
+) -> list[dict]:
     cur = start
     days = workdays_between(start, end)
     per_day_credit_default = round(credited_hours / days, 2) if days else 0.0
+    rows: list[dict] = []
     while cur <= end:
         if _is_workday(cur):
             iso = cur.isoformat()
             per_day_credit = float((daily_credit_map or {}).get(iso, per_day_credit_default))
-            legacy_row = {
-                "mitarbeiter_id": mitarbeiter_id,
-                "datum": iso,
-                "start_zeit": "00:00:00",
-                "ende_zeit": "00:00:00",
-                "abwesenheitstyp": typ,
-                "ist_krank": typ == "krankheit",
-                "arbeitsstunden": per_day_credit if paid else 0.0,
-                "pause_minuten": 0,
-                "quelle": "abwesenheit_system",
-                "monat": cur.month,
-                "jahr": cur.year,
-            }
-            supabase.table("zeiterfassung").upsert(
-                legacy_row,
-                on_conflict="mitarbeiter_id,datum,start_zeit",
-            ).execute()
+            rows.append(
+                {
+                    "mitarbeiter_id": mitarbeiter_id,
+                    "datum": iso,
+                    "start_zeit": "00:00:00",
+                    "ende_zeit": "00:00:00",
+                    "abwesenheitstyp": typ,
+                    "ist_krank": typ == "krankheit",
+                    "arbeitsstunden": per_day_credit if paid else 0.0,
+                    "pause_minuten": 0,
+                    "quelle": "abwesenheit_system",
+                    "monat": cur.month,
+                    "jahr": cur.year,
+                }
+            )
         cur += timedelta(days=1)
+    return rows
+
+
+def _mirror_absence_into_legacy(
+    supabase,
+    *,
+    mitarbeiter_id: int,
+    typ: str,
+    start: date,
+    end: date,
+    paid: bool,
+    credited_hours: float,
+    daily_credit_map: Dict[str, float] | None = None,
+) -> None:
+    rows = _build_legacy_mirror_rows(
+        mitarbeiter_id=mitarbeiter_id,
+        typ=typ,
+        start=start,
+        end=end,
+        paid=paid,
+        credited_hours=credited_hours,
+        daily_credit_map=daily_credit_map,
+    )
+    if rows:
+        # Ein Bulk-Upsert statt eines Roundtrips pro Arbeitstag.
+        supabase.table("zeiterfassung").upsert(
+            rows,
+            on_conflict="mitarbeiter_id,datum,start_zeit",
+        ).execute()
+    invalidiere_monatsfakten(mitarbeiter_id)
 
 
 def _remove_legacy_absence_mirror(
@@ -384,6 +388,54 @@ def _remove_legacy_absence_mirror(
     except Exception:
         # Legacy-Instanzen können eingeschränkte Filter/Spalten haben.
         pass
+    invalidiere_monatsfakten(mitarbeiter_id)
+
+
+def _replace_legacy_absence_mirror(
+    supabase,
+    *,
+    mitarbeiter_id: int,
+    old_start: date,
+    old_end: date,
+    typ: str,
+    start: date,
+    end: date,
+    paid: bool,
+    credited_hours: float,
+    daily_credit_map: Dict[str, float] | None = None,
+) -> None:
+    """
+    Ersetzt den Spiegel einer geänderten Abwesenheit: alten Zeitraum löschen,
+    neuen schreiben. Bevorzugt per RPC in einer Transaktion; ohne Migration
+    Fallback auf Delete + Bulk-Upsert (zwei Roundtrips).
+    """
+    rows = _build_legacy_mirror_rows(
+        mitarbeiter_id=mitarbeiter_id,
+        typ=typ,
+        start=start,
+        end=end,
+        paid=paid,
+        credited_hours=credited_hours,
+        daily_credit_map=daily_credit_map,
+    )
+    try:
+        supabase.rpc(
+            "ersetze_abwesenheit_spiegel",
+            {
+                "p_mitarbeiter_id": mitarbeiter_id,
+                "p_von": old_start.isoformat(),
+                "p_bis": old_end.isoformat(),
+                "p_zeilen": rows,
+            },
+        ).execute()
+    except Exception:
+        _remove_legacy_absence_mirror(supabase, mitarbeiter_id=mitarbeiter_id, start=old_start, end=old_end)
+        if rows:
+            supabase.table("zeiterfassung").upsert(
+                rows,
+                on_conflict="mitarbeiter_id,datum,start_zeit",
+            ).execute()
+    invalidiere_monatsfakten(mitarbeiter_id)
 
 
 def _write_absence_audit_log(
@@ -468,6 +520,18 @@ def _load_existing_sick_episodes_same_diagnosis(
     mitarbeiter_id: int,
     current_absence_id: int | None = None,
 ) -> list[dict]:
+    return _query_sick_episodes(
+        supabase, mitarbeiter_id=mitarbeiter_id, current_absence_id=current_absence_id
+    ) or []
+
+
+def _query_sick_episodes(
+    supabase,
+    *,
+    mitarbeiter_id: int,
+    current_absence_id: int | None = None,
+) -> list[dict] | None:
+    """Krankheits-Episoden aus abwesenheiten; None, wenn keine Abfragevariante lief."""
     select_variants = [
         "id,typ,start_datum,ende_datum,grund,diagnose,diagnose_schluessel,diagnose_code,icd10",
         "id,typ,start_datum,ende_datum,grund",
@@ -489,7 +553,7 @@ def _load_existing_sick_episodes_same_diagnosis(
             return _coerce_existing_absence_history(rows)
         except Exception:
             continue
-    return []
+    return None
 
 
 def _insert_absence_compat(supabase, base_payload: dict, start: date) -> str:
@@ -567,6 +631,8 @@ def store_absence(
         "created_by": created_by,
     }
     _insert_absence_compat(supabase, payload, start)
+    if normalized_typ == "krankheit":
+        _extend_efzg_episode_index(mitarbeiter_id, start=start, end=end, diagnose=diagnose_schluessel)
 
     # Rückwärtskompatibilität: für bestehende Auswertungen in zeiterfassung spiegeln.
     _mirror_absence_into_legacy(
@@ -579,6 +645,8 @@ def store_absence(
         credited_hours=result.credited_hours,
         daily_credit_map=daily_credit_map,
     )
+    if normalized_typ == "urlaub":
+        aktualisiere_urlaubskonto(supabase, mitarbeiter_id, jahre_im_zeitraum(start, end))
 
     return {
         "tage": result.days,
@@ -668,15 +736,11 @@ def update_absence(
         if last_exc:
             raise last_exc
 
-    _remove_legacy_absence_mirror(
-        supabase,
-        mitarbeiter_id=mitarbeiter_id,
-        start=old_start,
-        end=old_end,
-    )
-    _mirror_absence_into_legacy(
+    _replace_legacy_absence_mirror(
         supabase,
         mitarbeiter_id=mitarbeiter_id,
+        old_start=old_start,
+        old_end=old_end,
         typ=normalized_typ,
         start=start,
         end=end,
@@ -685,6 +749,10 @@ def update_absence(
         daily_credit_map=daily_credit_map,
     )
 
+    if "urlaub" in (normalized_typ, _normalize_absence_type(str(current.get("typ") or ""))):
+        aktualisiere_urlaubskonto(supabase, mitarbeiter_id, jahre_im_zeitraum(old_start, old_end, start, end))
+    invalidate_efzg_episode_index(mitarbeiter_id)
+
     updated = _load_absence_by_id(supabase, absence_id)
     _write_absence_audit_log(
         supabase,
@@ -705,6 +773,60 @@ def update_absence(
     }
 
 
+# Episoden-Index je Mitarbeiter (siehe efzg.EfzgEpisodenIndex). store_absence und
+# der Import erweitern einen geladenen Index inkrementell, Änderungen/Löschungen
+# verwerfen ihn. Die TTL begrenzt die Verzögerung zwischen Worker-Prozessen.
+EFZG_INDEX_TTL_SECONDS = 900.0
+
+_efzg_index_cache: Dict[int, tuple[float, EfzgEpisodenIndex]] = {}
+_efzg_index_lock = Lock()
+
+
+def load_efzg_episode_index(supabase, *, mitarbeiter_id: int) -> EfzgEpisodenIndex:
+    """
+    Episoden-Index aller Krankheits-Abwesenheiten eines Mitarbeiters (gecacht).
+    Für Monatsauswertungen: ein Abruf je Mitarbeiter, danach
+    efzg.berechne_efzg_status(..., episoden_index=index) bzw. index.status(tag, diagnose).
+    """
+    key = int(mitarbeiter_id)
+    now = monotonic()
+    with _efzg_index_lock:
+        hit = _efzg_index_cache.get(key)
+        if hit and (now - hit[0]) < EFZG_INDEX_TTL_SECONDS:
+            return hit[1]
+
+    history = _query_sick_episodes(supabase, mitarbeiter_id=key)
+    try:
+        eintritt = _parse_iso_date(lade_mitarbeiter_zeile(supabase, key).get("eintrittsdatum"))
+        gelesen = history is not None
+    except Exception:
+        eintritt, gelesen = None, False
+    index = EfzgEpisodenIndex(eintritt or date.min, history or [])
+    if gelesen:
+        # Nach Lesefehlern nicht cachen, sonst gälte bis zum Ablauf der TTL
+        # jede Erkrankung als neuer Anspruch.
+        with _efzg_index_lock:
+            _efzg_index_cache[key] = (monotonic(), index)
+    return index
+
+
+def _extend_efzg_episode_index(mitarbeiter_id: int, *, start: date, end: date, diagnose: str | None) -> None:
+    with _efzg_index_lock:
+        hit = _efzg_index_cache.get(int(mitarbeiter_id))
+        if hit:
+            hit[1].hinzufuegen(
+                {"start_datum": start.isoformat(), "ende_datum": end.isoformat(), "diagnose": diagnose or None}
+            )
+
+
+def invalidate_efzg_episode_index(mitarbeiter_id: int | None = None) -> None:
+    with _efzg_index_lock:
+        if mitarbeiter_id is None:
+            _efzg_index_cache.clear()
+        else:
+            _efzg_index_cache.pop(int(mitarbeiter_id), None)
+
+
 def build_efzg_episode_history(
     supabase,
     *,
@@ -713,44 +835,22 @@ def build_efzg_episode_history(
     max_lookback_days: int = 540,
 ) -> list[dict]:
     """
-    Baut eine einfache Episoden-Historie aus abwesenheiten (Typ Krankheit).
-    Ergebnis kompatibel zu utils.efzg.berechne_efzg_status(..., vorerkrankungen=...).
+    Episoden-Historie (Typ Krankheit) aus dem gecachten Episoden-Index.
+    Ergebnis kompatibel zu utils.efzg.berechne_efzg_status(..., vorerkrankungen=...);
+    überlappende Episoden derselben Diagnose sind bereits zusammengeführt.
     """
     start_lookback = bis_datum - timedelta(days=max(1, int(max_lookback_days)))
-    try:
-        res = (
-            supabase.table("abwesenheiten")
-            .select("start_datum,ende_datum,grund")
-            .eq("mitarbeiter_id", int(mitarbeiter_id))
-            .in_("typ", ["krankheit", "krank"])
-            .gte("start_datum", start_lookback.isoformat())
-            .lte("start_datum", bis_datum.isoformat())
-            .order("start_datum")
-            .execute()
-        )
-        rows = res.data or []
-    except Exception:
-        rows = []
-
-    episodes: list[dict] = []
-    for row in rows:
-        s = _parse_iso_date(row.get("start_datum"))
-        e = _parse_iso_date(row.get("ende_datum")) or s
-        if s is None:
-            continue
-        if e is None or e < s:
-            e = s
-        episodes.append(
-            {
-                "start_datum": s.isoformat(),
-                "ende_datum": e.isoformat(),
-                # Diagnose-Schlüssel nur wenn im Feld grund explizit als Prefix mitgegeben.
-                # Beispiel: "diag:M54.5"
-                "diagnose_schluessel": (str(row.get("grund") or "").strip().split("diag:", 1)[1].strip()
-                                        if "diag:" in str(row.get("grund") or "") else None),
-            }
-        )
-    return episodes
+    index = load_efzg_episode_index(supabase, mitarbeiter_id=mitarbeiter_id)
+    return [
+        {
+            "start_datum": ep["start"].isoformat(),
+            "ende_datum": ep["end"].isoformat(),
+            "diagnose_schluessel": ep["diagnose_key"],
+            "erster_tag_teilgearbeitet": ep["erster_tag_teilgearbeitet"],
+        }
+        for ep in index.episoden()
+        if start_lookback <= ep["start"] <= bis_datum
+    ]
 
 
 def delete_absence(
@@ -774,12 +874,15 @@ def delete_absence(
     end = _parse_iso_date(current.get("ende_datum") or current.get("datum")) or start
 
     supabase.table("abwesenheiten").delete().eq("id", absence_id).execute()
+    invalidate_efzg_episode_index(mitarbeiter_id)
     _remove_legacy_absence_mirror(
         supabase,
         mitarbeiter_id=mitarbeiter_id,
         start=start,
         end=end,
     )
+    if _normalize_absence_type(str(current.get("typ") or "")) == "urlaub":
+        aktualisiere_urlaubskonto(supabase, mitarbeiter_id, jahre_im_zeitraum(start, end))
     _write_absence_audit_log(
         supabase,
         event_type="absence_deleted",
@@ -792,3 +895,347 @@ def delete_absence(
         reason=reason,
     )
     return {"deleted": True}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MASSENIMPORT (Altdaten-Übernahme bei neuen Standorten)
+# ─────────────────────────────────────────────────────────────────────────────
+
+IMPORT_CHUNK_SIZE = 500
+
+_IMPORT_SPALTEN_ALIASE = {
+    "mitarbeiter_id": "mitarbeiter_id",
+    "ma_id": "mitarbeiter_id",
+    "typ": "typ",
+    "art": "typ",
+    "start_datum": "start_datum",
+    "von": "start_datum",
+    "datum_von": "start_datum",
+    "ende_datum": "ende_datum",
+    "bis": "ende_datum",
+    "datum_bis": "ende_datum",
+    "grund": "grund",
+    "kommentar": "grund",
+}
+
+
+def _parse_import_date(value) -> Optional[date]:
+    raw = str(value or "").strip()
+    if not raw:
+        return None
+    try:
+        if "." in raw:
+            return datetime.strptime(raw[:10], "%d.%m.%Y").date()
+        return date.fromisoformat(raw[:10])
+    except Exception:
+        return None
+
+
+def parse_absence_import_csv(text: str) -> list[dict]:
+    """
+    CSV (Trennzeichen ';' oder ',') → Rohzeilen für import_absences_bulk.
+    Erwartete Spalten: mitarbeiter_id, typ, start_datum, ende_datum[, grund];
+    Aliase wie von/bis oder datum_von/datum_bis werden akzeptiert.
+    """
+    import csv
+    import io
+
+    text = (text or "").lstrip("﻿")
+    first_line = text.split("\n", 1)[0]
+    delimiter = ";" if first_line.count(";") >= first_line.count(",") else ","
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    rows: list[dict] = []
+    for raw in reader:
+        row: dict = {}
+        for key, value in (raw or {}).items():
+            target = _IMPORT_SPALTEN_ALIASE.get(str(key or "").strip().lower())
+            if target and value is not None:
+                row[target] = value.strip()
+        if any(row.values()):
+            rows.append(row)
+    return rows
+
+
+def _intervals_overlap(a_start: date, a_end: date, b_start: date, b_end: date) -> bool:
+    return a_start <= b_end and b_start <= a_end
+
+
+def _load_import_context(supabase, *, betrieb_id: int, mitarbeiter_ids: list[int]) -> tuple[dict, dict]:
+    """Stammdaten und Verträge aller betroffenen Mitarbeiter in je einem Abruf."""
+    stammdaten: dict[int, dict] = {}
+    for start in range(0, len(mitarbeiter_ids), IMPORT_CHUNK_SIZE):
+        chunk = mitarbeiter_ids[start:start + IMPORT_CHUNK_SIZE]
+        res = (
+            supabase.table("mitarbeiter")
+            .select("id,monatliche_soll_stunden")
+            .eq("betrieb_id", int(betrieb_id))
+            .in_("id", chunk)
+            .execute()
+        )
+        for row in res.data or []:
+            stammdaten[int(row["id"])] = row
+
+    contracts: dict[int, list[dict]] = {mid: [] for mid in stammdaten}
+    if stammdaten:
+        try:
+            res = (
+                supabase.table("vertraege")
+                .select(
+                    "mitarbeiter_id,gueltig_ab,gueltig_bis,soll_stunden_monat,wochenstunden,"
+                    "arbeitstage_pro_woche,wochenarbeitstage"
+                )
+                .in_("mitarbeiter_id", list(stammdaten))
+                .execute()
+            )
+            for row in res.data or []:
+                contracts.setdefault(int(row.get("mitarbeiter_id") or 0), []).append(row)
+        except Exception:
+            pass
+    return stammdaten, contracts
+
+
+def _load_existing_absence_intervals(
+    supabase,
+    *,
+    mitarbeiter_ids: list[int],
+    start: date,
+    end: date,
+) -> dict[int, list[tuple[date, date]]]:
+    intervals: dict[int, list[tuple[date, date]]] = {}
+    if not mitarbeiter_ids:
+        return intervals
+    res = (
+        supabase.table("abwesenheiten")
+        .select("mitarbeiter_id,start_datum,ende_datum")
+        .in_("mitarbeiter_id", mitarbeiter_ids)
+        .lte("start_datum", end.isoformat())
+        .gte("ende_datum", start.isoformat())
+        .execute()
+    )
+    for row in res.data or []:
+        s = _parse_iso_date(row.get("start_datum"))
+        e = _parse_iso_date(row.get("ende_datum")) or s
+        if s is None:
+            continue
+        intervals.setdefault(int(row.get("mitarbeiter_id") or 0), []).append((s, max(s, e)))
+    for rows in intervals.values():
+        rows.sort()
+    return intervals
+
+
+def _insert_absences_bulk_compat(supabase, payloads: list[dict]) -> None:
+    """Wie _insert_absence_compat, aber als Bulk-Insert je Chunk."""
+    for start in range(0, len(payloads), IMPORT_CHUNK_SIZE):
+        chunk = payloads[start:start + IMPORT_CHUNK_SIZE]
+        variants = [
+            chunk,
+            [{**p, "datum": p["start_datum"]} for p in chunk],
+            [{**p, "typ": _candidate_db_types(p["typ"])[-1]} for p in chunk],
+            [{**p, "typ": _candidate_db_types(p["typ"])[-1], "datum": p["start_datum"]} for p in chunk],
+        ]
+        for idx, rows in enumerate(variants):
+            try:
+                supabase.table("abwesenheiten").insert(rows).execute()
+                break
+            except Exception as exc:
+                has_next = idx < len(variants) - 1
+                if has_next and (_is_not_null_datum_error(exc) or _is_typ_check_error(exc)):
+                    continue
+                raise
+
+
+def import_absences_bulk(
+    supabase,
+    *,
+    betrieb_id: int,
+    rows: list[dict],
+    monthly_target_hours: float = 0.0,
+    created_by: int | None = None,
+    nur_pruefen: bool = False,
+    sync_accounts: bool = True,
+) -> dict:
+    """
+    Importiert viele Abwesenheiten mehrerer Mitarbeiter auf einmal.
+
+    Gegenüber store_absence je Zeile: Stammdaten, Verträge, Bezahl-Regeln und
+    bestehende Abwesenheiten werden je einmal geladen, Gutschriften im Speicher
+    berechnet, abwesenheiten und der zeiterfassung-Spiegel per Bulk-Insert
+    geschrieben und Arbeitszeitkonten einmal pro betroffenem Monat aktualisiert.
+
+    Fehlerhafte oder überlappende Zeilen werden übersprungen und mit Zeilennummer
+    (1-basiert) gemeldet. ``nur_pruefen=True`` validiert nur.
+    """
+    fehler: list[dict] = []
+    kandidaten: list[dict] = []
+    valid_types = set(ABSENCE_TYPE_LABELS)
+
+    for idx, raw in enumerate(rows or [], start=1):
+        try:
+            mitarbeiter_id = int(str((raw or {}).get("mitarbeiter_id") or "").strip())
+        except ValueError:
+            fehler.append({"zeile": idx, "grund": "Ungültige mitarbeiter_id."})
+            continue
+        typ = _normalize_absence_type(str((raw or {}).get("typ") or ""))
+        if typ not in valid_types:
+            fehler.append({"zeile": idx, "grund": f"Unbekannter Typ '{(raw or {}).get('typ')}'."})
+            continue
+        start = _parse_import_date((raw or {}).get("start_datum"))
+        end = _parse_import_date((raw or {}).get("ende_datum")) or start
+        if start is None:
+            fehler.append({"zeile": idx, "grund": "Ungültiges Startdatum."})
+            continue
+        if end < start:
+            fehler.append({"zeile": idx, "grund": "Enddatum liegt vor Startdatum."})
+            continue
+        kandidaten.append(
+            {
+                "zeile": idx,
+                "mitarbeiter_id": mitarbeiter_id,
+                "typ": typ,
+                "start": start,
+                "end": end,
+                "grund": str((raw or {}).get("grund") or "").strip() or None,
+            }
+        )
+
+    if not kandidaten:
+        return {"importiert": 0, "geprueft": len(rows or []), "fehler": fehler, "monate_aktualisiert": 0}
+
+    mitarbeiter_ids = sorted({k["mitarbeiter_id"] for k in kandidaten})
+    stammdaten, contracts = _load_import_context(supabase, betrieb_id=betrieb_id, mitarbeiter_ids=mitarbeiter_ids)
+    existing = _load_existing_absence_intervals(
+        supabase,
+        mitarbeiter_ids=list(stammdaten),
+        start=min(k["start"] for k in kandidaten),
+        end=max(k["end"] for k in kandidaten),
+    )
+    paid_rules = resolve_absence_payment_rules(supabase, betrieb_id)
+
+    # Überlappungen: gegen Bestand (sortiert, früh abbrechen) und innerhalb des Batches.
+    angenommen: list[dict] = []
+    batch_intervals: dict[int, list[tuple[date, date]]] = {}
+    for k in sorted(kandidaten, key=lambda x: (x["mitarbeiter_id"], x["start"], x["zeile"])):
+        mid = k["mitarbeiter_id"]
+        if mid not in stammdaten:
+            fehler.append({"zeile": k["zeile"], "grund": "Mitarbeiter nicht gefunden."})
+            continue
+        kollision = False
+        for s, e in existing.get(mid, []):
+            if s > k["end"]:
+                break
+            if _intervals_overlap(s, e, k["start"], k["end"]):
+                kollision = True
+                break
+        if kollision:
+            fehler.append({"zeile": k["zeile"], "grund": "Überschneidung mit bestehender Abwesenheit."})
+            continue
+        vorige = batch_intervals.get(mid)
+        if vorige and vorige[-1][1] >= k["start"]:
+            fehler.append({"zeile": k["zeile"], "grund": "Überschneidung innerhalb des Imports."})
+            continue
+        batch_intervals.setdefault(mid, []).append((k["start"], k["end"]))
+        angenommen.append(k)
+
+    fehler.sort(key=lambda f: f["zeile"])
+    if nur_pruefen or not angenommen:
+        return {
+            "importiert": 0,
+            "geprueft": len(rows or []),
+            "gueltig": len(angenommen),
+            "fehler": fehler,
+            "monate_aktualisiert": 0,
+        }
+
+    payloads: list[dict] = []
+    mirror_rows: list[dict] = []
+    betroffene_monate: set[tuple[int, int, int]] = set()
+    for k in angenommen:
+        mid = k["mitarbeiter_id"]
+        paid = _resolve_paid_flag(k["typ"], paid_rules)
+        fallback_target = _to_float(stammdaten[mid].get("monatliche_soll_stunden"), 0.0) or _to_float(
+            monthly_target_hours, 0.0
+        )
+        daily_credit_map = _calculate_daily_credit_map(
+            start=k["start"],
+            end=k["end"],
+            paid=paid,
+            fallback_monthly_target=fallback_target,
+            contract_rows=contracts.get(mid, []),
+        )
+        credited_hours = round(sum(daily_credit_map.values()), 2)
+
+        grund = k["grund"]
+        if k["typ"] == "krankheit" and grund:
+            grund = f"{grund} | diag:{grund}"
+        payloads.append(
+            {
+                "betrieb_id": int(betrieb_id),
+                "mitarbeiter_id": mid,
+                "typ": k["typ"],
+                "start_datum": k["start"].isoformat(),
+                "ende_datum": k["end"].isoformat(),
+                "bezahlte_zeit": paid,
+                "stunden_gutschrift": credited_hours,
+                "attest_pfad": None,
+                "grund": grund,
+                "created_by": created_by,
+            }
+        )
+        mirror_rows.extend(
+            _build_legacy_mirror_rows(
+                mitarbeiter_id=mid,
+                typ=k["typ"],
+                start=k["start"],
+                end=k["end"],
+                paid=paid,
+                credited_hours=credited_hours,
+                daily_credit_map=daily_credit_map,
+            )
+        )
+        cur = date(k["start"].year, k["start"].month, 1)
+        while cur <= k["end"]:
+            betroffene_monate.add((mid, cur.month, cur.year))
+            cur = date(cur.year + 1, 1, 1) if cur.month == 12 else date(cur.year, cur.month + 1, 1)
+
+    _insert_absences_bulk_compat(supabase, payloads)
+    for k in angenommen:
+        if k["typ"] == "krankheit":
+            _extend_efzg_episode_index(k["mitarbeiter_id"], start=k["start"], end=k["end"], diagnose=k["grund"])
+    for start in range(0, len(mirror_rows), IMPORT_CHUNK_SIZE):
+        supabase.table("zeiterfassung").upsert(
+            mirror_rows[start:start + IMPORT_CHUNK_SIZE],
+            on_conflict="mitarbeiter_id,datum,start_zeit",
+        ).execute()
+    for mid in {m for m, _, _ in betroffene_monate}:
+        invalidiere_monatsfakten(mid)
+    urlaub_jahre: dict[int, set[int]] = {}
+    for k in angenommen:
+        if k["typ"] == "urlaub":
+            urlaub_jahre.setdefault(k["mitarbeiter_id"], set()).update(jahre_im_zeitraum(k["start"], k["end"]))
+    for mid, jahre in urlaub_jahre.items():
+        aktualisiere_urlaubskonto(supabase, mid, jahre)
+
+    monate_aktualisiert = 0
+    if sync_accounts:
+        from utils.work_accounts import sync_work_account_for_month
+
+        for mid, monat, jahr in sorted(betroffene_monate, key=lambda x: (x[0], x[2], x[1])):
+            try:
+                sync_work_account_for_month(
+                    supabase,
+                    betrieb_id=int(betrieb_id),
+                    mitarbeiter_id=mid,
+                    monat=monat,
+                    jahr=jahr,
+                )
+                monate_aktualisiert += 1
+            except Exception:
+                # Konto-Sync ist nachgelagert; Import bleibt gültig.
+                continue
+
+    return {
+        "importiert": len(payloads),
+        "geprueft": len(rows or []),
+        "fehler": fehler,
+        "monate_aktualisiert": monate_aktualisiert,
+    }
@@ -0,0 +1,260 @@
+"""
+abwesenheitskalender.py – Wer fehlt wann? (Betriebsweite Abwesenheitsübersicht)
+
+Lädt alle Abwesenheiten und genehmigten Urlaubsanträge eines Betriebs, die einen
+Zeitraum überschneiden (je Tabelle ein Abruf), und legt daraus einen
+Intervall-Index an:
+
+  - Intervalle je Mitarbeiter zusammengeführt (Urlaubsantrag + gespiegelte
+    Abwesenheit zählen nicht doppelt)
+  - Differenzen-Array + Präfixsummen → Anzahl je Tag in O(1)
+  - Sparse Table über die Tageszahlen → Maximum über beliebige Teilbereiche
+    in O(1) (Kapazitätswarnung beim Genehmigen)
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Mehr gleichzeitig abwesende Mitarbeiter (inkl. neuem Antrag) als hier erlaubt
+# → Warnung bei der Genehmigung. Mo/Di sind Ruhetage und zählen nicht.
+URLAUB_MAX_GLEICHZEITIG = int(os.getenv("URLAUB_MAX_GLEICHZEITIG", "3"))
+
+
+def _safe_date(value) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except Exception:
+        return None
+
+
+def _name(row: Dict[str, Any]) -> str:
+    ma = row.get("mitarbeiter") or {}
+    name = f"{ma.get('vorname') or ''} {ma.get('nachname') or ''}".strip()
+    return name or f"#{row.get('mitarbeiter_id')}"
+
+
+@dataclass
+class AbwesenheitsKalender:
+    """Intervall-Index über [von, bis]; Tage außerhalb werden gekappt."""
+    von: date
+    bis: date
+    intervalle: Dict[int, List[Tuple[date, date, str]]] = field(default_factory=dict)
+    namen: Dict[int, str] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._anzahl: List[int] = []
+        self._sparse: List[List[int]] = []
+        self._neu_aufbauen()
+
+    # ── Aufbau ───────────────────────────────────────────────────────────────
+
+    def _neu_aufbauen(self) -> None:
+        tage = (self.bis - self.von).days + 1
+        diff = [0] * (tage + 1)
+        for mid, rows in self.intervalle.items():
+            rows.sort()
+            merged: List[Tuple[date, date, str]] = []
+            for start, ende, art in rows:
+                if merged and start <= merged[-1][1] + timedelta(days=1):
+                    prev = merged[-1]
+                    merged[-1] = (prev[0], max(prev[1], ende), prev[2] if prev[2] == art else "gemischt")
+                else:
+                    merged.append((start, ende, art))
+            self.intervalle[mid] = merged
+            for start, ende, _ in merged:
+                diff[(start - self.von).days] += 1
+                diff[(ende - self.von).days + 1] -= 1
+
+        anzahl, laufend = [], 0
+        for i in range(tage):
+            laufend += diff[i]
+            anzahl.append(laufend)
+        self._anzahl = anzahl
+
+        # Sparse Table nur über Arbeitstage (Mo/Di = Ruhetage → 0).
+        basis = [0 if (self.von + timedelta(days=i)).weekday() in (0, 1) else n for i, n in enumerate(anzahl)]
+        sparse = [basis]
+        k = 1
+        while (1 << k) <= tage:
+            prev = sparse[-1]
+            half = 1 << (k - 1)
+            sparse.append([max(prev[i], prev[i + half]) for i in range(tage - (1 << k) + 1)])
+            k += 1
+        self._sparse = sparse
+
+    def _hinzu(self, mitarbeiter_id: int, name: str, start: date, ende: date, art: str) -> None:
+        start, ende = max(start, self.von), min(ende, self.bis)
+        if ende < start:
+            return
+        self.intervalle.setdefault(int(mitarbeiter_id), []).append((start, ende, art))
+        self.namen.setdefault(int(mitarbeiter_id), name)
+
+    # ── Abfragen ─────────────────────────────────────────────────────────────
+
+    def anzahl(self, tag: date) -> int:
+        if tag < self.von or tag > self.bis:
+            return 0
+        return self._anzahl[(tag - self.von).days]
+
+    def max_gleichzeitig(self, von: date, bis: date) -> int:
+        """Höchste Zahl gleichzeitig Abwesender an einem Arbeitstag in [von, bis]."""
+        lo = max(0, (von - self.von).days)
+        hi = min(len(self._anzahl) - 1, (bis - self.von).days)
+        if hi < lo:
+            return 0
+        k = (hi - lo + 1).bit_length() - 1
+        row = self._sparse[k]
+        return max(row[lo], row[hi - (1 << k) + 1])
+
+    def abwesend_am(self, tag: date) -> List[Dict[str, Any]]:
+        result = []
+        for mid, rows in self.intervalle.items():
+            for start, ende, art in rows:
+                if start > tag:
+                    break
+                if tag <= ende:
+                    result.append({"mitarbeiter_id": mid, "name": self.namen.get(mid, f"#{mid}"), "art": art})
+                    break
+        return sorted(result, key=lambda r: r["name"])
+
+    def tage(self) -> List[Dict[str, Any]]:
+        """Je Tag Anzahl und Namen (Sweep über die sortierten Intervalle)."""
+        starts: Dict[int, List[Tuple[int, str, str]]] = {}
+        for mid, rows in self.intervalle.items():
+            for start, ende, art in rows:
+                starts.setdefault((start - self.von).days, []).append(
+                    ((ende - self.von).days, self.namen.get(mid, f"#{mid}"), art)
+                )
+        aktiv: List[Tuple[int, str, str]] = []
+        result = []
+        for i, n in enumerate(self._anzahl):
+            aktiv = [a for a in aktiv if a[0] >= i] + starts.get(i, [])
+            tag = self.von + timedelta(days=i)
+            result.append({
+                "datum": tag.isoformat(),
+                "ruhetag": tag.weekday() in (0, 1),
+                "anzahl": n,
+                "abwesend": [{"name": name, "art": art} for _, name, art in sorted(aktiv, key=lambda a: a[1])],
+            })
+        return result
+
+
+def baue_abwesenheitskalender(
+    von: date,
+    bis: date,
+    abwesenheiten: Iterable[Dict[str, Any]],
+    urlaubsantraege: Iterable[Dict[str, Any]],
+    *,
+    ohne_mitarbeiter_id: Optional[int] = None,
+) -> AbwesenheitsKalender:
+    kalender = AbwesenheitsKalender(von=von, bis=bis)
+    for row in abwesenheiten:
+        mid = row.get("mitarbeiter_id")
+        start = _safe_date(row.get("start_datum") or row.get("datum"))
+        ende = _safe_date(row.get("ende_datum")) or start
+        if mid is None or start is None or (ohne_mitarbeiter_id is not None and int(mid) == int(ohne_mitarbeiter_id)):
+            continue
+        art = "krank" if str(row.get("typ") or "").lower() in ("krank", "krankheit") else "urlaub"
+        kalender._hinzu(int(mid), _name(row), start, ende, art)
+    for row in urlaubsantraege:
+        mid = row.get("mitarbeiter_id")
+        start = _safe_date(row.get("datum_von"))
+        ende = _safe_date(row.get("datum_bis")) or start
+        if mid is None or start is None or (ohne_mitarbeiter_id is not None and int(mid) == int(ohne_mitarbeiter_id)):
+            continue
+        kalender._hinzu(int(mid), _name(row), start, ende, "urlaub")
+    kalender._neu_aufbauen()
+    return kalender
+
+
+def _lade_mit_namen(abfrage_mit_join, abfrage_ohne_join) -> List[Dict[str, Any]]:
+    try:
+        return abfrage_mit_join().data or []
+    except Exception:
+        try:
+            return abfrage_ohne_join().data or []
+        except Exception:
+            return []
+
+
+def lade_abwesenheitskalender(
+    supabase,
+    *,
+    betrieb_id: int,
+    von: date,
+    bis: date,
+    ohne_mitarbeiter_id: Optional[int] = None,
+) -> AbwesenheitsKalender:
+    """Ein Abruf je Quelle (abwesenheiten, genehmigte urlaubsantraege) für den ganzen Betrieb."""
+    von_iso, bis_iso = von.isoformat(), bis.isoformat()
+
+    def _abw(cols: str):
+        return lambda: (
+            supabase.table("abwesenheiten").select(cols)
+            .eq("betrieb_id", betrieb_id)
+            .lte("start_datum", bis_iso)
+            .gte("ende_datum", von_iso)
+            .execute()
+        )
+
+    def _antr(cols: str):
+        return lambda: (
+            supabase.table("urlaubsantraege").select(cols)
+            .eq("betrieb_id", betrieb_id)
+            .eq("status", "genehmigt")
+            .lte("datum_von", bis_iso)
+            .gte("datum_bis", von_iso)
+            .execute()
+        )
+
+    abwesenheiten = _lade_mit_namen(
+        _abw("mitarbeiter_id,typ,start_datum,ende_datum, mitarbeiter(vorname, nachname)"),
+        _abw("mitarbeiter_id,typ,start_datum,ende_datum"),
+    )
+    antraege = _lade_mit_namen(
+        _antr("mitarbeiter_id,datum_von,datum_bis, mitarbeiter(vorname, nachname)"),
+        _antr("mitarbeiter_id,datum_von,datum_bis"),
+    )
+    return baue_abwesenheitskalender(
+        von, bis, abwesenheiten, antraege, ohne_mitarbeiter_id=ohne_mitarbeiter_id
+    )
+
+
+def pruefe_urlaubskapazitaet(
+    supabase,
+    *,
+    betrieb_id: int,
+    mitarbeiter_id: int,
+    von: date,
+    bis: date,
+    max_gleichzeitig: int = URLAUB_MAX_GLEICHZEITIG,
+) -> Dict[str, Any]:
+    """
+    Wie viele andere sind im Zeitraum bereits abwesend? Liefert Spitzenwert
+    (inkl. des neuen Antrags), betroffene Tage und ob gewarnt werden sollte.
+    """
+    kalender = lade_abwesenheitskalender(
+        supabase, betrieb_id=betrieb_id, von=von, bis=bis, ohne_mitarbeiter_id=mitarbeiter_id
+    )
+    spitze = kalender.max_gleichzeitig(von, bis) + 1
+    kritische_tage = []
+    if spitze > max_gleichzeitig:
+        tag = von
+        while tag <= bis:
+            if tag.weekday() not in (0, 1) and kalender.anzahl(tag) + 1 > max_gleichzeitig:
+                kritische_tage.append({
+                    "datum": tag.isoformat(),
+                    "abwesend": kalender.anzahl(tag) + 1,
+                    "namen": [r["name"] for r in kalender.abwesend_am(tag)],
+                })
+            tag += timedelta(days=1)
+    return {
+        "max_gleichzeitig_abwesend": spitze,
+        "grenze": max_gleichzeitig,
+        "warnung": spitze > max_gleichzeitig,
+        "kritische_tage": kritische_tage,
+    }
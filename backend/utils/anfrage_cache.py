@@ -0,0 +1,105 @@
+"""
+anfrage_cache.py – Identity-Map je Request (Unit of Work)
+
+Innerhalb eines Requests werden dieselben Stammdaten mehrfach geladen: die
+Zugehörigkeitsprüfung liest den Mitarbeiter, danach berechne_azk_monat bzw.
+lade_monatsfakten erneut; _build_month_snapshot und _load_month_ist_hours laden
+Mitarbeiter und Verträge ein zweites Mal.
+
+``anfrage_cache`` (FastAPI-Dependency, in main.py global eingehängt) legt für
+die Dauer eines Requests eine Identity-Map in einer ContextVar an. Die Lader
+``lade_mitarbeiter_zeile``, ``lade_vertraege`` und ``lade_betrieb_zeile`` lesen
+je Schlüssel höchstens einmal pro Request. Außerhalb eines Requests (Skripte,
+Hintergrundjobs) wird ohne Cache direkt geladen – die Berechnungsmodule
+brauchen keinen zusätzlichen Parameter.
+
+Schreibpfade innerhalb desselben Requests rufen ``vergiss(...)``, damit
+nachfolgende Berechnungen den neuen Stand sehen. Treffer werden als Kopie
+ausgegeben; Aufrufer dürfen die Zeilen verändern.
+"""
+
+from __future__ import annotations
+
+import copy
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from utils.metrics import zaehle
+
+T = TypeVar("T")
+
+_aktiv: ContextVar[Optional[Dict[Tuple[Hashable, ...], Any]]] = ContextVar("anfrage_cache", default=None)
+
+
+async def anfrage_cache() -> AsyncIterator[Dict[Tuple[Hashable, ...], Any]]:
+    """
+    FastAPI-Dependency: Identity-Map für die Dauer eines Requests.
+
+    Asynchron, damit die ContextVar im Request-Kontext gesetzt wird; synchrone
+    Endpunkte im Threadpool erhalten eine Kopie dieses Kontexts und sehen
+    dieselbe Map.
+    """
+    cache: Dict[Tuple[Hashable, ...], Any] = {}
+    token = _aktiv.set(cache)
+    try:
+        yield cache
+    finally:
+        cache.clear()
+        try:
+            _aktiv.reset(token)
+        except ValueError:
+            # Aufräumen in einem anderen Kontext (je nach Starlette-Version).
+            _aktiv.set(None)
+
+
+def im_anfrage_cache(schluessel: Tuple[Hashable, ...], laden: Callable[[], T]) -> T:
+    """``laden()`` höchstens einmal je Schlüssel und Request; ohne Request direkt."""
+    cache = _aktiv.get()
+    if cache is None:
+        return laden()
+    if schluessel in cache:
+        zaehle("anfrage_cache.hit")
+        return copy.deepcopy(cache[schluessel])
+    zaehle("anfrage_cache.load")
+    wert = laden()
+    cache[schluessel] = copy.deepcopy(wert)
+    return wert
+
+
+def vergiss(tabelle: str, schluessel: Optional[Hashable] = None) -> None:
+    """Einträge einer Tabelle (oder nur eines Schlüssels) nach Schreibzugriffen verwerfen."""
+    cache = _aktiv.get()
+    if not cache:
+        return
+    for key in [k for k in cache if k[0] == tabelle and (schluessel is None or k[1] == schluessel)]:
+        del cache[key]
+
+
+def lade_mitarbeiter_zeile(supabase, mitarbeiter_id: int) -> Dict[str, Any]:
+    """Vollständige mitarbeiter-Zeile ({} wenn unbekannt)."""
+    def _laden() -> Dict[str, Any]:
+        res = supabase.table("mitarbeiter").select("*").eq("id", mitarbeiter_id).limit(1).execute()
+        return (res.data or [{}])[0] or {}
+
+    return im_anfrage_cache(("mitarbeiter", int(mitarbeiter_id)), _laden)
+
+
+def lade_vertraege(supabase, mitarbeiter_id: int) -> List[Dict[str, Any]]:
+    """Alle Verträge eines Mitarbeiters ([] auf Instanzen ohne Tabelle vertraege)."""
+    def _laden() -> List[Dict[str, Any]]:
+        try:
+            res = supabase.table("vertraege").select("*").eq("mitarbeiter_id", mitarbeiter_id).execute()
+            return res.data or []
+        except Exception:
+            return []
+
+    return im_anfrage_cache(("vertraege", int(mitarbeiter_id)), _laden)
+
+
+def lade_betrieb_zeile(supabase, betrieb_id: int) -> Dict[str, Any]:
+    """Vollständige betriebe-Zeile ({} wenn unbekannt)."""
+    def _laden() -> Dict[str, Any]:
+        res = supabase.table("betriebe").select("*").eq("id", betrieb_id).limit(1).execute()
+        return (res.data or [{}])[0] or {}
+
+    return im_anfrage_cache(("betriebe", int(betrieb_id)), _laden)
@@ -0,0 +1,327 @@
+"""
+anmeldung.py – Login-Pfad: bcrypt-Pool, Betriebs-Cache, last_login, Fehlversuche
+
+Zum Schichtbeginn treffen Dutzende Logins in derselben Minute ein. Bisher lief
+jeder Login mit drei Abfragen, bcrypt und dem last_login-Update synchron im
+Threadpool – bcrypt (bewusst teuer) verdrängte dabei alle anderen Requests.
+
+  - bcrypt läuft in einem eigenen, kleinen Worker-Pool (``BCRYPT_WORKER``);
+    höchstens ``BCRYPT_MAX_WARTEND`` Prüfungen warten gleichzeitig, darüber
+    hinaus 503 statt unbegrenzter Warteschlange
+  - betriebsnummer → Betrieb (id, name) wird je Prozess gecacht
+    (``BETRIEB_LOGIN_TTL_SECONDS``; nur aktive Betriebe, keine Negativ-Treffer)
+  - last_login wird gesammelt und verzögert im Hintergrund geschrieben; mehrere
+    Logins desselben Users ergeben ein Update
+  - Fehlversuche je IP und je Konto (Betriebsnummer + Benutzername) von dieser
+    IP im gleitenden Fenster; gesperrte Schlüssel werden vor bcrypt mit 429
+    abgewiesen. Das Konto sperrt bewusst nur pro IP: Fremde können ein Konto
+    nicht durch Fehlversuche von anderswo aussperren (Lockout-DoS)
+  - zusätzlich Fehlversuche je Konto über alle IPs: oberhalb von
+    ``LOGIN_MAX_FEHLVERSUCHE_KONTO_GESAMT`` wird nicht gesperrt, sondern
+    gebremst – höchstens eine Passwortprüfung je ``LOGIN_KONTO_BREMSE_SECONDS``
+    für dieses Konto (verteiltes Raten über viele IPs)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from utils.metrics import zaehle
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_WORKER = int(os.getenv("BCRYPT_WORKER", "2"))
+BCRYPT_MAX_WARTEND = int(os.getenv("BCRYPT_MAX_WARTEND", "32"))
+BETRIEB_LOGIN_TTL_SECONDS = float(os.getenv("BETRIEB_LOGIN_TTL_SECONDS", "300"))
+LAST_LOGIN_VERZOEGERUNG_SECONDS = float(os.getenv("LAST_LOGIN_VERZOEGERUNG_SECONDS", "10"))
+LOGIN_FENSTER_SECONDS = float(os.getenv("LOGIN_FENSTER_SECONDS", "900"))
+LOGIN_MAX_FEHLVERSUCHE_IP = int(os.getenv("LOGIN_MAX_FEHLVERSUCHE_IP", "30"))
+LOGIN_MAX_FEHLVERSUCHE_KONTO = int(os.getenv("LOGIN_MAX_FEHLVERSUCHE_KONTO", "5"))
+LOGIN_MAX_FEHLVERSUCHE_KONTO_GESAMT = int(os.getenv("LOGIN_MAX_FEHLVERSUCHE_KONTO_GESAMT", "20"))
+LOGIN_KONTO_BREMSE_SECONDS = float(os.getenv("LOGIN_KONTO_BREMSE_SECONDS", "2"))
+LOGIN_KONTO_MAX_WARTEN_SECONDS = float(os.getenv("LOGIN_KONTO_MAX_WARTEN_SECONDS", "30"))
+_MAX_SCHLUESSEL = 10_000
+
+
+# ── bcrypt-Pool ──────────────────────────────────────────────────────────────
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_plaetze = threading.BoundedSemaphore(BCRYPT_MAX_WARTEND)
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKER, thread_name_prefix="bcrypt")
+        return _pool
+
+
+def _platz_belegen() -> None:
+    if not _plaetze.acquire(blocking=False):
+        zaehle("anmeldung.bcrypt_ueberlast")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Zu viele gleichzeitige Anmeldungen. Bitte in wenigen Sekunden erneut versuchen.",
+            headers={"Retry-After": "5"},
+        )
+
+
+def _checkpw(passwort: str, pw_hash: str) -> bool:
+    import bcrypt
+    try:
+        return bcrypt.checkpw(passwort.encode(), pw_hash.encode())
+    finally:
+        _plaetze.release()
+
+
+def _hashpw(passwort: str) -> str:
+    import bcrypt
+    try:
+        return bcrypt.hashpw(passwort.encode(), bcrypt.gensalt()).decode()
+    finally:
+        _plaetze.release()
+
+
+async def passwort_pruefen_async(passwort: str, pw_hash: str) -> bool:
+    """bcrypt-Prüfung im Pool, ohne Event-Loop oder Request-Threadpool zu blockieren."""
+    if not pw_hash:
+        return False
+    _platz_belegen()
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), _checkpw, passwort, pw_hash)
+
+
+def passwort_pruefen(passwort: str, pw_hash: str) -> bool:
+    """Wie ``passwort_pruefen_async`` für synchrone Endpunkte (wartet auf den Pool)."""
+    if not pw_hash:
+        return False
+    _platz_belegen()
+    return _get_pool().submit(_checkpw, passwort, pw_hash).result()
+
+
+def passwort_hashen(passwort: str) -> str:
+    _platz_belegen()
+    return _get_pool().submit(_hashpw, passwort).result()
+
+
+# ── Betrieb je Betriebsnummer ────────────────────────────────────────────────
+
+_betriebe: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_betriebe_lock = threading.Lock()
+
+
+async def lade_betrieb_fuer_login(db, betriebsnummer: str) -> Optional[Dict[str, Any]]:
+    """Aktiver Betrieb (id, name) zur Betriebsnummer; None wenn unbekannt/inaktiv."""
+    with _betriebe_lock:
+        eintrag = _betriebe.get(betriebsnummer)
+    if eintrag is not None and monotonic() - eintrag[0] < BETRIEB_LOGIN_TTL_SECONDS:
+        zaehle("anmeldung.betrieb_hit")
+        return dict(eintrag[1])
+    zaehle("anmeldung.betrieb_load")
+    res = await (
+        db.table("betriebe")
+        .select("id, name")
+        .eq("betriebsnummer", betriebsnummer)
+        .eq("aktiv", True)
+        .execute()
+    )
+    if not res.data:
+        return None
+    betrieb = {"id": res.data[0]["id"], "name": res.data[0].get("name", "")}
+    with _betriebe_lock:
+        _betriebe[betriebsnummer] = (monotonic(), betrieb)
+    return dict(betrieb)
+
+
+def invalidiere_betrieb_login(betrieb_id: Optional[int] = None) -> None:
+    """Nach Änderungen an Betrieben (Name, Aktiv-Status, Betriebsnummer) aufrufen."""
+    with _betriebe_lock:
+        if betrieb_id is None:
+            _betriebe.clear()
+            return
+        for nummer in [n for n, (_, b) in _betriebe.items() if int(b["id"]) == int(betrieb_id)]:
+            del _betriebe[nummer]
+
+
+# ── last_login (gesammelt, verzögert) ────────────────────────────────────────
+
+_last_login: Dict[int, str] = {}
+_last_login_lock = threading.Lock()
+_last_login_timer: Optional[threading.Timer] = None
+
+
+def merke_last_login(user_id: int) -> None:
+    """Vormerken; geschrieben wird spätestens nach LAST_LOGIN_VERZOEGERUNG_SECONDS."""
+    global _last_login_timer
+    with _last_login_lock:
+        _last_login[int(user_id)] = datetime.now(timezone.utc).isoformat()
+        if _last_login_timer is None:
+            _last_login_timer = threading.Timer(LAST_LOGIN_VERZOEGERUNG_SECONDS, schreibe_last_login)
+            _last_login_timer.daemon = True
+            _last_login_timer.start()
+
+
+def vorgemerkter_last_login(user_id: int) -> Optional[str]:
+    """Noch nicht geschriebener last_login-Wert (für /auth/me)."""
+    with _last_login_lock:
+        return _last_login.get(int(user_id))
+
+
+def schreibe_last_login() -> int:
+    """Vorgemerkte last_login-Werte schreiben (Timer bzw. Shutdown-Hook)."""
+    global _last_login_timer
+    with _last_login_lock:
+        offen = dict(_last_login)
+        _last_login.clear()
+        if _last_login_timer is not None:
+            _last_login_timer.cancel()
+            _last_login_timer = None
+    if not offen:
+        return 0
+    from utils.benutzerprofil import invalidiere_profil
+    from utils.database import get_service_role_client
+
+    supabase = get_service_role_client()
+    for user_id, zeitpunkt in offen.items():
+        try:
+            supabase.table("users").update({"last_login": zeitpunkt}).eq("id", user_id).execute()
+        except Exception as exc:
+            logger.warning("last_login für User %s nicht gespeichert: %s", user_id, exc)
+        invalidiere_profil(user_id)
+    zaehle("anmeldung.last_login_geschrieben", len(offen))
+    return len(offen)
+
+
+# ── Fehlversuche ─────────────────────────────────────────────────────────────
+
+class _Fehlversuche:
+    """Fehlversuche je Schlüssel im gleitenden Fenster (nur im Speicher)."""
+
+    def __init__(self, grenze: int, fenster: float):
+        self.grenze = grenze
+        self.fenster = fenster
+        self._eintraege: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _bereinigen(self, jetzt: float) -> None:
+        for schluessel in [s for s, z in self._eintraege.items() if not z or jetzt - z[-1] >= self.fenster]:
+            del self._eintraege[schluessel]
+
+    def sperre_sekunden(self, schluessel: str) -> int:
+        """0, wenn Versuche erlaubt sind, sonst Sekunden bis zur Freigabe."""
+        jetzt = monotonic()
+        with self._lock:
+            zeiten = self._eintraege.get(schluessel)
+            if not zeiten:
+                return 0
+            while zeiten and jetzt - zeiten[0] >= self.fenster:
+                zeiten.popleft()
+            if len(zeiten) < self.grenze:
+                return 0
+            return max(1, int(self.fenster - (jetzt - zeiten[0])) + 1)
+
+    def melden(self, schluessel: str) -> None:
+        jetzt = monotonic()
+        with self._lock:
+            if len(self._eintraege) >= _MAX_SCHLUESSEL:
+                self._bereinigen(jetzt)
+            zeiten = self._eintraege.setdefault(schluessel, deque(maxlen=self.grenze))
+            zeiten.append(jetzt)
+
+    def zuruecksetzen(self, schluessel: str) -> None:
+        with self._lock:
+            self._eintraege.pop(schluessel, None)
+
+
+_fehlversuche_ip = _Fehlversuche(LOGIN_MAX_FEHLVERSUCHE_IP, LOGIN_FENSTER_SECONDS)
+_fehlversuche_konto = _Fehlversuche(LOGIN_MAX_FEHLVERSUCHE_KONTO, LOGIN_FENSTER_SECONDS)
+_fehlversuche_konto_gesamt = _Fehlversuche(LOGIN_MAX_FEHLVERSUCHE_KONTO_GESAMT, LOGIN_FENSTER_SECONDS)
+
+# Konto → frühester Zeitpunkt der nächsten Passwortprüfung (nur gebremste Konten)
+_bremse_naechste: Dict[str, float] = {}
+_bremse_lock = threading.Lock()
+
+
+def _konto(betriebsnummer: str, username: str) -> str:
+    return f"{betriebsnummer.strip()}|{username.strip().lower()}"
+
+
+def _konto_ip(ip: str, betriebsnummer: str, username: str) -> str:
+    return f"{_konto(betriebsnummer, username)}|{ip}"
+
+
+def client_ip(request) -> str:
+    """Client-IP; hinter dem Proxy der zuletzt angehängte X-Forwarded-For-Eintrag."""
+    weitergeleitet = request.headers.get("x-forwarded-for", "")
+    if weitergeleitet:
+        return weitergeleitet.split(",")[-1].strip()
+    return request.client.host if request.client else "unbekannt"
+
+
+def pruefe_login_sperre(ip: str, betriebsnummer: str, username: str) -> None:
+    """429, solange die IP oder das Konto von dieser IP zu viele Fehlversuche im Fenster hat."""
+    sekunden = max(
+        _fehlversuche_ip.sperre_sekunden(ip),
+        _fehlversuche_konto.sperre_sekunden(_konto_ip(ip, betriebsnummer, username)),
+    )
+    if sekunden:
+        zaehle("anmeldung.gesperrt")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Zu viele fehlgeschlagene Anmeldeversuche. Bitte später erneut versuchen.",
+            headers={"Retry-After": str(sekunden)},
+        )
+
+
+async def bremse_konto(betriebsnummer: str, username: str) -> None:
+    """
+    Verteiltes Raten auf ein Konto begrenzen, ohne es zu sperren: Hat das Konto
+    über alle IPs zu viele Fehlversuche im Fenster, wartet jede weitere Prüfung
+    auf ihren Slot (eine je LOGIN_KONTO_BREMSE_SECONDS). Nur wenn die Warteschlange
+    länger als LOGIN_KONTO_MAX_WARTEN_SECONDS wäre, kurz 429 mit Retry-After.
+    """
+    konto = _konto(betriebsnummer, username)
+    if not _fehlversuche_konto_gesamt.sperre_sekunden(konto):
+        return
+    jetzt = monotonic()
+    with _bremse_lock:
+        if len(_bremse_naechste) >= _MAX_SCHLUESSEL:
+            for alt in [k for k, t in _bremse_naechste.items() if t <= jetzt]:
+                del _bremse_naechste[alt]
+        slot = max(jetzt, _bremse_naechste.get(konto, 0.0))
+        warten = slot - jetzt
+        if warten > LOGIN_KONTO_MAX_WARTEN_SECONDS:
+            zaehle("anmeldung.gesperrt")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Zu viele fehlgeschlagene Anmeldeversuche. Bitte später erneut versuchen.",
+                headers={"Retry-After": str(int(warten - LOGIN_KONTO_MAX_WARTEN_SECONDS) + 1)},
+            )
+        _bremse_naechste[konto] = slot + LOGIN_KONTO_BREMSE_SECONDS
+    zaehle("anmeldung.gebremst")
+    if warten > 0:
+        await asyncio.sleep(warten)
+
+
+def melde_fehlversuch(ip: str, betriebsnummer: str, username: str) -> None:
+    zaehle("anmeldung.fehlversuch")
+    _fehlversuche_ip.melden(ip)
+    _fehlversuche_konto.melden(_konto_ip(ip, betriebsnummer, username))
+    _fehlversuche_konto_gesamt.melden(_konto(betriebsnummer, username))
+
+
+def melde_erfolg(ip: str, betriebsnummer: str, username: str) -> None:
+    # Der Zähler über alle IPs läuft weiter aus: ein Erfolg des Inhabers soll
+    # verteiltes Raten nicht wieder freischalten.
+    _fehlversuche_konto.zuruecksetzen(_konto_ip(ip, betriebsnummer, username))
@@ -0,0 +1,78 @@
+"""
+aufwaermen.py – Warm-up nach dem Start (Kaltstart bei Scale-to-zero)
+
+Schwere Abhängigkeiten (Supabase-SDK, holidays, reportlab, fpdf, pandas)
+werden erst bei Bedarf importiert, damit ``import main`` im Importbudget
+bleibt (scripts/importbudget_pruefen.py). Damit nicht der erste Stempel- oder
+Login-Request Importe und Verbindungsaufbau bezahlt, lädt ``aufwaermen()``
+direkt nach dem Start in einem Hintergrund-Thread, was die heißen Pfade
+brauchen:
+
+  - Module der Stempel-/Zeitpfade (``HEISSE_MODULE``)
+  - sync. und async. Service-Role-Client (Verbindungspool)
+  - Feiertagskalender des laufenden Jahres
+
+Der Server nimmt währenddessen bereits Requests an; Fehler (z. B. fehlende
+Umgebungsvariablen) werden nur protokolliert. Abschaltbar mit WARMUP_AKTIV=0.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import threading
+from datetime import date
+from time import perf_counter
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+WARMUP_AKTIV = os.getenv("WARMUP_AKTIV", "1") == "1"
+
+HEISSE_MODULE = (
+    "utils.database",
+    "utils.database_async",
+    "utils.zeit_events",
+    "utils.eintragsberechnung",
+    "utils.work_accounts",
+    "utils.betrieb_mitarbeiter",
+    "utils.anmeldung",
+    "bcrypt",
+)
+
+
+def _schritt(name: str, dauern: Dict[str, float], funktion) -> None:
+    start = perf_counter()
+    try:
+        funktion()
+    except Exception as exc:
+        logger.warning("Warm-up %s fehlgeschlagen: %s", name, exc)
+    dauern[name] = round((perf_counter() - start) * 1000, 1)
+
+
+def aufwaermen() -> Dict[str, float]:
+    """Lädt Module, Clients und Feiertage vor; liefert die Dauer je Schritt (ms)."""
+    dauern: Dict[str, float] = {}
+    for modul in HEISSE_MODULE:
+        _schritt(modul, dauern, lambda m=modul: importlib.import_module(m))
+
+    def _clients() -> None:
+        from utils.database import get_service_role_client
+        from utils.database_async import get_async_service_role_client
+        get_service_role_client()
+        get_async_service_role_client()
+
+    def _feiertage() -> None:
+        from utils.lohnberechnung import get_feiertage_sachsen
+        get_feiertage_sachsen(date.today().year)
+
+    _schritt("clients", dauern, _clients)
+    _schritt("feiertage", dauern, _feiertage)
+    logger.info("Warm-up abgeschlossen: %s", dauern)
+    return dauern
+
+
+def starte_aufwaermen() -> None:
+    """Warm-up im Hintergrund (blockiert den Start nicht)."""
+    threading.Thread(target=aufwaermen, name="complio-warmup", daemon=True).start()
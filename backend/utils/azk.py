@@ -15,6 +15,7 @@ from datetime import date, datetime, timedelta
 from typing import Dict, Any, List, Optional
 
 from utils.database import get_supabase_client
+from utils.monatsfakten import ART_KRANK, ART_URLAUB, lade_monatsfakten
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -94,31 +95,14 @@ def berechne_azk_monat(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
     }
 
     try:
-        supabase = get_supabase_client()
-
-        # Mitarbeiterdaten laden
-        ma_resp = supabase.table('mitarbeiter').select(
-            'id, vorname, nachname, monatliche_soll_stunden, wochensoll_stunden, azk_startsaldo'
-        ).eq('id', mitarbeiter_id).single().execute()
-
-        if not ma_resp.data:
+        fakten = lade_monatsfakten(mitarbeiter_id, monat, jahr)
+        ma = fakten.mitarbeiter
+        if not ma:
             ergebnis['fehler'] = f"Mitarbeiter {mitarbeiter_id} nicht gefunden."
             return ergebnis
 
-        ma = ma_resp.data
         soll_monat = float(ma.get('monatliche_soll_stunden') or 0)
         ergebnis['soll_stunden'] = soll_monat
-
-        # Zeiterfassung laden
-        von = date(jahr, monat, 1).isoformat()
-        bis = date(jahr, monat + 1, 1).isoformat() if monat < 12 else date(jahr + 1, 1, 1).isoformat()
-
-        ze_resp = supabase.table('zeiterfassung').select(
-            'datum, start_zeit, ende_zeit, pause_minuten, arbeitsstunden, '
-            'ist_krank, abwesenheitstyp, ist_sonntag, ist_feiertag, quelle'
-        ).eq('mitarbeiter_id', mitarbeiter_id).gte('datum', von).lt('datum', bis).order('datum').execute()
-
-        eintraege = ze_resp.data or []
         soll_tag = soll_stunden_pro_tag(soll_monat, monat, jahr)
 
         ist_h = 0.0
@@ -128,19 +112,14 @@ def berechne_azk_monat(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
         tage = []
         kum_saldo = 0.0  # Kumulierter Tagessaldo innerhalb des Monats
 
-        for e in eintraege:
-            if e.get('quelle') == 'historischer_saldo':
-                continue
-
-            d = date.fromisoformat(e['datum'])
+        for p in fakten.posten:
+            d = p.datum
             wt_name = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So'][d.weekday()]
-            ruhetag = ist_ruhetag(d)
-            abwtyp = (e.get('abwesenheitstyp') or '').lower()
-            krank_flag = e.get('ist_krank') or False
-            h = float(e.get('arbeitsstunden') or 0)
+            ruhetag = p.ruhetag
+            h = p.stunden
 
             # Typ bestimmen
-            if abwtyp in ('urlaub', 'vacation', 'u'):
+            if p.art == ART_URLAUB:
                 typ = 'Urlaub'
                 if not ruhetag:
                     urlaub_h += h
@@ -148,7 +127,7 @@ def berechne_azk_monat(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
                     ist_eff = h  # Urlaub neutralisiert Soll
                 else:
                     ist_eff = 0.0
-            elif krank_flag or abwtyp in ('krank', 'k', 'krank_lfz'):
+            elif p.art == ART_KRANK:
                 typ = 'Krank (LFZ)'
                 if not ruhetag:
                     krank_h += h
@@ -169,13 +148,13 @@ def berechne_azk_monat(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
 
             kum_saldo = round(kum_saldo + diff, 4)
             tage.append({
-                'datum': e['datum'],
+                'datum': d.isoformat(),
                 'datum_fmt': d.strftime('%d.%m.%Y'),
                 'wochentag': wt_name,
                 'typ': typ,
-                'start': (e.get('start_zeit') or '')[:5] or '--:--',
-                'ende': (e.get('ende_zeit') or '')[:5] or '--:--',
-                'pause_min': int(e.get('pause_minuten') or 0),
+                'start': p.start_zeit[:5] or '--:--',
+                'ende': p.ende_zeit[:5] or '--:--',
+                'pause_min': p.pause_minuten,
                 'ist_h': round(ist_eff, 2),
                 'soll_h': round(soll_eff, 2),
                 'diff_h': diff,
@@ -185,7 +164,7 @@ def berechne_azk_monat(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
                 'kum_saldo_h': round(kum_saldo, 2),
                 'kum_saldo_hhmm': h_zu_hhmm(kum_saldo),
                 'ruhetag': ruhetag,
-                'ist_sonntag': e.get('ist_sonntag', False),
+                'ist_sonntag': p.ist_sonntag,
             })
 
         # Gesamtwerte
@@ -290,105 +269,25 @@ def berechne_azk_kumuliert(mitarbeiter_id: int, bis_monat: int, bis_jahr: int) -
 # ─────────────────────────────────────────────────────────────────────────────
 
 def berechne_urlaubskonto(mitarbeiter_id: int, jahr: int) -> Dict[str, Any]:
-    """Berechnet den Urlaubsstand für ein Jahr aus allen verfügbaren Quellen."""
-    def _result(gesamt: int, genommen: int, resturlaub: int, jahresanspruch: int, fehler: str = "") -> Dict[str, Any]:
-        offen = max(0, gesamt - genommen)
-        base = {
-            'gesamt_anspruch': gesamt,
-            'genommen': genommen,
-            'offen': offen,
-            'resturlaub_vorjahr': resturlaub,
-            'jahresanspruch': jahresanspruch,
-            # Frontend-kompatible Feldnamen
-            'anspruch_tage': gesamt,
-            'genommene_tage': genommen,
-            'rest_tage': offen,
-        }
-        if fehler:
-            base['fehler'] = fehler
-        return base
+    """Urlaubsstand für ein Jahr aus dem Urlaubskonto (siehe utils.urlaubskonto)."""
+    from utils.urlaubskonto import lade_urlaubskonto
 
     try:
-        supabase = get_supabase_client()
-
-        ma_resp = supabase.table('mitarbeiter').select(
-            'jahres_urlaubstage, resturlaub_vorjahr, urlaubsanspruch_jahrestage'
-        ).eq('id', mitarbeiter_id).single().execute()
-
-        if not ma_resp.data:
-            return _result(0, 0, 0, 0)
-
-        ma = ma_resp.data
-        jahresanspruch = int(ma.get('urlaubsanspruch_jahrestage') or ma.get('jahres_urlaubstage') or 0)
-        resturlaub = int(ma.get('resturlaub_vorjahr') or 0)
-        gesamt = jahresanspruch + resturlaub
-
-        von = date(jahr, 1, 1).isoformat()
-        bis = date(jahr + 1, 1, 1).isoformat()
-
-        # 1) abwesenheiten-Tabelle (primäre Quelle im FastAPI-System)
-        genommen_abw = 0
-        try:
-            abw_resp = supabase.table('abwesenheiten').select(
-                'typ, start_datum, ende_datum'
-            ).eq('mitarbeiter_id', mitarbeiter_id).eq('typ', 'urlaub').execute()
-            for row in (abw_resp.data or []):
-                try:
-                    start = date.fromisoformat(str(row['start_datum']))
-                    end = date.fromisoformat(str(row['ende_datum']))
-                    cur = max(start, date(jahr, 1, 1))
-                    end = min(end, date(jahr, 12, 31))
-                    while cur <= end:
-                        if not ist_ruhetag(cur):
-                            genommen_abw += 1
-                        cur += timedelta(days=1)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
-        # 2) Zeiterfassung (Fallback / zusätzliche Quelle)
-        genommen_ze = 0
-        try:
-            ze_resp = supabase.table('zeiterfassung').select('datum, abwesenheitstyp').eq(
-                'mitarbeiter_id', mitarbeiter_id
-            ).gte('datum', von).lt('datum', bis).execute()
-            for e in (ze_resp.data or []):
-                if (e.get('abwesenheitstyp') or '').lower() in ('urlaub', 'vacation', 'u'):
-                    try:
-                        if not ist_ruhetag(date.fromisoformat(e['datum'])):
-                            genommen_ze += 1
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
-        # 3) Urlaubsanträge (genehmigt) als weiterer Fallback
-        genommen_ua = 0
-        try:
-            ua_resp = supabase.table('urlaubsantraege').select('anzahl_tage').eq(
-                'mitarbeiter_id', mitarbeiter_id
-            ).eq('status', 'genehmigt').gte('datum_von', von).lt('datum_von', bis).execute()
-            if ua_resp.data:
-                genommen_ua = sum(int(u.get('anzahl_tage') or 0) for u in ua_resp.data)
-        except Exception:
-            # Fallback: von_datum statt datum_von
-            try:
-                ua_resp2 = supabase.table('urlaubsantraege').select('anzahl_tage').eq(
-                    'mitarbeiter_id', mitarbeiter_id
-                ).eq('status', 'genehmigt').gte('von_datum', von).lt('von_datum', bis).execute()
-                if ua_resp2.data:
-                    genommen_ua = sum(int(u.get('anzahl_tage') or 0) for u in ua_resp2.data)
-            except Exception:
-                pass
-
-        # Beste verfügbare Zahl: abwesenheiten hat Vorrang, dann ze, dann ua
-        genommen = genommen_abw or genommen_ze or genommen_ua
-
-        return _result(gesamt, genommen, resturlaub, jahresanspruch)
-
+        return lade_urlaubskonto(get_supabase_client(), mitarbeiter_id, jahr)
     except Exception as ex:
-        return _result(0, 0, 0, 0, fehler=str(ex))
+        return {
+            'gesamt_anspruch': 0,
+            'genommen': 0,
+            'geplant': 0,
+            'offen': 0,
+            'resturlaub_vorjahr': 0,
+            'jahresanspruch': 0,
+            'anspruch_tage': 0,
+            'genommene_tage': 0,
+            'geplante_tage': 0,
+            'rest_tage': 0,
+            'fehler': str(ex),
+        }
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,74 @@
+"""
+benutzerprofil.py – Kurzlebiger Profil-Cache für /auth/me
+
+Das Frontend ruft /auth/me bei jedem Seitenwechsel. Rolle, betrieb_id und
+mitarbeiter_id stehen bereits im JWT und sind dort maßgeblich (danach
+entscheiden die Dependencies); aus ``users`` werden nur Felder gebraucht, die
+das Token nicht trägt (username, last_login). Diese werden je User für
+``PROFIL_CACHE_TTL_SECONDS`` gehalten.
+
+Invalidiert wird bei Passwortänderung, ``user_aktualisieren`` und nach dem
+Schreiben von last_login (utils.anmeldung); zwischen Workern begrenzt die
+kurze TTL jede Abweichung.
+"""
+
+from __future__ import annotations
+
+import os
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional, Tuple
+
+from utils.metrics import zaehle
+
+PROFIL_CACHE_TTL_SECONDS = float(os.getenv("PROFIL_CACHE_TTL_SECONDS", "60"))
+
+# user_id → (geladen, Zeile)
+_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_lock = Lock()
+
+
+async def lade_profil_async(user_id: int) -> Optional[Dict[str, Any]]:
+    """users-Zeile (id, username, role, betrieb_id, last_login); None wenn unbekannt."""
+    user_id = int(user_id)
+    with _lock:
+        eintrag = _cache.get(user_id)
+    if eintrag is not None and monotonic() - eintrag[0] < PROFIL_CACHE_TTL_SECONDS:
+        zaehle("benutzerprofil.hit")
+        return dict(eintrag[1])
+
+    from utils.database_async import get_async_service_role_client
+
+    zaehle("benutzerprofil.load")
+    res = await (
+        get_async_service_role_client().table("users")
+        .select("id, username, role, betrieb_id, last_login")
+        .eq("id", user_id)
+        .limit(1)
+        .execute()
+    )
+    if not res.data:
+        return None
+    with _lock:
+        _cache[user_id] = (monotonic(), res.data[0])
+    return dict(res.data[0])
+
+
+def profil_aus_token(zeile: Dict[str, Any], token: Dict[str, Any]) -> Dict[str, Any]:
+    """Gespeicherte Felder, überlagert von den im Token maßgeblichen Angaben."""
+    profil = dict(zeile)
+    if token.get("role"):
+        profil["role"] = token["role"]
+    if token.get("betrieb_id"):
+        profil["betrieb_id"] = int(token["betrieb_id"])
+    profil["mitarbeiter_id"] = token.get("mitarbeiter_id")
+    profil["betrieb_name"] = token.get("betrieb_name", "")
+    return profil
+
+
+def invalidiere_profil(user_id: Optional[int] = None) -> None:
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(int(user_id), None)
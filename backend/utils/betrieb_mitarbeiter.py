@@ -0,0 +1,133 @@
+"""
+betrieb_mitarbeiter.py – Mitarbeiter-IDs je Betrieb (Zugehörigkeitsprüfung ohne Roundtrip)
+
+Fast jeder mandantenbezogene Endpunkt prüft zuerst, ob die angefragte
+mitarbeiter_id zum Betrieb aus dem JWT gehört – bisher je Request eine eigene
+Abfrage. Hier wird je Betrieb die Menge seiner Mitarbeiter-IDs (mit Aktiv-Flag)
+im Prozess gehalten:
+
+  - Treffer im Cache → gehört zum Betrieb, keine Abfrage
+  - ID fehlt → einmal neu laden (Mitarbeiter kann in einem anderen Worker
+    angelegt worden sein), dann erst ablehnen; höchstens ein Nachladen je
+    Betrieb pro ``_NACHLADEN_SEKUNDEN`` (fremde IDs erzeugen keine Abfrageflut)
+  - Anlegen/Deaktivieren/Aktualisieren im selben Prozess rufen
+    ``invalidiere_betrieb_mitarbeiter``
+
+Die Mandantentrennung bleibt erhalten: eine ID gilt nur als zugehörig, wenn
+sie in der aus ``mitarbeiter.betrieb_id`` geladenen Menge steht. Mitarbeiter
+wechseln den Betrieb nicht; die TTL begrenzt trotzdem jede Abweichung.
+"""
+
+from __future__ import annotations
+
+import os
+from threading import Lock
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from utils.metrics import zaehle
+
+BETRIEB_MITARBEITER_TTL_SECONDS = float(os.getenv("BETRIEB_MITARBEITER_TTL_SECONDS", "300"))
+_NACHLADEN_SEKUNDEN = 5.0
+
+# betrieb_id → (geladen, {mitarbeiter_id: aktiv})
+_cache: Dict[int, Tuple[float, Dict[int, bool]]] = {}
+_lock = Lock()
+
+
+def _aus_zeilen(rows) -> Dict[int, bool]:
+    return {int(r["id"]): r.get("aktiv") is not False for r in (rows or [])}
+
+
+def _lade(betrieb_id: int) -> Dict[int, bool]:
+    from utils.database import get_service_role_client
+
+    res = (
+        get_service_role_client().table("mitarbeiter")
+        .select("id, aktiv")
+        .eq("betrieb_id", betrieb_id)
+        .execute()
+    )
+    return _aus_zeilen(res.data)
+
+
+async def _lade_async(betrieb_id: int) -> Dict[int, bool]:
+    from utils.database_async import get_async_service_role_client
+
+    res = await (
+        get_async_service_role_client().table("mitarbeiter")
+        .select("id, aktiv")
+        .eq("betrieb_id", betrieb_id)
+        .execute()
+    )
+    return _aus_zeilen(res.data)
+
+
+def _eintrag(betrieb_id: int) -> Optional[Tuple[float, Dict[int, bool]]]:
+    with _lock:
+        return _cache.get(betrieb_id)
+
+
+def _speichern(betrieb_id: int, ids: Dict[int, bool]) -> None:
+    with _lock:
+        _cache[betrieb_id] = (monotonic(), ids)
+
+
+def _entscheidung(betrieb_id: int, mitarbeiter_id: int) -> Optional[bool]:
+    """True/False aus dem Cache, None wenn neu geladen werden muss."""
+    eintrag = _eintrag(betrieb_id)
+    if eintrag is None:
+        return None
+    alter = monotonic() - eintrag[0]
+    if alter >= BETRIEB_MITARBEITER_TTL_SECONDS:
+        return None
+    if mitarbeiter_id in eintrag[1]:
+        zaehle("betrieb_mitarbeiter.hit")
+        return True
+    # Unbekannte ID: nur nachladen, wenn der Stand nicht ganz frisch ist.
+    return False if alter < _NACHLADEN_SEKUNDEN else None
+
+
+def betrieb_mitarbeiter_ids(betrieb_id: int, *, nur_aktive: bool = False) -> set[int]:
+    """Alle (bzw. aktiven) Mitarbeiter-IDs eines Betriebs (aus dem Cache)."""
+    betrieb_id = int(betrieb_id)
+    eintrag = _eintrag(betrieb_id)
+    if eintrag is None or (monotonic() - eintrag[0]) >= BETRIEB_MITARBEITER_TTL_SECONDS:
+        zaehle("betrieb_mitarbeiter.load")
+        ids = _lade(betrieb_id)
+        _speichern(betrieb_id, ids)
+    else:
+        ids = eintrag[1]
+    return {mid for mid, aktiv in ids.items() if aktiv or not nur_aktive}
+
+
+def gehoert_zu_betrieb(betrieb_id: int, mitarbeiter_id: int) -> bool:
+    betrieb_id, mitarbeiter_id = int(betrieb_id), int(mitarbeiter_id)
+    entscheidung = _entscheidung(betrieb_id, mitarbeiter_id)
+    if entscheidung is not None:
+        return entscheidung
+    zaehle("betrieb_mitarbeiter.load")
+    ids = _lade(betrieb_id)
+    _speichern(betrieb_id, ids)
+    return mitarbeiter_id in ids
+
+
+async def gehoert_zu_betrieb_async(betrieb_id: int, mitarbeiter_id: int) -> bool:
+    """Wie ``gehoert_zu_betrieb``, lädt aber über den asynchronen Client."""
+    betrieb_id, mitarbeiter_id = int(betrieb_id), int(mitarbeiter_id)
+    entscheidung = _entscheidung(betrieb_id, mitarbeiter_id)
+    if entscheidung is not None:
+        return entscheidung
+    zaehle("betrieb_mitarbeiter.load")
+    ids = await _lade_async(betrieb_id)
+    _speichern(betrieb_id, ids)
+    return mitarbeiter_id in ids
+
+
+def invalidiere_betrieb_mitarbeiter(betrieb_id: Optional[int] = None) -> None:
+    """Nach Anlegen, Deaktivieren oder Ändern von Mitarbeitern aufrufen."""
+    with _lock:
+        if betrieb_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(int(betrieb_id), None)
@@ -3,10 +3,6 @@ from __future__ import annotations
 from datetime import date, datetime, time, timedelta
 from typing import Dict, Tuple
 
-try:
-    import holidays
-except Exception:  # pragma: no cover
-    holidays = None
 
 
 MONATE_DE = [
@@ -149,7 +145,10 @@ def format_stunden(stunden: float) -> str:
 
 
 def get_german_holidays(jahr: int, bundesland: str = "SN") -> Dict[date, str]:
-    if holidays is None:
+    # Lazy-Import: holidays lädt beim Import sämtliche Länderkalender (Kaltstart).
+    try:
+        import holidays
+    except Exception:  # pragma: no cover
         return {}
     try:
         return dict(holidays.Germany(years=jahr, subdiv=bundesland))
@@ -5,15 +5,17 @@ import logging
 import os
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
-from urllib.parse import quote
 
 import bcrypt
-import requests
 from supabase import Client, create_client
 
+from utils.db_instrumentierung import instrumentiere
+
 logger = logging.getLogger(__name__)
 
 # ── Modul-Level Singletons (thread-safe für FastAPI/uvicorn) ─────────────────
+# Beide Clients sind instrumentiert (utils.db_instrumentierung): gleiche
+# Query-API, execute() wird je Route/Tabelle/Operation gemessen.
 _anon_client: Optional[Client] = None
 _service_client: Optional[Client] = None
 
@@ -31,7 +33,7 @@ def get_supabase_client() -> Client:
     if _anon_client is None:
         url = _require_env("SUPABASE_URL")
         key = _require_env("SUPABASE_KEY")
-        _anon_client = create_client(url, key)
+        _anon_client = instrumentiere(create_client(url, key))
     return _anon_client
 
 
@@ -47,7 +49,7 @@ def get_service_role_client() -> Client:
         )
         if not service_key:
             raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY / SUPABASE_KEY fehlt")
-        _service_client = create_client(url, service_key)
+        _service_client = instrumentiere(create_client(url, service_key))
     return _service_client
 
 
@@ -137,38 +139,10 @@ def upload_file_to_storage_result(
     file_data: bytes,
     fallback_buckets: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
-    """Datei-Upload über Supabase Storage REST API mit Bucket-Fallback."""
+    """Datei-Upload über Supabase Storage (gepoolter Client, utils.storage) mit Bucket-Fallback."""
     try:
-        url = _require_env("SUPABASE_URL")
-        service_key = (
-            os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-            or os.getenv("SUPABASE_SERVICE_KEY")
-            or os.getenv("SUPABASE_KEY")
-        )
-        if not service_key:
-            return {"ok": False, "bucket": None, "status_code": None, "error": "Service-Key fehlt"}
-
-        headers = {
-            "apikey": service_key,
-            "Authorization": f"Bearer {service_key}",
-            "x-upsert": "true",
-            "Content-Type": "application/octet-stream",
-        }
-        buckets = [bucket_name] + [b for b in (fallback_buckets or []) if b and b != bucket_name]
-
-        last_status = None
-        last_error = None
-        for bucket in buckets:
-            encoded_path = quote(file_path, safe="/")
-            upload_url = f"{url}/storage/v1/object/{bucket}/{encoded_path}"
-            response = requests.post(upload_url, headers=headers, data=file_data, timeout=30)
-            if response.status_code in (200, 201):
-                return {"ok": True, "bucket": bucket, "status_code": response.status_code, "error": None}
-            last_status = response.status_code
-            body = (response.text or "").strip()
-            last_error = body[:500] if body else "Unbekannter Storage-Fehler"
-
-        return {"ok": False, "bucket": None, "status_code": last_status, "error": last_error}
+        from utils.storage import get_storage_client
+        return get_storage_client().hochladen(bucket_name, file_path, file_data, fallback_buckets)
     except Exception as exc:
         return {"ok": False, "bucket": None, "status_code": None, "error": str(exc)}
 
@@ -249,26 +223,16 @@ def check_and_save_monats_abschluss(mitarbeiter_id: Any, monat: int, jahr: int)
 def get_signed_url(bucket_name: str, file_path: str, expires_in: int = 3600) -> Optional[str]:
     """Erstellt eine signierte URL für eine Datei im Supabase Storage."""
     try:
-        url = _require_env("SUPABASE_URL")
-        service_key = (
-            os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-            or os.getenv("SUPABASE_SERVICE_KEY")
-            or os.getenv("SUPABASE_KEY")
-        )
-        if not service_key:
-            return None
-        headers = {
-            "apikey": service_key,
-            "Authorization": f"Bearer {service_key}",
-            "Content-Type": "application/json",
-        }
-        sign_url = f"{url}/storage/v1/object/sign/{bucket_name}/{file_path}"
-        response = requests.post(sign_url, headers=headers, json={"expiresIn": expires_in}, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            signed_path = data.get("signedURL") or data.get("signedUrl") or ""
-            if signed_path:
-                return signed_path if signed_path.startswith("http") else f"{url}{signed_path}"
-        return None
+        from utils.storage import get_storage_client
+        return get_storage_client().signierte_url(bucket_name, file_path, expires_in)
     except Exception:
         return None
+
+
+def get_signed_urls(bucket_name: str, file_paths: List[str], expires_in: int = 3600) -> Dict[str, Optional[str]]:
+    """Signierte URLs für mehrere Dateien in einem Storage-Aufruf (Pfad → URL oder None)."""
+    try:
+        from utils.storage import get_storage_client
+        return get_storage_client().signierte_urls(bucket_name, file_paths, expires_in)
+    except Exception:
+        return {p: None for p in file_paths}
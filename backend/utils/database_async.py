@@ -0,0 +1,95 @@
+"""
+database_async.py – Asynchroner Datenbankzugriff für hochfrequente Endpunkte
+
+Die Router sind synchrone ``def``-Funktionen; jeder blockierende PostgREST-
+Roundtrip belegt einen Thread aus Starlettes Threadpool. Zum Schichtwechsel
+(Kiosk, Stempeln, Statusabfragen) ist der Pool erschöpft und die Latenz steigt.
+
+Dieses Modul stellt einen asynchronen PostgREST-Client (Service-Role) bereit:
+
+  - ein gemeinsamer httpx.AsyncClient je Prozess mit begrenztem, per Umgebung
+    einstellbarem Verbindungspool (Keep-Alive statt Verbindungsaufbau je Abfrage)
+  - ``parallel(...)`` führt unabhängige Abfragen eines Requests gleichzeitig aus
+  - ``schliesse_async_client()`` beim Herunterfahren (main.py)
+  - ``execute()`` wird wie beim synchronen Client gemessen (db_instrumentierung)
+
+Die Query-API ist dieselbe wie beim synchronen Client
+(``db.table("x").select(...).eq(...)``), nur ``execute()`` wird ``await``-et.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, List, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from utils.db_instrumentierung import instrumentiere
+
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "50"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+SUPABASE_HTTP_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_HTTP_TIMEOUT_SECONDS", "10"))
+
+_client: Optional[AsyncPostgrestClient] = None
+
+
+def _service_key() -> str:
+    key = (
+        os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        or os.getenv("SUPABASE_SERVICE_KEY")
+        or os.getenv("SUPABASE_KEY")
+    )
+    if not key:
+        raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY / SUPABASE_KEY fehlt")
+    return key
+
+
+def get_async_service_role_client() -> AsyncPostgrestClient:
+    """Asynchroner Service-Role-Client (Modul-Singleton, gemeinsamer Verbindungspool)."""
+    global _client
+    if _client is None:
+        url = os.getenv("SUPABASE_URL")
+        if not url:
+            raise RuntimeError("Fehlende Umgebungsvariable: SUPABASE_URL")
+        key = _service_key()
+        client = AsyncPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+        )
+        # Die Standard-Session hat weder Pool-Limits noch Keep-Alive-Vorgaben;
+        # sie wurde noch nie benutzt und wird durch eine abgestimmte ersetzt.
+        standard = client.session
+        client.session = httpx.AsyncClient(
+            base_url=standard.base_url,
+            headers=standard.headers,
+            timeout=httpx.Timeout(SUPABASE_HTTP_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+        )
+        _client = instrumentiere(client)
+    return _client
+
+
+async def parallel(*abfragen, ausnahmen_zurueckgeben: bool = False) -> List[Any]:
+    """
+    Führt unabhängige Abfragen gleichzeitig aus (asyncio.gather) und liefert
+    die Antworten in Aufrufreihenfolge. Mit ``ausnahmen_zurueckgeben`` stehen
+    Fehler als Exception-Objekte an ihrer Position, statt alle abzubrechen.
+    """
+    return await asyncio.gather(
+        *(q.execute() for q in abfragen),
+        return_exceptions=ausnahmen_zurueckgeben,
+    )
+
+
+async def schliesse_async_client() -> None:
+    """Verbindungspool schließen (Shutdown-Hook)."""
+    global _client
+    if _client is not None:
+        await _client.session.aclose()
+        _client = None
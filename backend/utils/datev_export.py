@@ -15,6 +15,7 @@ Lohnarten-Schlüssel (DATEV-Standard):
     1000 = Grundlohn / Normalstunden
     1100 = Sonntagszuschlag (steuerfrei bis 25% des Grundlohns)
     1200 = Feiertagszuschlag (steuerfrei bis 125% des Grundlohns)
+    1300 = Nachtzuschlag 23–06 Uhr (steuerfrei bis 25% des Grundlohns)
     2000 = Urlaubsvergütung
 """
 
@@ -22,13 +23,14 @@ import csv
 import io
 import os
 from datetime import date, datetime
-from typing import List, Dict, Any, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 # DATEV-Lohnarten-Schlüssel
 LOHNART_GRUNDLOHN = "1000"
 LOHNART_SONNTAGSZUSCHLAG = "1100"
 LOHNART_FEIERTAGSZUSCHLAG = "1200"
+LOHNART_NACHTZUSCHLAG = "1300"
 LOHNART_URLAUBSVERGÜTUNG = "2000"
 
 
@@ -80,6 +82,232 @@ def erstelle_datev_header(
     return header
 
 
+MONATE_DE = ['', 'Januar', 'Februar', 'März', 'April', 'Mai', 'Juni',
+             'Juli', 'August', 'September', 'Oktober', 'November', 'Dezember']
+
+# Seitengröße für das blätternde Lesen von lohnabrechnungen
+DATEV_SEITENGROESSE = 500
+
+DATEV_SPALTEN = [
+    'Umsatz (ohne Soll/Haben-Kz)',  # Betrag
+    'Soll/Haben-Kennzeichen',         # S oder H
+    'WKZ Umsatz',                     # Währungskennzeichen
+    'Kurs',                           # Wechselkurs
+    'Basis-Umsatz',                   # Basisumsatz
+    'WKZ Basis-Umsatz',               # WKZ Basisumsatz
+    'Konto',                          # Buchungskonto
+    'Gegenkonto (ohne BU-Schlüssel)', # Gegenkonto
+    'BU-Schlüssel',                   # Buchungsschlüssel
+    'Belegdatum',                     # Datum
+    'Belegfeld 1',                    # Belegnummer
+    'Belegfeld 2',                    # Zusatzinfo
+    'Skonto',                         # Skonto
+    'Buchungstext',                   # Beschreibung
+    'Postensperre',                   # Postensperre
+    'Diverse Adressnummer',           # Adressnummer
+    'Geschäftspartnerbank',           # Bankverbindung
+    'Sachverhalt',                    # Sachverhalt
+    'Zinssperre',                     # Zinssperre
+    'Beleglink',                      # Link
+    'Beleginfo - Art 1',              # Mitarbeitername
+    'Beleginfo - Inhalt 1',           # Personalnummer
+    'Beleginfo - Art 2',              # Lohnart
+    'Beleginfo - Inhalt 2',           # Lohnart-Bezeichnung
+    'Beleginfo - Art 3',              # Stunden
+    'Beleginfo - Inhalt 3',           # Stundenzahl
+    'Beleginfo - Art 4',              # Referenzsatz
+    'Beleginfo - Inhalt 4',           # Referenzsatz-Betrag
+    'Beleginfo - Art 5',              # Monat
+    'Beleginfo - Inhalt 5',           # Monat-Wert
+]
+
+
+def _datev_buchungszeilen(
+    abrechnung: Dict[str, Any],
+    ma: Dict[str, Any],
+    monat: int,
+    jahr: int,
+) -> Iterator[List[str]]:
+    """Buchungszeilen (Grundlohn, Sonntags-, Feiertags-, Nachtzuschlag) einer Abrechnung."""
+    ma_id = abrechnung.get('mitarbeiter_id')
+    monat_name = MONATE_DE[monat]
+    bis_datum_letzter = date(jahr, monat, _letzter_tag_des_monats(monat, jahr))
+
+    ma_name = f"{ma.get('vorname', '')} {ma.get('nachname', '')}".strip()
+    personalnummer = ma.get('personalnummer', str(ma_id)[:8])
+    soll_stunden = float(ma.get('monatliche_soll_stunden') or 0.0)
+    monatsbrutto = float(ma.get('monatliche_brutto_verguetung') or 0.0)
+    referenzsatz = (monatsbrutto / soll_stunden) if soll_stunden > 0 else 0.0
+    
+    grundlohn = float(abrechnung.get('grundlohn', 0))
+    sonntagszuschlag = float(abrechnung.get('sonntagszuschlag', 0))
+    feiertagszuschlag = float(abrechnung.get('feiertagszuschlag', 0))
+    # nachtstunden / nachtzuschlag fehlen, solange die Migration nicht ausgeführt ist
+    nachtzuschlag = float(abrechnung.get('nachtzuschlag') or 0)
+    
+    # Arbeitszeitkonto-Daten
+    ist_stunden = float(abrechnung.get('ist_stunden', 0))
+    sonntagsstunden = float(abrechnung.get('sonntagsstunden', 0))
+    feiertagsstunden = float(abrechnung.get('feiertagsstunden', 0))
+    nachtstunden = float(abrechnung.get('nachtstunden') or 0)
+    
+    belegdatum = _format_datum(bis_datum_letzter)
+    belegnummer = f"LOHN-{personalnummer}-{monat:02d}{jahr}"
+    
+    # --- Zeile 1: Grundlohn ---
+    if grundlohn > 0:
+        yield [
+            _format_betrag(grundlohn),  # Betrag
+            'S',                         # Soll
+            'EUR',                       # Währung
+            '',                          # Kurs
+            '',                          # Basis-Umsatz
+            '',                          # WKZ Basis
+            '4120',                      # Konto: Löhne und Gehälter
+            '1200',                      # Gegenkonto: Verbindlichkeiten Lohn
+            '',                          # BU-Schlüssel
+            belegdatum,                  # Belegdatum
+            belegnummer,                 # Belegfeld 1
+            f"{monat:02d}/{jahr}",       # Belegfeld 2
+            '',                          # Skonto
+            f"Grundlohn {ma_name} {monat_name} {jahr}",  # Buchungstext
+            '',                          # Postensperre
+            '',                          # Adressnummer
+            '',                          # Bank
+            '',                          # Sachverhalt
+            '',                          # Zinssperre
+            '',                          # Beleglink
+            'Mitarbeiter',               # Art 1
+            ma_name,                     # Inhalt 1
+            'Lohnart',                   # Art 2
+            f"{LOHNART_GRUNDLOHN} Grundlohn",  # Inhalt 2
+            'Stunden',                   # Art 3
+            _format_stunden(ist_stunden - sonntagsstunden - feiertagsstunden),  # Inhalt 3
+            'Referenzsatz',              # Art 4
+            _format_betrag(referenzsatz), # Inhalt 4
+            'Monat',                     # Art 5
+            f"{monat:02d}/{jahr}",       # Inhalt 5
+        ]
+    
+    # --- Zeile 2: Sonntagszuschlag ---
+    if sonntagszuschlag > 0:
+        yield [
+            _format_betrag(sonntagszuschlag),
+            'S',
+            'EUR',
+            '', '', '',
+            '4125',   # Konto: Zuschläge (steuerfreie Lohnbestandteile)
+            '1200',
+            '',
+            belegdatum,
+            belegnummer,
+            f"{monat:02d}/{jahr}",
+            '',
+            f"Sonntagszuschlag {ma_name} {monat_name} {jahr}",
+            '', '', '', '', '', '',
+            'Mitarbeiter', ma_name,
+            'Lohnart', f"{LOHNART_SONNTAGSZUSCHLAG} Sonntagszuschlag 50%",
+            'Stunden', _format_stunden(sonntagsstunden),
+            'Referenzsatz', _format_betrag(referenzsatz * 0.5),
+            'Monat', f"{monat:02d}/{jahr}",
+        ]
+    
+    # --- Zeile 3: Feiertagszuschlag ---
+    if feiertagszuschlag > 0:
+        yield [
+            _format_betrag(feiertagszuschlag),
+            'S',
+            'EUR',
+            '', '', '',
+            '4125',   # Konto: Zuschläge
+            '1200',
+            '',
+            belegdatum,
+            belegnummer,
+            f"{monat:02d}/{jahr}",
+            '',
+            f"Feiertagszuschlag {ma_name} {monat_name} {jahr}",
+            '', '', '', '', '', '',
+            'Mitarbeiter', ma_name,
+            'Lohnart', f"{LOHNART_FEIERTAGSZUSCHLAG} Feiertagszuschlag 100%",
+            'Stunden', _format_stunden(feiertagsstunden),
+            'Referenzsatz', _format_betrag(referenzsatz * 1.0),
+            'Monat', f"{monat:02d}/{jahr}",
+        ]
+    
+    # --- Zeile 4: Nachtzuschlag ---
+    if nachtzuschlag > 0:
+        yield [
+            _format_betrag(nachtzuschlag),
+            'S',
+            'EUR',
+            '', '', '',
+            '4125',   # Konto: Zuschläge
+            '1200',
+            '',
+            belegdatum,
+            belegnummer,
+            f"{monat:02d}/{jahr}",
+            '',
+            f"Nachtzuschlag {ma_name} {monat_name} {jahr}",
+            '', '', '', '', '', '',
+            'Mitarbeiter', ma_name,
+            'Lohnart', f"{LOHNART_NACHTZUSCHLAG} Nachtzuschlag 25%",
+            'Stunden', _format_stunden(nachtstunden),
+            'Referenzsatz', _format_betrag(referenzsatz * 0.25),
+            'Monat', f"{monat:02d}/{jahr}",
+        ]
+
+
+def iter_datev_lohnexport(
+    mitarbeiter_liste: List[Dict[str, Any]],
+    lohnabrechnungen: Iterable[Dict[str, Any]],
+    jahr: int,
+    betrieb_info: Dict[str, Any] = None,
+    monat: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Schreibt den DATEV-Export als Generator von UTF-8-Chunks (BOM + Header zuerst,
+    danach je Abrechnung ihre Buchungszeilen).
+
+    ``lohnabrechnungen`` darf ein beliebiger Iterator sein (z.B. seitenweise aus
+    der DB gelesen) – es wird nie mehr als eine Abrechnung im Speicher gehalten.
+    Monat/Jahr je Zeile kommen aus der Abrechnung; ``monat``/``jahr`` dienen nur
+    als Fallback bzw. für den Wirtschaftsjahr-Beginn im Header.
+    """
+    ma_lookup = {ma['id']: ma for ma in mitarbeiter_liste}
+
+    beraternummer = betrieb_info.get('datev_beraternummer', '0000000') if betrieb_info else '0000000'
+    mandantennummer = betrieb_info.get('datev_mandantennummer', '00000') if betrieb_info else '00000'
+
+    puffer = io.StringIO()
+    writer = csv.writer(puffer, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+
+    def _abholen() -> bytes:
+        daten = puffer.getvalue()
+        puffer.seek(0)
+        puffer.truncate(0)
+        return daten.encode('utf-8')
+
+    # Zeile 1: DATEV-Header, Zeile 2: Spaltenüberschriften
+    puffer.write(erstelle_datev_header(beraternummer, mandantennummer, jahr))
+    puffer.write('\n')
+    writer.writerow(DATEV_SPALTEN)
+    yield b'\xef\xbb\xbf' + _abholen()
+
+    # Ab Zeile 3: Datensätze
+    for abrechnung in lohnabrechnungen:
+        ma = ma_lookup.get(abrechnung.get('mitarbeiter_id'), {})
+        if not ma:
+            continue
+        zeilen_monat = int(abrechnung.get('monat') or monat)
+        zeilen_jahr = int(abrechnung.get('jahr') or jahr)
+        writer.writerows(_datev_buchungszeilen(abrechnung, ma, zeilen_monat, zeilen_jahr))
+        chunk = _abholen()
+        if chunk:
+            yield chunk
+
+
 def erstelle_datev_lohnexport(
     mitarbeiter_liste: List[Dict[str, Any]],
     lohnabrechnungen: List[Dict[str, Any]],
@@ -100,185 +328,52 @@ def erstelle_datev_lohnexport(
     Returns:
         bytes: CSV-Datei als Bytes (UTF-8 mit BOM)
     """
-    output = io.StringIO()
-    
-    # Erstelle Mitarbeiter-Lookup
-    ma_lookup = {ma['id']: ma for ma in mitarbeiter_liste}
-    
-    # Abrechnungszeitraum
-    von_datum = date(jahr, monat, 1)
-    if monat == 12:
-        bis_datum = date(jahr + 1, 1, 1)
-    else:
-        bis_datum = date(jahr, monat + 1, 1)
-    bis_datum_letzter = date(jahr, monat, _letzter_tag_des_monats(monat, jahr))
-    
-    # ============================================================
-    # DATEV-HEADER (Zeile 1)
-    # ============================================================
-    beraternummer = betrieb_info.get('datev_beraternummer', '0000000') if betrieb_info else '0000000'
-    mandantennummer = betrieb_info.get('datev_mandantennummer', '00000') if betrieb_info else '00000'
-    
-    output.write(erstelle_datev_header(beraternummer, mandantennummer, jahr))
-    output.write('\n')
-    
-    # ============================================================
-    # SPALTENÜBERSCHRIFTEN (Zeile 2)
-    # ============================================================
-    spalten = [
-        'Umsatz (ohne Soll/Haben-Kz)',  # Betrag
-        'Soll/Haben-Kennzeichen',         # S oder H
-        'WKZ Umsatz',                     # Währungskennzeichen
-        'Kurs',                           # Wechselkurs
-        'Basis-Umsatz',                   # Basisumsatz
-        'WKZ Basis-Umsatz',               # WKZ Basisumsatz
-        'Konto',                          # Buchungskonto
-        'Gegenkonto (ohne BU-Schlüssel)', # Gegenkonto
-        'BU-Schlüssel',                   # Buchungsschlüssel
-        'Belegdatum',                     # Datum
-        'Belegfeld 1',                    # Belegnummer
-        'Belegfeld 2',                    # Zusatzinfo
-        'Skonto',                         # Skonto
-        'Buchungstext',                   # Beschreibung
-        'Postensperre',                   # Postensperre
-        'Diverse Adressnummer',           # Adressnummer
-        'Geschäftspartnerbank',           # Bankverbindung
-        'Sachverhalt',                    # Sachverhalt
-        'Zinssperre',                     # Zinssperre
-        'Beleglink',                      # Link
-        'Beleginfo - Art 1',              # Mitarbeitername
-        'Beleginfo - Inhalt 1',           # Personalnummer
-        'Beleginfo - Art 2',              # Lohnart
-        'Beleginfo - Inhalt 2',           # Lohnart-Bezeichnung
-        'Beleginfo - Art 3',              # Stunden
-        'Beleginfo - Inhalt 3',           # Stundenzahl
-        'Beleginfo - Art 4',              # Referenzsatz
-        'Beleginfo - Inhalt 4',           # Referenzsatz-Betrag
-        'Beleginfo - Art 5',              # Monat
-        'Beleginfo - Inhalt 5',           # Monat-Wert
-    ]
-    
-    writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow(spalten)
-    
-    # ============================================================
-    # DATENSÄTZE (ab Zeile 3)
-    # ============================================================
-    monate_de = ['', 'Januar', 'Februar', 'März', 'April', 'Mai', 'Juni',
-                 'Juli', 'August', 'September', 'Oktober', 'November', 'Dezember']
-    monat_name = monate_de[monat]
-    
-    for abrechnung in lohnabrechnungen:
-        ma_id = abrechnung.get('mitarbeiter_id')
-        ma = ma_lookup.get(ma_id, {})
-        
-        if not ma:
-            continue
-        
-        ma_name = f"{ma.get('vorname', '')} {ma.get('nachname', '')}".strip()
-        personalnummer = ma.get('personalnummer', str(ma_id)[:8])
-        soll_stunden = float(ma.get('monatliche_soll_stunden') or 0.0)
-        monatsbrutto = float(ma.get('monatliche_brutto_verguetung') or 0.0)
-        referenzsatz = (monatsbrutto / soll_stunden) if soll_stunden > 0 else 0.0
-        
-        grundlohn = float(abrechnung.get('grundlohn', 0))
-        sonntagszuschlag = float(abrechnung.get('sonntagszuschlag', 0))
-        feiertagszuschlag = float(abrechnung.get('feiertagszuschlag', 0))
-        
-        # Arbeitszeitkonto-Daten
-        ist_stunden = float(abrechnung.get('ist_stunden', 0))
-        sonntagsstunden = float(abrechnung.get('sonntagsstunden', 0))
-        feiertagsstunden = float(abrechnung.get('feiertagsstunden', 0))
-        
-        belegdatum = _format_datum(bis_datum_letzter)
-        belegnummer = f"LOHN-{personalnummer}-{monat:02d}{jahr}"
-        
-        # --- Zeile 1: Grundlohn ---
-        if grundlohn > 0:
-            writer.writerow([
-                _format_betrag(grundlohn),  # Betrag
-                'S',                         # Soll
-                'EUR',                       # Währung
-                '',                          # Kurs
-                '',                          # Basis-Umsatz
-                '',                          # WKZ Basis
-                '4120',                      # Konto: Löhne und Gehälter
-                '1200',                      # Gegenkonto: Verbindlichkeiten Lohn
-                '',                          # BU-Schlüssel
-                belegdatum,                  # Belegdatum
-                belegnummer,                 # Belegfeld 1
-                f"{monat:02d}/{jahr}",       # Belegfeld 2
-                '',                          # Skonto
-                f"Grundlohn {ma_name} {monat_name} {jahr}",  # Buchungstext
-                '',                          # Postensperre
-                '',                          # Adressnummer
-                '',                          # Bank
-                '',                          # Sachverhalt
-                '',                          # Zinssperre
-                '',                          # Beleglink
-                'Mitarbeiter',               # Art 1
-                ma_name,                     # Inhalt 1
-                'Lohnart',                   # Art 2
-                f"{LOHNART_GRUNDLOHN} Grundlohn",  # Inhalt 2
-                'Stunden',                   # Art 3
-                _format_stunden(ist_stunden - sonntagsstunden - feiertagsstunden),  # Inhalt 3
-                'Referenzsatz',              # Art 4
-                _format_betrag(referenzsatz), # Inhalt 4
-                'Monat',                     # Art 5
-                f"{monat:02d}/{jahr}",       # Inhalt 5
-            ])
-        
-        # --- Zeile 2: Sonntagszuschlag ---
-        if sonntagszuschlag > 0:
-            writer.writerow([
-                _format_betrag(sonntagszuschlag),
-                'S',
-                'EUR',
-                '', '', '',
-                '4125',   # Konto: Zuschläge (steuerfreie Lohnbestandteile)
-                '1200',
-                '',
-                belegdatum,
-                belegnummer,
-                f"{monat:02d}/{jahr}",
-                '',
-                f"Sonntagszuschlag {ma_name} {monat_name} {jahr}",
-                '', '', '', '', '', '',
-                'Mitarbeiter', ma_name,
-                'Lohnart', f"{LOHNART_SONNTAGSZUSCHLAG} Sonntagszuschlag 50%",
-                'Stunden', _format_stunden(sonntagsstunden),
-                'Referenzsatz', _format_betrag(referenzsatz * 0.5),
-                'Monat', f"{monat:02d}/{jahr}",
-            ])
-        
-        # --- Zeile 3: Feiertagszuschlag ---
-        if feiertagszuschlag > 0:
-            writer.writerow([
-                _format_betrag(feiertagszuschlag),
-                'S',
-                'EUR',
-                '', '', '',
-                '4125',   # Konto: Zuschläge
-                '1200',
-                '',
-                belegdatum,
-                belegnummer,
-                f"{monat:02d}/{jahr}",
-                '',
-                f"Feiertagszuschlag {ma_name} {monat_name} {jahr}",
-                '', '', '', '', '', '',
-                'Mitarbeiter', ma_name,
-                'Lohnart', f"{LOHNART_FEIERTAGSZUSCHLAG} Feiertagszuschlag 100%",
-                'Stunden', _format_stunden(feiertagsstunden),
-                'Referenzsatz', _format_betrag(referenzsatz * 1.0),
-                'Monat', f"{monat:02d}/{jahr}",
-            ])
-    
-    csv_content = output.getvalue()
-    output.close()
-    
-    # UTF-8 mit BOM (für Excel-Kompatibilität)
-    return b'\xef\xbb\xbf' + csv_content.encode('utf-8')
+    return b''.join(iter_datev_lohnexport(
+        mitarbeiter_liste,
+        lohnabrechnungen,
+        jahr,
+        betrieb_info,
+        monat=monat,
+    ))
+
+
+def iter_lohnabrechnungen_zeitraum(
+    supabase,
+    mitarbeiter_ids: List[int],
+    von: Tuple[int, int],
+    bis: Tuple[int, int],
+    seitengroesse: int = DATEV_SEITENGROESSE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Liest lohnabrechnungen für (jahr, monat) von..bis (inklusive) seitenweise,
+    sortiert nach Jahr, Monat und Mitarbeiter.
+    """
+    if not mitarbeiter_ids:
+        return
+    von_index = von[0] * 12 + von[1]
+    bis_index = bis[0] * 12 + bis[1]
+    offset = 0
+    while True:
+        res = (
+            supabase.table('lohnabrechnungen')
+            .select('*')
+            .in_('mitarbeiter_id', mitarbeiter_ids)
+            .gte('jahr', von[0])
+            .lte('jahr', bis[0])
+            .order('jahr')
+            .order('monat')
+            .order('mitarbeiter_id')
+            .range(offset, offset + seitengroesse - 1)
+            .execute()
+        )
+        seite = res.data or []
+        for abrechnung in seite:
+            index = int(abrechnung['jahr']) * 12 + int(abrechnung['monat'])
+            if von_index <= index <= bis_index:
+                yield abrechnung
+        if len(seite) < seitengroesse:
+            return
+        offset += seitengroesse
 
 
 def erstelle_lohnuebersicht_csv(
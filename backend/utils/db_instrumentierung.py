@@ -0,0 +1,255 @@
+"""
+db_instrumentierung.py – Datenbank-Roundtrips je Request messen
+
+Ein dünner Proxy um die Supabase-/PostgREST-Clients: Abfrageketten
+(``table(...)``, ``from_(...)``, ``rpc(...)``) werden unverändert an den
+echten Client durchgereicht, gemessen wird nur ``execute()`` – mit Tabelle,
+Operation (select/insert/update/upsert/delete/rpc) und Dauer.
+
+``MetrikMiddleware`` (ASGI, in main.py eingehängt) legt je Request eine
+``AnfrageMessung`` in einer ContextVar an. Synchrone Endpunkte im Threadpool
+und ``asyncio.to_thread`` erhalten eine Kopie des Kontexts und schreiben in
+dasselbe Objekt. Am Request-Ende werden Latenz, Anzahl und Dauer der
+DB-Aufrufe unter dem Routen-Template (``/zeiten/azk/{mitarbeiter_id}``, nicht
+der konkreten URL) in utils.metrics verbucht. Aufrufe außerhalb eines
+Requests (Skripte, Hintergrundjobs) laufen unter der Route ``ohne_request``.
+
+Über ``beobachter_registrieren`` können Werkzeuge (tests/abfrage_rekorder.py)
+jeden Aufruf samt Abfrageform mitlesen. Ohne registrierte Beobachter wird die
+Form nicht aufgebaut.
+"""
+
+from __future__ import annotations
+
+import inspect
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import addiere, request_erfassen
+
+OHNE_REQUEST = "ohne_request"
+_OPERATIONEN = frozenset({"select", "insert", "update", "upsert", "delete"})
+# Methoden, deren erstes Argument eine Spalte (kein Wert) ist → Teil der Form.
+_SPALTEN_METHODEN = frozenset({
+    "select", "order", "eq", "neq", "gt", "gte", "lt", "lte", "in_", "is_",
+    "like", "ilike", "contains", "contained_by", "filter", "match",
+})
+
+# (tabelle, operation, form, dauer) – form: ((methode, spalte), ...)
+Form = Tuple[Tuple[str, Optional[str]], ...]
+Beobachter = Callable[[str, str, Form, float], None]
+_beobachter: List[Beobachter] = []
+
+
+@dataclass
+class AnfrageMessung:
+    route: str = ""  # Routen-Template, gesetzt am Request-Ende
+    db_aufrufe: int = 0
+    db_zeit: float = 0.0
+    # (tabelle, operation) → [anzahl, sekunden]
+    je_abfrage: Dict[Tuple[str, str], List[float]] = field(default_factory=dict)
+    beginn: float = field(default_factory=perf_counter)
+    # Einzelaufrufe, nur bei Profiling (utils.profiling) eine Liste
+    spur: Optional[List[Dict[str, Any]]] = None
+    spur_max: int = 0
+
+
+_messung: ContextVar[Optional[AnfrageMessung]] = ContextVar("db_messung", default=None)
+
+
+def aktuelle_messung() -> Optional[AnfrageMessung]:
+    return _messung.get()
+
+
+def beobachter_registrieren(beobachter: Beobachter) -> None:
+    _beobachter.append(beobachter)
+
+
+def beobachter_entfernen(beobachter: Beobachter) -> None:
+    if beobachter in _beobachter:
+        _beobachter.remove(beobachter)
+
+
+def db_aufruf_erfassen(tabelle: str, operation: str, dauer: float) -> None:
+    messung = _messung.get()
+    if messung is None:
+        addiere("complio_db_calls_total", 1, route=OHNE_REQUEST, table=tabelle, operation=operation)
+        addiere("complio_db_duration_seconds_total", dauer, route=OHNE_REQUEST, table=tabelle, operation=operation)
+        return
+    messung.db_aufrufe += 1
+    messung.db_zeit += dauer
+    eintrag = messung.je_abfrage.setdefault((tabelle, operation), [0, 0.0])
+    eintrag[0] += 1
+    eintrag[1] += dauer
+    if messung.spur is not None and len(messung.spur) < messung.spur_max:
+        ende = perf_counter() - messung.beginn
+        messung.spur.append({
+            "tabelle": tabelle,
+            "operation": operation,
+            "ab_ms": round((ende - dauer) * 1000, 2),
+            "dauer_ms": round(dauer * 1000, 2),
+        })
+
+
+# ── Client-Proxy ─────────────────────────────────────────────────────────────
+
+def _ist_abfrage(obj: Any) -> bool:
+    return hasattr(obj, "execute") or hasattr(obj, "select")
+
+
+class _Abfrage:
+    """Reicht eine Abfragekette durch und misst ``execute()``."""
+
+    __slots__ = ("_ziel", "_tabelle", "_operation", "_form")
+
+    def __init__(self, ziel: Any, tabelle: str, operation: Optional[str], form: Optional[Form] = None):
+        self._ziel = ziel
+        self._tabelle = tabelle
+        self._operation = operation
+        self._form = form
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._ziel, name)
+        if name == "execute":
+            return self._gemessen(attr)
+        if not callable(attr):
+            # z. B. ``.not_`` (Property, liefert den Builder)
+            if not _ist_abfrage(attr):
+                return attr
+            form = self._form + ((name, None),) if self._form is not None else None
+            return _Abfrage(attr, self._tabelle, self._operation, form)
+        operation = self._operation or (name if name in _OPERATIONEN else None)
+
+        def _kette(*args, **kwargs):
+            ergebnis = attr(*args, **kwargs)
+            if not _ist_abfrage(ergebnis):
+                return ergebnis
+            form = None
+            if self._form is not None:
+                spalte = args[0] if name in _SPALTEN_METHODEN and args and isinstance(args[0], str) else None
+                form = self._form + ((name, spalte),)
+            return _Abfrage(ergebnis, self._tabelle, operation, form)
+
+        return _kette
+
+    def _gemessen(self, execute):
+        tabelle, operation, form = self._tabelle, self._operation or "select", self._form or ()
+
+        def _melden(dauer: float) -> None:
+            db_aufruf_erfassen(tabelle, operation, dauer)
+            for beobachter in list(_beobachter):
+                beobachter(tabelle, operation, form, dauer)
+        if inspect.iscoroutinefunction(execute):
+            async def _ausfuehren_async(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return await execute(*args, **kwargs)
+                finally:
+                    _melden(perf_counter() - start)
+
+            return _ausfuehren_async
+
+        def _ausfuehren(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return execute(*args, **kwargs)
+            finally:
+                _melden(perf_counter() - start)
+
+        return _ausfuehren
+
+
+class InstrumentierterClient:
+    """Proxy mit derselben Query-API wie der umhüllte Client."""
+
+    __slots__ = ("_client",)
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def table(self, name: str) -> _Abfrage:
+        return _Abfrage(self._client.table(name), name, None, () if _beobachter else None)
+
+    def from_(self, name: str) -> _Abfrage:
+        return _Abfrage(self._client.from_(name), name, None, () if _beobachter else None)
+
+    def rpc(self, funktion: str, *args, **kwargs) -> _Abfrage:
+        ziel = self._client.rpc(funktion, *args, **kwargs)
+        return _Abfrage(ziel, f"rpc:{funktion}", "rpc", () if _beobachter else None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in InstrumentierterClient.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._client, name, value)
+
+
+def instrumentiere(client: Any) -> Any:
+    return client if isinstance(client, InstrumentierterClient) else InstrumentierterClient(client)
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+def _route_template(scope) -> str:
+    """
+    Vollständiges Routen-Template (``/zeiten/azk/{mitarbeiter_id}``).
+
+    Je nach FastAPI-Version enthält ``scope["route"].path`` den Router-Präfix
+    oder nur den Teilpfad (``/azk/{mitarbeiter_id}``). Der Präfix wird daher aus
+    dem konkreten Pfad rekonstruiert: alles vor dem mit den Pfadparametern
+    gefüllten Teilpfad der Route.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unbekannt"
+    pfad = scope.get("path") or ""
+    root_path = scope.get("root_path") or ""
+    if root_path and pfad.startswith(root_path):
+        pfad = pfad[len(root_path):]
+    try:
+        format_ = getattr(route, "path_format", template)
+        teilpfad = format_.format(**{k: str(v) for k, v in (scope.get("path_params") or {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return template
+    if teilpfad != pfad and pfad.endswith(teilpfad):
+        return pfad[: len(pfad) - len(teilpfad)] + template
+    return template
+
+
+class MetrikMiddleware:
+    """ASGI-Middleware: Latenz und DB-Aufrufe je Route verbuchen."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        messung = AnfrageMessung()
+        token = _messung.set(messung)
+        status = 500
+        start = perf_counter()
+
+        async def _senden(nachricht):
+            nonlocal status
+            if nachricht["type"] == "http.response.start":
+                status = nachricht["status"]
+            await send(nachricht)
+
+        try:
+            await self.app(scope, receive, _senden)
+        finally:
+            _messung.reset(token)
+            route = messung.route = _route_template(scope)
+            request_erfassen(route, scope.get("method", ""), status, perf_counter() - start, messung.db_aufrufe)
+            for (tabelle, operation), (anzahl, dauer) in messung.je_abfrage.items():
+                addiere("complio_db_calls_total", anzahl, route=route, table=tabelle, operation=operation)
+                addiere("complio_db_duration_seconds_total", dauer, route=route, table=tabelle, operation=operation)
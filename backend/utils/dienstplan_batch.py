@@ -0,0 +1,188 @@
+"""
+dienstplan_batch.py – Sammeländerungen am Dienstplan
+
+Eine Woche für 30 Personen sind 210 Zellen. Statt je Zelle ein Request und ein
+Upsert nimmt ``speichere_zellen`` alle Änderungen (Setzen und Löschen) eines
+Payloads, prüft sie gegen den Betrieb und schreibt sie als ein Bulk-Upsert auf
+``dienstplaene`` (on_conflict="mitarbeiter_id,datum") plus ein Delete.
+
+``kopiere_zeitraum`` überträgt eine Quellwoche (oder einen beliebigen
+Quellzeitraum als Vorlage) zyklisch auf einen Zielzeitraum.
+
+Beide liefern einen Konfliktbericht statt bei der ersten Unstimmigkeit
+abzubrechen: übersprungene Zellen stehen mit Grund in ``konflikte``.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DIENSTPLAN_SPALTEN = "id, mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten"
+SCHICHTTYPEN = ("arbeit", "urlaub", "frei")
+MAX_ZELLEN = 5000
+_CHUNK = 500
+
+Zelle = Tuple[int, str]  # (mitarbeiter_id, datum ISO)
+
+
+def _konflikt(mitarbeiter_id: int, datum: str, grund: str, **extra) -> Dict[str, Any]:
+    return {"mitarbeiter_id": mitarbeiter_id, "datum": datum, "grund": grund, **extra}
+
+
+def lade_betrieb_mitarbeiter_ids(supabase, betrieb_id: int, mitarbeiter_ids: Iterable[int]) -> set[int]:
+    """Teilmenge von ``mitarbeiter_ids``, die zum Betrieb gehört (ID-Cache je Betrieb)."""
+    from utils.betrieb_mitarbeiter import gehoert_zu_betrieb
+
+    return {m for m in {int(m) for m in mitarbeiter_ids} if gehoert_zu_betrieb(betrieb_id, m)}
+
+
+def lade_plan(
+    supabase,
+    betrieb_id: int,
+    von: date,
+    bis: date,
+    mitarbeiter_ids: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    query = (
+        supabase.table("dienstplaene")
+        .select(DIENSTPLAN_SPALTEN)
+        .eq("betrieb_id", betrieb_id)
+        .gte("datum", von.isoformat())
+        .lte("datum", bis.isoformat())
+    )
+    if mitarbeiter_ids is not None:
+        query = query.in_("mitarbeiter_id", sorted({int(m) for m in mitarbeiter_ids}))
+    return query.execute().data or []
+
+
+def _zeile(betrieb_id: int, zelle: Dict[str, Any]) -> Dict[str, Any]:
+    # Bulk-Upserts verlangen identische Schlüssel je Zeile; eine Zelle wird
+    # daher vollständig ersetzt (fehlende Zeiten → NULL).
+    return {
+        "betrieb_id": betrieb_id,
+        "mitarbeiter_id": int(zelle["mitarbeiter_id"]),
+        "datum": str(zelle["datum"])[:10],
+        "schichttyp": zelle.get("schichttyp") or "arbeit",
+        "start_zeit": zelle.get("start_zeit"),
+        "end_zeit": zelle.get("end_zeit"),
+        "pause_minuten": zelle.get("pause_minuten"),
+    }
+
+
+def _schreibe(supabase, zeilen: List[Dict[str, Any]], loeschen: List[Zelle], betrieb_id: int) -> List[Dict[str, Any]]:
+    gespeichert: List[Dict[str, Any]] = []
+    for start in range(0, len(zeilen), _CHUNK):
+        res = (
+            supabase.table("dienstplaene")
+            .upsert(zeilen[start:start + _CHUNK], on_conflict="mitarbeiter_id,datum")
+            .execute()
+        )
+        gespeichert.extend(res.data or [])
+    for start in range(0, len(loeschen), _CHUNK):
+        bedingungen = ",".join(
+            f"and(mitarbeiter_id.eq.{mid},datum.eq.{datum})" for mid, datum in loeschen[start:start + _CHUNK]
+        )
+        supabase.table("dienstplaene").delete().eq("betrieb_id", betrieb_id).or_(bedingungen).execute()
+    return gespeichert
+
+
+def speichere_zellen(
+    supabase,
+    *,
+    betrieb_id: int,
+    setzen: List[Dict[str, Any]],
+    loeschen: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Setzt und löscht viele Zellen in einem Durchgang.
+
+    Konflikte: fremder/unbekannter Mitarbeiter, ungültiger Schichttyp, Zelle
+    mehrfach im Payload (letzte gewinnt), Zelle gleichzeitig gesetzt und gelöscht
+    (Setzen gewinnt).
+    """
+    konflikte: List[Dict[str, Any]] = []
+    alle_ids = [z["mitarbeiter_id"] for z in setzen] + [z["mitarbeiter_id"] for z in loeschen]
+    erlaubt = lade_betrieb_mitarbeiter_ids(supabase, betrieb_id, alle_ids)
+
+    zellen: Dict[Zelle, Dict[str, Any]] = {}
+    for zelle in setzen:
+        key = (int(zelle["mitarbeiter_id"]), str(zelle["datum"])[:10])
+        if key[0] not in erlaubt:
+            konflikte.append(_konflikt(*key, "mitarbeiter_unbekannt"))
+            continue
+        if (zelle.get("schichttyp") or "arbeit") not in SCHICHTTYPEN:
+            konflikte.append(_konflikt(*key, "schichttyp_ungueltig", schichttyp=zelle.get("schichttyp")))
+            continue
+        if key in zellen:
+            konflikte.append(_konflikt(*key, "doppelt_im_payload"))
+        zellen[key] = _zeile(betrieb_id, zelle)
+
+    zu_loeschen: List[Zelle] = []
+    for zelle in loeschen:
+        key = (int(zelle["mitarbeiter_id"]), str(zelle["datum"])[:10])
+        if key[0] not in erlaubt:
+            konflikte.append(_konflikt(*key, "mitarbeiter_unbekannt"))
+            continue
+        if key in zellen:
+            konflikte.append(_konflikt(*key, "setzen_und_loeschen"))
+            continue
+        if key not in zu_loeschen:
+            zu_loeschen.append(key)
+
+    gespeichert = _schreibe(supabase, list(zellen.values()), zu_loeschen, betrieb_id)
+    return {
+        "gespeichert": len(zellen),
+        "geloescht": len(zu_loeschen),
+        "eintraege": gespeichert,
+        "konflikte": konflikte,
+    }
+
+
+def kopiere_zeitraum(
+    supabase,
+    *,
+    betrieb_id: int,
+    quelle_von: date,
+    quelle_bis: date,
+    ziel_von: date,
+    ziel_bis: date,
+    mitarbeiter_ids: Optional[List[int]] = None,
+    ueberschreiben: bool = False,
+) -> Dict[str, Any]:
+    """
+    Überträgt den Quellzeitraum zyklisch auf den Zielzeitraum
+    (Zieltag d ← Quelltag quelle_von + (d - ziel_von) mod Länge).
+
+    Ohne ``ueberschreiben`` bleiben bereits belegte Zielzellen unverändert und
+    erscheinen als Konflikt ``ziel_belegt``. Leere Quelltage löschen nichts.
+    """
+    laenge = (quelle_bis - quelle_von).days + 1
+    quelle = lade_plan(supabase, betrieb_id, quelle_von, quelle_bis, mitarbeiter_ids)
+    ziel = lade_plan(supabase, betrieb_id, ziel_von, ziel_bis, mitarbeiter_ids)
+    belegt = {(int(r["mitarbeiter_id"]), str(r["datum"])[:10]): r for r in ziel}
+
+    vorlage: Dict[int, List[Dict[str, Any]]] = {}
+    for row in quelle:
+        offset = (date.fromisoformat(str(row["datum"])[:10]) - quelle_von).days
+        vorlage.setdefault(offset, []).append(row)
+
+    konflikte: List[Dict[str, Any]] = []
+    zeilen: List[Dict[str, Any]] = []
+    tag = ziel_von
+    while tag <= ziel_bis:
+        for row in vorlage.get((tag - ziel_von).days % laenge, []):
+            key = (int(row["mitarbeiter_id"]), tag.isoformat())
+            if key in belegt and not ueberschreiben:
+                konflikte.append(_konflikt(*key, "ziel_belegt", vorhanden=belegt[key].get("schichttyp")))
+                continue
+            zeilen.append(_zeile(betrieb_id, {**row, "datum": tag.isoformat()}))
+        tag += timedelta(days=1)
+
+    gespeichert = _schreibe(supabase, zeilen, [], betrieb_id)
+    return {
+        "gespeichert": len(zeilen),
+        "geloescht": 0,
+        "eintraege": gespeichert,
+        "konflikte": konflikte,
+    }
@@ -0,0 +1,109 @@
+"""
+dienstplan_cache.py – Versionszähler und Antwort-Cache für Dienstplan-Ansichten
+
+Wochen- und Monatsansicht werden von jedem Mitarbeiter mehrmals täglich
+geöffnet, der Plan ändert sich aber nur bei Admin-Änderungen. Daher:
+
+  - Versionszähler je Betrieb (``plan_geaendert`` bei jedem Schreibpfad)
+  - Prozess-Cache je (Betrieb, Zeitraum) mit Zeilen und ETag
+  - ETag = Hash über den Inhalt → auch über Worker-Grenzen und Neustarts stabil
+
+Solange Version unverändert und der Eintrag jünger als die TTL ist, wird ohne
+DB-Zugriff geantwortet (304 bei passendem If-None-Match). Die TTL begrenzt nur,
+wie lange ein anderer Worker-Prozess eine dort geschriebene Änderung nicht sieht.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import zaehle
+
+DIENSTPLAN_CACHE_TTL_SECONDS = float(os.getenv("DIENSTPLAN_CACHE_TTL_SECONDS", "30"))
+_MAX_EINTRAEGE = 512
+
+
+@dataclass
+class _Eintrag:
+    version: int
+    geladen: float
+    etag: str
+    zeilen: List[Dict[str, Any]]
+
+
+_versionen: Dict[int, int] = {}
+_cache: "OrderedDict[Tuple[int, str, str], _Eintrag]" = OrderedDict()
+_lock = Lock()
+
+
+def plan_version(betrieb_id: int) -> int:
+    with _lock:
+        return _versionen.get(int(betrieb_id), 0)
+
+
+def plan_geaendert(betrieb_id: int) -> int:
+    """Nach jedem Schreibzugriff auf den Dienstplan eines Betriebs aufrufen."""
+    key = int(betrieb_id)
+    with _lock:
+        _versionen[key] = _versionen.get(key, 0) + 1
+        for cache_key in [k for k in _cache if k[0] == key]:
+            del _cache[cache_key]
+        return _versionen[key]
+
+
+def _etag(zeilen: List[Dict[str, Any]]) -> str:
+    canonical = sorted(
+        (json.dumps(z, sort_keys=True, default=str) for z in zeilen),
+    )
+    digest = hashlib.sha1("\n".join(canonical).encode("utf-8")).hexdigest()[:20]
+    return f'"dp-{digest}"'
+
+
+def etag_passt(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    kandidaten = [t.strip() for t in if_none_match.split(",")]
+    return any((t[2:] if t.startswith("W/") else t) == etag for t in kandidaten)
+
+
+def lade_plan_zeitraum(
+    betrieb_id: int,
+    von: date,
+    bis: date,
+    laden: Callable[[], List[Dict[str, Any]]],
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Zeilen und ETag für (Betrieb, Zeitraum) – aus dem Cache oder über ``laden()``.
+    Die gelieferte Liste wird geteilt und darf nicht verändert werden.
+    """
+    key = (int(betrieb_id), von.isoformat(), bis.isoformat())
+    version = plan_version(betrieb_id)
+    now = monotonic()
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit.version == version and (now - hit.geladen) < DIENSTPLAN_CACHE_TTL_SECONDS:
+            _cache.move_to_end(key)
+            zaehle("dienstplan_cache.hit")
+            return hit.zeilen, hit.etag
+
+    zaehle("dienstplan_cache.load")
+    zeilen = laden()
+    etag = _etag(zeilen)
+    with _lock:
+        # Nur speichern, wenn zwischenzeitlich keine Änderung gezählt wurde.
+        if _versionen.get(int(betrieb_id), 0) == version:
+            _cache[key] = _Eintrag(version=version, geladen=monotonic(), etag=etag, zeilen=zeilen)
+            _cache.move_to_end(key)
+            while len(_cache) > _MAX_EINTRAEGE:
+                _cache.popitem(last=False)
+    return zeilen, etag
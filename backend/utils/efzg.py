@@ -17,6 +17,7 @@ Wichtig:
 - Die Höhe der Zahlung richtet sich nach ausgefallenen Arbeitstagen/Stunden.
 """
 
+from bisect import bisect_right
 from datetime import date, timedelta
 from typing import Optional, Sequence
 import calendar
@@ -76,79 +77,140 @@ def _normalize_episode(episode: dict) -> Optional[dict]:
     }
 
 
-def _build_active_same_diagnosis_chain(
-    *,
-    current_episode_start: date,
-    current_episode_end: date,
-    current_diagnose_key: Optional[str],
-    current_partial_first_day: bool,
-    history: Sequence[dict] | None,
-) -> list[dict]:
-    current = {
-        "start": current_episode_start,
-        "end": current_episode_end,
-        "diagnose_key": _normalize_diagnose_key(current_diagnose_key),
-        "erster_tag_teilgearbeitet": bool(current_partial_first_day),
-    }
-    episodes: list[dict] = []
+def _episoden_bis(history: Optional[Sequence[dict]], stichtag: date) -> list[dict]:
+    """Vorerkrankungen, die spätestens am Stichtag begonnen haben."""
+    out: list[dict] = []
     for ep in history or []:
         n = _normalize_episode(ep)
-        if n is not None and n["start"] <= current_episode_end:
-            episodes.append(n)
-    episodes.append(current)
-    episodes = sorted(episodes, key=lambda x: (x["start"], x["end"]))
-
-    diagnose_key = current["diagnose_key"]
-    if diagnose_key:
-        episodes = [e for e in episodes if e.get("diagnose_key") == diagnose_key]
-    else:
-        # Ohne Diagnose-Key lässt sich §3 Abs.1 S.2 nicht belastbar anwenden.
-        # Daher konservativ: nur aktuelle Episode als Krankheitsfall betrachten.
-        return [current]
-
-    if not episodes:
-        return [current]
-
-    chain: list[dict] = [episodes[0]]
-    chain_anchor = episodes[0]["start"]
-    for ep in episodes[1:]:
-        prev = chain[-1]
-        gesund_start = prev["end"] + timedelta(days=1)
-        reset_by_6m = ep["start"] >= _add_months(gesund_start, 6)
-        reset_by_12m = ep["start"] >= _add_months(chain_anchor, 12)
-        if reset_by_6m or reset_by_12m:
-            chain = [ep]
-            chain_anchor = ep["start"]
-        else:
-            chain.append(ep)
-    return chain
-
-
-def _count_lfz_calendar_days_until(
-    *,
-    chain: Sequence[dict],
-    target_day: date,
-    sperrfrist_ende: date,
-) -> int:
-    counted = 0
-    for ep in chain:
-        start = ep["start"]
-        end = min(ep["end"], target_day)
-        if end < start:
-            continue
-        day = start
-        while day <= end:
-            # Wartezeit-Tage verbrauchen keine 42-Tage-LFZ.
-            if day <= sperrfrist_ende:
-                day += timedelta(days=1)
-                continue
-            # Angearbeiteter erster Krankheitstag zählt nicht in die 42 Tage.
-            if bool(ep.get("erster_tag_teilgearbeitet")) and day == start:
-                day += timedelta(days=1)
+        if n is not None and n["start"] <= stichtag:
+            out.append(ep)
+    return out
+
+
+# ── Episoden-Index ───────────────────────────────────────────
+
+class EfzgEpisodenIndex:
+    """
+    Krankheitsepisoden eines Mitarbeiters, je Diagnose-Key nach Beginn sortiert.
+
+    Je Episode werden der Beginn der Anspruchskette und die bis dahin in der
+    Kette verbrauchten LFZ-Kalendertage vorgehalten. Eine neue Kette (neuer
+    42-Tage-Anspruch, §3 Abs.1 S.2 EntgFG) beginnt, wenn seit dem Ende der
+    vorigen Episode 6 Monate vergangen sind oder seit Kettenbeginn 12 Monate.
+    ``status(tag)`` ist damit eine Binärsuche plus Datumsarithmetik.
+
+    ``hinzufuegen`` sortiert neue Episoden ein und verkettet nur ab der
+    Einfügestelle neu. Überlappende Episoden desselben Keys werden
+    zusammengeführt (ein Kalendertag zählt nur einmal). Episoden ohne
+    Diagnose-Key lassen §3 Abs.1 S.2 nicht belastbar zu und bilden daher
+    konservativ jeweils einen eigenen Fall.
+    """
+
+    def __init__(self, eintrittsdatum: date, episoden: Optional[Sequence[dict]] = None):
+        self.eintrittsdatum = _safe_date(eintrittsdatum, default=date.min) or date.min
+        self.sperrfrist_ende = self.eintrittsdatum + timedelta(days=27)
+        # key → {"starts": [date], "eps": [episode], "anker": [date], "kum": [int]}
+        self._gruppen: dict[Optional[str], dict[str, list]] = {}
+        for ep in sorted(episoden or [], key=lambda e: str((e or {}).get("start_datum") or "")):
+            self.hinzufuegen(ep)
+
+    def __len__(self) -> int:
+        return sum(len(g["eps"]) for g in self._gruppen.values())
+
+    def _lfz_tage(self, ep: dict, bis: date) -> int:
+        erster = ep["start"] + timedelta(days=1) if ep["erster_tag_teilgearbeitet"] else ep["start"]
+        erster = max(erster, self.sperrfrist_ende + timedelta(days=1))
+        letzter = min(ep["end"], bis)
+        return max(0, (letzter - erster).days + 1)
+
+    def _neu_verketten(self, key: Optional[str], ab: int) -> None:
+        g = self._gruppen[key]
+        eps, anker, kum = g["eps"], g["anker"], g["kum"]
+        del anker[ab:], kum[ab:]
+        for i in range(ab, len(eps)):
+            ep = eps[i]
+            if i == 0 or key is None:
+                anker.append(ep["start"])
+                kum.append(0)
                 continue
-            counted += 1
-            day += timedelta(days=1)
-    return counted
+            prev = eps[i - 1]
+            gesund_start = prev["end"] + timedelta(days=1)
+            if ep["start"] >= _add_months(gesund_start, 6) or ep["start"] >= _add_months(anker[i - 1], 12):
+                anker.append(ep["start"])
+                kum.append(0)
+            else:
+                anker.append(anker[i - 1])
+                kum.append(kum[i - 1] + self._lfz_tage(prev, prev["end"]))
+
+    def hinzufuegen(self, episode: dict) -> None:
+        """Episode (start_datum, ende_datum, Diagnose-Felder) einsortieren."""
+        n = _normalize_episode(episode)
+        if n is None:
+            return
+        key = n["diagnose_key"]
+        g = self._gruppen.setdefault(key, {"starts": [], "eps": [], "anker": [], "kum": []})
+        starts, eps = g["starts"], g["eps"]
+
+        pos = bisect_right(starts, n["start"])
+        if pos > 0 and eps[pos - 1]["end"] >= n["start"]:
+            pos -= 1
+            teilgearbeitet = eps[pos]["erster_tag_teilgearbeitet"] or (
+                n["erster_tag_teilgearbeitet"] and n["start"] == eps[pos]["start"]
+            )
+            n = {**eps[pos], "end": max(eps[pos]["end"], n["end"]), "erster_tag_teilgearbeitet": teilgearbeitet}
+            del starts[pos], eps[pos]
+        while pos < len(eps) and eps[pos]["start"] <= n["end"]:
+            n["end"] = max(n["end"], eps[pos]["end"])
+            del starts[pos], eps[pos]
+        starts.insert(pos, n["start"])
+        eps.insert(pos, n)
+        self._neu_verketten(key, pos)
+
+    def _finde(self, tag: date, diagnose_schluessel: Optional[str]) -> Optional[int]:
+        g = self._gruppen.get(_normalize_diagnose_key(diagnose_schluessel))
+        if not g:
+            return None
+        i = bisect_right(g["starts"], tag) - 1
+        if i < 0 or g["eps"][i]["end"] < tag:
+            return None
+        return i
+
+    def episoden(self) -> list[dict]:
+        """Alle (zusammengeführten) Episoden, nach Beginn sortiert."""
+        return sorted((ep for g in self._gruppen.values() for ep in g["eps"]), key=lambda e: (e["start"], e["end"]))
+
+    def kettenbeginn(self, datum: date, diagnose_schluessel: Optional[str] = None) -> Optional[date]:
+        """Beginn der Anspruchskette, zu der ``datum`` gehört (None: kein Krankheitstag)."""
+        tag = _safe_date(datum)
+        i = self._finde(tag, diagnose_schluessel)
+        if i is None:
+            return None
+        return self._gruppen[_normalize_diagnose_key(diagnose_schluessel)]["anker"][i]
+
+    def lfz_tage_bis(self, datum: date, diagnose_schluessel: Optional[str] = None) -> Optional[int]:
+        """Verbrauchte LFZ-Kalendertage der Kette bis einschließlich ``datum`` (None: kein Krankheitstag)."""
+        tag = _safe_date(datum)
+        i = self._finde(tag, diagnose_schluessel)
+        if i is None:
+            return None
+        g = self._gruppen[_normalize_diagnose_key(diagnose_schluessel)]
+        return g["kum"][i] + self._lfz_tage(g["eps"][i], tag)
+
+    def status(self, datum: date, diagnose_schluessel: Optional[str] = None) -> Optional[str]:
+        """
+        Entgeltstatus wie berechne_efzg_status für einen Tag im Index.
+        None, wenn der Tag in keiner Episode des Diagnose-Keys liegt.
+        """
+        tag = _safe_date(datum)
+        i = self._finde(tag, diagnose_schluessel)
+        if i is None:
+            return None
+        if tag <= self.sperrfrist_ende:
+            return "sperrfrist"
+        ep = self._gruppen[_normalize_diagnose_key(diagnose_schluessel)]["eps"][i]
+        if ep["erster_tag_teilgearbeitet"] and tag == ep["start"]:
+            return "arbeitslohn_ersttag"
+        return "lohnfortzahlung" if self.lfz_tage_bis(tag, diagnose_schluessel) <= 42 else "krankengeld"
 
 
 def berechne_efzg_status(
@@ -161,10 +223,15 @@ def berechne_efzg_status(
     diagnose_schluessel: Optional[str] = None,
     vorerkrankungen: Optional[Sequence[dict]] = None,
     erster_krankheitstag_teilgearbeitet: bool = False,
+    episoden_index: Optional[EfzgEpisodenIndex] = None,
 ) -> str:
     """
     Bestimmt den Entgeltstatus eines Krankheitstages.
 
+    Mit ``episoden_index`` (z.B. absences.load_efzg_episode_index) wird der Tag
+    direkt im Index nachgeschlagen; ``vorerkrankungen`` wird dann nicht gebraucht.
+    Sonst wird ein Index aus ``vorerkrankungen`` und der aktuellen Episode gebaut.
+
     Returns:
         'sperrfrist'          – < 4 Wochen Betriebszugehörigkeit (§3 Abs.3)
         'arbeitslohn_ersttag' – angearbeiteter erster Krankheitstag
@@ -185,14 +252,23 @@ def berechne_efzg_status(
     if erster_krankheitstag_teilgearbeitet and target == ep_start:
         return "arbeitslohn_ersttag"
 
-    chain = _build_active_same_diagnosis_chain(
-        current_episode_start=ep_start,
-        current_episode_end=ep_end,
-        current_diagnose_key=diagnose_schluessel,
-        current_partial_first_day=bool(erster_krankheitstag_teilgearbeitet),
-        history=vorerkrankungen,
-    )
-    lfz_days = _count_lfz_calendar_days_until(chain=chain, target_day=target, sperrfrist_ende=sperrfrist_ende)
+    if episoden_index is not None:
+        status = episoden_index.status(target, diagnose_schluessel)
+        if status is not None:
+            return status
+
+    aktuell = {
+        "start_datum": ep_start,
+        "ende_datum": ep_end,
+        "diagnose": diagnose_schluessel,
+        "erster_tag_teilgearbeitet": bool(erster_krankheitstag_teilgearbeitet),
+    }
+    episoden = [aktuell]
+    if _normalize_diagnose_key(diagnose_schluessel):
+        episoden += _episoden_bis(vorerkrankungen, ep_end)
+    index = EfzgEpisodenIndex(entry, episoden)
+    # Tage außerhalb der Episode zählen wie ihr Rand.
+    lfz_days = index.lfz_tage_bis(min(max(target, ep_start), ep_end), diagnose_schluessel) or 0
     return "lohnfortzahlung" if lfz_days <= 42 else "krankengeld"
 
 
@@ -399,16 +475,11 @@ def pruefe_6_wochen_regel(episode_beginn: date, datum: date) -> tuple[str, int]:
         episode_ende=datum,
     )
     if status == "lohnfortzahlung":
-        lfz_tag_nr = max(1, _count_lfz_calendar_days_until(
-            chain=[{
-                "start": episode_beginn,
-                "end": datum,
-                "diagnose_key": None,
-                "erster_tag_teilgearbeitet": False,
-            }],
-            target_day=datum,
-            sperrfrist_ende=episode_beginn - timedelta(days=1),
-        ))
+        index = EfzgEpisodenIndex(
+            episode_beginn - timedelta(days=28),  # Wartezeit endet am Vortag der Episode
+            [{"start_datum": episode_beginn, "ende_datum": datum}],
+        )
+        lfz_tag_nr = max(1, index.lfz_tage_bis(datum) or 0)
         verbleibend = max(0, 42 - lfz_tag_nr + 1)
         return status, verbleibend
     if status == "arbeitslohn_ersttag":
@@ -426,19 +497,16 @@ def pruefe_wiederholungserkrankung_anspruch(
     Prüft, ob für eine Wiederholungserkrankung derselben Diagnose ein neuer
     42-Tage-Anspruch entstanden ist (§ 3 Abs. 1 S. 2 EntgFG).
     """
-    chain = _build_active_same_diagnosis_chain(
-        current_episode_start=aktuelle_episode_beginn,
-        current_episode_end=aktuelle_episode_beginn,
-        current_diagnose_key=diagnose_schluessel,
-        current_partial_first_day=False,
-        history=vorerkrankungen,
-    )
     # Ohne belastbaren Diagnose-Key wird konservativ ein neuer Fall angenommen.
-    if not diagnose_schluessel:
+    if not _normalize_diagnose_key(diagnose_schluessel):
         return True
-    # Wenn die Kette nur aus der aktuellen Episode besteht, wurde bereits
-    # nach 6-/12-Monats-Regel getrennt und damit ein neuer Anspruch aufgebaut.
-    return len(chain) == 1
+    beginn = _safe_date(aktuelle_episode_beginn)
+    episoden = _episoden_bis(vorerkrankungen, beginn)
+    episoden.append({"start_datum": beginn, "ende_datum": beginn, "diagnose": diagnose_schluessel})
+    # Beginnt die Kette mit der aktuellen Episode, wurde bereits nach
+    # 6-/12-Monats-Regel getrennt und damit ein neuer Anspruch aufgebaut.
+    index = EfzgEpisodenIndex(date.min, episoden)
+    return index.kettenbeginn(beginn, diagnose_schluessel) == beginn
 
 
 # ── Hilfsfunktion für Monatsauswertung ───────────────────────
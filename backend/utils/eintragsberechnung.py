@@ -0,0 +1,163 @@
+"""
+eintragsberechnung.py – Persistierte Berechnung je zeiterfassung-Eintrag
+
+Schreibt die Netto-Minuten aus berechne_eintrag() in die calc_*-Spalten der
+zeiterfassung, sobald ein Eintrag geschrieben wird. Das Arbeitszeitkonto
+summiert dann die gespeicherten Werte, statt jeden Eintrag neu zu rechnen.
+
+Ändern sich die Rechenregeln, wird BERECHNUNGS_VERSION (lohnberechnung) erhöht
+und ``neuberechne_eintraege`` (scripts/zeiterfassung_neuberechnen.py) ausgeführt.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from utils.anfrage_cache import lade_mitarbeiter_zeile
+from utils.lohnberechnung import BERECHNUNGS_VERSION, berechne_gespeicherte_felder
+from utils.monatsfakten import invalidiere_monatsfakten
+from utils.work_accounts import _load_dienstplan_start_map, _month_bounds
+
+
+_CALC_SPALTEN_CACHE_SECONDS = 600.0
+_calc_spalten_cache: Optional[bool] = None
+_calc_spalten_cache_ts: float = 0.0
+
+
+def calc_spalten_vorhanden(supabase) -> bool:
+    """Prüft (gecacht), ob die Migration mit den calc_*-Spalten ausgeführt wurde."""
+    global _calc_spalten_cache, _calc_spalten_cache_ts
+    now = monotonic()
+    if _calc_spalten_cache is not None and (now - _calc_spalten_cache_ts) < _CALC_SPALTEN_CACHE_SECONDS:
+        return _calc_spalten_cache
+    try:
+        supabase.table("zeiterfassung").select("calc_version").limit(0).execute()
+        _calc_spalten_cache = True
+    except Exception:
+        _calc_spalten_cache = False
+    _calc_spalten_cache_ts = now
+    return _calc_spalten_cache
+
+
+def _load_mitarbeiter(supabase, mitarbeiter_id: int) -> dict:
+    return lade_mitarbeiter_zeile(supabase, mitarbeiter_id)
+
+
+def _speichere_felder(supabase, row: dict, mitarbeiter: dict, dienstplan_start_zeit: Optional[str]) -> bool:
+    felder = berechne_gespeicherte_felder(row, mitarbeiter, dienstplan_start_zeit)
+    if felder is None:
+        return False
+    felder["calc_berechnet_am"] = datetime.now(timezone.utc).isoformat()
+    supabase.table("zeiterfassung").update(felder).eq("id", row["id"]).execute()
+    return True
+
+
+def aktualisiere_berechnung_tag(supabase, mitarbeiter_id: int, datum: date | str) -> int:
+    """
+    Berechnet alle Einträge eines Mitarbeiters an einem Tag und speichert die
+    calc_*-Spalten. Für Schreibpfade gedacht: Fehler werden geschluckt, da die
+    Monatsauswertung ohne gespeicherte Werte live rechnet.
+
+    Returns:
+        Anzahl aktualisierter Einträge
+    """
+    try:
+        if not calc_spalten_vorhanden(supabase):
+            return 0
+        tag = datum if isinstance(datum, date) else date.fromisoformat(str(datum)[:10])
+        rows = (
+            supabase.table("zeiterfassung")
+            .select("*")
+            .eq("mitarbeiter_id", mitarbeiter_id)
+            .eq("datum", tag.isoformat())
+            .execute()
+        ).data or []
+        if not rows:
+            return 0
+        mitarbeiter = _load_mitarbeiter(supabase, mitarbeiter_id)
+        start_map = _load_dienstplan_start_map(
+            supabase,
+            mitarbeiter_id=mitarbeiter_id,
+            month_start=tag,
+            month_end=tag,
+            required_days={tag.isoformat()},
+        )
+        anzahl = sum(
+            1 for row in rows
+            if _speichere_felder(supabase, row, mitarbeiter, start_map.get(tag.isoformat()))
+        )
+        invalidiere_monatsfakten(mitarbeiter_id)
+        return anzahl
+    except Exception:
+        return 0
+
+
+def neuberechne_eintraege(
+    supabase,
+    *,
+    betrieb_id: Optional[int] = None,
+    alle: bool = False,
+    seitengroesse: int = 500,
+) -> Dict[str, Any]:
+    """
+    Massen-Neuberechnung der calc_*-Spalten.
+
+    Standardmäßig nur Einträge ohne bzw. mit älterer calc_version; ``alle=True``
+    rechnet jeden Eintrag neu (z.B. nach Änderung von Stammdaten). Gelesen wird
+    seitenweise nach id, Mitarbeiter und Dienstplan-Monate werden zwischengespeichert.
+    """
+    if not calc_spalten_vorhanden(supabase):
+        raise RuntimeError("calc_*-Spalten fehlen – Migration 20261019_zeiterfassung_calc.sql ausführen.")
+
+    ma_query = supabase.table("mitarbeiter").select("*")
+    if betrieb_id is not None:
+        ma_query = ma_query.eq("betrieb_id", betrieb_id)
+    mitarbeiter_map = {m["id"]: m for m in (ma_query.execute().data or [])}
+    if not mitarbeiter_map:
+        return {"version": BERECHNUNGS_VERSION, "geprueft": 0, "aktualisiert": 0, "fehler": 0}
+
+    start_maps: Dict[tuple, dict] = {}
+    geprueft = aktualisiert = fehler = 0
+    letzte_id = 0
+    while True:
+        query = (
+            supabase.table("zeiterfassung")
+            .select("*")
+            .in_("mitarbeiter_id", list(mitarbeiter_map))
+            .gt("id", letzte_id)
+        )
+        if not alle:
+            query = query.or_(f"calc_version.is.null,calc_version.lt.{BERECHNUNGS_VERSION}")
+        seite = query.order("id").limit(seitengroesse).execute().data or []
+
+        for row in seite:
+            geprueft += 1
+            try:
+                tag = date.fromisoformat(str(row.get("datum"))[:10])
+                key = (row["mitarbeiter_id"], tag.year, tag.month)
+                if key not in start_maps:
+                    month_start, month_end = _month_bounds(tag.month, tag.year)
+                    start_maps[key] = _load_dienstplan_start_map(
+                        supabase,
+                        mitarbeiter_id=row["mitarbeiter_id"],
+                        month_start=month_start,
+                        month_end=month_end,
+                    )
+                if _speichere_felder(
+                    supabase,
+                    row,
+                    mitarbeiter_map[row["mitarbeiter_id"]],
+                    start_maps[key].get(tag.isoformat()),
+                ):
+                    aktualisiert += 1
+            except Exception:
+                fehler += 1
+
+        if len(seite) < seitengroesse:
+            break
+        letzte_id = seite[-1]["id"]
+
+    invalidiere_monatsfakten()
+    return {"version": BERECHNUNGS_VERSION, "geprueft": geprueft, "aktualisiert": aktualisiert, "fehler": fehler}
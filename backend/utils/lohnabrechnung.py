@@ -1,23 +1,17 @@
 """
 Lohnabrechnung und PDF-Export
 """
-from datetime import datetime, date, timedelta
-from utils.calculations import parse_zeit
-from typing import Dict, Any, List, Optional
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import io
+import os
+import threading
+import zipfile
 
 from utils.database import get_supabase_client
-from utils.planning_tables import resolve_planning_table
+from utils.monatsfakten import lade_monatsfakten
 from utils.calculations import (
-    berechne_arbeitsstunden,
     berechne_grundlohn,
     berechne_sonntagszuschlag,
     berechne_feiertagszuschlag,
@@ -42,33 +36,16 @@ def berechne_arbeitszeitkonto(mitarbeiter_id: str, monat: int, jahr: int) -> Opt
     """
     try:
         supabase = get_supabase_client()
-        planning_table = resolve_planning_table(supabase)
         
-        # Lade Mitarbeiterdaten
-        mitarbeiter_response = supabase.table('mitarbeiter').select('*').eq('id', mitarbeiter_id).execute()
-        if not mitarbeiter_response.data:
+        # Mitarbeiter, Zeiterfassung und Dienstplan aus dem gemeinsamen Monatsabruf
+        # (frisch, da das Arbeitszeitkonto anschließend gespeichert wird)
+        fakten = lade_monatsfakten(mitarbeiter_id, monat, jahr, supabase=supabase, frisch=True)
+        mitarbeiter = fakten.mitarbeiter
+        if not mitarbeiter:
             return None
         
-        mitarbeiter = mitarbeiter_response.data[0]
-        
-        # Lade Zeiterfassungen für den Monat
-        von_datum = date(jahr, monat, 1)
-        
-        # Letzter Tag des Monats
-        if monat == 12:
-            bis_datum = date(jahr + 1, 1, 1)
-        else:
-            bis_datum = date(jahr, monat + 1, 1)
-        
-        zeiterfassungen = supabase.table('zeiterfassung').select('*').eq(
-            'mitarbeiter_id', mitarbeiter_id
-        ).gte('datum', von_datum.isoformat()).lt('datum', bis_datum.isoformat()).execute()
-        
-        # Lade Dienstpläne für Urlaubstage und Frei-Tage
-        # Nur schichttyp-Feld verwenden (ist_urlaub-Spalte in schichtvorlagen ggf. nicht vorhanden)
-        dienstplaene = supabase.table(planning_table).select('*').eq(
-            'mitarbeiter_id', mitarbeiter_id
-        ).gte('datum', von_datum.isoformat()).lt('datum', bis_datum.isoformat()).execute()
+        von_datum = fakten.von
+        bis_datum = fakten.bis + timedelta(days=1)
         
         # Berechne Stunden pro Urlaubstag (Soll-Stunden / Arbeitstage)
         # 5-Tage-Woche (Mi-So) = ca. 21,65 Arbeitstage pro Monat
@@ -80,41 +57,28 @@ def berechne_arbeitszeitkonto(mitarbeiter_id: str, monat: int, jahr: int) -> Opt
         sonntagsstunden = 0
         feiertagsstunden = 0
         
-        for z in zeiterfassungen.data:
-            if z['ende_zeit']:
-                # Import-/Abwesenheitszeilen mit 00:00 -> 00:00 wurden historisch als
-                # Marker genutzt und dürfen nicht als 24h-Schicht gewertet werden.
-                if (
-                    str(z.get('start_zeit') or '')[:8] == '00:00:00'
-                    and str(z.get('ende_zeit') or '')[:8] == '00:00:00'
-                ):
-                    continue
-                # Konvertiere zu time-Objekten für berechne_arbeitsstunden
-                start_time, _ = parse_zeit(z['start_zeit'])
-                ende_time, naechster_tag = parse_zeit(z['ende_zeit'])
-                
-                stunden = berechne_arbeitsstunden(
-                    start_time,
-                    ende_time,
-                    z['pause_minuten'],
-                    naechster_tag=naechster_tag
-                )
-                
-                ist_stunden += stunden
-                
-                # Zuschlagsstunden
-                if z['ist_sonntag'] and mitarbeiter['sonntagszuschlag_aktiv']:
-                    sonntagsstunden += stunden
-                
-                if z['ist_feiertag'] and mitarbeiter['feiertagszuschlag_aktiv']:
-                    feiertagsstunden += stunden
+        for posten in fakten.posten:
+            # Import-/Abwesenheitszeilen mit 00:00 -> 00:00 wurden historisch als
+            # Marker genutzt und dürfen nicht als 24h-Schicht gewertet werden.
+            if not posten.hat_zeiten:
+                continue
+            
+            stunden = posten.stunden
+            ist_stunden += stunden
+            
+            # Zuschlagsstunden
+            if posten.ist_sonntag and mitarbeiter.get('sonntagszuschlag_aktiv'):
+                sonntagsstunden += stunden
+            
+            if posten.ist_feiertag and mitarbeiter.get('feiertagszuschlag_aktiv'):
+                feiertagsstunden += stunden
         
         # Zähle Urlaubstage aus Dienstplan und addiere Stunden
         # Priorität: neues schichttyp-Feld > altes schichtvorlage.ist_urlaub
         urlaubstage_aus_dienstplan = 0
         urlaubsstunden_gesamt = 0.0
-        if dienstplaene.data:
-            for dienst in dienstplaene.data:
+        if fakten.dienstplan:
+            for dienst in fakten.dienstplan:
                 typ = dienst.get('schichttyp', 'arbeit')
                 
                 if typ == 'frei':
@@ -246,13 +210,11 @@ def erstelle_lohnabrechnung(mitarbeiter_id: str, monat: int, jahr: int) -> Optio
         if not arbeitszeitkonto:
             return None
         
-        # Lade Mitarbeiterdaten
-        mitarbeiter_response = supabase.table('mitarbeiter').select('*').eq('id', mitarbeiter_id).execute()
-        if not mitarbeiter_response.data:
+        # Mitarbeiterdaten (bereits von berechne_arbeitszeitkonto geladen)
+        mitarbeiter = lade_monatsfakten(mitarbeiter_id, monat, jahr, supabase=supabase).mitarbeiter
+        if not mitarbeiter:
             return None
         
-        mitarbeiter = mitarbeiter_response.data[0]
-        
         # Berechne Stundenwert aus Monatsbrutto und Sollstunden
         monatsbrutto = float(mitarbeiter.get('monatliche_brutto_verguetung') or 0.0)
         soll_stunden = float(mitarbeiter.get('monatliche_soll_stunden') or 0.0)
@@ -321,6 +283,9 @@ def erstelle_lohnabrechnung(mitarbeiter_id: str, monat: int, jahr: int) -> Optio
         return None
 
 
+_PDF_SELECT = '*, mitarbeiter(*), arbeitszeitkonto(*)'
+
+
 def generiere_lohnabrechnung_pdf(lohnabrechnung_id: str) -> Optional[bytes]:
     """
     Generiert ein PDF für eine Lohnabrechnung
@@ -336,183 +301,329 @@ def generiere_lohnabrechnung_pdf(lohnabrechnung_id: str) -> Optional[bytes]:
         
         # Lade Lohnabrechnung mit allen Daten
         lohnabrechnung_response = supabase.table('lohnabrechnungen').select(
-            '*, mitarbeiter(*), arbeitszeitkonto(*)'
+            _PDF_SELECT
         ).eq('id', lohnabrechnung_id).execute()
         
         if not lohnabrechnung_response.data:
             return None
         
-        lohnabrechnung = lohnabrechnung_response.data[0]
-        mitarbeiter = lohnabrechnung['mitarbeiter']
-        arbeitszeitkonto = lohnabrechnung['arbeitszeitkonto']
-        
-        # Erstelle PDF in Memory
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1f77b4'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#1f77b4'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        
-        normal_style = styles['Normal']
-        
-        # Story (Inhalt)
-        story = []
-        
-        # Titel
-        story.append(Paragraph("Entgeltaufstellung", title_style))
-        story.append(Spacer(1, 0.5*cm))
-        
-        # Zeitraum
-        monat_name = get_monatsnamen(lohnabrechnung['monat'])
-        story.append(Paragraph(
-            f"<b>Abrechnungszeitraum:</b> {monat_name} {lohnabrechnung['jahr']}",
-            normal_style
-        ))
-        story.append(Spacer(1, 0.5*cm))
-        
-        # Mitarbeiterdaten
-        story.append(Paragraph("Mitarbeiterdaten", heading_style))
-        
-        mitarbeiter_data = [
-            ['Personalnummer:', mitarbeiter['personalnummer']],
-            ['Name:', f"{mitarbeiter['vorname']} {mitarbeiter['nachname']}"],
-            ['Geburtsdatum:', mitarbeiter['geburtsdatum']],
-            ['Adresse:', f"{mitarbeiter['strasse']}, {mitarbeiter['plz']} {mitarbeiter['ort']}"]
-        ]
-        
-        mitarbeiter_table = Table(mitarbeiter_data, colWidths=[5*cm, 10*cm])
-        mitarbeiter_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        story.append(mitarbeiter_table)
-        story.append(Spacer(1, 0.5*cm))
-        
-        # Arbeitszeitkonto
-        story.append(Paragraph("Arbeitszeitkonto", heading_style))
-        
-        arbeitszeitkonto_data = [
-            ['Soll-Stunden:', format_stunden(arbeitszeitkonto['soll_stunden'])],
-            ['Ist-Stunden:', format_stunden(arbeitszeitkonto['ist_stunden'])],
-            ['Differenz:', format_stunden(abs(arbeitszeitkonto['differenz_stunden'])) + 
-             (' (Plus)' if arbeitszeitkonto['differenz_stunden'] >= 0 else ' (Minus)')],
-            ['Urlaubstage genommen:', f"{arbeitszeitkonto['urlaubstage_genommen']} Tage"]
-        ]
-        
-        if arbeitszeitkonto['sonntagsstunden'] > 0:
-            arbeitszeitkonto_data.append(['Sonntagsstunden:', format_stunden(arbeitszeitkonto['sonntagsstunden'])])
-        
-        if arbeitszeitkonto['feiertagsstunden'] > 0:
-            arbeitszeitkonto_data.append(['Feiertagsstunden:', format_stunden(arbeitszeitkonto['feiertagsstunden'])])
-        
-        arbeitszeitkonto_table = Table(arbeitszeitkonto_data, colWidths=[5*cm, 10*cm])
-        arbeitszeitkonto_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        story.append(arbeitszeitkonto_table)
-        story.append(Spacer(1, 0.5*cm))
-        
-        # Lohnberechnung
-        story.append(Paragraph("Lohnberechnung (Brutto)", heading_style))
-        
-        lohn_data = [
-            ['Beschreibung', 'Betrag'],
-            ['Grundlohn', format_waehrung(lohnabrechnung['grundlohn'])],
-        ]
-        
-        if lohnabrechnung['sonntagszuschlag'] > 0:
-            lohn_data.append(['Sonntagszuschlag (50%)', format_waehrung(lohnabrechnung['sonntagszuschlag'])])
-        
-        if lohnabrechnung['feiertagszuschlag'] > 0:
-            lohn_data.append(['Feiertagszuschlag (100%)', format_waehrung(lohnabrechnung['feiertagszuschlag'])])
-        
-        lohn_data.append(['', ''])  # Leerzeile
-        lohn_data.append(['Gesamtbetrag (Brutto)', format_waehrung(lohnabrechnung['gesamtbetrag'])])
-        
-        lohn_table = Table(lohn_data, colWidths=[10*cm, 5*cm])
-        lohn_table.setStyle(TableStyle([
-            # Header
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-            
-            # Body
-            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -2), 10),
-            ('ALIGN', (1, 1), (1, -2), 'RIGHT'),
-            ('BOTTOMPADDING', (0, 1), (-1, -2), 6),
-            
-            # Gesamtbetrag
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 12),
-            ('ALIGN', (1, -1), (1, -1), 'RIGHT'),
-            ('LINEABOVE', (0, -1), (-1, -1), 2, colors.HexColor('#1f77b4')),
-            ('TOPPADDING', (0, -1), (-1, -1), 10),
-            
-            # Grid
-            ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),
-        ]))
-        
-        story.append(lohn_table)
-        story.append(Spacer(1, 1*cm))
-        
-        # Hinweise
-        story.append(Paragraph("Hinweise", heading_style))
-        story.append(Paragraph(
-            "Diese Entgeltaufstellung dient als Nachweis der geleisteten Arbeitsstunden und "
-            "der daraus resultierenden Vergütung gemäß Arbeitsvertrag. Die Zeiterfassung erfolgt "
-            "nach den Vorgaben des EuGH-Urteils zur Arbeitszeiterfassung.",
-            normal_style
-        ))
-        story.append(Spacer(1, 0.5*cm))
-        story.append(Paragraph(
-            f"<i>Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M')}</i>",
-            normal_style
-        ))
-        
-        # Generiere PDF
-        doc.build(story)
-        
-        # Hole PDF-Bytes
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        
-        return pdf_bytes
+        return render_lohnabrechnung_pdf(lohnabrechnung_response.data[0])
     
     except Exception as e:
         print(f"Fehler beim Generieren des PDFs: {str(e)}")
         return None
 
 
+def generate_lohnabrechnung_pdf(mitarbeiter_id: int, monat: int, jahr: int) -> bytes:
+    """
+    PDF der gespeicherten Lohnabrechnung eines Mitarbeiters für einen Monat.
+
+    Raises:
+        LookupError: wenn für den Monat keine gespeicherte Abrechnung existiert
+    """
+    supabase = get_supabase_client()
+    res = supabase.table('lohnabrechnungen').select(_PDF_SELECT).eq(
+        'mitarbeiter_id', mitarbeiter_id
+    ).eq('monat', monat).eq('jahr', jahr).limit(1).execute()
+    if not res.data:
+        raise LookupError(f"Keine gespeicherte Lohnabrechnung für {monat:02d}/{jahr}.")
+    return render_lohnabrechnung_pdf(res.data[0])
+
+
+def render_lohnabrechnung_pdf(lohnabrechnung: Dict[str, Any]) -> bytes:
+    """
+    Rendert das PDF aus einer bereits geladenen Lohnabrechnung
+    (inkl. eingebettetem ``mitarbeiter`` und ``arbeitszeitkonto``).
+
+    Reine CPU-Arbeit ohne DB-Zugriff – daher auch im Prozess-Pool nutzbar.
+    """
+    # reportlab erst hier laden: Datenpfade dieses Moduls brauchen es nicht (Kaltstart).
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    mitarbeiter = lohnabrechnung['mitarbeiter']
+    arbeitszeitkonto = lohnabrechnung['arbeitszeitkonto']
+    
+    # Erstelle PDF in Memory
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1f77b4'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#1f77b4'),
+        spaceAfter=12,
+        spaceBefore=12
+    )
+    
+    normal_style = styles['Normal']
+    
+    # Story (Inhalt)
+    story = []
+    
+    # Titel
+    story.append(Paragraph("Entgeltaufstellung", title_style))
+    story.append(Spacer(1, 0.5*cm))
+    
+    # Zeitraum
+    monat_name = get_monatsnamen(lohnabrechnung['monat'])
+    story.append(Paragraph(
+        f"<b>Abrechnungszeitraum:</b> {monat_name} {lohnabrechnung['jahr']}",
+        normal_style
+    ))
+    story.append(Spacer(1, 0.5*cm))
+    
+    # Mitarbeiterdaten
+    story.append(Paragraph("Mitarbeiterdaten", heading_style))
+    
+    mitarbeiter_data = [
+        ['Personalnummer:', mitarbeiter['personalnummer']],
+        ['Name:', f"{mitarbeiter['vorname']} {mitarbeiter['nachname']}"],
+        ['Geburtsdatum:', mitarbeiter['geburtsdatum']],
+        ['Adresse:', f"{mitarbeiter['strasse']}, {mitarbeiter['plz']} {mitarbeiter['ort']}"]
+    ]
+    
+    mitarbeiter_table = Table(mitarbeiter_data, colWidths=[5*cm, 10*cm])
+    mitarbeiter_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    
+    story.append(mitarbeiter_table)
+    story.append(Spacer(1, 0.5*cm))
+    
+    # Arbeitszeitkonto
+    story.append(Paragraph("Arbeitszeitkonto", heading_style))
+    
+    arbeitszeitkonto_data = [
+        ['Soll-Stunden:', format_stunden(arbeitszeitkonto['soll_stunden'])],
+        ['Ist-Stunden:', format_stunden(arbeitszeitkonto['ist_stunden'])],
+        ['Differenz:', format_stunden(abs(arbeitszeitkonto['differenz_stunden'])) + 
+         (' (Plus)' if arbeitszeitkonto['differenz_stunden'] >= 0 else ' (Minus)')],
+        ['Urlaubstage genommen:', f"{arbeitszeitkonto['urlaubstage_genommen']} Tage"]
+    ]
+    
+    if arbeitszeitkonto['sonntagsstunden'] > 0:
+        arbeitszeitkonto_data.append(['Sonntagsstunden:', format_stunden(arbeitszeitkonto['sonntagsstunden'])])
+    
+    if arbeitszeitkonto['feiertagsstunden'] > 0:
+        arbeitszeitkonto_data.append(['Feiertagsstunden:', format_stunden(arbeitszeitkonto['feiertagsstunden'])])
+    
+    # Nachtstunden stehen nur in der Abrechnung (Migration 20261019_nachtzuschlag.sql)
+    if float(lohnabrechnung.get('nachtstunden') or 0) > 0:
+        arbeitszeitkonto_data.append(['Nachtstunden:', format_stunden(float(lohnabrechnung['nachtstunden']))])
+    
+    arbeitszeitkonto_table = Table(arbeitszeitkonto_data, colWidths=[5*cm, 10*cm])
+    arbeitszeitkonto_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    
+    story.append(arbeitszeitkonto_table)
+    story.append(Spacer(1, 0.5*cm))
+    
+    # Lohnberechnung
+    story.append(Paragraph("Lohnberechnung (Brutto)", heading_style))
+    
+    lohn_data = [
+        ['Beschreibung', 'Betrag'],
+        ['Grundlohn', format_waehrung(lohnabrechnung['grundlohn'])],
+    ]
+    
+    if lohnabrechnung['sonntagszuschlag'] > 0:
+        lohn_data.append(['Sonntagszuschlag (50%)', format_waehrung(lohnabrechnung['sonntagszuschlag'])])
+    
+    if lohnabrechnung['feiertagszuschlag'] > 0:
+        lohn_data.append(['Feiertagszuschlag (100%)', format_waehrung(lohnabrechnung['feiertagszuschlag'])])
+    
+    if float(lohnabrechnung.get('nachtzuschlag') or 0) > 0:
+        lohn_data.append(['Nachtzuschlag (25%)', format_waehrung(float(lohnabrechnung['nachtzuschlag']))])
+    
+    lohn_data.append(['', ''])  # Leerzeile
+    lohn_data.append(['Gesamtbetrag (Brutto)', format_waehrung(lohnabrechnung.get('gesamtbetrag', lohnabrechnung.get('gesamtbrutto') or 0))])
+    
+    lohn_table = Table(lohn_data, colWidths=[10*cm, 5*cm])
+    lohn_table.setStyle(TableStyle([
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+        
+        # Body
+        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -2), 10),
+        ('ALIGN', (1, 1), (1, -2), 'RIGHT'),
+        ('BOTTOMPADDING', (0, 1), (-1, -2), 6),
+        
+        # Gesamtbetrag
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 12),
+        ('ALIGN', (1, -1), (1, -1), 'RIGHT'),
+        ('LINEABOVE', (0, -1), (-1, -1), 2, colors.HexColor('#1f77b4')),
+        ('TOPPADDING', (0, -1), (-1, -1), 10),
+        
+        # Grid
+        ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),
+    ]))
+    
+    story.append(lohn_table)
+    story.append(Spacer(1, 1*cm))
+    
+    # Hinweise
+    story.append(Paragraph("Hinweise", heading_style))
+    story.append(Paragraph(
+        "Diese Entgeltaufstellung dient als Nachweis der geleisteten Arbeitsstunden und "
+        "der daraus resultierenden Vergütung gemäß Arbeitsvertrag. Die Zeiterfassung erfolgt "
+        "nach den Vorgaben des EuGH-Urteils zur Arbeitszeiterfassung.",
+        normal_style
+    ))
+    story.append(Spacer(1, 0.5*cm))
+    story.append(Paragraph(
+        f"<i>Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M')}</i>",
+        normal_style
+    ))
+    
+    # Generiere PDF
+    doc.build(story)
+    
+    # Hole PDF-Bytes
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    
+    return pdf_bytes
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SAMMEL-DOWNLOAD: alle Abrechnungen eines Monats als ZIP
+# ─────────────────────────────────────────────────────────────────────────────
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _pdf_pool_workers() -> int:
+    try:
+        konfiguriert = int(os.getenv("LOHN_PDF_WORKERS", "0"))
+    except ValueError:
+        konfiguriert = 0
+    return konfiguriert if konfiguriert > 0 else max(1, min(4, os.cpu_count() or 1))
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Prozess-Pool für das PDF-Rendering (Modul-Singleton, lazy)."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=_pdf_pool_workers())
+        return _pdf_pool
+
+
+def lohnabrechnung_dateiname(lohnabrechnung: Dict[str, Any]) -> str:
+    return (
+        f"lohnabrechnung_{lohnabrechnung['mitarbeiter_id']}_"
+        f"{lohnabrechnung['jahr']}_{int(lohnabrechnung['monat']):02d}.pdf"
+    )
+
+
+def lade_lohnabrechnungen_monat(supabase, mitarbeiter_ids: List[int], monat: int, jahr: int) -> List[Dict[str, Any]]:
+    """Alle gespeicherten Abrechnungen eines Monats in einer Abfrage (inkl. PDF-Stammdaten)."""
+    if not mitarbeiter_ids:
+        return []
+    res = supabase.table('lohnabrechnungen').select(_PDF_SELECT).in_(
+        'mitarbeiter_id', mitarbeiter_ids
+    ).eq('monat', monat).eq('jahr', jahr).execute()
+    return res.data or []
+
+
+class _ZipStreamPuffer(io.RawIOBase):
+    """Nicht-seekbarer Schreibpuffer: zipfile schreibt hinein, der Generator leert ihn."""
+
+    def __init__(self) -> None:
+        self._teile: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, daten) -> int:
+        self._teile.append(bytes(daten))
+        self._position += len(daten)
+        return len(daten)
+
+    def tell(self) -> int:
+        return self._position
+
+    def leeren(self) -> bytes:
+        daten = b"".join(self._teile)
+        self._teile = []
+        return daten
+
+
+def iter_lohnabrechnungen_zip(abrechnungen: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Rendert alle Abrechnungen parallel im Prozess-Pool und streamt das ZIP.
+
+    Jedes PDF wird in das Archiv geschrieben, sobald es fertig ist, und der
+    Puffer direkt als Chunk ausgegeben. Es sind höchstens 2 × Worker-Anzahl
+    Aufträge gleichzeitig offen – der Speicherbedarf bleibt bei wenigen PDFs.
+    Fehlgeschlagene Abrechnungen landen in ``FEHLER.txt`` im Archiv.
+    """
+    pool = _get_pdf_pool()
+    fenster = 2 * _pdf_pool_workers()
+    puffer = _ZipStreamPuffer()
+    fehler: List[str] = []
+    offen: Dict[Any, Dict[str, Any]] = {}
+    ausstehend = iter(abrechnungen)
+
+    with zipfile.ZipFile(puffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archiv:
+        while True:
+            for abrechnung in ausstehend:
+                offen[pool.submit(render_lohnabrechnung_pdf, abrechnung)] = abrechnung
+                if len(offen) >= fenster:
+                    break
+            if not offen:
+                break
+            fertig, _ = wait(list(offen), return_when=FIRST_COMPLETED)
+            for future in fertig:
+                abrechnung = offen.pop(future)
+                try:
+                    archiv.writestr(lohnabrechnung_dateiname(abrechnung), future.result())
+                except Exception as e:
+                    fehler.append(f"{lohnabrechnung_dateiname(abrechnung)}: {e}")
+            yield puffer.leeren()
+
+        if fehler:
+            archiv.writestr("FEHLER.txt", "\n".join(fehler))
+    yield puffer.leeren()
+
+
 def speichere_lohnabrechnung_pdf(lohnabrechnung_id: str) -> Optional[str]:
     """
     Generiert und speichert ein Lohnabrechnung-PDF in Supabase Storage
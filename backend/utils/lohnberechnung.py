@@ -4,7 +4,7 @@ lohnberechnung.py – Vollständige Lohnberechnungs-Engine
 
 Implementiert:
   1. Netto-Arbeitszeit-Berechnung mit automatischem Pausenabzug (§ 4 ArbZG)
-  2. Zuschlags-Matrix: Sonntag (+50%), Feiertag (+100%), Nacht (23–06 Uhr)
+  2. Zuschlags-Matrix: Sonntag (+50%), Feiertag (+100%), Nacht (+25%, 23–06 Uhr)
   3. Feiertagskalender Sachsen (inkl. Buß- und Bettag)
   4. Korrekte Behandlung von Nachtschichten über Mitternacht
   5. Splitting bei Schichten, die mehrere Zuschlags-Perioden überspannen
@@ -16,11 +16,11 @@ Bundesland: Sachsen (SN) – Besonderheit: Buß- und Bettag ist gesetzlicher Fei
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from bisect import bisect_right
+from dataclasses import dataclass, replace
 from datetime import date, datetime, time, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Iterable
 import calendar
-import holidays
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,7 +35,11 @@ BUNDESLAND = "SN"  # Sachsen
 # Zuschlagssätze (auf den Basisstundenlohn)
 SONNTAG_FAKTOR = 0.50   # +50%
 FEIERTAG_FAKTOR = 1.00  # +100%
-NACHT_FAKTOR = 0.25     # +25% (23:00–06:00 Uhr) – optional, aktuell nicht aktiv
+NACHT_FAKTOR = 0.25     # +25% (23:00–06:00 Uhr) – nur wenn nachtzuschlag_aktiv
+
+# Nachtzeitraum (volle Stunden, lokale Zeit)
+NACHT_BEGINN_STUNDE = 23
+NACHT_ENDE_STUNDE = 6
 
 # Gesetzliche Pausenregeln (§ 4 ArbZG)
 PAUSE_REGELN = [
@@ -45,6 +49,16 @@ PAUSE_REGELN = [
 ]
 
 
+@dataclass(frozen=True)
+class ZuschlagsIntervall:
+    """Halboffenes Intervall [start, ende) mit einheitlicher Zuschlagslage."""
+    start: datetime
+    ende: datetime
+    tagesart: str  # "normal" | "sonntag" | "feiertag" | "feiertag_sonntag"
+    nacht: bool
+    feiertag_name: str = ""
+
+
 @dataclass(frozen=True)
 class DienstplanSummary:
     geplant: int
@@ -71,6 +85,8 @@ def get_feiertage_sachsen(jahr: int) -> Dict[date, str]:
 
     feiertage: Dict[date, str] = {}
     try:
+        import holidays  # lazy: schwerer Import, nur für die Feiertagsberechnung
+
         de_holidays = holidays.Germany(years=jahr, subdiv="SN")
         for d, name in de_holidays.items():
             feiertage[d] = name
@@ -281,7 +297,127 @@ def _parse_zeit_zu_datetime(zeit_str: str, datum: date) -> datetime:
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# ZUSCHLAGS-MATRIX (Splitting über Tagesgrenzen)
+# ZUSCHLAGS-INTERVALLE (vorberechnet je Jahr)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_zuschlags_intervalle_cache: Dict[int, Tuple[List[datetime], List[ZuschlagsIntervall]]] = {}
+
+
+def _tagesart(datum: date) -> Tuple[str, str]:
+    """
+    Zuschlagsrelevante Tagesart nach der dokumentierten Rangfolge:
+    Feiertag auf Sonntag → Feiertag (100%) vor Sonntag (50%).
+    Feiertage an Ruhetagen (Mo/Di) zählen nicht (siehe ist_feiertag_sachsen).
+    """
+    ist_so = ist_sonntag(datum)
+    ist_ft, ft_name = ist_feiertag_sachsen(datum)
+    if ist_ft and ist_so:
+        return "feiertag_sonntag", ft_name
+    if ist_ft:
+        return "feiertag", ft_name
+    if ist_so:
+        return "sonntag", ""
+    return "normal", ""
+
+
+def get_zuschlags_intervalle(jahr: int) -> Tuple[List[datetime], List[ZuschlagsIntervall]]:
+    """
+    Liefert die lückenlose, sortierte Zuschlags-Intervallliste eines Jahres
+    (01.01. 00:00 bis 01.01. des Folgejahres 00:00) plus die Startzeitpunkte
+    für die binäre Suche.
+
+    Grenzen liegen nur an Tageswechseln und am Nachtbeginn/-ende; benachbarte
+    Intervalle mit identischer Zuschlagslage werden zusammengefasst
+    (z. B. Mi 23:00 – Do 06:00). Ergebnis wird im Modulscope gecacht.
+    """
+    if jahr in _zuschlags_intervalle_cache:
+        return _zuschlags_intervalle_cache[jahr]
+
+    intervalle: List[ZuschlagsIntervall] = []
+    tag = date(jahr, 1, 1)
+    while tag.year == jahr:
+        art, ft_name = _tagesart(tag)
+        basis = datetime.combine(tag, time(0, 0, 0))
+        for von_h, bis_h, nacht in (
+            (0, NACHT_ENDE_STUNDE, True),
+            (NACHT_ENDE_STUNDE, NACHT_BEGINN_STUNDE, False),
+            (NACHT_BEGINN_STUNDE, 24, True),
+        ):
+            start = basis + timedelta(hours=von_h)
+            ende = basis + timedelta(hours=bis_h)
+            letztes = intervalle[-1] if intervalle else None
+            if (
+                letztes is not None
+                and letztes.ende == start
+                and letztes.tagesart == art
+                and letztes.nacht == nacht
+                and letztes.feiertag_name == ft_name
+            ):
+                intervalle[-1] = replace(letztes, ende=ende)
+            else:
+                intervalle.append(ZuschlagsIntervall(start, ende, art, nacht, ft_name))
+        tag += timedelta(days=1)
+
+    ergebnis = ([iv.start for iv in intervalle], intervalle)
+    _zuschlags_intervalle_cache[jahr] = ergebnis
+    return ergebnis
+
+
+def _berechne_zuschlags_segmente(
+    start_dt: datetime, ende_dt: datetime
+) -> List[Tuple[datetime, datetime, ZuschlagsIntervall]]:
+    """
+    Schneidet eine Schicht mit den vorberechneten Zuschlags-Intervallen.
+
+    Einstieg per binärer Suche, danach nur so viele Schritte wie Intervallgrenzen
+    in der Schicht liegen – unabhängig von der Schichtlänge in Stunden/Minuten.
+
+    Beispiel: So 22:00 → Mo 06:00
+    → [(So 22:00, So 23:00, Sonntag), (So 23:00, Mo 00:00, Sonntag+Nacht),
+       (Mo 00:00, Mo 06:00, Nacht)]
+    """
+    segmente: List[Tuple[datetime, datetime, ZuschlagsIntervall]] = []
+    aktuell = start_dt
+    while aktuell < ende_dt:
+        starts, intervalle = get_zuschlags_intervalle(aktuell.year)
+        idx = bisect_right(starts, aktuell) - 1
+        while idx < len(intervalle) and aktuell < ende_dt:
+            intervall = intervalle[idx]
+            segment_ende = min(intervall.ende, ende_dt)
+            segmente.append((aktuell, segment_ende, intervall))
+            aktuell = segment_ende
+            idx += 1
+    return segmente
+
+
+def zerlege_schicht_in_zuschlagsstunden(start_dt: datetime, ende_dt: datetime) -> Dict[str, float]:
+    """
+    Brutto-Stunden einer Schicht je Zuschlagskategorie (ohne Pausenanteil).
+
+    Returns:
+        {'sonntags_stunden', 'feiertags_stunden', 'sonntag_auf_feiertag_stunden', 'nacht_stunden'}
+    """
+    stunden = {
+        "sonntags_stunden": 0.0,
+        "feiertags_stunden": 0.0,
+        "sonntag_auf_feiertag_stunden": 0.0,
+        "nacht_stunden": 0.0,
+    }
+    for segment_start, segment_ende, intervall in _berechne_zuschlags_segmente(start_dt, ende_dt):
+        segment_h = (segment_ende - segment_start).total_seconds() / 3600.0
+        if intervall.tagesart == "feiertag_sonntag":
+            stunden["sonntag_auf_feiertag_stunden"] += segment_h
+        elif intervall.tagesart == "feiertag":
+            stunden["feiertags_stunden"] += segment_h
+        elif intervall.tagesart == "sonntag":
+            stunden["sonntags_stunden"] += segment_h
+        if intervall.nacht:
+            stunden["nacht_stunden"] += segment_h
+    return stunden
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ZUSCHLAGS-MATRIX (Splitting an Zuschlags-Intervallgrenzen)
 # ─────────────────────────────────────────────────────────────────────────────
 
 def berechne_zuschlaege_mit_splitting(
@@ -293,76 +429,81 @@ def berechne_zuschlaege_mit_splitting(
     netto_faktor: float = 1.0
 ) -> Dict[str, float]:
     """
-    Berechnet Zuschläge mit korrektem Splitting über Tages- und Stundengrenzen.
+    Berechnet Zuschläge mit korrektem Splitting über Tages- und Nachtgrenzen.
 
-    Jede Stunde der Schicht wird gegen die Zuschlags-Matrix geprüft:
+    Die Schicht wird mit den vorberechneten Zuschlags-Intervallen geschnitten
+    (siehe get_zuschlags_intervalle):
     - Sonntag 00:00–24:00: +50% (wenn sonntagszuschlag_aktiv)
     - Feiertag 00:00–24:00: +100% (wenn feiertagszuschlag_aktiv)
     - Feiertag auf Sonntag: 100% (höhere Regel, keine Addition)
+    - Nacht 23:00–06:00: +25% (wenn nachtzuschlag_aktiv), zusätzlich zum
+      Sonntags-/Feiertagszuschlag, da unabhängig von der Tagesart
 
     Splitting-Beispiel: Schicht So 22:00 – Mo 06:00
-    → 22:00–24:00 = 2 Std Sonntag (50%)
-    → 00:00–06:00 = 6 Std Montag (0%, Ruhetag)
+    → 22:00–23:00 = 1 Std Sonntag (50%)
+    → 23:00–00:00 = 1 Std Sonntag (50%) + Nacht (25%)
+    → 00:00–06:00 = 6 Std Montag (Ruhetag) + Nacht (25%)
 
     Returns:
         {
             'sonntags_stunden': float,
             'feiertags_stunden': float,
             'sonntag_auf_feiertag_stunden': float,
+            'nacht_stunden': float,
             'sonntagszuschlag': float,
             'feiertagszuschlag': float,
+            'nachtzuschlag': float,
             'gesamt_zuschlag': float,
         }
     """
     sonntags_h = 0.0
     feiertags_h = 0.0
     sonntag_feiertag_h = 0.0  # Feiertag der auf Sonntag fällt
+    nacht_h = 0.0
 
     sonntagszuschlag_aktiv = mitarbeiter.get("sonntagszuschlag_aktiv", False)
     feiertagszuschlag_aktiv = mitarbeiter.get("feiertagszuschlag_aktiv", False)
+    nachtzuschlag_aktiv = mitarbeiter.get("nachtzuschlag_aktiv", False)
 
-    # Schicht in 1-Minuten-Intervalle aufteilen für exaktes Splitting
-    # (Optimierung: Tagesgrenzen als Splitting-Punkte nutzen)
-    splitting_punkte = _berechne_splitting_punkte(start_dt, ende_dt)
-
-    for segment_start, segment_ende in splitting_punkte:
-        segment_datum = segment_start.date()
+    for segment_start, segment_ende, intervall in _berechne_zuschlags_segmente(start_dt, ende_dt):
         segment_h_brutto = (segment_ende - segment_start).total_seconds() / 3600.0
         # Netto-Anteil: proportional zur Gesamtschicht (Pausen gleichmäßig verteilt)
         segment_h = segment_h_brutto * netto_faktor
+        zeitraum = f"{segment_start.strftime('%d.%m. %H:%M')}–{segment_ende.strftime('%H:%M')}"
+        nacht_label = " + Nacht → 25% Nachtzuschlag" if intervall.nacht else ""
 
-        ist_so = ist_sonntag(segment_datum)
-        ist_ft, ft_name = ist_feiertag_sachsen(segment_datum)
+        if intervall.nacht:
+            nacht_h += segment_h
 
-        if ist_ft and ist_so:
+        if intervall.tagesart == "feiertag_sonntag":
             # Feiertag auf Sonntag → höhere Regel (100%)
             sonntag_feiertag_h += segment_h
             audit_log.append(
-                f"  Segment {segment_start.strftime('%d.%m. %H:%M')}–{segment_ende.strftime('%H:%M')}: "
-                f"{segment_h:.2f} Std | Feiertag+Sonntag ({ft_name}) → 100% Zuschlag"
+                f"  Segment {zeitraum}: {segment_h:.2f} Std | "
+                f"Feiertag+Sonntag ({intervall.feiertag_name}) → 100% Zuschlag{nacht_label}"
             )
-        elif ist_ft:
+        elif intervall.tagesart == "feiertag":
             feiertags_h += segment_h
             audit_log.append(
-                f"  Segment {segment_start.strftime('%d.%m. %H:%M')}–{segment_ende.strftime('%H:%M')}: "
-                f"{segment_h:.2f} Std | Feiertag ({ft_name}) → 100% Zuschlag"
+                f"  Segment {zeitraum}: {segment_h:.2f} Std | "
+                f"Feiertag ({intervall.feiertag_name}) → 100% Zuschlag{nacht_label}"
             )
-        elif ist_so:
+        elif intervall.tagesart == "sonntag":
             sonntags_h += segment_h
             audit_log.append(
-                f"  Segment {segment_start.strftime('%d.%m. %H:%M')}–{segment_ende.strftime('%H:%M')}: "
-                f"{segment_h:.2f} Std | Sonntag → 50% Zuschlag"
+                f"  Segment {zeitraum}: {segment_h:.2f} Std | Sonntag → 50% Zuschlag{nacht_label}"
             )
         else:
-            wochentag_name = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"][segment_datum.weekday()]
+            wochentag_name = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"][segment_start.weekday()]
             audit_log.append(
-                f"  Segment {segment_start.strftime('%d.%m. %H:%M')}–{segment_ende.strftime('%H:%M')}: "
-                f"{segment_h:.2f} Std | {wochentag_name} → kein Zuschlag"
+                f"  Segment {zeitraum}: {segment_h:.2f} Std | {wochentag_name}"
+                f"{nacht_label or ' → kein Zuschlag'}"
             )
 
     # Zuschläge berechnen (nur wenn Häkchen gesetzt)
     sonntagszuschlag = 0.0
     feiertagszuschlag = 0.0
+    nachtzuschlag = 0.0
 
     effektive_sonntags_h = sonntags_h
     effektive_feiertags_h = feiertags_h + sonntag_feiertag_h
@@ -387,40 +528,30 @@ def berechne_zuschlaege_mit_splitting(
             f"  Feiertagszuschlag: {effektive_feiertags_h:.2f} Std NICHT berechnet (Häkchen nicht gesetzt)"
         )
 
-    gesamt_zuschlag = round(sonntagszuschlag + feiertagszuschlag, 4)
+    if nachtzuschlag_aktiv and nacht_h > 0:
+        nachtzuschlag = round(nacht_h * stundenlohn * NACHT_FAKTOR, 4)
+        audit_log.append(
+            f"  Nachtzuschlag: {nacht_h:.2f} Std × {stundenlohn:.2f} € × {NACHT_FAKTOR:.0%} = {nachtzuschlag:.2f} €"
+        )
+    elif nacht_h > 0 and not nachtzuschlag_aktiv:
+        audit_log.append(
+            f"  Nachtzuschlag: {nacht_h:.2f} Std NICHT berechnet (Häkchen nicht gesetzt)"
+        )
+
+    gesamt_zuschlag = round(sonntagszuschlag + feiertagszuschlag + nachtzuschlag, 4)
 
     return {
         "sonntags_stunden": round(effektive_sonntags_h, 4),
         "feiertags_stunden": round(effektive_feiertags_h, 4),
         "sonntag_auf_feiertag_stunden": round(sonntag_feiertag_h, 4),
+        "nacht_stunden": round(nacht_h, 4),
         "sonntagszuschlag": sonntagszuschlag,
         "feiertagszuschlag": feiertagszuschlag,
+        "nachtzuschlag": nachtzuschlag,
         "gesamt_zuschlag": gesamt_zuschlag,
     }
 
 
-def _berechne_splitting_punkte(
-    start_dt: datetime, ende_dt: datetime
-) -> List[Tuple[datetime, datetime]]:
-    """
-    Teilt eine Schicht an Tagesgrenzen (00:00) auf.
-
-    Beispiel: 22:00 So → 06:00 Mo
-    → [(So 22:00, Mo 00:00), (Mo 00:00, Mo 06:00)]
-    """
-    segmente = []
-    aktuell = start_dt
-
-    while aktuell < ende_dt:
-        # Nächste Tagesgrenze
-        naechster_tag = datetime.combine(aktuell.date() + timedelta(days=1), time(0, 0, 0))
-        segment_ende = min(naechster_tag, ende_dt)
-        segmente.append((aktuell, segment_ende))
-        aktuell = segment_ende
-
-    return segmente
-
-
 # ─────────────────────────────────────────────────────────────────────────────
 # HAUPTFUNKTION: Einzelnen Zeiterfassungs-Eintrag berechnen
 # ─────────────────────────────────────────────────────────────────────────────
@@ -448,8 +579,10 @@ def berechne_eintrag(
             'grundlohn': float,
             'sonntags_stunden': float,
             'feiertags_stunden': float,
+            'nacht_stunden': float,
             'sonntagszuschlag': float,
             'feiertagszuschlag': float,
+            'nachtzuschlag': float,
             'gesamt_zuschlag': float,
             'gesamtlohn': float,
             'ist_sonntag': bool,
@@ -527,8 +660,10 @@ def berechne_eintrag(
             "grundlohn": 0.0,
             "sonntags_stunden": 0.0,
             "feiertags_stunden": 0.0,
+            "nacht_stunden": 0.0,
             "sonntagszuschlag": 0.0,
             "feiertagszuschlag": 0.0,
+            "nachtzuschlag": 0.0,
             "gesamt_zuschlag": 0.0,
             "gesamtlohn": 0.0,
             "ist_sonntag": ist_so,
@@ -555,8 +690,10 @@ def berechne_eintrag(
             "grundlohn": grundlohn,
             "sonntags_stunden": 0.0,
             "feiertags_stunden": 0.0,
+            "nacht_stunden": 0.0,
             "sonntagszuschlag": 0.0,
             "feiertagszuschlag": 0.0,
+            "nachtzuschlag": 0.0,
             "gesamt_zuschlag": 0.0,
             "gesamtlohn": grundlohn,
             "ist_sonntag": ist_so,
@@ -601,8 +738,10 @@ def berechne_eintrag(
             "grundlohn": lfz_grundlohn,
             "sonntags_stunden": 0.0,
             "feiertags_stunden": 0.0,
+            "nacht_stunden": 0.0,
             "sonntagszuschlag": 0.0,
             "feiertagszuschlag": 0.0,
+            "nachtzuschlag": 0.0,
             "gesamt_zuschlag": 0.0,
             "gesamtlohn": lfz_grundlohn,
             "ist_sonntag": ist_so,
@@ -626,8 +765,10 @@ def berechne_eintrag(
             "grundlohn": 0.0,
             "sonntags_stunden": 0.0,
             "feiertags_stunden": 0.0,
+            "nacht_stunden": 0.0,
             "sonntagszuschlag": 0.0,
             "feiertagszuschlag": 0.0,
+            "nachtzuschlag": 0.0,
             "gesamt_zuschlag": 0.0,
             "gesamtlohn": 0.0,
             "ist_sonntag": ist_so,
@@ -678,8 +819,10 @@ def berechne_eintrag(
                     "grundlohn": 0.0,
                     "sonntags_stunden": 0.0,
                     "feiertags_stunden": 0.0,
+                    "nacht_stunden": 0.0,
                     "sonntagszuschlag": 0.0,
                     "feiertagszuschlag": 0.0,
+                    "nachtzuschlag": 0.0,
                     "gesamt_zuschlag": 0.0,
                     "gesamtlohn": 0.0,
                     "ist_sonntag": ist_so,
@@ -716,7 +859,7 @@ def berechne_eintrag(
     # Proportionaler Faktor: Netto/Brutto (für Pausenanteil)
     netto_faktor = (netto_h / brutto_gesamt_h) if brutto_gesamt_h > 0 else 1.0
 
-    audit_log.append(f"Zuschlagsberechnung (Splitting nach Tagesgrenzen, Netto-Faktor: {netto_faktor:.4f}):")
+    audit_log.append(f"Zuschlagsberechnung (Splitting nach Zuschlags-Intervallen, Netto-Faktor: {netto_faktor:.4f}):")
     zuschlaege = berechne_zuschlaege_mit_splitting(
         start_dt, ende_dt, mitarbeiter, stundenlohn, audit_log, netto_faktor=netto_faktor
     )
@@ -733,8 +876,10 @@ def berechne_eintrag(
         "grundlohn": round(grundlohn, 2),
         "sonntags_stunden": zuschlaege["sonntags_stunden"],
         "feiertags_stunden": zuschlaege["feiertags_stunden"],
+        "nacht_stunden": zuschlaege["nacht_stunden"],
         "sonntagszuschlag": zuschlaege["sonntagszuschlag"],
         "feiertagszuschlag": zuschlaege["feiertagszuschlag"],
+        "nachtzuschlag": zuschlaege["nachtzuschlag"],
         "gesamt_zuschlag": zuschlaege["gesamt_zuschlag"],
         "gesamtlohn": gesamtlohn,
         "ist_sonntag": ist_so,
@@ -747,197 +892,79 @@ def berechne_eintrag(
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# MONATSSUMMEN
+# PERSISTIERTE EINTRAGSBERECHNUNG (zeiterfassung.calc_*)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _is_krank_row(entry: Dict[str, Any]) -> bool:
-    quelle = str(entry.get("quelle") or "").strip().lower()
-    abw_typ = str(entry.get("abwesenheitstyp") or "").strip().lower()
-    kommentar = str(entry.get("manuell_kommentar") or "").strip().lower()
-    return bool(entry.get("ist_krank")) or quelle == "au_bescheinigung" or abw_typ in {
-        "krank",
-        "krankheit",
-    } or kommentar.startswith("manuelle_korrektur_krank:")
+# Version der Berechnungsregeln für die calc_*-Spalten in zeiterfassung.
+# Bei jeder Regeländerung erhöhen und scripts/zeiterfassung_neuberechnen.py ausführen.
+BERECHNUNGS_VERSION = 3
+
+
+def _zeit8(wert: Any) -> str:
+    roh = str(wert or "").strip()
+    return f"{roh}:00"[:8] if len(roh) == 5 else roh[:8]
 
 
-def _sort_key_for_entry(entry: Dict[str, Any]) -> tuple:
-    datum_key = str(entry.get("datum") or "")
-    start_key = str(entry.get("start_zeit") or "")
+def eintragsbasis(eintrag: Dict[str, Any]) -> str:
+    """Eigene Eingaben des Eintrags: Datum, Start, Ende, Pause."""
     try:
-        id_key = int(entry.get("id") or 0)
-    except Exception:
-        id_key = 0
-    return (datum_key, start_key, id_key)
+        pause = int(float(eintrag.get("pause_minuten") or 0))
+    except (TypeError, ValueError):
+        pause = 0
+    return (
+        f"{str(eintrag.get('datum') or '')[:10]} "
+        f"{_zeit8(eintrag.get('start_zeit'))}-{_zeit8(eintrag.get('ende_zeit'))}/{pause}"
+    )
 
 
-def _normalize_entries_for_month(entries: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[str]]:
+def berechnungsbasis(dienstplan_start_zeit: Optional[str], eintrag: Dict[str, Any]) -> str:
     """
-    Bereinigt Konflikttage:
-    - Liegt an einem Datum mindestens ein Krank-Eintrag vor, zählt nur dieser Krank-Pfad.
-    - Zusätzliche Arbeits-/Stempelzeilen desselben Datums werden für die Monatsberechnung ignoriert.
+    Eingaben, von denen die Netto-Zeit abhängt:
+    Dienstplan-Start (Kappung) | Datum, Start, Ende und Pause des Eintrags selbst.
+    Weicht die Basis ab, gilt die gespeicherte Berechnung als veraltet – auch wenn
+    der Eintrag an einem Schreibpfad vorbei geändert wurde.
     """
-    by_day: Dict[str, List[Dict[str, Any]]] = {}
-    for row in entries or []:
-        day = str(row.get("datum") or "").strip()
-        if not day:
-            continue
-        by_day.setdefault(day, []).append(row)
+    return f"{str(dienstplan_start_zeit or '')[:8]}|{eintragsbasis(eintrag)}"
 
-    normalized: List[Dict[str, Any]] = []
-    warnings: List[str] = []
 
-    for day in sorted(by_day.keys()):
-        rows = sorted(by_day[day], key=_sort_key_for_entry)
-        krank_rows = [r for r in rows if _is_krank_row(r)]
-        if not krank_rows:
-            normalized.extend(rows)
-            continue
-
-        chosen = krank_rows[0]
-        normalized.append(chosen)
-        ignored = [r for r in rows if r is not chosen]
-        if ignored:
-            warnings.append(
-                f"Hinweis {day}: Kranktag-Konflikt erkannt. "
-                f"{len(ignored)} zusätzlicher Eintrag wurde in der Berechnung ignoriert."
-            )
-    return normalized, warnings
-
-
-def berechne_monat(
-    eintraege: List[Dict[str, Any]],
+def berechne_gespeicherte_felder(
+    eintrag: Dict[str, Any],
     mitarbeiter: Dict[str, Any],
-    auto_pause: bool = False,  # Pausen werden ausschließlich manuell eingetragen
-    dienstplan_start_map: Optional[Dict[str, str]] = None,
-    data_hash: Optional[str] = None,
-) -> Dict[str, Any]:
+    dienstplan_start_zeit: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
     """
-    Berechnet alle Stunden und Lohnsummen für einen Monat.
+    calc_*-Spalten für einen zeiterfassung-Datensatz.
+    ``None`` für offene oder gesperrte Einträge (berechne_eintrag meldet ``fehler``).
 
-    Args:
-        eintraege: Liste aller Zeiterfassungs-Einträge des Monats
-        mitarbeiter: Mitarbeiter-Datensatz
-        auto_pause: Automatischen Pausenabzug anwenden
-        dienstplan_start_map: Optionales Mapping {YYYY-MM-DD: HH:MM(:SS)} für Kappung
-
-    Returns:
-        {
-            'zeilen': List[Dict],          # Berechnete Einzelzeilen
-            'gesamt_stunden': float,
-            'sonntags_stunden': float,
-            'feiertags_stunden': float,
-            'grundlohn': float,
-            'sonntagszuschlag': float,
-            'feiertagszuschlag': float,
-            'gesamt_zuschlag': float,
-            'gesamtbrutto': float,
-            'anzahl_eintraege': int,
-            'offene_eintraege': int,
-            'warnungen': List[str],        # Feiertag ohne Häkchen etc.
-            'audit_log_gesamt': List[str], # Vollständiges Audit-Log
-        }
+    Gespeichert wird nur, was gelesen wird: die Netto-Zeit fürs Arbeitszeitkonto.
+    Zuschlagsstunden summiert lohnkern.summiere_monatsstunden nach eigenen Regeln
+    (ganzer Tag für So/Ft, Nachtfenster netto) und bleibt deshalb live.
     """
-    # data_hash dient als expliziter Cache-Buster im Funktions-Signature-Key.
-    _ = data_hash
-    eintraege_bereinigt, konflikt_warnungen = _normalize_entries_for_month(eintraege)
-    zeilen = []
-    gesamt_stunden = 0.0
-    sonntags_stunden = 0.0
-    feiertags_stunden = 0.0
-    grundlohn_gesamt = 0.0
-    sonntagszuschlag_gesamt = 0.0
-    feiertagszuschlag_gesamt = 0.0
-    offene_eintraege = 0
-    warnungen = []
-    audit_log_gesamt = []
-
-    for eintrag in eintraege_bereinigt:
-        raw_day = eintrag.get("datum")
-        if isinstance(raw_day, date):
-            datum_key = raw_day.isoformat()
-        else:
-            datum_key = str(raw_day or "").strip()[:10]
-        planned_start = (dienstplan_start_map or {}).get(datum_key)
-        zeile = berechne_eintrag(
-            eintrag,
-            mitarbeiter,
-            auto_pause,
-            dienstplan_start_zeit=planned_start,
-        )
-        zeilen.append(zeile)
-        audit_log_gesamt.extend(zeile["audit_log"])
-        audit_log_gesamt.append("")  # Leerzeile zwischen Einträgen
-
-        if zeile.get("fehler"):
-            offene_eintraege += 1
-            continue
-
-        gesamt_stunden += zeile["netto_stunden"]
-        sonntags_stunden += zeile["sonntags_stunden"]
-        feiertags_stunden += zeile["feiertags_stunden"]
-        grundlohn_gesamt += zeile["grundlohn"]
-        sonntagszuschlag_gesamt += zeile["sonntagszuschlag"]
-        feiertagszuschlag_gesamt += zeile["feiertagszuschlag"]
-
-        if zeile["hat_zuschlag_aber_kein_haekchen"]:
-            datum_str = zeile["datum"].strftime("%d.%m.%Y") if isinstance(zeile["datum"], date) else str(zeile["datum"])
-            ft_name = zeile.get("feiertag_name", "Feiertag")
-            warnungen.append(
-                f"⚠️ {datum_str}: Arbeit an Feiertag ({ft_name}), "
-                f"aber 'Feiertagszuschlag aktiv' ist NICHT gesetzt. "
-                f"Bitte in den Mitarbeiterstammdaten prüfen!"
-            )
-
-    gesamt_zuschlag = round(sonntagszuschlag_gesamt + feiertagszuschlag_gesamt, 2)
-    gesamtbrutto = round(grundlohn_gesamt + gesamt_zuschlag, 2)
-
-    # Summen-Audit
-    audit_log_gesamt.append("=== MONATSSUMMEN ===")
-    audit_log_gesamt.append(f"Gesamt-Nettostunden: {gesamt_stunden:.2f} Std")
-    audit_log_gesamt.append(f"Davon Sonntagsstunden: {sonntags_stunden:.2f} Std")
-    audit_log_gesamt.append(f"Davon Feiertagsstunden: {feiertags_stunden:.2f} Std")
-    audit_log_gesamt.append(f"Grundlohn: {grundlohn_gesamt:.2f} €")
-    audit_log_gesamt.append(f"Sonntagszuschlag: {sonntagszuschlag_gesamt:.2f} €")
-    audit_log_gesamt.append(f"Feiertagszuschlag: {feiertagszuschlag_gesamt:.2f} €")
-    audit_log_gesamt.append(f"Gesamt-Brutto: {gesamtbrutto:.2f} €")
-
+    zeile = berechne_eintrag(eintrag, mitarbeiter, auto_pause=False, dienstplan_start_zeit=dienstplan_start_zeit)
+    if zeile.get("fehler"):
+        return None
     return {
-        "zeilen": zeilen,
-        "gesamt_stunden": round(gesamt_stunden, 2),
-        "sonntags_stunden": round(sonntags_stunden, 2),
-        "feiertags_stunden": round(feiertags_stunden, 2),
-        "grundlohn": round(grundlohn_gesamt, 2),
-        "sonntagszuschlag": round(sonntagszuschlag_gesamt, 2),
-        "feiertagszuschlag": round(feiertagszuschlag_gesamt, 2),
-        "gesamt_zuschlag": gesamt_zuschlag,
-        "gesamtbrutto": gesamtbrutto,
-        "anzahl_eintraege": len(zeilen),
-        "offene_eintraege": offene_eintraege,
-        "warnungen": warnungen + konflikt_warnungen,
-        "audit_log_gesamt": audit_log_gesamt,
+        "calc_netto_minuten": round(float(zeile["netto_stunden"]) * 60, 2),
+        "calc_version": BERECHNUNGS_VERSION,
+        "calc_basis": berechnungsbasis(dienstplan_start_zeit, eintrag),
     }
 
 
-def berechne_monat_cached(
-    eintraege: List[Dict[str, Any]],
-    mitarbeiter: Dict[str, Any],
-    auto_pause: bool = False,
-    dienstplan_start_map: Optional[Dict[str, str]] = None,
-    data_hash: Optional[str] = None,
-) -> Dict[str, Any]:
+def gespeicherte_netto_stunden(eintrag: Dict[str, Any], dienstplan_start_zeit: Optional[str] = None) -> Optional[float]:
     """
-    Gecachte Variante der Monatsberechnung.
-    data_hash muss aus Rohdaten erzeugt und übergeben werden, damit Änderungen
-    sofort zu einem neuen Cache-Key führen.
+    Gespeicherte Netto-Stunden, wenn Version, Dienstplan-Start und die eigenen
+    Zeiten des Eintrags (Start/Ende/Pause) noch zur gespeicherten Basis passen.
     """
-    return berechne_monat(
-        eintraege=eintraege,
-        mitarbeiter=mitarbeiter,
-        auto_pause=auto_pause,
-        dienstplan_start_map=dienstplan_start_map,
-        data_hash=data_hash,
-    )
+    if eintrag.get("calc_version") != BERECHNUNGS_VERSION or eintrag.get("calc_netto_minuten") is None:
+        return None
+    if eintrag.get("calc_basis") != berechnungsbasis(dienstplan_start_zeit, eintrag):
+        return None
+    return round(float(eintrag["calc_netto_minuten"]) / 60.0, 4)
+
 
+# ─────────────────────────────────────────────────────────────────────────────
+# MONATSSUMMEN
+# ─────────────────────────────────────────────────────────────────────────────
 
 def berechne_arbeitszeitkonto_saldo(
     *,
@@ -1158,6 +1185,7 @@ def fuehre_testrechnung_durch() -> str:
     Erwartet:
     - 2 Std Sonntag (50% Zuschlag)
     - 6 Std Montag (kein Zuschlag, Ruhetag)
+    - 7 Std Nacht (23:00–06:00, Nachtzuschlag hier nicht aktiv)
     - Pause: 30 Min (> 6 Std Brutto)
     - Netto: 7,5 Std
     """
@@ -1202,6 +1230,7 @@ def fuehre_testrechnung_durch() -> str:
     bericht.append(f"  Pause:               {ergebnis['pause_minuten']} Min")
     bericht.append(f"  Sonntags-Stunden:    {ergebnis['sonntags_stunden']:.2f} Std")
     bericht.append(f"  Feiertags-Stunden:   {ergebnis['feiertags_stunden']:.2f} Std")
+    bericht.append(f"  Nacht-Stunden:       {ergebnis['nacht_stunden']:.2f} Std")
     bericht.append(f"  Grundlohn:           {ergebnis['grundlohn']:.2f} €")
     bericht.append(f"  Sonntagszuschlag:    {ergebnis['sonntagszuschlag']:.2f} €")
     bericht.append(f"  Feiertagszuschlag:   {ergebnis['feiertagszuschlag']:.2f} €")
@@ -1226,12 +1255,15 @@ def fuehre_testrechnung_durch() -> str:
     so_netto_erwartet = 2.0 * netto_faktor_erwartet  # 1.875
     so_zuschlag_erwartet = round(so_netto_erwartet * 15.0 * 0.50, 2)  # 14.06
     gesamt_erwartet = round(112.50 + so_zuschlag_erwartet, 2)
+    nacht_netto_erwartet = 7.0 * netto_faktor_erwartet  # 6.5625
 
     checks = [
         ("Netto-Stunden = 7,50", abs(ergebnis["netto_stunden"] - 7.5) < 0.01),
         ("Pause = 30 Min", ergebnis["pause_minuten"] == 30),
         (f"Sonntags-Stunden ≈ {so_netto_erwartet:.4f}", abs(ergebnis["sonntags_stunden"] - so_netto_erwartet) < 0.01),
         ("Feiertags-Stunden = 0,00", abs(ergebnis["feiertags_stunden"] - 0.0) < 0.01),
+        (f"Nacht-Stunden ≈ {nacht_netto_erwartet:.4f}", abs(ergebnis["nacht_stunden"] - nacht_netto_erwartet) < 0.01),
+        ("Nachtzuschlag = 0,00 € (nicht aktiv)", abs(ergebnis["nachtzuschlag"] - 0.0) < 0.01),
         ("Grundlohn = 112,50 €", abs(ergebnis["grundlohn"] - 112.50) < 0.01),
         (f"Sonntagszuschlag ≈ {so_zuschlag_erwartet:.2f} €", abs(ergebnis["sonntagszuschlag"] - so_zuschlag_erwartet) < 0.02),
         (f"Gesamtlohn ≈ {gesamt_erwartet:.2f} €", abs(ergebnis["gesamtlohn"] - gesamt_erwartet) < 0.02),
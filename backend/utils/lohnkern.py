@@ -8,15 +8,38 @@ Lohnprinzip (vertragsbasiert):
   - Minusstunden (vergütete_h < Soll) → ins Arbeitszeitkonto, nur tatsächliche Stunden bezahlt
   - Sonntagszuschlag  = tatsächliche Sonntags-Stunden × Stundenlohn × 0,50
   - Feiertagszuschlag = tatsächliche Feiertags-Stunden × Stundenlohn × 1,00
-  - Gesamtbrutto = Grundlohn + Sonntagszuschlag + Feiertagszuschlag
+  - Nachtzuschlag     = tatsächliche Nacht-Stunden (23–06 Uhr) × Stundenlohn × 0,25
+  - Gesamtbrutto = Grundlohn + Sonntagszuschlag + Feiertagszuschlag + Nachtzuschlag
 
 Keine Steuern, keine Sozialversicherung in dieser Funktion.
 """
 
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from time import monotonic
 from typing import Optional, Dict, Any
 
 from utils.database import get_supabase_client
+from utils.monatsfakten import ART_KRANK, ART_URLAUB, invalidiere_monatsfakten, lade_monatsfakten
+from utils.lohnberechnung import NACHT_FAKTOR, zerlege_schicht_in_zuschlagsstunden
+
+
+def _nachtstunden_netto(eintrag: Dict[str, Any], netto_h: float) -> float:
+    """Nachtanteil (23–06 Uhr) einer Buchung, proportional auf die Netto-Stunden umgelegt."""
+    if not eintrag.get('datum') or not eintrag.get('start_zeit') or not eintrag.get('ende_zeit'):
+        return 0.0
+    try:
+        tag = date.fromisoformat(str(eintrag['datum'])[:10])
+        start = datetime.combine(tag, datetime.strptime(str(eintrag['start_zeit'])[:5], '%H:%M').time())
+        ende = datetime.combine(tag, datetime.strptime(str(eintrag['ende_zeit'])[:5], '%H:%M').time())
+    except ValueError:
+        return 0.0
+    if ende <= start:
+        ende += timedelta(days=1)
+    brutto_h = (ende - start).total_seconds() / 3600.0
+    if brutto_h <= 0:
+        return 0.0
+    nacht_brutto_h = zerlege_schicht_in_zuschlagsstunden(start, ende)['nacht_stunden']
+    return nacht_brutto_h * (netto_h / brutto_h)
 
 
 # ─────────────────────────────────────────────
@@ -35,6 +58,7 @@ def summiere_monatsstunden(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[s
             'verguetete_stunden': float,   # = gesamt + urlaub + krank_lfz
             'sonntags_stunden': float,     # Für Zuschlagsberechnung
             'feiertags_stunden': float,    # Für Zuschlagsberechnung
+            'nacht_stunden': float,        # Für Zuschlagsberechnung (23–06 Uhr)
             'anzahl_eintraege': int,
             'fehler': None | str
         }
@@ -46,88 +70,41 @@ def summiere_monatsstunden(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[s
         'verguetete_stunden': 0.0,
         'sonntags_stunden': 0.0,
         'feiertags_stunden': 0.0,
+        'nacht_stunden': 0.0,
         'anzahl_eintraege': 0,
         'fehler': None
     }
 
     try:
-        supabase = get_supabase_client()
-
-        von = date(jahr, monat, 1).isoformat()
-        bis = date(jahr + 1, 1, 1).isoformat() if monat == 12 else date(jahr, monat + 1, 1).isoformat()
-
-        # Alle Zeiterfassungs-Einträge des Mitarbeiters im Monat laden
-        # Hinweis: zeiterfassung hat KEINE schichttyp-Spalte, stattdessen abwesenheitstyp + ist_krank
-        response = supabase.table('zeiterfassung').select(
-            'arbeitsstunden, start_zeit, ende_zeit, pause_minuten, '
-            'ist_sonntag, ist_feiertag, quelle, abwesenheitstyp, ist_krank, datum'
-        ).eq('mitarbeiter_id', mitarbeiter_id).gte('datum', von).lt('datum', bis).execute()
-
-        if not response.data:
-            return result
-
-        for eintrag in response.data:
-            # Historische Saldo-Einträge überspringen
-            if eintrag.get('quelle') == 'historischer_saldo':
-                continue
-
-            # abwesenheitstyp ist das korrekte Feld in zeiterfassung
-            abwesenheitstyp = (eintrag.get('abwesenheitstyp') or '').lower()
-            ist_krank_flag = eintrag.get('ist_krank') or False
+        fakten = lade_monatsfakten(mitarbeiter_id, monat, jahr)
 
+        for posten in fakten.posten:
             # ── Urlaubsstunden ────────────────────────────────────────────
-            if abwesenheitstyp in ('urlaub', 'vacation', 'u'):
-                urlaub_h = float(eintrag.get('arbeitsstunden') or 0)
-                result['urlaub_stunden'] += urlaub_h
+            if posten.art == ART_URLAUB:
+                result['urlaub_stunden'] += posten.stunden
                 continue
 
             # ── Krankheitsstunden (LFZ) ─────────────────────────────────────────────
-            # Erkannt durch abwesenheitstyp='krank' ODER ist_krank=True
-            if abwesenheitstyp in ('krank', 'k', 'krank_lfz') or ist_krank_flag:
+            if posten.art == ART_KRANK:
                 # Montag (0) und Dienstag (1) sind Ruhetage → kein LFZ (wie beim Urlaub)
-                datum_str = eintrag.get('datum', '')
-                if datum_str:
-                    try:
-                        tag_wochentag = date.fromisoformat(datum_str).weekday()
-                        if tag_wochentag in (0, 1):  # Mo=0, Di=1
-                            continue  # Ruhetag – kein LFZ
-                    except Exception:
-                        pass
-                krank_h = float(eintrag.get('arbeitsstunden') or 0)
-                result['krank_lfz_stunden'] += krank_h
+                if posten.ruhetag:
+                    continue
+                result['krank_lfz_stunden'] += posten.stunden
                 continue
 
             # ── Reguläre Arbeitsstunden ───────────────────────────────────
-            try:
-                # Gespeicherte Arbeitsstunden bevorzugen
-                if eintrag.get('arbeitsstunden') is not None:
-                    netto_h = float(eintrag['arbeitsstunden'])
-                elif eintrag.get('ende_zeit'):
-                    fmt = '%H:%M:%S'
-                    start = datetime.strptime(eintrag['start_zeit'], fmt)
-                    ende = datetime.strptime(eintrag['ende_zeit'], fmt)
-                    differenz_min = (ende - start).seconds / 60
-                    pause = int(eintrag.get('pause_minuten') or 0)
-                    netto_min = differenz_min - pause
-                    if netto_min <= 0:
-                        continue
-                    netto_h = round(netto_min / 60, 4)
-                else:
-                    continue  # Offene Buchung – überspringen
-
-                if netto_h <= 0:
-                    continue
+            netto_h = posten.stunden
+            if netto_h <= 0:
+                continue  # Offene oder leere Buchung
 
-                result['gesamt_stunden'] += netto_h
-                result['anzahl_eintraege'] += 1
+            result['gesamt_stunden'] += netto_h
+            result['anzahl_eintraege'] += 1
 
-                if eintrag.get('ist_sonntag'):
-                    result['sonntags_stunden'] += netto_h
-                if eintrag.get('ist_feiertag'):
-                    result['feiertags_stunden'] += netto_h
-
-            except Exception:
-                continue
+            if posten.ist_sonntag:
+                result['sonntags_stunden'] += netto_h
+            if posten.ist_feiertag:
+                result['feiertags_stunden'] += netto_h
+            result['nacht_stunden'] += _nachtstunden_netto(posten.zeile, netto_h)
 
         # Vergütete Stunden = gearbeitet + Urlaub + Krank-LFZ
         # WICHTIG: Vergütete Stunden dürfen die vertraglich vereinbarten Soll-Stunden NICHT
@@ -143,6 +120,7 @@ def summiere_monatsstunden(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[s
         result['krank_lfz_stunden'] = round(result['krank_lfz_stunden'], 2)
         result['sonntags_stunden'] = round(result['sonntags_stunden'], 2)
         result['feiertags_stunden'] = round(result['feiertags_stunden'], 2)
+        result['nacht_stunden'] = round(result['nacht_stunden'], 2)
 
     except Exception as e:
         result['fehler'] = f"Datenbankfehler beim Laden der Zeiterfassung: {str(e)}"
@@ -163,7 +141,8 @@ def berechneMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
         grundlohn       = vergütete_h × (Monatsbrutto / Sollstunden)
         sonntagszuschlag  = sonntags_h × stundenwert × 0,50  (wenn aktiv)
         feiertagszuschlag = feiertags_h × stundenwert × 1,00 (wenn aktiv)
-        gesamtbrutto    = grundlohn + sonntagszuschlag + feiertagszuschlag
+        nachtzuschlag     = nacht_h × stundenwert × 0,25     (wenn aktiv)
+        gesamtbrutto    = grundlohn + sonntagszuschlag + feiertagszuschlag + nachtzuschlag
 
         Saldo (Arbeitszeitkonto) = vergütete_h - soll_h
         (positiv = Überstunden, negativ = Minusstunden)
@@ -181,29 +160,22 @@ def berechneMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
         'saldo_stunden': 0.0,         # Arbeitszeitkonto-Saldo
         'sonntags_stunden': 0.0,
         'feiertags_stunden': 0.0,
+        'nacht_stunden': 0.0,
         'grundlohn': 0.0,
         'sonntagszuschlag': 0.0,
         'feiertagszuschlag': 0.0,
+        'nachtzuschlag': 0.0,
         'gesamtbrutto': 0.0,
         'anzahl_eintraege': 0,
     }
 
     try:
-        supabase = get_supabase_client()
-
-        # ── Mitarbeiterdaten laden ──────────────────────────────────────────
-        ma_resp = supabase.table('mitarbeiter').select(
-            'id, vorname, nachname, monatliche_brutto_verguetung, '
-            'monatliche_soll_stunden, jahres_urlaubstage, resturlaub_vorjahr, '
-            'sonntagszuschlag_aktiv, feiertagszuschlag_aktiv, '
-            'beschaeftigungsart, minijob_monatsgrenze, eintrittsdatum'
-        ).eq('id', mitarbeiter_id).execute()
-
-        if not ma_resp.data:
+        # ── Mitarbeiterdaten laden (gemeinsamer Monatsabruf) ─────────────────
+        ma = lade_monatsfakten(mitarbeiter_id, monat, jahr).mitarbeiter
+        if not ma:
             leeres_ergebnis['fehler'] = f"Fehler: Mitarbeiter mit ID {mitarbeiter_id} nicht gefunden."
             return leeres_ergebnis
 
-        ma = ma_resp.data[0]
         name = f"{ma['vorname']} {ma['nachname']}"
 
         # ── Stundensatz aus Monatsbrutto/Sollstunden ableiten ─────────────
@@ -235,6 +207,7 @@ def berechneMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
         verguetete_h = stunden_data['verguetete_stunden']
         sonntags_h = stunden_data['sonntags_stunden']
         feiertags_h = stunden_data['feiertags_stunden']
+        nacht_h = stunden_data['nacht_stunden']
 
         # ── Saldo (Arbeitszeitkonto) ───────────────────────────────────────
         saldo = round(verguetete_h - soll_stunden, 2) if soll_stunden > 0 else 0.0
@@ -257,7 +230,11 @@ def berechneMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
         if ma.get('feiertagszuschlag_aktiv') and feiertags_h > 0:
             feiertagszuschlag = round(feiertags_h * stundenlohn * 1.00, 2)
 
-        gesamtbrutto = round(grundlohn + sonntagszuschlag + feiertagszuschlag, 2)
+        nachtzuschlag = 0.0
+        if ma.get('nachtzuschlag_aktiv') and nacht_h > 0:
+            nachtzuschlag = round(nacht_h * stundenlohn * NACHT_FAKTOR, 2)
+
+        gesamtbrutto = round(grundlohn + sonntagszuschlag + feiertagszuschlag + nachtzuschlag, 2)
 
         # ── Minijob-spezifische Prüfungen (§ 8 SGB IV, EntgFG, MiLoG) ──────────────────────
         ist_minijob = (ma.get('beschaeftigungsart') or '') == 'minijob'
@@ -313,9 +290,11 @@ def berechneMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
             'saldo_stunden': saldo,
             'sonntags_stunden': sonntags_h,
             'feiertags_stunden': feiertags_h,
+            'nacht_stunden': nacht_h,
             'grundlohn': grundlohn,
             'sonntagszuschlag': sonntagszuschlag,
             'feiertagszuschlag': feiertagszuschlag,
+            'nachtzuschlag': nachtzuschlag,
             'gesamtbrutto': gesamtbrutto,
             'anzahl_eintraege': stunden_data['anzahl_eintraege'],
             # Minijob-spezifische Felder
@@ -337,11 +316,32 @@ def berechneMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
 # SCHRITT 3: Ergebnis in DB speichern
 # ─────────────────────────────────────────────
 
+_SPALTEN_CACHE_SECONDS = 600.0
+_spalten_cache: Dict[str, tuple[float, bool]] = {}
+
+
+def _lohnabrechnung_spalte_vorhanden(supabase, spalte: str) -> bool:
+    """Prüft (gecacht), ob lohnabrechnungen die Spalte schon hat (Migration ausgeführt)."""
+    now = monotonic()
+    hit = _spalten_cache.get(spalte)
+    if hit is not None and (now - hit[0]) < _SPALTEN_CACHE_SECONDS:
+        return hit[1]
+    try:
+        supabase.table('lohnabrechnungen').select(spalte).limit(0).execute()
+        vorhanden = True
+    except Exception:
+        vorhanden = False
+    _spalten_cache[spalte] = (now, vorhanden)
+    return vorhanden
+
+
 def speichereMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str, Any]:
     """
     Berechnet den Monatslohn und speichert ihn in lohnabrechnungen.
     Überschreibt bestehende Einträge (UPSERT-Logik).
     """
+    # Gespeichert wird nur auf frischen Daten, nie aus dem Lese-Cache.
+    invalidiere_monatsfakten(mitarbeiter_id)
     ergebnis = berechneMonatslohn(mitarbeiter_id, monat, jahr)
 
     if not ergebnis['ok']:
@@ -370,12 +370,12 @@ def speichereMonatslohn(mitarbeiter_id: int, monat: int, jahr: int) -> Dict[str,
         }
 
         # Neue Felder hinzufügen falls vorhanden (Migration nötig)
-        try:
-            supabase.table('lohnabrechnungen').select('soll_stunden').limit(0).execute()
+        if _lohnabrechnung_spalte_vorhanden(supabase, 'soll_stunden'):
             daten['soll_stunden'] = ergebnis['soll_stunden']
             daten['ueberstunden'] = ergebnis['saldo_stunden']
-        except Exception:
-            pass  # Felder noch nicht migriert – ignorieren
+        if _lohnabrechnung_spalte_vorhanden(supabase, 'nachtstunden'):
+            daten['nachtstunden'] = ergebnis['nacht_stunden']
+            daten['nachtzuschlag'] = ergebnis['nachtzuschlag']
 
         # Prüfe ob bereits vorhanden
         existing = supabase.table('lohnabrechnungen').select('id').eq(
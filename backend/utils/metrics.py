@@ -0,0 +1,192 @@
+"""
+metrics.py – Prozessweite Zähler, Histogramme und Latenzfenster
+
+Bewusst minimal (kein Prometheus-Client als Abhängigkeit): benannte Zähler,
+thread-sicher, als Snapshot abrufbar. Dazu je Route:
+
+  - Latenz-Histogramm der Requests und Histogramm der DB-Aufrufe je Request
+  - DB-Aufrufe und DB-Zeit nach Route, Tabelle und Operation
+  - rollierende Fenster der letzten Requests für p95-Werte (/health)
+
+``prometheus_text()`` rendert alles im Prometheus-Textformat (/metrics).
+Erfasst wird über ``utils.db_instrumentierung``.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Tuple
+
+_zaehler: Dict[str, int] = {}
+_lock = Lock()
+
+
+def zaehle(name: str, wert: int = 1) -> None:
+    with _lock:
+        _zaehler[name] = _zaehler.get(name, 0) + int(wert)
+
+
+def zaehler_snapshot(prefix: str = "") -> Dict[str, int]:
+    with _lock:
+        return {k: v for k, v in sorted(_zaehler.items()) if k.startswith(prefix)}
+
+
+def zaehler_zuruecksetzen() -> None:
+    with _lock:
+        _zaehler.clear()
+        _histogramme.clear()
+        _summen.clear()
+        _fenster.clear()
+
+
+# ── Histogramme, Summen, Latenzfenster ───────────────────────────────────────
+
+LATENZ_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_AUFRUF_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100)
+P95_FENSTER = 500  # letzte Requests je Route
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_HILFE = {
+    "complio_http_request_duration_seconds": ("histogram", "Dauer der HTTP-Requests je Route"),
+    "complio_db_calls_per_request": ("histogram", "Datenbank-Aufrufe je Request"),
+    "complio_db_calls_total": ("counter", "Datenbank-Aufrufe nach Route, Tabelle und Operation"),
+    "complio_db_duration_seconds_total": ("counter", "Datenbank-Zeit nach Route, Tabelle und Operation"),
+    "complio_events_total": ("counter", "Prozessweite Ereigniszähler (Caches u. a.)"),
+}
+
+
+class _Histogramm:
+    __slots__ = ("grenzen", "anzahlen", "summe", "anzahl")
+
+    def __init__(self, grenzen: Tuple[float, ...]):
+        self.grenzen = grenzen
+        self.anzahlen = [0] * len(grenzen)
+        self.summe = 0.0
+        self.anzahl = 0
+
+    def beobachte(self, wert: float) -> None:
+        for i, grenze in enumerate(self.grenzen):
+            if wert <= grenze:
+                self.anzahlen[i] += 1
+        self.summe += wert
+        self.anzahl += 1
+
+
+# (name, labels) → Histogramm bzw. Summe; route → (dauer, db_aufrufe)
+_histogramme: Dict[Tuple[str, Labels], _Histogramm] = {}
+_summen: Dict[Tuple[str, Labels], float] = {}
+_fenster: Dict[str, Deque[Tuple[float, int]]] = {}
+
+
+def _labels(werte: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in werte.items()))
+
+
+def beobachte(name: str, wert: float, grenzen: Tuple[float, ...] = LATENZ_BUCKETS, **labels: str) -> None:
+    schluessel = (name, _labels(labels))
+    with _lock:
+        hist = _histogramme.get(schluessel)
+        if hist is None:
+            hist = _histogramme[schluessel] = _Histogramm(grenzen)
+        hist.beobachte(float(wert))
+
+
+def addiere(name: str, wert: float = 1.0, **labels: str) -> None:
+    schluessel = (name, _labels(labels))
+    with _lock:
+        _summen[schluessel] = _summen.get(schluessel, 0.0) + float(wert)
+
+
+def request_erfassen(route: str, methode: str, status: int, dauer: float, db_aufrufe: int) -> None:
+    """Abschluss eines Requests: Histogramme und rollierendes Fenster."""
+    beobachte("complio_http_request_duration_seconds", dauer,
+              route=route, method=methode, status=str(status))
+    beobachte("complio_db_calls_per_request", db_aufrufe, DB_AUFRUF_BUCKETS, route=route)
+    with _lock:
+        fenster = _fenster.get(route)
+        if fenster is None:
+            fenster = _fenster[route] = deque(maxlen=P95_FENSTER)
+        fenster.append((dauer, db_aufrufe))
+
+
+def _p95(werte: List[float]) -> Optional[float]:
+    if not werte:
+        return None
+    werte = sorted(werte)
+    return werte[max(0, math.ceil(0.95 * len(werte)) - 1)]
+
+
+def rolling_p95() -> Dict[str, object]:
+    """p95 von Latenz und DB-Aufrufen über die letzten Requests je Route."""
+    with _lock:
+        fenster = {route: list(werte) for route, werte in _fenster.items()}
+    routen: Dict[str, Dict[str, object]] = {}
+    alle: List[float] = []
+    for route, werte in sorted(fenster.items()):
+        dauern = [d for d, _ in werte]
+        alle.extend(dauern)
+        routen[route] = {
+            "anzahl": len(werte),
+            "p95_ms": round(_p95(dauern) * 1000, 1),
+            "db_aufrufe_p95": _p95([float(n) for _, n in werte]),
+        }
+    gesamt = _p95(alle)
+    return {"p95_ms": round(gesamt * 1000, 1) if gesamt is not None else None, "routen": routen}
+
+
+# ── Prometheus-Textformat ────────────────────────────────────────────────────
+
+def _esc(wert: str) -> str:
+    return wert.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    paare = labels + extra
+    if not paare:
+        return ""
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in paare) + "}"
+
+
+def _zahl(wert: float) -> str:
+    if wert == math.inf:
+        return "+Inf"
+    return repr(float(wert)) if not float(wert).is_integer() else str(int(wert))
+
+
+def prometheus_text() -> str:
+    with _lock:
+        histogramme = {k: (h.grenzen, list(h.anzahlen), h.summe, h.anzahl) for k, h in _histogramme.items()}
+        summen = dict(_summen)
+        ereignisse = dict(_zaehler)
+
+    zeilen: List[str] = []
+    gesehen: set[str] = set()
+
+    def _kopf(name: str) -> None:
+        if name not in gesehen:
+            gesehen.add(name)
+            typ, hilfe = _HILFE.get(name, ("untyped", name))
+            zeilen.append(f"# HELP {name} {hilfe}")
+            zeilen.append(f"# TYPE {name} {typ}")
+
+    for (name, labels), (grenzen, anzahlen, summe, anzahl) in sorted(histogramme.items()):
+        _kopf(name)
+        for grenze, n in zip(grenzen, anzahlen):
+            zeilen.append(f"{name}_bucket{_label_text(labels, (('le', _zahl(grenze)),))} {n}")
+        zeilen.append(f"{name}_bucket{_label_text(labels, (('le', '+Inf'),))} {anzahl}")
+        zeilen.append(f"{name}_sum{_label_text(labels)} {_zahl(summe)}")
+        zeilen.append(f"{name}_count{_label_text(labels)} {anzahl}")
+
+    for (name, labels), wert in sorted(summen.items()):
+        _kopf(name)
+        zeilen.append(f"{name}{_label_text(labels)} {_zahl(wert)}")
+
+    if ereignisse:
+        _kopf("complio_events_total")
+        for name, wert in sorted(ereignisse.items()):
+            zeilen.append(f"complio_events_total{_label_text((('name', name),))} {wert}")
+
+    return "\n".join(zeilen) + "\n"
@@ -0,0 +1,297 @@
+"""
+monatsfakten.py – Ein Datenabruf pro Mitarbeiter und Monat
+
+Lädt Stammdaten, Zeiterfassung, Abwesenheiten, Dienstplan und Verträge eines
+Mitarbeiters für einen Monat genau einmal und legt daraus ein typisiertes
+Tagesbuch an. AZK (azk), Lohnkern (lohnkern), Lohnabrechnung (lohnabrechnung)
+und Arbeitszeitkonten (work_accounts) lesen daraus, statt jeweils eigene
+Abfragen mit leicht abweichenden Regeln zu stellen.
+
+Einheitliche Regeln:
+  - Einträge mit quelle='historischer_saldo' gehören nicht ins Tagesbuch
+  - Art je Eintrag: 'urlaub' | 'krank' | 'arbeit' (siehe _klassifiziere)
+  - Stunden: gespeicherte arbeitsstunden/stunden, sonst aus Start/Ende - Pause
+  - Mo/Di = Ruhetage
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.anfrage_cache import lade_mitarbeiter_zeile, lade_vertraege
+from utils.planning_tables import resolve_planning_table
+
+
+ART_ARBEIT = 'arbeit'
+ART_URLAUB = 'urlaub'
+ART_KRANK = 'krank'
+
+# Kurzlebiger Prozess-Cache: Monatsansicht, Lohnvorschau und AZK-PDF kurz
+# hintereinander teilen sich einen Abruf. Schreibpfade rufen invalidiere_monatsfakten().
+# LRU-begrenzt; abgelaufene Einträge werden beim Einfügen verworfen.
+MONATSFAKTEN_TTL_SEKUNDEN = 30.0
+MONATSFAKTEN_MAX_EINTRAEGE = int(os.getenv("MONATSFAKTEN_MAX_EINTRAEGE", "512"))
+
+_monatsfakten_cache: "OrderedDict[Tuple[int, int, int], Tuple[float, Monatsfakten]]" = OrderedDict()
+_monatsfakten_lock = Lock()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TAGESBUCH
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Tagesposten:
+    """Ein Zeiterfassungs-Eintrag, klassifiziert und mit Netto-Stunden."""
+    datum: date
+    art: str
+    stunden: float
+    start_zeit: str
+    ende_zeit: str
+    pause_minuten: int
+    ist_sonntag: bool
+    ist_feiertag: bool
+    quelle: str
+    zeile: Dict[str, Any] = field(compare=False, repr=False)
+
+    @property
+    def ruhetag(self) -> bool:
+        return self.datum.weekday() in (0, 1)
+
+    @property
+    def hat_zeiten(self) -> bool:
+        """Start und Ende gesetzt und kein 00:00→00:00-Marker (Import/Abwesenheit)."""
+        if not self.start_zeit or not self.ende_zeit:
+            return False
+        return not (self.start_zeit[:5] == '00:00' and self.ende_zeit[:5] == '00:00')
+
+
+@dataclass(frozen=True)
+class Monatsfakten:
+    """
+    Alle Rohdaten und das Tagesbuch eines Mitarbeiters für einen Monat.
+    Eingefroren; lade_monatsfakten() gibt jedem Aufrufer eine eigene Kopie.
+    """
+    mitarbeiter_id: int
+    monat: int
+    jahr: int
+    von: date
+    bis: date  # letzter Tag des Monats (inklusive)
+    mitarbeiter: Dict[str, Any]
+    zeilen: Tuple[Dict[str, Any], ...]    # zeiterfassung roh (inkl. historischer_saldo)
+    posten: Tuple[Tagesposten, ...]       # Tagesbuch, nach Datum sortiert
+    dienstplan: Tuple[Dict[str, Any], ...]
+    abwesenheiten: Tuple[Dict[str, Any], ...]
+    vertraege: Tuple[Dict[str, Any], ...]
+    tage: Dict[date, Tuple[Tagesposten, ...]] = field(default_factory=dict)
+
+    def urlaubstage_abwesenheit(self) -> set[date]:
+        """Arbeitstage (ohne Mo/Di) des Monats, die laut abwesenheiten Urlaub sind."""
+        tage: set[date] = set()
+        for row in self.abwesenheiten:
+            if str(row.get('typ') or '').lower() != 'urlaub':
+                continue
+            start = _safe_date(row.get('start_datum'))
+            ende = _safe_date(row.get('ende_datum'))
+            if not start or not ende:
+                continue
+            tag = max(start, self.von)
+            while tag <= min(ende, self.bis):
+                if tag.weekday() not in (0, 1):
+                    tage.add(tag)
+                tag += timedelta(days=1)
+        return tage
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HILFSFUNKTIONEN
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _safe_date(value) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except Exception:
+        return None
+
+
+def _klassifiziere(zeile: Dict[str, Any]) -> str:
+    abwtyp = str(zeile.get('abwesenheitstyp') or '').strip().lower()
+    if abwtyp in ('urlaub', 'vacation', 'u'):
+        return ART_URLAUB
+    quelle = str(zeile.get('quelle') or '').strip().lower()
+    kommentar = str(zeile.get('manuell_kommentar') or '').strip().lower()
+    if (
+        zeile.get('ist_krank')
+        or abwtyp in ('krank', 'k', 'krank_lfz', 'krankheit')
+        or quelle == 'au_bescheinigung'
+        or kommentar.startswith('manuelle_korrektur_krank:')
+    ):
+        return ART_KRANK
+    return ART_ARBEIT
+
+
+def _netto_stunden(zeile: Dict[str, Any], start_zeit: str, ende_zeit: str, pause: int) -> float:
+    for key in ('arbeitsstunden', 'stunden'):
+        if zeile.get(key) is not None:
+            try:
+                return float(zeile[key])
+            except (TypeError, ValueError):
+                pass
+    if not start_zeit or not ende_zeit:
+        return 0.0  # Offene Buchung
+    if start_zeit[:5] == '00:00' and ende_zeit[:5] == '00:00':
+        return 0.0
+    try:
+        start = datetime.strptime(start_zeit[:5], '%H:%M')
+        ende = datetime.strptime(ende_zeit[:5], '%H:%M')
+    except ValueError:
+        return 0.0
+    netto_min = (ende - start).seconds / 60 - pause
+    return round(netto_min / 60, 4) if netto_min > 0 else 0.0
+
+
+def baue_tagesbuch(zeilen: List[Dict[str, Any]]) -> List[Tagesposten]:
+    """Zeiterfassungs-Zeilen → sortierte Tagesposten (ohne historischer_saldo)."""
+    posten: List[Tagesposten] = []
+    for zeile in zeilen:
+        quelle = str(zeile.get('quelle') or '')
+        if quelle == 'historischer_saldo':
+            continue
+        tag = _safe_date(zeile.get('datum'))
+        if tag is None:
+            continue
+        start_zeit = str(zeile.get('start_zeit') or '')[:8]
+        ende_zeit = str(zeile.get('ende_zeit') or '')[:8]
+        pause = int(zeile.get('pause_minuten') or 0)
+        posten.append(Tagesposten(
+            datum=tag,
+            art=_klassifiziere(zeile),
+            stunden=_netto_stunden(zeile, start_zeit, ende_zeit, pause),
+            start_zeit=start_zeit,
+            ende_zeit=ende_zeit,
+            pause_minuten=pause,
+            ist_sonntag=bool(zeile.get('ist_sonntag')),
+            ist_feiertag=bool(zeile.get('ist_feiertag')),
+            quelle=quelle,
+            zeile=zeile,
+        ))
+    posten.sort(key=lambda p: (p.datum, p.start_zeit))
+    return posten
+
+
+def _lade_optional(abfrage) -> List[Dict[str, Any]]:
+    """Tabellen, die auf älteren Instanzen fehlen können, liefern [] statt Fehler."""
+    try:
+        return abfrage().data or []
+    except Exception:
+        return []
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LADEN
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _lade_monatsfakten_db(supabase, mitarbeiter_id: int, monat: int, jahr: int) -> Monatsfakten:
+    von = date(jahr, monat, 1)
+    bis = (date(jahr + 1, 1, 1) if monat == 12 else date(jahr, monat + 1, 1)) - timedelta(days=1)
+    von_iso, bis_iso = von.isoformat(), bis.isoformat()
+
+    mitarbeiter = lade_mitarbeiter_zeile(supabase, mitarbeiter_id)
+
+    zeilen = supabase.table('zeiterfassung').select('*').eq(
+        'mitarbeiter_id', mitarbeiter_id
+    ).gte('datum', von_iso).lte('datum', bis_iso).order('datum').execute().data or []
+
+    planning_table = resolve_planning_table(supabase)
+    dienstplan = _lade_optional(
+        lambda: supabase.table(planning_table).select('*').eq('mitarbeiter_id', mitarbeiter_id)
+        .gte('datum', von_iso).lte('datum', bis_iso).order('datum').execute()
+    )
+    abwesenheiten = _lade_optional(
+        lambda: supabase.table('abwesenheiten').select('*').eq('mitarbeiter_id', mitarbeiter_id)
+        .lte('start_datum', bis_iso).gte('ende_datum', von_iso).execute()
+    )
+    vertraege = lade_vertraege(supabase, mitarbeiter_id)
+
+    posten = baue_tagesbuch(zeilen)
+    tage: Dict[date, List[Tagesposten]] = {}
+    for p in posten:
+        tage.setdefault(p.datum, []).append(p)
+
+    return Monatsfakten(
+        mitarbeiter_id=mitarbeiter_id,
+        monat=monat,
+        jahr=jahr,
+        von=von,
+        bis=bis,
+        mitarbeiter=dict(mitarbeiter or {}),
+        zeilen=tuple(zeilen),
+        posten=tuple(posten),
+        dienstplan=tuple(dienstplan),
+        abwesenheiten=tuple(abwesenheiten),
+        vertraege=tuple(vertraege or ()),
+        tage={tag: tuple(liste) for tag, liste in tage.items()},
+    )
+
+
+def lade_monatsfakten(
+    mitarbeiter_id: int,
+    monat: int,
+    jahr: int,
+    supabase=None,
+    *,
+    frisch: bool = False,
+) -> Monatsfakten:
+    """
+    Monatsfakten eines Mitarbeiters (aus dem Cache, sonst ein Abruf).
+
+    ``frisch=True`` umgeht den Cache – für Pfade, die das Ergebnis persistieren.
+    Jeder Aufruf erhält eine eigene (tiefe) Kopie des eingefrorenen Cache-Eintrags.
+    Ein fehlender Mitarbeiter ergibt ``mitarbeiter == {}``; DB-Fehler bei
+    Stammdaten oder Zeiterfassung werden an den Aufrufer durchgereicht.
+    """
+    key = (int(mitarbeiter_id), int(monat), int(jahr))
+    if not frisch:
+        now = monotonic()
+        with _monatsfakten_lock:
+            treffer = _monatsfakten_cache.get(key)
+            if treffer and (now - treffer[0]) < MONATSFAKTEN_TTL_SEKUNDEN:
+                _monatsfakten_cache.move_to_end(key)
+                return copy.deepcopy(treffer[1])
+
+    if supabase is None:
+        from utils.database import get_supabase_client
+        supabase = get_supabase_client()
+    fakten = _lade_monatsfakten_db(supabase, *key)
+    with _monatsfakten_lock:
+        _monatsfakten_speichern(key, fakten)
+    # Der Cache behält das Original; Aufrufer können Zeilen-Dicts nicht hineinverändern.
+    return copy.deepcopy(fakten)
+
+
+def _monatsfakten_speichern(key: Tuple[int, int, int], fakten: Monatsfakten) -> None:
+    """Einfügen unter _monatsfakten_lock: Abgelaufenes verwerfen, dann LRU-Grenze."""
+    now = monotonic()
+    for alt in [k for k, (ts, _) in _monatsfakten_cache.items() if (now - ts) >= MONATSFAKTEN_TTL_SEKUNDEN]:
+        del _monatsfakten_cache[alt]
+    _monatsfakten_cache[key] = (now, fakten)
+    _monatsfakten_cache.move_to_end(key)
+    while len(_monatsfakten_cache) > MONATSFAKTEN_MAX_EINTRAEGE:
+        _monatsfakten_cache.popitem(last=False)
+
+
+def invalidiere_monatsfakten(mitarbeiter_id: Optional[int] = None) -> None:
+    """Verwirft gecachte Monatsfakten (eines Mitarbeiters oder alle)."""
+    with _monatsfakten_lock:
+        if mitarbeiter_id is None:
+            _monatsfakten_cache.clear()
+            return
+        for key in [k for k in _monatsfakten_cache if k[0] == int(mitarbeiter_id)]:
+            del _monatsfakten_cache[key]
@@ -0,0 +1,360 @@
+"""
+plan_ist_abgleich.py – Soll/Ist-Abgleich Dienstplan gegen Zeiterfassung
+
+Betriebsweiter Abweichungsbericht je Mitarbeiter und Tag: geplante Stunden
+(dienstplaene) gegen gestempelte Stunden (zeiterfassung), verspätete Starts und
+fehlende Schichten. Statt woche/zeiten_monat/_load_dienstplan_start_map je
+Mitarbeiter zu kombinieren, wird jede Seite für den Zeitraum betriebsweit
+geladen (seitenweise, max-rows), nach (mitarbeiter_id, datum) sortiert und per
+Sort-Merge verbunden.
+
+Status je Tag (Vorrang in dieser Reihenfolge):
+  - ausstehend:  geplanter Tag nach dem Stichtag (zählt nicht in Summen)
+  - fehlt:       Arbeitsschicht geplant, nichts gestempelt, keine Abwesenheit
+  - abwesend:    Arbeitsschicht geplant, Abwesenheitsspiegel (Urlaub/Krank)
+  - ungeplant:   gestempelt ohne geplante Arbeitsschicht
+  - verspaetet:  erster Stempel später als Planbeginn + Toleranz
+  - ok
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.planpruefung import schicht_aus_zeile
+
+PLAN_IST_TOLERANZ_MINUTEN = int(os.getenv("PLAN_IST_TOLERANZ_MINUTEN", "5"))
+MAX_TAGE = 92
+SEITENGROESSE = 1000
+
+# Zeilen ohne echte Arbeitszeit: Abwesenheitsspiegel und Saldo-Übernahmen.
+_KEINE_ARBEIT_QUELLEN = {"abwesenheit_system", "historischer_saldo"}
+
+Schluessel = Tuple[int, str]  # (mitarbeiter_id, datum ISO)
+
+CSV_SPALTEN = [
+    "Mitarbeiter-ID", "Name", "Datum", "Status",
+    "Plan von", "Plan bis", "Soll (h)",
+    "Ist von", "Ist bis", "Ist (h)", "Differenz (h)", "Verspätung (min)",
+]
+
+
+def _zeit(value) -> Optional[str]:
+    raw = str(value or "").strip()
+    return raw[:5] if len(raw) >= 5 else None
+
+
+def _minuten(hhmm: str) -> int:
+    return int(hhmm[:2]) * 60 + int(hhmm[3:5])
+
+
+def _stunden(row: Dict[str, Any]) -> float:
+    """Netto-Stunden eines Zeiterfassung-Eintrags (gespeichert oder aus Start/Ende/Pause)."""
+    for key in ("arbeitsstunden", "stunden"):
+        if row.get(key) not in (None, ""):
+            try:
+                return float(row[key])
+            except (TypeError, ValueError):
+                pass
+    start, ende = _zeit(row.get("start_zeit")), _zeit(row.get("ende_zeit"))
+    if not start or not ende:
+        return 0.0
+    minuten = _minuten(ende) - _minuten(start)
+    if minuten < 0:
+        minuten += 24 * 60  # über Mitternacht
+    return max(0, minuten - int(row.get("pause_minuten") or 0)) / 60.0
+
+
+def _schluessel(row: Dict[str, Any]) -> Schluessel:
+    return int(row["mitarbeiter_id"]), str(row["datum"])[:10]
+
+
+def _gruppen(rows: List[Dict[str, Any]]) -> Iterator[Tuple[Schluessel, List[Dict[str, Any]]]]:
+    """Sortierte Zeilen → (Schlüssel, Zeilen) je Mitarbeiter und Tag."""
+    aktuell: Optional[Schluessel] = None
+    gruppe: List[Dict[str, Any]] = []
+    for row in rows:
+        key = _schluessel(row)
+        if key != aktuell and gruppe:
+            yield aktuell, gruppe
+            gruppe = []
+        aktuell = key
+        gruppe.append(row)
+    if gruppe:
+        yield aktuell, gruppe
+
+
+def _sort_merge(
+    plan: List[Dict[str, Any]],
+    ist: List[Dict[str, Any]],
+) -> Iterator[Tuple[Schluessel, List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Äußerer Join zweier nach (mitarbeiter_id, datum) sortierter Zeilenlisten."""
+    links, rechts = _gruppen(plan), _gruppen(ist)
+    p, i = next(links, None), next(rechts, None)
+    while p is not None or i is not None:
+        if i is None or (p is not None and p[0] < i[0]):
+            yield p[0], p[1], []
+            p = next(links, None)
+        elif p is None or i[0] < p[0]:
+            yield i[0], [], i[1]
+            i = next(rechts, None)
+        else:
+            yield p[0], p[1], i[1]
+            p, i = next(links, None), next(rechts, None)
+
+
+def _tag_auswerten(
+    key: Schluessel,
+    plan_rows: List[Dict[str, Any]],
+    ist_rows: List[Dict[str, Any]],
+    *,
+    stichtag: str,
+    toleranz: int,
+) -> Optional[Dict[str, Any]]:
+    mitarbeiter_id, datum = key
+    schicht = next((s for s in map(schicht_aus_zeile, plan_rows) if s is not None), None)
+    arbeit = [r for r in ist_rows if str(r.get("quelle") or "").strip().lower() not in _KEINE_ARBEIT_QUELLEN]
+    abwesend = any(str(r.get("quelle") or "").strip().lower() == "abwesenheit_system" for r in ist_rows) or any(
+        r.get("ist_krank") or r.get("abwesenheitstyp") for r in ist_rows
+    )
+    if schicht is None and not arbeit:
+        return None  # frei/urlaub geplant oder Planzeile ohne Zeiten, nichts gestempelt
+
+    soll = schicht.arbeitsminuten / 60.0 if schicht else 0.0
+    ist = sum(_stunden(r) for r in arbeit)
+    starts = sorted(s for s in (_zeit(r.get("start_zeit")) for r in arbeit) if s)
+    enden = sorted(e for e in (_zeit(r.get("ende_zeit")) for r in arbeit) if e)
+    plan_start = schicht.start.strftime("%H:%M") if schicht else None
+
+    verspaetung = 0
+    if plan_start and starts:
+        verspaetung = max(0, _minuten(starts[0]) - _minuten(plan_start))
+
+    if schicht is not None and datum > stichtag:
+        status = "ausstehend"
+    elif schicht is not None and not arbeit:
+        status = "abwesend" if abwesend else "fehlt"
+    elif schicht is None:
+        status = "ungeplant"
+    elif verspaetung > toleranz:
+        status = "verspaetet"
+    else:
+        status = "ok"
+
+    return {
+        "mitarbeiter_id": mitarbeiter_id,
+        "datum": datum,
+        "status": status,
+        "plan_von": plan_start,
+        "plan_bis": schicht.ende.strftime("%H:%M") if schicht else None,
+        "soll_stunden": round(soll, 2),
+        "ist_von": starts[0] if starts else None,
+        "ist_bis": enden[-1] if enden else None,
+        "ist_stunden": round(ist, 2),
+        "differenz_stunden": round(ist - soll, 2),
+        "verspaetung_minuten": verspaetung if status != "ausstehend" else 0,
+    }
+
+
+def _leere_summe() -> Dict[str, Any]:
+    return {
+        "soll_stunden": 0.0,
+        "ist_stunden": 0.0,
+        "differenz_stunden": 0.0,
+        "geplante_schichten": 0,
+        "fehlende_schichten": 0,
+        "abwesend": 0,
+        "ungeplante_tage": 0,
+        "verspaetungen": 0,
+        "verspaetung_minuten": 0,
+    }
+
+
+def _summieren(summe: Dict[str, Any], tag: Dict[str, Any]) -> None:
+    if tag["status"] == "ausstehend":
+        return
+    summe["soll_stunden"] += tag["soll_stunden"]
+    summe["ist_stunden"] += tag["ist_stunden"]
+    summe["differenz_stunden"] += tag["differenz_stunden"]
+    summe["geplante_schichten"] += 1 if tag["plan_von"] else 0
+    summe["fehlende_schichten"] += 1 if tag["status"] == "fehlt" else 0
+    summe["abwesend"] += 1 if tag["status"] == "abwesend" else 0
+    summe["ungeplante_tage"] += 1 if tag["status"] == "ungeplant" else 0
+    summe["verspaetungen"] += 1 if tag["status"] == "verspaetet" else 0
+    summe["verspaetung_minuten"] += tag["verspaetung_minuten"] if tag["status"] == "verspaetet" else 0
+
+
+def _runden(summe: Dict[str, Any]) -> Dict[str, Any]:
+    for key in ("soll_stunden", "ist_stunden", "differenz_stunden"):
+        summe[key] = round(summe[key], 2)
+    return summe
+
+
+def berechne_abweichungen(
+    plan: Iterable[Dict[str, Any]],
+    ist: Iterable[Dict[str, Any]],
+    *,
+    namen: Optional[Dict[int, str]] = None,
+    stichtag: Optional[date] = None,
+    toleranz_minuten: int = PLAN_IST_TOLERANZ_MINUTEN,
+) -> Dict[str, Any]:
+    """Sort-Merge beider Seiten → Tageszeilen, Summen je Mitarbeiter und gesamt."""
+    namen = namen or {}
+    stichtag_iso = (stichtag or date.today()).isoformat()
+    plan_sortiert = sorted(plan, key=_schluessel)
+    ist_sortiert = sorted(ist, key=_schluessel)
+
+    tage: List[Dict[str, Any]] = []
+    je_mitarbeiter: Dict[int, Dict[str, Any]] = {}
+    gesamt = _leere_summe()
+    for key, plan_rows, ist_rows in _sort_merge(plan_sortiert, ist_sortiert):
+        tag = _tag_auswerten(key, plan_rows, ist_rows, stichtag=stichtag_iso, toleranz=toleranz_minuten)
+        if tag is None:
+            continue
+        tag["name"] = namen.get(key[0], f"#{key[0]}")
+        tage.append(tag)
+        summe = je_mitarbeiter.setdefault(
+            key[0], {"mitarbeiter_id": key[0], "name": tag["name"], **_leere_summe()}
+        )
+        _summieren(summe, tag)
+        _summieren(gesamt, tag)
+
+    return {
+        "tage": tage,
+        "mitarbeiter": sorted((_runden(s) for s in je_mitarbeiter.values()), key=lambda s: s["name"]),
+        "gesamt": _runden(gesamt),
+        "toleranz_minuten": toleranz_minuten,
+    }
+
+
+def _lade_mitarbeiter(supabase, betrieb_id: int) -> Dict[int, str]:
+    res = (
+        supabase.table("mitarbeiter")
+        .select("id, vorname, nachname")
+        .eq("betrieb_id", betrieb_id)
+        .execute()
+    )
+    return {
+        int(r["id"]): f"{r.get('vorname') or ''} {r.get('nachname') or ''}".strip() or f"#{r['id']}"
+        for r in (res.data or [])
+    }
+
+
+def _alle_seiten(abfrage, seitengroesse: int = SEITENGROESSE) -> List[Dict[str, Any]]:
+    """
+    Alle Zeilen seitenweise (``.range``): PostgREST kappt einzelne Abrufe bei
+    max-rows (Supabase: 1000) still – ein betriebsweiter Zeitraum liegt darüber.
+    ``abfrage()`` liefert je Seite eine neue, eindeutig sortierte Abfrage.
+    """
+    zeilen: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        seite = abfrage().range(offset, offset + seitengroesse - 1).execute().data or []
+        zeilen.extend(seite)
+        if len(seite) < seitengroesse:
+            return zeilen
+        offset += seitengroesse
+
+
+def _spalte_fehlt(exc: Exception) -> bool:
+    """PostgREST-Fehler für eine unbekannte Spalte (ältere Schemata)."""
+    text = str(exc)
+    return "42703" in text or "PGRST204" in text or ("column" in text and "does not exist" in text)
+
+
+def _lade_plan(supabase, betrieb_id: int, von: date, bis: date) -> List[Dict[str, Any]]:
+    return _alle_seiten(lambda: (
+        supabase.table("dienstplaene")
+        .select("mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten")
+        .eq("betrieb_id", betrieb_id)
+        .gte("datum", von.isoformat())
+        .lte("datum", bis.isoformat())
+        .order("mitarbeiter_id")
+        .order("datum")
+    ))
+
+
+def _lade_ist(supabase, mitarbeiter_ids: List[int], von: date, bis: date) -> List[Dict[str, Any]]:
+    if not mitarbeiter_ids:
+        return []
+    # zeiterfassung hat nicht überall betrieb_id → Filter über die Mitarbeiter des Betriebs.
+    # Nur bei fehlenden Spalten auf die schmalere Auswahl zurückfallen; andere
+    # Fehler weiterreichen (sonst erschiene jeder geplante Tag als „fehlt“).
+    spaltensaetze = (
+        "mitarbeiter_id,datum,start_zeit,ende_zeit,pause_minuten,arbeitsstunden,stunden,quelle,ist_krank,abwesenheitstyp",
+        "mitarbeiter_id,datum,start_zeit,ende_zeit,pause_minuten,arbeitsstunden,stunden,quelle,ist_krank",
+        "mitarbeiter_id,datum,start_zeit,ende_zeit,pause_minuten,quelle",
+    )
+    for i, cols in enumerate(spaltensaetze):
+        try:
+            return _alle_seiten(lambda cols=cols: (
+                supabase.table("zeiterfassung")
+                .select(cols)
+                .in_("mitarbeiter_id", mitarbeiter_ids)
+                .gte("datum", von.isoformat())
+                .lte("datum", bis.isoformat())
+                .order("mitarbeiter_id")
+                .order("datum")
+                .order("start_zeit")
+            ))
+        except Exception as exc:
+            if i == len(spaltensaetze) - 1 or not _spalte_fehlt(exc):
+                raise
+    return []
+
+
+def lade_abweichungsbericht(
+    supabase,
+    *,
+    betrieb_id: int,
+    von: date,
+    bis: date,
+    mitarbeiter_id: Optional[int] = None,
+    stichtag: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Ein Abruf je Seite (dienstplaene, zeiterfassung) für den ganzen Betrieb."""
+    namen = _lade_mitarbeiter(supabase, betrieb_id)
+    ids = sorted(namen) if mitarbeiter_id is None else [m for m in (int(mitarbeiter_id),) if m in namen]
+    plan = [r for r in _lade_plan(supabase, betrieb_id, von, bis) if int(r["mitarbeiter_id"]) in ids]
+    ist = _lade_ist(supabase, ids, von, bis)
+    bericht = berechne_abweichungen(plan, ist, namen=namen, stichtag=stichtag)
+    return {"von": von.isoformat(), "bis": bis.isoformat(), **bericht}
+
+
+def _dezimal(wert: float) -> str:
+    return f"{wert:.2f}".replace(".", ",")
+
+
+def iter_abweichungen_csv(bericht: Dict[str, Any]) -> Iterator[bytes]:
+    """Tageszeilen als CSV (UTF-8 mit BOM, Semikolon, Dezimalkomma) für Excel."""
+    puffer = io.StringIO()
+    writer = csv.writer(puffer, delimiter=";", quoting=csv.QUOTE_MINIMAL)
+
+    def _abholen() -> bytes:
+        daten = puffer.getvalue()
+        puffer.seek(0)
+        puffer.truncate(0)
+        return daten.encode("utf-8")
+
+    writer.writerow(CSV_SPALTEN)
+    yield b"\xef\xbb\xbf" + _abholen()
+    for tag in bericht.get("tage") or []:
+        writer.writerow([
+            tag["mitarbeiter_id"],
+            tag["name"],
+            datetime.strptime(tag["datum"], "%Y-%m-%d").strftime("%d.%m.%Y"),
+            tag["status"],
+            tag["plan_von"] or "",
+            tag["plan_bis"] or "",
+            _dezimal(tag["soll_stunden"]),
+            tag["ist_von"] or "",
+            tag["ist_bis"] or "",
+            _dezimal(tag["ist_stunden"]),
+            _dezimal(tag["differenz_stunden"]),
+            tag["verspaetung_minuten"],
+        ])
+        yield _abholen()
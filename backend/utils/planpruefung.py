@@ -0,0 +1,169 @@
+"""
+planpruefung.py – ArbZG-Prüfung geplanter Schichten (Dienstplan)
+
+utils.compliance prüft bisher erst gestempelte Zeiten. Hier werden dieselben
+Regeln auf den Plan angewandt, sobald er bearbeitet wird:
+
+  - §4 Pausen je Schicht (check_arbzg_breaks)
+  - §3 Tageshöchstarbeitszeit je Schicht (check_daily_work_limit)
+  - §5 Ruhezeit zwischen aufeinanderfolgenden Schichten (check_rest_period)
+
+Je Mitarbeiter und Tag gibt es höchstens eine Planzeile (mitarbeiter_id,datum).
+Eine Ruhezeit-Verletzung ist nur zwischen Schichten benachbarter Tage möglich
+(zwei Tage Abstand ergeben ≥ 24 h minus Schichtlänge). Eine geänderte Zelle
+betrifft daher nur ihre eigenen Befunde und die Paare (Vortag, Tag) und
+(Tag, Folgetag) – ``pruefe_zellen`` lädt genau dieses Fenster.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.compliance import check_arbzg_breaks, check_daily_work_limit, check_rest_period
+
+Zelle = Tuple[int, date]
+
+
+@dataclass(frozen=True)
+class GeplanteSchicht:
+    mitarbeiter_id: int
+    datum: date
+    start: datetime
+    ende: datetime
+    pause_minuten: int
+
+    @property
+    def arbeitsminuten(self) -> int:
+        return max(0, int((self.ende - self.start).total_seconds() // 60) - self.pause_minuten)
+
+
+def _zeit(value) -> Optional[time]:
+    raw = str(value or "").strip()
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw[:5], "%H:%M").time()
+    except ValueError:
+        return None
+
+
+def schicht_aus_zeile(row: Dict[str, Any]) -> Optional[GeplanteSchicht]:
+    """Planzeile → Schicht; None für frei/urlaub oder ohne vollständige Zeiten."""
+    if (row.get("schichttyp") or "arbeit") != "arbeit":
+        return None
+    start_t, ende_t = _zeit(row.get("start_zeit")), _zeit(row.get("end_zeit"))
+    if start_t is None or ende_t is None:
+        return None
+    tag = date.fromisoformat(str(row["datum"])[:10])
+    start = datetime.combine(tag, start_t)
+    ende = datetime.combine(tag, ende_t)
+    if ende <= start:
+        ende += timedelta(days=1)  # Nachtschicht über Mitternacht
+    return GeplanteSchicht(
+        mitarbeiter_id=int(row["mitarbeiter_id"]),
+        datum=tag,
+        start=start,
+        ende=ende,
+        pause_minuten=int(row.get("pause_minuten") or 0),
+    )
+
+
+def _befunde(schicht: GeplanteSchicht, findings, datum: Optional[date] = None) -> List[Dict[str, Any]]:
+    return [
+        {"mitarbeiter_id": schicht.mitarbeiter_id, "datum": (datum or schicht.datum).isoformat(), **asdict(f)}
+        for f in findings
+    ]
+
+
+def pruefe_schicht(schicht: GeplanteSchicht) -> List[Dict[str, Any]]:
+    """Befunde, die nur von der Schicht selbst abhängen (§3, §4)."""
+    return _befunde(
+        schicht,
+        check_arbzg_breaks(schicht.arbeitsminuten, schicht.pause_minuten)
+        + check_daily_work_limit(schicht.arbeitsminuten),
+    )
+
+
+def pruefe_ruhezeit(vorher: Optional[GeplanteSchicht], nachher: Optional[GeplanteSchicht]) -> List[Dict[str, Any]]:
+    """§5-Befund für ein Paar aufeinanderfolgender Schichten (am späteren Tag gemeldet)."""
+    if vorher is None or nachher is None:
+        return []
+    return _befunde(nachher, check_rest_period(vorher.ende, nachher.start))
+
+
+def pruefe_plan(zeilen: Iterable[Dict[str, Any]], zellen: Optional[Iterable[Zelle]] = None) -> List[Dict[str, Any]]:
+    """
+    Befunde für ``zellen`` (None: alle Zeilen). Geprüft werden die Zelle selbst
+    und die Ruhezeit zu Vor- und Folgetag; jedes Paar wird nur einmal gemeldet.
+    """
+    schichten: Dict[Zelle, GeplanteSchicht] = {}
+    for row in zeilen:
+        s = schicht_aus_zeile(row)
+        if s is not None:
+            schichten[(s.mitarbeiter_id, s.datum)] = s
+
+    ziel = sorted(set(zellen) if zellen is not None else set(schichten))
+    befunde: List[Dict[str, Any]] = []
+    paare: set[Zelle] = set()  # Paar (mid, Folgetag)
+    for mid, tag in ziel:
+        s = schichten.get((mid, tag))
+        if s is not None:
+            befunde.extend(pruefe_schicht(s))
+        for spaeter in (tag, tag + timedelta(days=1)):
+            if (mid, spaeter) in paare:
+                continue
+            paare.add((mid, spaeter))
+            befunde.extend(pruefe_ruhezeit(
+                schichten.get((mid, spaeter - timedelta(days=1))),
+                schichten.get((mid, spaeter)),
+            ))
+    befunde.sort(key=lambda b: (b["mitarbeiter_id"], b["datum"], b["code"]))
+    return befunde
+
+
+def pruefe_zellen(supabase, *, betrieb_id: int, zellen: Iterable[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+    """
+    Inkrementelle Prüfung nach Änderungen: lädt nur die betroffenen Mitarbeiter
+    im Fenster [frühester Tag - 1, spätester Tag + 1] (ein Abruf).
+    """
+    normiert: set[Zelle] = set()
+    for mid, datum in zellen:
+        tag = datum if isinstance(datum, date) else date.fromisoformat(str(datum)[:10])
+        normiert.add((int(mid), tag))
+    if not normiert:
+        return []
+    von = min(t for _, t in normiert) - timedelta(days=1)
+    bis = max(t for _, t in normiert) + timedelta(days=1)
+    res = (
+        supabase.table("dienstplaene")
+        .select("mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten")
+        .eq("betrieb_id", betrieb_id)
+        .in_("mitarbeiter_id", sorted({m for m, _ in normiert}))
+        .gte("datum", von.isoformat())
+        .lte("datum", bis.isoformat())
+        .execute()
+    )
+    return pruefe_plan(res.data or [], normiert)
+
+
+def pruefe_monat(supabase, *, betrieb_id: int, jahr: int, monat: int) -> List[Dict[str, Any]]:
+    """Vollprüfung eines Monats inkl. Ruhezeit zum Vormonat (letzter Tag)."""
+    von = date(jahr, monat, 1)
+    bis = (date(jahr + 1, 1, 1) if monat == 12 else date(jahr, monat + 1, 1)) - timedelta(days=1)
+    res = (
+        supabase.table("dienstplaene")
+        .select("mitarbeiter_id, datum, schichttyp, start_zeit, end_zeit, pause_minuten")
+        .eq("betrieb_id", betrieb_id)
+        .gte("datum", (von - timedelta(days=1)).isoformat())
+        .lte("datum", bis.isoformat())
+        .execute()
+    )
+    zeilen = res.data or []
+    zellen = {
+        (int(r["mitarbeiter_id"]), date.fromisoformat(str(r["datum"])[:10]))
+        for r in zeilen
+        if str(r["datum"])[:10] >= von.isoformat()
+    }
+    return [b for b in pruefe_plan(zeilen, zellen) if b["datum"] <= bis.isoformat()]
@@ -0,0 +1,250 @@
+"""
+profiling.py – Profiling einzelner Requests auf Anforderung (nur Admins)
+
+Bei Beschwerden über langsame Monatsansichten eines Betriebs lässt sich ein
+einzelner Request gezielt vermessen:
+
+  - Auslöser: Header ``X-Complio-Profil: 1`` oder Query ``?profil=1``; der
+    Bearer-Token muss ``require_admin`` erfüllen, sonst läuft der Request
+    normal (ohne Fehler, ohne Profil)
+  - Sampling-Profiler: ein Hintergrund-Thread liest alle
+    ``PROFILING_INTERVALL_MS`` die Stacks aller Threads (Event-Loop und
+    Threadpool) und zählt Stapel mit Backend-Code. Parallel laufende Requests
+    desselben Workers können mit auftauchen.
+  - dazu die DB-Aufrufspur des Requests (utils.db_instrumentierung)
+  - Ergebnis im Speicher, Antwort-Header ``X-Profil-Id``; abrufbar über
+    ``GET /admin/profile/{id}`` (nur eigener Betrieb)
+
+Ohne ``PROFILING_AKTIV=1`` wird die Middleware gar nicht eingehängt (kein
+Aufwand je Request). Gespeichert werden höchstens ``PROFILING_MAX_ANZAHL``
+Profile mit je höchstens ``PROFILING_MAX_BYTES`` (JSON), älteste zuerst verworfen.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from utils.db_instrumentierung import _route_template, aktuelle_messung
+
+PROFILING_AKTIV = os.getenv("PROFILING_AKTIV", "0") == "1"
+PROFILING_INTERVALL_MS = float(os.getenv("PROFILING_INTERVALL_MS", "5"))
+PROFILING_MAX_ANZAHL = int(os.getenv("PROFILING_MAX_ANZAHL", "20"))
+PROFILING_MAX_BYTES = int(os.getenv("PROFILING_MAX_BYTES", "262144"))
+_MAX_SEKUNDEN = 60.0
+_MAX_SPUR = 500
+_MAX_STAPEL = 200
+_MAX_FUNKTIONEN = 30
+
+HEADER = b"x-complio-profil"
+
+_WURZEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_EIGENE = os.path.abspath(__file__)
+
+_profile: Deque[Dict[str, Any]] = deque(maxlen=PROFILING_MAX_ANZAHL)
+_lock = threading.Lock()
+
+
+# ── Sampler ──────────────────────────────────────────────────────────────────
+
+def _stapel(frame) -> Optional[Tuple[str, ...]]:
+    """Stapel außen→innen aus Backend-Frames; innerster Fremd-Frame als Blatt."""
+    backend: List[str] = []
+    blatt: Optional[str] = None
+    innerster = True
+    while frame is not None:
+        pfad = os.path.abspath(frame.f_code.co_filename)
+        if pfad.startswith(_WURZEL) and "site-packages" not in pfad and pfad != _EIGENE:
+            backend.append(f"{os.path.relpath(pfad, _WURZEL)}:{frame.f_code.co_name}")
+        elif innerster:
+            blatt = f"[{os.path.basename(pfad)}:{frame.f_code.co_name}]"
+        innerster = False
+        frame = frame.f_back
+    if not backend:
+        return None
+    backend.reverse()
+    return tuple(backend + [blatt]) if blatt else tuple(backend)
+
+
+class _Abtaster(threading.Thread):
+    def __init__(self, intervall: float):
+        super().__init__(name="complio-profiler", daemon=True)
+        self.intervall = intervall
+        self.stapel: Counter = Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        ende = perf_counter() + _MAX_SEKUNDEN
+        while not self._halt.wait(self.intervall) and perf_counter() < ende:
+            self.samples += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == self.ident:
+                    continue
+                stapel = _stapel(frame)
+                if stapel:
+                    self.stapel[stapel] += 1
+
+    def stoppen(self) -> None:
+        self._halt.set()
+        self.join(timeout=1.0)
+
+
+def _auswertung(stapel: Counter) -> Dict[str, Any]:
+    selbst: Counter = Counter()
+    gesamt: Counter = Counter()
+    for s, n in stapel.items():
+        selbst[s[-1]] += n
+        for funktion in set(s):
+            gesamt[funktion] += n
+    return {
+        "funktionen": [
+            {"funktion": f, "gesamt": n, "selbst": selbst.get(f, 0)}
+            for f, n in gesamt.most_common(_MAX_FUNKTIONEN)
+        ],
+        # Collapsed-Stack-Format (flamegraph.pl / speedscope)
+        "stapel": [f"{';'.join(s)} {n}" for s, n in stapel.most_common(_MAX_STAPEL)],
+    }
+
+
+def _begrenzen(profil: Dict[str, Any]) -> Dict[str, Any]:
+    """Kürzt Stapel und Spur, bis das Profil in PROFILING_MAX_BYTES passt."""
+    while len(json.dumps(profil, default=str)) > PROFILING_MAX_BYTES:
+        stapel, spur = profil["profil"]["stapel"], profil["db"]["spur"]
+        if len(stapel) > 10:
+            del stapel[len(stapel) // 2:]
+        elif len(spur) > 10:
+            del spur[len(spur) // 2:]
+            profil["db"]["spur_gekuerzt"] = True
+        else:
+            profil["profil"]["stapel"], profil["db"]["spur"] = [], []
+            break
+    return profil
+
+
+# ── Ablage ───────────────────────────────────────────────────────────────────
+
+def profile_liste(betrieb_id: int) -> List[Dict[str, Any]]:
+    with _lock:
+        eigene = [p for p in _profile if p["betrieb_id"] == betrieb_id]
+    return [
+        {
+            **{k: p[k] for k in ("id", "zeitpunkt", "methode", "route", "pfad", "status", "dauer_ms")},
+            "db_aufrufe": p["db"]["aufrufe"],
+        }
+        for p in reversed(eigene)
+    ]
+
+
+def profil_laden(profil_id: str, betrieb_id: int) -> Optional[Dict[str, Any]]:
+    with _lock:
+        for p in _profile:
+            if p["id"] == profil_id and p["betrieb_id"] == betrieb_id:
+                return p
+    return None
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+def _angefordert(scope) -> bool:
+    for name, wert in scope.get("headers") or ():
+        if name == HEADER:
+            return wert.strip() in (b"1", b"true")
+    query = scope.get("query_string") or b""
+    if b"profil" in query:
+        return parse_qs(query.decode("latin-1")).get("profil", [""])[0] in ("1", "true")
+    return False
+
+
+def _admin(scope) -> Optional[Dict[str, Any]]:
+    """Token-Payload, wenn der Bearer-Token require_admin erfüllt."""
+    from fastapi import HTTPException
+
+    from deps import _decode_token, require_admin
+
+    for name, wert in scope.get("headers") or ():
+        if name == b"authorization":
+            schema, _, token = wert.decode("latin-1").partition(" ")
+            if schema.lower() != "bearer" or not token:
+                return None
+            try:
+                return require_admin(_decode_token(token.strip()))
+            except HTTPException:
+                return None
+    return None
+
+
+class ProfilMiddleware:
+    """ASGI-Middleware: profiliert nur explizit angeforderte Admin-Requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _angefordert(scope):
+            await self.app(scope, receive, send)
+            return
+        user = _admin(scope)
+        if user is None or not user.get("betrieb_id"):
+            await self.app(scope, receive, send)
+            return
+
+        profil_id = uuid.uuid4().hex[:12]
+        messung = aktuelle_messung()
+        if messung is not None:
+            messung.spur, messung.spur_max = [], _MAX_SPUR
+        status = 500
+
+        async def _senden(nachricht):
+            nonlocal status
+            if nachricht["type"] == "http.response.start":
+                status = nachricht["status"]
+                nachricht = dict(nachricht)
+                nachricht["headers"] = list(nachricht.get("headers") or []) + [
+                    (b"x-profil-id", profil_id.encode()),
+                ]
+            await send(nachricht)
+
+        abtaster = _Abtaster(PROFILING_INTERVALL_MS / 1000.0)
+        start = perf_counter()
+        abtaster.start()
+        try:
+            await self.app(scope, receive, _senden)
+        finally:
+            abtaster.stoppen()
+            dauer = perf_counter() - start
+            route = _route_template(scope)
+            profil = {
+                "id": profil_id,
+                "zeitpunkt": datetime.now(timezone.utc).isoformat(),
+                "betrieb_id": int(user["betrieb_id"]),
+                "benutzer": user.get("sub"),
+                "methode": scope.get("method", ""),
+                "route": route,
+                "pfad": scope.get("path", ""),
+                "status": status,
+                "dauer_ms": round(dauer * 1000, 1),
+                "db": {
+                    "aufrufe": messung.db_aufrufe if messung else None,
+                    "zeit_ms": round(messung.db_zeit * 1000, 1) if messung else None,
+                    "spur": list(messung.spur or []) if messung else [],
+                    "spur_gekuerzt": bool(messung and messung.db_aufrufe > len(messung.spur or [])),
+                },
+                "profil": {
+                    "intervall_ms": PROFILING_INTERVALL_MS,
+                    "samples": abtaster.samples,
+                    **_auswertung(abtaster.stapel),
+                },
+            }
+            if messung is not None:
+                messung.spur = None
+            with _lock:
+                _profile.append(_begrenzen(profil))
@@ -0,0 +1,170 @@
+"""
+storage.py – Supabase-Storage-Client mit Verbindungspool
+
+Uploads und signierte URLs liefen bisher über einzelne ``requests.post``-
+Aufrufe: je Aufruf neuer TCP-/TLS-Handshake, Umgebungsvariablen jedes Mal neu
+gelesen, und eine Dokumentenliste kostete einen Storage-Aufruf je Datei.
+
+``get_storage_client()`` liefert einen Prozess-Singleton mit:
+
+  - einer ``requests.Session`` mit Keep-Alive-Pool (``STORAGE_HTTP_POOL``)
+  - Wiederholungen bei 429/5xx und Verbindungsfehlern (``STORAGE_HTTP_RETRIES``,
+    exponentielles Backoff) – Upload (x-upsert) und Signieren sind idempotent
+  - getrennten Timeouts für Upload und übrige Aufrufe
+  - ``signierte_urls(...)``: viele Pfade über den Sammel-Endpunkt
+    ``POST /storage/v1/object/sign/{bucket}`` in einem Aufruf
+
+Aufrufe werden wie DB-Abfragen gemessen (Tabelle ``storage:<bucket>``).
+utils.database delegiert ``upload_file_to_storage_result`` und
+``get_signed_url`` hierher; deren Signaturen bleiben unverändert.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.db_instrumentierung import db_aufruf_erfassen
+
+STORAGE_HTTP_POOL = int(os.getenv("STORAGE_HTTP_POOL", "10"))
+STORAGE_HTTP_RETRIES = int(os.getenv("STORAGE_HTTP_RETRIES", "2"))
+STORAGE_HTTP_TIMEOUT_SECONDS = float(os.getenv("STORAGE_HTTP_TIMEOUT_SECONDS", "10"))
+STORAGE_UPLOAD_TIMEOUT_SECONDS = float(os.getenv("STORAGE_UPLOAD_TIMEOUT_SECONDS", "30"))
+_SIGN_BATCH = 500
+
+
+class StorageClient:
+    def __init__(
+        self,
+        url: str,
+        service_key: str,
+        *,
+        pool: int = STORAGE_HTTP_POOL,
+        retries: int = STORAGE_HTTP_RETRIES,
+        timeout: float = STORAGE_HTTP_TIMEOUT_SECONDS,
+        upload_timeout: float = STORAGE_UPLOAD_TIMEOUT_SECONDS,
+    ):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self.session = requests.Session()
+        self.session.headers.update({"apikey": service_key, "Authorization": f"Bearer {service_key}"})
+        adapter = HTTPAdapter(
+            pool_connections=pool,
+            pool_maxsize=pool,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "POST", "PUT", "DELETE"}),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _post(self, bucket: str, operation: str, pfad: str, **kwargs) -> requests.Response:
+        start = perf_counter()
+        try:
+            return self.session.post(f"{self.url}/storage/v1/{pfad}", **kwargs)
+        finally:
+            db_aufruf_erfassen(f"storage:{bucket}", operation, perf_counter() - start)
+
+    def _absolut(self, signiert: str) -> str:
+        if signiert.startswith("http"):
+            return signiert
+        if not signiert.startswith("/storage/v1"):
+            signiert = "/storage/v1" + (signiert if signiert.startswith("/") else f"/{signiert}")
+        return f"{self.url}{signiert}"
+
+    def hochladen(
+        self,
+        bucket: str,
+        datei_pfad: str,
+        daten: bytes,
+        fallback_buckets: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Upload mit Bucket-Fallback; Ergebnis wie upload_file_to_storage_result."""
+        buckets = [bucket] + [b for b in (fallback_buckets or []) if b and b != bucket]
+        last_status = None
+        last_error = None
+        for kandidat in buckets:
+            response = self._post(
+                kandidat,
+                "upload",
+                f"object/{kandidat}/{quote(datei_pfad, safe='/')}",
+                data=daten,
+                headers={"x-upsert": "true", "Content-Type": "application/octet-stream"},
+                timeout=self.upload_timeout,
+            )
+            if response.status_code in (200, 201):
+                return {"ok": True, "bucket": kandidat, "status_code": response.status_code, "error": None}
+            last_status = response.status_code
+            body = (response.text or "").strip()
+            last_error = body[:500] if body else "Unbekannter Storage-Fehler"
+        return {"ok": False, "bucket": None, "status_code": last_status, "error": last_error}
+
+    def signierte_url(self, bucket: str, datei_pfad: str, expires_in: int = 3600) -> Optional[str]:
+        response = self._post(
+            bucket,
+            "sign",
+            f"object/sign/{bucket}/{quote(datei_pfad, safe='/')}",
+            json={"expiresIn": expires_in},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        signiert = data.get("signedURL") or data.get("signedUrl") or ""
+        return self._absolut(signiert) if signiert else None
+
+    def signierte_urls(self, bucket: str, datei_pfade: Iterable[str], expires_in: int = 3600) -> Dict[str, Optional[str]]:
+        """Signierte URLs für viele Pfade (Sammel-Endpunkt, ein Aufruf je 500 Pfade)."""
+        pfade = list(dict.fromkeys(p for p in datei_pfade if p))
+        ergebnis: Dict[str, Optional[str]] = {p: None for p in pfade}
+        for i in range(0, len(pfade), _SIGN_BATCH):
+            teil = pfade[i:i + _SIGN_BATCH]
+            response = self._post(
+                bucket,
+                "sign",
+                f"object/sign/{bucket}",
+                json={"expiresIn": expires_in, "paths": teil},
+                timeout=self.timeout,
+            )
+            if response.status_code != 200:
+                continue
+            for eintrag in response.json() or []:
+                signiert = eintrag.get("signedURL") or eintrag.get("signedUrl")
+                if eintrag.get("path") in ergebnis and signiert and not eintrag.get("error"):
+                    ergebnis[eintrag["path"]] = self._absolut(signiert)
+        return ergebnis
+
+
+_client: Optional[StorageClient] = None
+_lock = threading.Lock()
+
+
+def get_storage_client() -> StorageClient:
+    """Storage-Client (Modul-Singleton; Umgebung wird einmal gelesen)."""
+    global _client
+    with _lock:
+        if _client is None:
+            url = os.getenv("SUPABASE_URL")
+            if not url:
+                raise RuntimeError("Fehlende Umgebungsvariable: SUPABASE_URL")
+            service_key = (
+                os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+                or os.getenv("SUPABASE_SERVICE_KEY")
+                or os.getenv("SUPABASE_KEY")
+            )
+            if not service_key:
+                raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY / SUPABASE_KEY fehlt")
+            _client = StorageClient(url, service_key)
+        return _client
@@ -0,0 +1,254 @@
+"""
+urlaubskonto.py – Urlaubskonto je Mitarbeiter und Jahr (Tabelle urlaubskonten)
+
+Statt bei jedem Abruf mitarbeiter, abwesenheiten, zeiterfassung und
+urlaubsantraege zu lesen und die erste Zahl ungleich 0 zu nehmen, hält
+``urlaubskonten`` pro Jahr Anspruch, Vortrag, genommene und geplante Tage.
+Schreibpfade, die Urlaub berühren, rufen ``aktualisiere_urlaubskonto``; der
+Saldo ist dann ein Einzelzeilen-Abruf. ``neuaufbau_urlaubskonten``
+(scripts/urlaubskonten_neuaufbauen.py) gleicht alle Konten mit den Quellen ab.
+
+Abgleichsregeln (Arbeitstage Mi–So, Mo/Di = Ruhetage):
+  - genommen: Vereinigung der Urlaubstage aus abwesenheiten und zeiterfassung
+    (ein Tag zählt einmal, auch wenn er in beiden Quellen steht)
+  - geplant:  Tage genehmigter Urlaubsanträge, die noch nicht als genommen gebucht sind
+  - offen:    Anspruch + Vortrag - genommen - geplant
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from time import monotonic
+from typing import Any, Dict, Iterable, Optional
+
+from utils.anfrage_cache import lade_mitarbeiter_zeile
+
+_TABELLE_CACHE_SECONDS = 600.0
+_tabelle_cache: Optional[bool] = None
+_tabelle_cache_ts: float = 0.0
+
+
+def urlaubskonten_tabelle_vorhanden(supabase) -> bool:
+    """Prüft (gecacht), ob die Migration 20261019_urlaubskonten.sql ausgeführt wurde."""
+    global _tabelle_cache, _tabelle_cache_ts
+    now = monotonic()
+    if _tabelle_cache is not None and (now - _tabelle_cache_ts) < _TABELLE_CACHE_SECONDS:
+        return _tabelle_cache
+    try:
+        supabase.table("urlaubskonten").select("id").limit(0).execute()
+        _tabelle_cache = True
+    except Exception:
+        _tabelle_cache = False
+    _tabelle_cache_ts = now
+    return _tabelle_cache
+
+
+def _safe_date(value) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except Exception:
+        return None
+
+
+def _arbeitstage(start: Optional[date], ende: Optional[date], jahr: int) -> set[date]:
+    if start is None:
+        return set()
+    tag = max(start, date(jahr, 1, 1))
+    ende = min(ende or start, date(jahr, 12, 31))
+    tage: set[date] = set()
+    while tag <= ende:
+        if tag.weekday() not in (0, 1):
+            tage.add(tag)
+        tag += timedelta(days=1)
+    return tage
+
+
+def _lade_anspruch(supabase, mitarbeiter_id: int) -> Dict[str, Any]:
+    try:
+        return lade_mitarbeiter_zeile(supabase, mitarbeiter_id)
+    except Exception:
+        return {}
+
+
+def _lade_genehmigte_antraege(supabase, mitarbeiter_id: int, von: str, bis: str) -> list[dict]:
+    # Ältere Instanzen nutzen von_datum/bis_datum statt datum_von/datum_bis.
+    for start_col, ende_col in (("datum_von", "datum_bis"), ("von_datum", "bis_datum")):
+        try:
+            res = (
+                supabase.table("urlaubsantraege")
+                .select(f"{start_col},{ende_col}")
+                .eq("mitarbeiter_id", mitarbeiter_id)
+                .eq("status", "genehmigt")
+                .lte(start_col, bis)
+                .gte(ende_col, von)
+                .execute()
+            )
+            return [
+                {"datum_von": r.get(start_col), "datum_bis": r.get(ende_col)}
+                for r in (res.data or [])
+            ]
+        except Exception:
+            continue
+    return []
+
+
+def berechne_urlaubskonto_aus_quellen(supabase, mitarbeiter_id: int, jahr: int) -> Dict[str, Any]:
+    """Abgleich aus den Quelltabellen (nur für Neuaufbau und Schreibpfade)."""
+    ma = _lade_anspruch(supabase, mitarbeiter_id)
+    von, bis = date(jahr, 1, 1).isoformat(), date(jahr, 12, 31).isoformat()
+
+    genommen: set[date] = set()
+    try:
+        res = (
+            supabase.table("abwesenheiten")
+            .select("start_datum,ende_datum")
+            .eq("mitarbeiter_id", mitarbeiter_id)
+            .eq("typ", "urlaub")
+            .lte("start_datum", bis)
+            .gte("ende_datum", von)
+            .execute()
+        )
+        for row in res.data or []:
+            start = _safe_date(row.get("start_datum"))
+            genommen |= _arbeitstage(start, _safe_date(row.get("ende_datum")) or start, jahr)
+    except Exception:
+        pass
+    try:
+        res = (
+            supabase.table("zeiterfassung")
+            .select("datum")
+            .eq("mitarbeiter_id", mitarbeiter_id)
+            .in_("abwesenheitstyp", ["urlaub", "vacation", "u"])
+            .gte("datum", von)
+            .lte("datum", bis)
+            .execute()
+        )
+        for row in res.data or []:
+            tag = _safe_date(row.get("datum"))
+            genommen |= _arbeitstage(tag, tag, jahr)
+    except Exception:
+        pass
+
+    geplant: set[date] = set()
+    for row in _lade_genehmigte_antraege(supabase, mitarbeiter_id, von, bis):
+        start = _safe_date(row.get("datum_von"))
+        geplant |= _arbeitstage(start, _safe_date(row.get("datum_bis")) or start, jahr)
+    geplant -= genommen
+
+    return {
+        "mitarbeiter_id": int(mitarbeiter_id),
+        "betrieb_id": ma.get("betrieb_id"),
+        "jahr": int(jahr),
+        "anspruch_tage": float(ma.get("urlaubsanspruch_jahrestage") or ma.get("jahres_urlaubstage") or 0),
+        "resturlaub_vorjahr": float(ma.get("resturlaub_vorjahr") or 0),
+        "genommen_tage": float(len(genommen)),
+        "geplant_tage": float(len(geplant)),
+    }
+
+
+def _speichere(supabase, konto: Dict[str, Any]) -> None:
+    payload = {**konto, "aktualisiert_am": datetime.now(timezone.utc).isoformat()}
+    supabase.table("urlaubskonten").upsert(payload, on_conflict="mitarbeiter_id,jahr").execute()
+
+
+def aktualisiere_urlaubskonto(supabase, mitarbeiter_id: int, jahre: int | Iterable[int]) -> None:
+    """
+    Urlaubskonto für die betroffenen Jahre neu abgleichen. Für Schreibpfade:
+    Fehler werden geschluckt, fehlende Konten entstehen beim nächsten Lesen.
+    """
+    try:
+        if not urlaubskonten_tabelle_vorhanden(supabase):
+            return
+        for jahr in sorted({int(jahre)} if isinstance(jahre, int) else {int(j) for j in jahre}):
+            _speichere(supabase, berechne_urlaubskonto_aus_quellen(supabase, mitarbeiter_id, jahr))
+    except Exception:
+        pass
+
+
+def jahre_im_zeitraum(*tage) -> set[int]:
+    """Jahre, die von (Start, Ende)-Paaren oder Einzeldaten berührt werden."""
+    parsed = [d for d in (t if isinstance(t, date) else _safe_date(t) for t in tage) if d]
+    if not parsed:
+        return set()
+    return set(range(min(parsed).year, max(parsed).year + 1))
+
+
+def urlaubskonto_ergebnis(konto: Dict[str, Any]) -> Dict[str, Any]:
+    """Ledger-Zeile → Antwortformat von azk.berechne_urlaubskonto (plus geplant)."""
+    jahresanspruch = float(konto.get("anspruch_tage") or 0)
+    resturlaub = float(konto.get("resturlaub_vorjahr") or 0)
+    genommen = float(konto.get("genommen_tage") or 0)
+    geplant = float(konto.get("geplant_tage") or 0)
+    gesamt = jahresanspruch + resturlaub
+    offen = max(0.0, gesamt - genommen - geplant)
+
+    def _zahl(v: float):
+        return int(v) if float(v).is_integer() else round(v, 2)
+
+    return {
+        "gesamt_anspruch": _zahl(gesamt),
+        "genommen": _zahl(genommen),
+        "geplant": _zahl(geplant),
+        "offen": _zahl(offen),
+        "resturlaub_vorjahr": _zahl(resturlaub),
+        "jahresanspruch": _zahl(jahresanspruch),
+        # Frontend-kompatible Feldnamen
+        "anspruch_tage": _zahl(gesamt),
+        "genommene_tage": _zahl(genommen),
+        "geplante_tage": _zahl(geplant),
+        "rest_tage": _zahl(offen),
+    }
+
+
+def lade_urlaubskonto(supabase, mitarbeiter_id: int, jahr: int) -> Dict[str, Any]:
+    """
+    Urlaubsstand eines Jahres: eine Zeile aus urlaubskonten. Fehlt sie, wird
+    sie einmalig aus den Quellen aufgebaut; ohne Migration wird live abgeglichen.
+    """
+    if not urlaubskonten_tabelle_vorhanden(supabase):
+        return urlaubskonto_ergebnis(berechne_urlaubskonto_aus_quellen(supabase, mitarbeiter_id, jahr))
+
+    res = (
+        supabase.table("urlaubskonten")
+        .select("anspruch_tage,resturlaub_vorjahr,genommen_tage,geplant_tage")
+        .eq("mitarbeiter_id", mitarbeiter_id)
+        .eq("jahr", jahr)
+        .limit(1)
+        .execute()
+    )
+    if res.data:
+        return urlaubskonto_ergebnis(res.data[0])
+
+    konto = berechne_urlaubskonto_aus_quellen(supabase, mitarbeiter_id, jahr)
+    try:
+        _speichere(supabase, konto)
+    except Exception:
+        pass
+    return urlaubskonto_ergebnis(konto)
+
+
+def neuaufbau_urlaubskonten(
+    supabase,
+    *,
+    betrieb_id: Optional[int] = None,
+    jahre: Optional[Iterable[int]] = None,
+) -> Dict[str, Any]:
+    """Alle Urlaubskonten (eines Betriebs) für die Jahre mit den Quelltabellen abgleichen."""
+    if not urlaubskonten_tabelle_vorhanden(supabase):
+        raise RuntimeError("Tabelle urlaubskonten fehlt – Migration 20261019_urlaubskonten.sql ausführen.")
+
+    jahre = sorted(set(jahre or [date.today().year]))
+    query = supabase.table("mitarbeiter").select("id")
+    if betrieb_id is not None:
+        query = query.eq("betrieb_id", betrieb_id)
+    mitarbeiter_ids = [int(r["id"]) for r in (query.execute().data or [])]
+
+    aktualisiert = fehler = 0
+    for mitarbeiter_id in mitarbeiter_ids:
+        for jahr in jahre:
+            try:
+                _speichere(supabase, berechne_urlaubskonto_aus_quellen(supabase, mitarbeiter_id, jahr))
+                aktualisiert += 1
+            except Exception:
+                fehler += 1
+    return {"mitarbeiter": len(mitarbeiter_ids), "jahre": jahre, "aktualisiert": aktualisiert, "fehler": fehler}
@@ -6,7 +6,13 @@ import math
 import re
 from typing import Dict, Iterable, Optional
 
-from utils.lohnberechnung import berechne_arbeitszeitkonto_saldo, berechne_eintrag
+from utils.lohnberechnung import (
+    berechne_arbeitszeitkonto_saldo,
+    berechne_eintrag,
+    gespeicherte_netto_stunden,
+)
+from utils.anfrage_cache import lade_mitarbeiter_zeile, lade_vertraege
+from utils.monatsfakten import ART_KRANK, Monatsfakten, Tagesposten, baue_tagesbuch, lade_monatsfakten
 from utils.planning_tables import resolve_planning_table
 
 
@@ -206,52 +212,14 @@ def calculate_absence_days(start: date, end: date) -> float:
 
 
 def _load_mitarbeiter_defaults(supabase, mitarbeiter_id: int) -> dict:
-    try:
-        res = (
-            supabase.table("mitarbeiter")
-            .select(
-                "monatliche_soll_stunden, jahres_urlaubstage, resturlaub_vorjahr, "
-                "eintrittsdatum, austrittsdatum, arbeitstage_pro_woche, urlaub_berechnungsbasis"
-            )
-            .eq("id", mitarbeiter_id)
-            .limit(1)
-            .execute()
-        )
-    except Exception:
-        # Legacy-Fallback mit konservativem Basissatz
-        res = (
-            supabase.table("mitarbeiter")
-            .select("monatliche_soll_stunden, jahres_urlaubstage, resturlaub_vorjahr, eintrittsdatum, austrittsdatum")
-            .eq("id", mitarbeiter_id)
-            .limit(1)
-            .execute()
-        )
-    rows = res.data or []
-    return rows[0] if rows else {}
+    # Vollständige Zeile aus der Request-Identity-Map; fehlende Spalten älterer
+    # Instanzen sind schlicht nicht enthalten.
+    return lade_mitarbeiter_zeile(supabase, mitarbeiter_id)
 
 
 def _load_contract_rows(supabase, mitarbeiter_id: int) -> list[dict]:
-    select_variants = [
-        (
-            "gueltig_ab, gueltig_bis, soll_stunden_monat, wochenstunden, urlaubstage_jahr, "
-            "arbeitstage_pro_woche, wochenarbeitstage, urlaubstage_basis_werktage, "
-            "urlaubstage_sind_basis_6tage, urlaub_berechnungsbasis"
-        ),
-        "gueltig_ab, gueltig_bis, soll_stunden_monat, wochenstunden, urlaubstage_jahr",
-    ]
-    for columns in select_variants:
-        try:
-            res = (
-                supabase.table("vertraege")
-                .select(columns)
-                .eq("mitarbeiter_id", mitarbeiter_id)
-                .execute()
-            )
-            return res.data or []
-        except Exception:
-            continue
-    # Vor Migrationstabelle oder ältere Instanzen ohne Verträge
-    return []
+    # Vor Migrationstabelle oder ältere Instanzen ohne Verträge → []
+    return lade_vertraege(supabase, mitarbeiter_id)
 
 
 def _contract_active_on(contract: dict, day: date) -> bool:
@@ -591,8 +559,9 @@ def resolve_month_contract_targets(
     }
     """
     month_start, month_end = _month_bounds(monat, jahr)
-    defaults = _load_mitarbeiter_defaults(supabase, mitarbeiter_id)
-    contracts = _load_contract_rows(supabase, mitarbeiter_id)
+    fakten = lade_monatsfakten(mitarbeiter_id, monat, jahr, supabase=supabase)
+    defaults = fakten.mitarbeiter or _load_mitarbeiter_defaults(supabase, mitarbeiter_id)
+    contracts = fakten.vertraege
     soll_stunden, _urlaubstage_basis = _resolve_month_soll_and_vacation(
         month_start=month_start,
         month_end=month_end,
@@ -633,16 +602,6 @@ def _resolve_daily_target_for_day(
     return round(_resolve_daily_target_hours(active, month_workdays) or fallback_daily, 4)
 
 
-def _is_krank_row(row: dict) -> bool:
-    source = str(row.get("quelle") or "").strip().lower()
-    abw_typ = str(row.get("abwesenheitstyp") or "").strip().lower()
-    kommentar = str(row.get("manuell_kommentar") or "").strip().lower()
-    return bool(row.get("ist_krank")) or source == "au_bescheinigung" or abw_typ in {
-        "krank",
-        "krankheit",
-    } or kommentar.startswith("manuelle_korrektur_krank:")
-
-
 def _normalize_day_key(value: object) -> str:
     raw = str(value or "").strip()
     if not raw:
@@ -680,6 +639,20 @@ def _is_work_shift_row(plan_row: dict) -> bool:
     return False
 
 
+def _merge_dienstplan_start_rows(start_map: dict[str, str], rows: Iterable[dict]) -> dict[str, str]:
+    # Frühester Arbeitsschicht-Beginn je Tag.
+    for row in rows:
+        if not _is_work_shift_row(row):
+            continue
+        day_key = _normalize_day_key(row.get("datum"))
+        start_time = _normalize_time_value(row.get("start_zeit"))
+        if not day_key or not start_time:
+            continue
+        if day_key not in start_map or start_time < start_map[day_key]:
+            start_map[day_key] = start_time
+    return start_map
+
+
 def _load_dienstplan_start_map(
     supabase,
     *,
@@ -716,15 +689,7 @@ def _load_dienstplan_start_map(
     fallback = "dienstplan" if primary == "dienstplaene" else "dienstplaene"
     for table_name in (primary, fallback):
         rows = _load_rows(table_name)
-        for row in rows:
-            if not _is_work_shift_row(row):
-                continue
-            day_key = _normalize_day_key(row.get("datum"))
-            start_time = _normalize_time_value(row.get("start_zeit"))
-            if not day_key or not start_time:
-                continue
-            if day_key not in start_map or start_time < start_map[day_key]:
-                start_map[day_key] = start_time
+        _merge_dienstplan_start_rows(start_map, rows)
         if required_days and required_days.issubset(set(start_map.keys())):
             break
         if not required_days and rows:
@@ -732,15 +697,7 @@ def _load_dienstplan_start_map(
     return start_map
 
 
-def _load_month_ist_hours(
-    supabase,
-    mitarbeiter_id: int,
-    month_start: date,
-    month_end: date,
-    *,
-    mitarbeiter_defaults: Optional[dict] = None,
-    contract_rows: Optional[list[dict]] = None,
-) -> float:
+def _load_month_zeit_rows(supabase, mitarbeiter_id: int, month_start: date, month_end: date) -> list[dict]:
     try:
         zeit_res = (
             supabase.table("zeiterfassung")
@@ -765,14 +722,32 @@ def _load_month_ist_hours(
             .lte("datum", month_end.isoformat())
             .execute()
         )
+    return zeit_res.data or []
 
-    rows = zeit_res.data or []
-    grouped: dict[str, list[dict]] = {}
-    for row in rows:
-        day = str(row.get("datum") or "").strip()[:10]
-        if not day:
-            continue
-        grouped.setdefault(day, []).append(row)
+
+def _load_month_ist_hours(
+    supabase,
+    mitarbeiter_id: int,
+    month_start: date,
+    month_end: date,
+    *,
+    mitarbeiter_defaults: Optional[dict] = None,
+    contract_rows: Optional[list[dict]] = None,
+    fakten: Optional[Monatsfakten] = None,
+) -> float:
+    # Klassifikation (Krank/Urlaub/Arbeit, historischer_saldo) und Stunden-Fallback
+    # kommen aus dem Tagesbuch (monatsfakten) – dieselben Regeln wie AZK und Lohnkern.
+    if fakten is not None:
+        # Gemeinsamer Monatsabruf: keine eigenen Abfragen nötig.
+        posten = fakten.posten
+        mitarbeiter_defaults = mitarbeiter_defaults or fakten.mitarbeiter
+        contract_rows = contract_rows or fakten.vertraege
+    else:
+        posten = baue_tagesbuch(_load_month_zeit_rows(supabase, mitarbeiter_id, month_start, month_end))
+
+    grouped: dict[str, list[Tagesposten]] = {}
+    for p in posten:
+        grouped.setdefault(p.datum.isoformat(), []).append(p)
 
     workdays = [d for d in _daterange(month_start, month_end) if _is_workday(d)]
     month_workdays = len(workdays)
@@ -780,15 +755,18 @@ def _load_month_ist_hours(
     if fallback_monthly_soll <= 0:
         fallback_monthly_soll = _to_float(_load_mitarbeiter_defaults(supabase, mitarbeiter_id).get("monatliche_soll_stunden"))
     contracts = list(contract_rows or [])
-    if not contracts:
+    if not contracts and fakten is None:
         contracts = _load_contract_rows(supabase, mitarbeiter_id)
-    dienstplan_start_map = _load_dienstplan_start_map(
-        supabase,
-        mitarbeiter_id=mitarbeiter_id,
-        month_start=month_start,
-        month_end=month_end,
-        required_days=set(grouped.keys()),
-    )
+    if fakten is not None:
+        dienstplan_start_map = _merge_dienstplan_start_rows({}, fakten.dienstplan)
+    else:
+        dienstplan_start_map = _load_dienstplan_start_map(
+            supabase,
+            mitarbeiter_id=mitarbeiter_id,
+            month_start=month_start,
+            month_end=month_end,
+            required_days=set(grouped.keys()),
+        )
     calc_ma = {
         "monatliche_soll_stunden": fallback_monthly_soll,
         "monatliche_brutto_verguetung": 0.0,
@@ -807,62 +785,62 @@ def _load_month_ist_hours(
 
     # Urlaubstage aus abwesenheiten laden — für AZK-Neutralisation (BUrlG §11).
     urlaubstage: set[str] = set()
-    try:
-        for cols in ("typ,start_datum,ende_datum,attest_pfad", "typ,start_datum,ende_datum"):
-            try:
-                abw_res = (
-                    supabase.table("abwesenheiten")
-                    .select(cols)
-                    .eq("mitarbeiter_id", mitarbeiter_id)
-                    .lte("start_datum", month_end.isoformat())
-                    .gte("ende_datum", month_start.isoformat())
-                    .execute()
-                )
-                for row in abw_res.data or []:
-                    if str(row.get("typ") or "").lower() != "urlaub":
-                        continue
-                    start = _safe_date(row.get("start_datum"))
-                    end = _safe_date(row.get("ende_datum"))
-                    if start and end:
-                        for d in _daterange(max(start, month_start), min(end, month_end)):
-                            if _is_workday(d):
-                                urlaubstage.add(d.isoformat())
-                break
-            except Exception:
-                continue
-    except Exception:
-        pass
+    if fakten is not None:
+        urlaubstage = {d.isoformat() for d in fakten.urlaubstage_abwesenheit()}
+    else:
+        try:
+            for cols in ("typ,start_datum,ende_datum,attest_pfad", "typ,start_datum,ende_datum"):
+                try:
+                    abw_res = (
+                        supabase.table("abwesenheiten")
+                        .select(cols)
+                        .eq("mitarbeiter_id", mitarbeiter_id)
+                        .lte("start_datum", month_end.isoformat())
+                        .gte("ende_datum", month_start.isoformat())
+                        .execute()
+                    )
+                    for row in abw_res.data or []:
+                        if str(row.get("typ") or "").lower() != "urlaub":
+                            continue
+                        start = _safe_date(row.get("start_datum"))
+                        end = _safe_date(row.get("ende_datum"))
+                        if start and end:
+                            for d in _daterange(max(start, month_start), min(end, month_end)):
+                                if _is_workday(d):
+                                    urlaubstage.add(d.isoformat())
+                    break
+                except Exception:
+                    continue
+        except Exception:
+            pass
 
     total = 0.0
     for day in sorted(grouped.keys()):
-        day_rows = grouped[day]
-        productive_rows = [r for r in day_rows if str(r.get("quelle") or "").strip().lower() != "historischer_saldo"]
-        if not productive_rows:
-            continue
+        day_posten = grouped[day]
 
         # Kranktag hat Vorrang: verhindert Doppelzählung aus "krank + stempeln" am selben Datum.
-        if any(_is_krank_row(r) for r in productive_rows):
+        if any(p.art == ART_KRANK for p in day_posten):
             total += float(daily_target_cache.get(day, 0.0))
             continue
 
         # Urlaubstag ohne echtes Stempeln → Soll-Stunden anrechnen (BUrlG §11 Entgeltfortzahlung).
         if day in urlaubstage:
-            real_work = [
-                r for r in productive_rows
-                if str(r.get("quelle") or "").strip().lower() != "abwesenheit_system"
-            ]
+            real_work = [p for p in day_posten if p.quelle.strip().lower() != "abwesenheit_system"]
             if not real_work:
                 total += float(daily_target_cache.get(day, 0.0))
                 continue
 
-        for row in productive_rows:
-            start_zeit = _normalize_time_value(row.get("start_zeit"))
-            ende_zeit = _normalize_time_value(row.get("ende_zeit"))
-            if start_zeit and ende_zeit:
+        for p in day_posten:
+            if p.hat_zeiten:
+                # Gespeicherte Eintragsberechnung (calc_*) statt Neuberechnung, solange aktuell.
+                gespeichert = gespeicherte_netto_stunden(p.zeile, dienstplan_start_map.get(day))
+                if gespeichert is not None:
+                    total += gespeichert
+                    continue
                 try:
-                    normalized_row = dict(row)
-                    normalized_row["start_zeit"] = start_zeit
-                    normalized_row["ende_zeit"] = ende_zeit
+                    normalized_row = dict(p.zeile)
+                    normalized_row["start_zeit"] = _normalize_time_value(p.start_zeit)
+                    normalized_row["ende_zeit"] = _normalize_time_value(p.ende_zeit)
                     calc_row = berechne_eintrag(
                         normalized_row,
                         calc_ma,
@@ -874,7 +852,7 @@ def _load_month_ist_hours(
                         continue
                 except Exception:
                     pass
-            total += _to_float(row.get("arbeitsstunden") or row.get("stunden"))
+            total += p.stunden
 
     # Urlaubstage ohne jeden Zeiterfassung-Eintrag: ebenfalls neutralisieren.
     for day_iso in urlaubstage:
@@ -1202,8 +1180,10 @@ def _build_month_snapshot(
     mitarbeiter_id: int,
 ) -> WorkAccountSnapshot:
     month_start, month_end = _month_bounds(monat, jahr)
-    defaults = _load_mitarbeiter_defaults(supabase, mitarbeiter_id)
-    contracts = _load_contract_rows(supabase, mitarbeiter_id)
+    # Snapshot wird persistiert → frisch laden, nicht aus dem Lese-Cache.
+    fakten = lade_monatsfakten(mitarbeiter_id, monat, jahr, supabase=supabase, frisch=True)
+    defaults = fakten.mitarbeiter or _load_mitarbeiter_defaults(supabase, mitarbeiter_id)
+    contracts = fakten.vertraege
 
     soll_stunden, _urlaubstage_basis = _resolve_month_soll_and_vacation(
         month_start=month_start,
@@ -1224,6 +1204,7 @@ def _build_month_snapshot(
         month_end,
         mitarbeiter_defaults=defaults,
         contract_rows=contracts,
+        fakten=fakten,
     )
     urlaub_genommen, krank_tage = _load_year_absence_counters(
         supabase,
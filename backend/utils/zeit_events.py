@@ -9,6 +9,7 @@ from utils.compliance import (
     check_daily_work_limit,
     check_rest_period,
 )
+from utils.monatsfakten import invalidiere_monatsfakten
 from utils.time_utils import get_berlin_tz, now_utc, to_berlin, to_utc
 
 MAX_AUTO_SHIFT_HOURS = 10.0
@@ -308,6 +309,11 @@ def _sync_legacy_row_for_auto_close(
                 fallback,
                 on_conflict="mitarbeiter_id,datum,start_zeit",
             ).execute()
+        invalidiere_monatsfakten(mitarbeiter_id)
+
+        from utils.eintragsberechnung import aktualisiere_berechnung_tag
+
+        aktualisiere_berechnung_tag(client, mitarbeiter_id, day)
     except Exception:
         return
 
@@ -347,6 +353,31 @@ def _collect_daily_events(events: List[Dict[str, Any]], day: date) -> List[Dict[
     return [ev for ev in events if _same_day(ev["_ts"], day)]
 
 
+def _day_bounds_utc(day: date) -> Tuple[str, str]:
+    tz_berlin = get_berlin_tz()
+    start_local = datetime.combine(day, time(0, 0), tzinfo=tz_berlin)
+    end_local = datetime.combine(day + timedelta(days=1), time(0, 0), tzinfo=tz_berlin)
+    return to_utc(start_local).isoformat(), to_utc(end_local).isoformat()
+
+
+def _state_from_events(events: List[Dict[str, Any]]) -> Dict[str, bool]:
+    eingestempelt = False
+    pause_aktiv = False
+    for ev in events:
+        action = ev.get("aktion")
+        if action == EVENT_CLOCK_IN:
+            eingestempelt = True
+            pause_aktiv = False
+        elif action == EVENT_CLOCK_OUT:
+            eingestempelt = False
+            pause_aktiv = False
+        elif action == EVENT_BREAK_START and eingestempelt:
+            pause_aktiv = True
+        elif action == EVENT_BREAK_END and eingestempelt:
+            pause_aktiv = False
+    return {"eingestempelt": eingestempelt, "pause_aktiv": pause_aktiv}
+
+
 def get_event_state_for_day(
     supabase,
     *,
@@ -356,11 +387,7 @@ def get_event_state_for_day(
     """
     Liefert den aktuellen Schicht-/Pausenstatus für einen Tag.
     """
-    tz_berlin = get_berlin_tz()
-    start_local = datetime.combine(day, time(0, 0), tzinfo=tz_berlin)
-    end_local = datetime.combine(day + timedelta(days=1), time(0, 0), tzinfo=tz_berlin)
-    start = to_utc(start_local).isoformat()
-    end = to_utc(end_local).isoformat()
+    start, end = _day_bounds_utc(day)
     read_client = _service_role_client_or_none() or supabase
     _close_stale_open_shift(
         read_client,
@@ -379,24 +406,7 @@ def get_event_state_for_day(
         .order("zeitpunkt_utc")
         .execute()
     )
-    events = _normalize_event_rows(ev_res.data or [])
-
-    eingestempelt = False
-    pause_aktiv = False
-    for ev in events:
-        action = ev.get("aktion")
-        if action == EVENT_CLOCK_IN:
-            eingestempelt = True
-            pause_aktiv = False
-        elif action == EVENT_CLOCK_OUT:
-            eingestempelt = False
-            pause_aktiv = False
-        elif action == EVENT_BREAK_START and eingestempelt:
-            pause_aktiv = True
-        elif action == EVENT_BREAK_END and eingestempelt:
-            pause_aktiv = False
-
-    return {"eingestempelt": eingestempelt, "pause_aktiv": pause_aktiv}
+    return _state_from_events(_normalize_event_rows(ev_res.data or []))
 
 
 def evaluate_daily_compliance(
@@ -427,6 +437,55 @@ def evaluate_daily_compliance(
     return findings
 
 
+def _legacy_row_for_day(
+    daily: List[Dict[str, Any]],
+    *,
+    mitarbeiter_id: int,
+    betrieb_id: int,
+    day: date,
+    source: str,
+) -> Optional[Dict[str, Any]]:
+    """zeiterfassung-Zeile aus den Tages-Events (None ohne CLOCK_IN)."""
+    start_dt: Optional[datetime] = None
+    end_dt: Optional[datetime] = None
+    for ev in daily:
+        if ev.get("aktion") == EVENT_CLOCK_IN:
+            start_dt = ev["_ts"]
+        elif ev.get("aktion") == EVENT_CLOCK_OUT:
+            end_dt = ev["_ts"]
+    if start_dt is None:
+        return None
+    legacy = _build_legacy_payload(
+        mitarbeiter_id=mitarbeiter_id,
+        day=day,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        break_minutes=_compute_break_minutes(daily),
+        source=source,
+    )
+    legacy["betrieb_id"] = betrieb_id
+    return legacy
+
+
+def _compliance_audit_payload(
+    findings: List[ComplianceFinding],
+    *,
+    betrieb_id: int,
+    mitarbeiter_id: int,
+    created_by: Optional[int],
+) -> Dict[str, Any]:
+    return {
+        "betrieb_id": betrieb_id,
+        "mitarbeiter_id": mitarbeiter_id,
+        "user_id": created_by,
+        "event_type": "compliance_warning",
+        "entity": "zeit_eintraege",
+        "entity_id": str(mitarbeiter_id),
+        "after_data": [f.__dict__ for f in findings],
+        "reason": "Automatische ArbZG-Prüfung",
+    }
+
+
 def register_time_event(
     supabase,
     *,
@@ -521,28 +580,17 @@ def register_time_event(
 
     # Legacy-Write nur bei clock_in/clock_out
     if action in (EVENT_CLOCK_IN, EVENT_CLOCK_OUT):
-        start_dt: Optional[datetime] = None
-        end_dt: Optional[datetime] = None
-        for ev in daily:
-            if ev.get("aktion") == EVENT_CLOCK_IN:
-                start_dt = ev["_ts"]
-            elif ev.get("aktion") == EVENT_CLOCK_OUT:
-                end_dt = ev["_ts"]
-        if start_dt is not None:
-            break_minutes = _compute_break_minutes(daily)
-            legacy = _build_legacy_payload(
-                mitarbeiter_id=mitarbeiter_id,
-                day=day,
-                start_dt=start_dt,
-                end_dt=end_dt,
-                break_minutes=break_minutes,
-                source=source,
-            )
-            legacy["betrieb_id"] = betrieb_id
+        legacy = _legacy_row_for_day(daily, mitarbeiter_id=mitarbeiter_id, betrieb_id=betrieb_id, day=day, source=source)
+        if legacy is not None:
             write_client.table("zeiterfassung").upsert(
                 legacy,
                 on_conflict="mitarbeiter_id,datum,start_zeit",
             ).execute()
+            invalidiere_monatsfakten(mitarbeiter_id)
+            if legacy.get("ende_zeit") is not None:
+                from utils.eintragsberechnung import aktualisiere_berechnung_tag
+
+                aktualisiere_berechnung_tag(write_client, mitarbeiter_id, day)
 
     prev_end = _last_shift_end([ev for ev in events if to_berlin(ev["_ts"]).date() < day])
     findings = evaluate_daily_compliance(events, day, previous_shift_end=prev_end)
@@ -556,16 +604,9 @@ def register_time_event(
             pass
         try:
             write_client.table("audit_logs").insert(
-                {
-                    "betrieb_id": betrieb_id,
-                    "mitarbeiter_id": mitarbeiter_id,
-                    "user_id": created_by,
-                    "event_type": "compliance_warning",
-                    "entity": "zeit_eintraege",
-                    "entity_id": str(mitarbeiter_id),
-                    "after_data": [f.__dict__ for f in findings],
-                    "reason": "Automatische ArbZG-Prüfung",
-                }
+                _compliance_audit_payload(
+                    findings, betrieb_id=betrieb_id, mitarbeiter_id=mitarbeiter_id, created_by=created_by
+                )
             ).execute()
         except Exception:
             # Rückwärtskompatibilität: wenn audit_logs noch nicht migriert ist.
@@ -573,3 +614,191 @@ def register_time_event(
 
     return {"ok": True, "findings": [f.__dict__ for f in findings]}
 
+
+# ── Asynchrone Varianten (Stempel-, Kiosk- und Status-Endpunkte) ──────────────
+# Gleiche Regeln wie oben, aber über utils.database_async: unabhängige Lese-
+# zugriffe laufen gleichzeitig, kein Threadpool-Thread wartet auf PostgREST.
+# Seltene Pfade (Auto-Close, Eintragsberechnung) laufen synchron in einem Thread.
+
+
+def _stale_shift_queries(db, *, mitarbeiter_id: int, now_ts: datetime):
+    cutoff = now_ts - timedelta(hours=_max_open_shift_age_hours())
+    letzter_in = (
+        db.table("zeit_eintraege")
+        .select("aktion, zeitpunkt_utc")
+        .eq("mitarbeiter_id", mitarbeiter_id)
+        .eq("aktion", EVENT_CLOCK_IN)
+        .lte("zeitpunkt_utc", cutoff.isoformat())
+        .order("zeitpunkt_utc", desc=True)
+        .limit(1)
+    )
+    letzter_out = (
+        db.table("zeit_eintraege")
+        .select("aktion, zeitpunkt_utc")
+        .eq("mitarbeiter_id", mitarbeiter_id)
+        .eq("aktion", EVENT_CLOCK_OUT)
+        .order("zeitpunkt_utc", desc=True)
+        .limit(1)
+    )
+    return letzter_in, letzter_out
+
+
+def _has_stale_open_shift(in_rows: List[Dict[str, Any]], out_rows: List[Dict[str, Any]]) -> bool:
+    """Gleiche Bedingung wie _close_stale_open_shift: altes IN ohne späteres OUT."""
+    ins = _normalize_event_rows(in_rows)
+    if not ins:
+        return False
+    outs = _normalize_event_rows(out_rows)
+    return not outs or outs[-1]["_ts"] < ins[-1]["_ts"]
+
+
+async def _close_stale_open_shift_in_thread(
+    *,
+    mitarbeiter_id: int,
+    betrieb_id: Optional[int],
+    now_ts: datetime,
+    source: str,
+) -> None:
+    import asyncio
+
+    client = _service_role_client_or_none()
+    if client is None:
+        return
+    await asyncio.to_thread(
+        _close_stale_open_shift,
+        client,
+        mitarbeiter_id=mitarbeiter_id,
+        betrieb_id=betrieb_id,
+        now_ts=now_ts,
+        source=source,
+    )
+
+
+async def get_event_state_for_day_async(db, *, mitarbeiter_id: int, day: date) -> Dict[str, bool]:
+    """Asynchrones get_event_state_for_day: Auto-Close-Prüfung und Tages-Events in einem gather."""
+    from utils.database_async import parallel
+
+    start, end = _day_bounds_utc(day)
+
+    def _tages_events():
+        return (
+            db.table("zeit_eintraege")
+            .select("aktion, zeitpunkt_utc")
+            .eq("mitarbeiter_id", mitarbeiter_id)
+            .gte("zeitpunkt_utc", start)
+            .lt("zeitpunkt_utc", end)
+            .order("zeitpunkt_utc")
+        )
+
+    now_ts = now_utc()
+    in_res, out_res, ev_res = await parallel(
+        *_stale_shift_queries(db, mitarbeiter_id=mitarbeiter_id, now_ts=now_ts),
+        _tages_events(),
+    )
+    if _has_stale_open_shift(in_res.data or [], out_res.data or []):
+        await _close_stale_open_shift_in_thread(
+            mitarbeiter_id=mitarbeiter_id, betrieb_id=None, now_ts=now_ts, source="system_auto_close"
+        )
+        ev_res = await _tages_events().execute()
+    return _state_from_events(_normalize_event_rows(ev_res.data or []))
+
+
+async def register_time_event_async(
+    db,
+    *,
+    betrieb_id: int,
+    mitarbeiter_id: int,
+    action: str,
+    source: str = "stempeluhr",
+    geraet_id: Optional[str] = None,
+    created_by: Optional[int] = None,
+    event_time_utc: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Asynchrones register_time_event (Service-Role, daher ohne RLS-Fallback).
+    Liefert zusätzlich ``status`` des Buchungstags, damit Kiosk/Stempeluhr
+    danach nicht erneut lesen müssen.
+    """
+    import asyncio
+
+    from utils.database_async import parallel
+
+    event_time = to_utc(event_time_utc or now_utc())
+    since = (event_time - timedelta(days=7)).isoformat()
+
+    def _historie():
+        return (
+            db.table("zeit_eintraege")
+            .select("*")
+            .eq("mitarbeiter_id", mitarbeiter_id)
+            .gte("zeitpunkt_utc", since)
+            .order("zeitpunkt_utc")
+        )
+
+    in_res, out_res, ev_res = await parallel(
+        *_stale_shift_queries(db, mitarbeiter_id=mitarbeiter_id, now_ts=event_time),
+        _historie(),
+    )
+    if _has_stale_open_shift(in_res.data or [], out_res.data or []):
+        await _close_stale_open_shift_in_thread(
+            mitarbeiter_id=mitarbeiter_id, betrieb_id=betrieb_id, now_ts=event_time, source=source
+        )
+        ev_res = await _historie().execute()
+    events = _normalize_event_rows(ev_res.data or [])
+
+    ok, reason = validate_event_transition(events, action)
+    if not ok:
+        return {"ok": False, "error": reason}
+
+    await db.table("zeit_eintraege").insert({
+        "betrieb_id": betrieb_id,
+        "mitarbeiter_id": mitarbeiter_id,
+        "aktion": action,
+        "zeitpunkt_utc": event_time.isoformat(),
+        "quelle": source,
+        "geraet_id": geraet_id,
+        "created_by": created_by,
+    }).execute()
+
+    events.append({"aktion": action, "_ts": event_time, "zeitpunkt_utc": event_time})
+    events.sort(key=lambda x: x["_ts"])
+    day = to_berlin(event_time).date()
+    daily = _collect_daily_events(events, day)
+
+    if action in (EVENT_CLOCK_IN, EVENT_CLOCK_OUT):
+        legacy = _legacy_row_for_day(daily, mitarbeiter_id=mitarbeiter_id, betrieb_id=betrieb_id, day=day, source=source)
+        if legacy is not None:
+            await db.table("zeiterfassung").upsert(
+                legacy,
+                on_conflict="mitarbeiter_id,datum,start_zeit",
+            ).execute()
+            invalidiere_monatsfakten(mitarbeiter_id)
+            if legacy.get("ende_zeit") is not None:
+                client = _service_role_client_or_none()
+                if client is not None:
+                    from utils.eintragsberechnung import aktualisiere_berechnung_tag
+
+                    await asyncio.to_thread(aktualisiere_berechnung_tag, client, mitarbeiter_id, day)
+
+    prev_end = _last_shift_end([ev for ev in events if to_berlin(ev["_ts"]).date() < day])
+    findings = evaluate_daily_compliance(events, day, previous_shift_end=prev_end)
+    if findings:
+        # Beide Schreibzugriffe sind optional (Spalte/Tabelle evtl. nicht migriert).
+        await parallel(
+            db.table("zeiterfassung")
+            .update({"compliance_warnungen": [f.__dict__ for f in findings]})
+            .eq("mitarbeiter_id", mitarbeiter_id)
+            .eq("datum", day.isoformat()),
+            db.table("audit_logs").insert(
+                _compliance_audit_payload(
+                    findings, betrieb_id=betrieb_id, mitarbeiter_id=mitarbeiter_id, created_by=created_by
+                )
+            ),
+            ausnahmen_zurueckgeben=True,
+        )
+
+    return {
+        "ok": True,
+        "findings": [f.__dict__ for f in findings],
+        "status": _state_from_events(daily),
+    }
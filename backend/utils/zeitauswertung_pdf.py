@@ -3,7 +3,6 @@ PDF-Generator fuer monatliche Zeitauswertungen (AZK).
 Erzeugt eine uebersichtliche, MiLoG-konforme Zeiterfassungs-PDF.
 """
 
-from fpdf import FPDF
 from datetime import date
 import io
 from utils.branding import BRAND_COMPANY_NAME
@@ -55,6 +54,8 @@ def erstelle_azk_pdf(
     Returns:
         PDF als bytes
     """
+    from fpdf import FPDF  # lazy: nur für den PDF-Export benötigt
+
     pdf = FPDF(orientation='L', unit='mm', format='A4')  # Querformat fuer Tabelle
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.add_page()
@@ -0,0 +1,66 @@
+-- ============================================
+-- MIGRATION: Abwesenheits-Spiegel in zeiterfassung transaktional ersetzen
+-- Ausführen in Supabase SQL-Editor
+-- Nicht-destruktiv, mehrfach ausführbar.
+-- ============================================
+-- Wird von utils/absences.py (update_absence) per RPC aufgerufen:
+-- alte Spiegelzeilen (quelle = 'abwesenheit_system') im Zeitraum p_von..p_bis
+-- löschen und die neuen Zeilen (JSON-Array) in EINER Transaktion schreiben.
+-- Nur für den Service-Role-Client: SECURITY INVOKER (kein RLS-Bypass für
+-- andere Rollen) und EXECUTE ausschließlich für service_role.
+
+CREATE OR REPLACE FUNCTION public.ersetze_abwesenheit_spiegel(
+    p_mitarbeiter_id BIGINT,
+    p_von DATE,
+    p_bis DATE,
+    p_zeilen JSONB
+)
+RETURNS INT
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+    v_geschrieben INT := 0;
+BEGIN
+    DELETE FROM public.zeiterfassung
+    WHERE mitarbeiter_id = p_mitarbeiter_id
+      AND quelle = 'abwesenheit_system'
+      AND datum BETWEEN p_von AND p_bis;
+
+    INSERT INTO public.zeiterfassung (
+        mitarbeiter_id, datum, start_zeit, ende_zeit, abwesenheitstyp, ist_krank,
+        arbeitsstunden, pause_minuten, quelle, monat, jahr
+    )
+    SELECT
+        p_mitarbeiter_id,
+        (z->>'datum')::DATE,
+        (z->>'start_zeit')::TIME,
+        (z->>'ende_zeit')::TIME,
+        z->>'abwesenheitstyp',
+        COALESCE((z->>'ist_krank')::BOOLEAN, FALSE),
+        COALESCE((z->>'arbeitsstunden')::NUMERIC, 0),
+        COALESCE((z->>'pause_minuten')::INT, 0),
+        'abwesenheit_system',
+        (z->>'monat')::INT,
+        (z->>'jahr')::INT
+    FROM jsonb_array_elements(COALESCE(p_zeilen, '[]'::JSONB)) AS z
+    ON CONFLICT (mitarbeiter_id, datum, start_zeit) DO UPDATE SET
+        ende_zeit       = EXCLUDED.ende_zeit,
+        abwesenheitstyp = EXCLUDED.abwesenheitstyp,
+        ist_krank       = EXCLUDED.ist_krank,
+        arbeitsstunden  = EXCLUDED.arbeitsstunden,
+        pause_minuten   = EXCLUDED.pause_minuten,
+        quelle          = EXCLUDED.quelle;
+
+    GET DIAGNOSTICS v_geschrieben = ROW_COUNT;
+    RETURN v_geschrieben;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.ersetze_abwesenheit_spiegel(BIGINT, DATE, DATE, JSONB)
+    FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ersetze_abwesenheit_spiegel(BIGINT, DATE, DATE, JSONB)
+    TO service_role;
+
+-- Fertig
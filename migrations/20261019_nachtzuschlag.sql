@@ -0,0 +1,20 @@
+-- ============================================
+-- MIGRATION: Nachtzuschlag (23:00–06:00 Uhr, +25 %)
+-- Ausführen in Supabase SQL-Editor
+-- Nicht-destruktiv, mehrfach ausführbar.
+-- ============================================
+
+-- Häkchen pro Mitarbeiter, analog zu sonntagszuschlag_aktiv / feiertagszuschlag_aktiv
+ALTER TABLE mitarbeiter
+    ADD COLUMN IF NOT EXISTS nachtzuschlag_aktiv BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Nachtstunden und Nachtzuschlag in der gespeicherten Abrechnung
+ALTER TABLE lohnabrechnungen
+    ADD COLUMN IF NOT EXISTS nachtstunden DECIMAL(6,2) DEFAULT 0;
+
+ALTER TABLE lohnabrechnungen
+    ADD COLUMN IF NOT EXISTS nachtzuschlag DECIMAL(10,2) DEFAULT 0;
+
+-- Fertig
+-- Nach Ausführung wird der Nachtzuschlag für Mitarbeiter mit
+-- nachtzuschlag_aktiv = TRUE in der Lohnberechnung berücksichtigt.
@@ -0,0 +1,27 @@
+-- ============================================
+-- MIGRATION: Urlaubskonto je Mitarbeiter und Jahr
+-- Ausführen in Supabase SQL-Editor
+-- Nicht-destruktiv, mehrfach ausführbar.
+-- ============================================
+-- Wird von utils/urlaubskonto.py bei jedem Urlaubs-Schreibpfad gepflegt.
+-- Abgleich mit den Quelltabellen: python scripts/urlaubskonten_neuaufbauen.py
+
+CREATE TABLE IF NOT EXISTS public.urlaubskonten (
+    id                  BIGSERIAL PRIMARY KEY,
+    betrieb_id          BIGINT REFERENCES public.betriebe(id) ON DELETE CASCADE,
+    mitarbeiter_id      BIGINT NOT NULL REFERENCES public.mitarbeiter(id) ON DELETE CASCADE,
+    jahr                INT NOT NULL,
+    anspruch_tage       DECIMAL(6,2) NOT NULL DEFAULT 0,
+    resturlaub_vorjahr  DECIMAL(6,2) NOT NULL DEFAULT 0,
+    genommen_tage       DECIMAL(6,2) NOT NULL DEFAULT 0,
+    geplant_tage        DECIMAL(6,2) NOT NULL DEFAULT 0,
+    aktualisiert_am     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE(mitarbeiter_id, jahr)
+);
+
+CREATE INDEX IF NOT EXISTS idx_urlaubskonten_betrieb_jahr
+    ON public.urlaubskonten(betrieb_id, jahr);
+
+ALTER TABLE public.urlaubskonten ENABLE ROW LEVEL SECURITY;
+
+-- Fertig
@@ -0,0 +1,27 @@
+-- ============================================
+-- MIGRATION: Gespeicherte Eintragsberechnung in zeiterfassung
+-- Ausführen in Supabase SQL-Editor
+-- Nicht-destruktiv, mehrfach ausführbar.
+-- ============================================
+
+-- Netto-Zeit aus berechne_eintrag() je Eintrag (Minuten)
+ALTER TABLE zeiterfassung
+    ADD COLUMN IF NOT EXISTS calc_netto_minuten DECIMAL(8,2);
+
+-- Regelversion (lohnberechnung.BERECHNUNGS_VERSION) und Eingabebasis
+-- (Dienstplan-Start | Datum, Start, Ende, Pause des Eintrags)
+ALTER TABLE zeiterfassung
+    ADD COLUMN IF NOT EXISTS calc_version SMALLINT;
+
+ALTER TABLE zeiterfassung
+    ADD COLUMN IF NOT EXISTS calc_basis TEXT;
+
+ALTER TABLE zeiterfassung
+    ADD COLUMN IF NOT EXISTS calc_berechnet_am TIMESTAMPTZ;
+
+-- Neuberechnung sucht veraltete/fehlende Versionen
+CREATE INDEX IF NOT EXISTS idx_zeiterfassung_calc_version
+    ON public.zeiterfassung (calc_version);
+
+-- Fertig
+-- Danach einmalig: python backend/scripts/zeiterfassung_neuberechnen.py